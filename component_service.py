@@ -251,7 +251,7 @@ async def process_component_command(command: Dict[str, Any]):
                 # RealPLC with communicator
                 if hasattr(plc_manager.plc.communicator, 'write_coil'):
                     logger.debug(f"✏️ [PLC WRITE] Writing boolean {target_state} to coil {modbus_address}")
-                    success = plc_manager.plc.communicator.write_coil(modbus_address, target_state)
+                    success = await plc_manager.plc.communicator.write_coil(modbus_address, target_state)
                     if success:
                         logger.info(f"✅ [PLC WRITE SUCCESS] Component {component_name} set to {action} at coil {modbus_address}")
                     else:
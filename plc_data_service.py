@@ -14,11 +14,14 @@ import os
 import sys
 import signal
 import argparse
+import itertools
 import json
+import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Tuple
 from dataclasses import dataclass
 
 # Ensure project root is on sys.path for src imports
@@ -27,10 +30,20 @@ sys.path.insert(0, project_root)
 
 from src.log_setup import get_plc_logger, get_data_collection_logger, logger as main_logger
 from src.config import MACHINE_ID, PLC_TYPE, PLC_CONFIG
-from src.db import get_supabase
+from src.db import get_supabase, create_async_supabase
 from src.plc.manager import plc_manager  # Use global singleton for consistent PLC connection
-from src.parameter_wide_table_mapping import PARAMETER_TO_COLUMN_MAP  # Wide table column mapping
 from src.terminal_registry import TerminalRegistry, TerminalAlreadyRunningError
+from src.data_collection.wide_batcher import AdaptiveWideBatcher
+from src.data_collection.ordered_writer import OrderedWriterPool
+from src.data_collection.write_ahead_log import SegmentedWriteAheadLog
+from src.data_collection.dlq_replay import DeadLetterIndex, DeadLetterReplayer
+from src.data_collection.deadband_filter import DeadbandFilter
+from src.data_collection.sampling_scheduler import (
+    DEFAULT_SAMPLING_CLASSES, MultiRateScheduler, parse_sampling_classes, sampling_class_for
+)
+from src.data_collection.acquisition_pipeline import AcquiredCycle, AcquisitionPipeline, MonotonicWallClock
+from src.data_collection.setpoint_shadow import SetpointShadow
+from src.data_collection.wide_column_mapping import WideColumnMapping
 # Removed broken transactional import - will use direct database logging
 
 # Service-specific loggers
@@ -47,8 +60,10 @@ class PLCDataService:
     Provides PLC data collection with precise timing and reliable database logging.
 
     Features zero data loss guarantee through:
+    - Durable segmented write-ahead log: readings are logged before upload and
+      replayed from the committed-offset checkpoint after DB failures
     - Retry logic with exponential backoff (3 attempts: 1s, 2s, 4s)
-    - Dead letter queue for failed batches
+    - Dead letter queue for failed batches (synchronous writer mode)
     - Background recovery task for replaying failed batches
     """
 
@@ -96,29 +111,137 @@ class PLCDataService:
             # Setpoint synchronization metrics
             'setpoint_reads_successful': 0,
             'setpoint_reads_failed': 0,
-            'external_setpoint_changes_detected': 0
+            'external_setpoint_changes_detected': 0,
+            # Report-by-exception: latest readings refreshed for unchanged parameters
+            'deadband_heartbeat_refreshes': 0
         }
 
         # Parameter metadata cache for enhanced logging
         self.parameter_metadata = {}  # Cache parameter name/component info
 
+        # Wide table column mapping, generated from component_parameters_full at startup
+        # (cached in WIDE_COLUMN_MAPPING_CACHE); the static PARAMETER_TO_COLUMN_MAP until then
+        self.column_mapping = WideColumnMapping.from_static()
+        self.column_mapping_cache = Path(os.environ.get('WIDE_COLUMN_MAPPING_CACHE', 'logs/wide_column_mapping.json'))
+        # Pending columns (DDL not applied yet) are re-probed every WIDE_COLUMN_PROBE_SECONDS
+        self.column_probe_interval: float = float(os.environ.get('WIDE_COLUMN_PROBE_SECONDS', '300'))
+        self.column_probe_task = None
+
         # Dead letter queue configuration
         self.dead_letter_queue_dir = Path("logs/dead_letter_queue")
         self.dead_letter_queue_dir.mkdir(parents=True, exist_ok=True)
 
         # Non-blocking DB writer configuration
-        # Bounded queue keeps memory in check and prevents backpressure from blocking the poller
-        # OPTIMIZED: Increased from maxsize=2 to maxsize=20 to provide 40s buffer capacity
-        # Previous: 2 batches × 4.5s = 9s buffer before drops
-        # Current: 20 batches × 1s target = 20s buffer (40s with fast retry)
+        # Readings are appended to a durable segmented write-ahead log instead of a bounded
+        # in-memory queue, so nothing is dropped while the DB is slow or down. The writer
+        # uploads from the log and advances a committed-offset checkpoint; failed batches
+        # stay in the log and are replayed in bulk (no per-reading DLQ files).
+        # WAL_GROUP_COMMIT_MS: appends within this window share one fsync
+        # WAL_SEGMENT_MAX_BYTES: segment rotation size
         self.async_writer_enabled: bool = os.environ.get('ASYNC_WRITER', '1') == '1'
-        self._write_queue: asyncio.Queue = asyncio.Queue(maxsize=20)
+        self.wal = SegmentedWriteAheadLog(
+            os.environ.get('WAL_DIR', 'logs/wal'),
+            segment_max_bytes=int(os.environ.get('WAL_SEGMENT_MAX_BYTES', str(4 * 1024 * 1024))),
+            group_commit_ms=float(os.environ.get('WAL_GROUP_COMMIT_MS', '50')),
+        )
+        # Upload position and replay backoff (doubles up to WAL_REPLAY_MAX_DELAY seconds)
+        self._wal_cursor: int = 1
+        self._wal_rewind: bool = False
+        self._wal_retry_delay: float = 1.0
+        self.wal_replay_max_delay: float = float(os.environ.get('WAL_REPLAY_MAX_DELAY', '30'))
+
+        # Micro-batching: the writer uploads up to WIDE_BATCH_MAX_ROWS logged wide rows
+        # (waiting at most WIDE_BATCH_MAX_WAIT_MS for more) in one batched RPC.
+        # The batch size follows the backlog and the measured RPC latency.
+        self.wide_batcher = AdaptiveWideBatcher(
+            max_rows=int(os.environ.get('WIDE_BATCH_MAX_ROWS', '60')),
+            max_wait_ms=float(os.environ.get('WIDE_BATCH_MAX_WAIT_MS', '250')),
+            arrival_interval=self.data_collection_interval,
+            latency_budget_ms=float(os.environ.get('WIDE_BATCH_LATENCY_BUDGET_MS', '2000')),
+        )
+
+        # Writer stage: WIDE_WRITER_WORKERS batches in flight at once. Blocking Supabase
+        # calls run in a dedicated thread pool so an RPC never stalls the collection loop;
+        # batches still commit (metrics, batcher feedback) in timestamp order.
+        self.wide_writer_workers: int = max(1, int(os.environ.get('WIDE_WRITER_WORKERS', '2')))
+        self._db_executor = ThreadPoolExecutor(
+            max_workers=self.wide_writer_workers + 1,  # +1 for DLQ replay
+            thread_name_prefix='t1-db-writer'
+        )
+        self.wide_writer = OrderedWriterPool(
+            self._write_wal_batch,
+            self._commit_wal_batch,
+            workers=self.wide_writer_workers
+        )
+
+        # Dead letter queue replay: pending files are indexed in memory (no glob per file)
+        # and replayed DLQ_REPLAY_BATCH_ROWS rows per bulk RPC, paced to
+        # DLQ_REPLAY_ROWS_PER_SECOND (0 = unlimited) so live writes keep priority.
+        self.dlq_index = DeadLetterIndex()
+        self.dlq_replayer = DeadLetterReplayer(
+            self.dlq_index,
+            self._replay_wide_rows,
+            self._replay_history_records,
+            self._run_db_call,
+            rows_per_second=float(os.environ.get('DLQ_REPLAY_ROWS_PER_SECOND', '50')),
+            max_batch_rows=int(os.environ.get('DLQ_REPLAY_BATCH_ROWS', '200')),
+        )
+        self.dlq_retry_interval: float = 60.0
+
+        # Report-by-exception (DEADBAND_MODE=1): only columns that moved beyond their deadband
+        # (DEADBAND_ABSOLUTE / DEADBAND_PERCENT; binaries on any change) are written, with a
+        # full keyframe row every DEADBAND_KEYFRAME_SECONDS so readers can rebuild state.
+        # Every DEADBAND_HEARTBEAT_SECONDS the latest_parameter_readings timestamps of parameters
+        # read in that cycle but within their deadband are refreshed; keep this below the UI
+        # freshness threshold (2s) or stable parameters show as stale between keyframes.
+        # DEADBAND_OVERRIDES: JSON {"<parameter id or column>": {"absolute": x, "percent": y}}
+        self.deadband_enabled: bool = os.environ.get('DEADBAND_MODE', '0') == '1'
+        self.deadband = DeadbandFilter(
+            absolute=float(os.environ.get('DEADBAND_ABSOLUTE', '0')),
+            percent=float(os.environ.get('DEADBAND_PERCENT', '0')),
+            keyframe_interval=float(os.environ.get('DEADBAND_KEYFRAME_SECONDS', '60')),
+            heartbeat_interval=float(os.environ.get('DEADBAND_HEARTBEAT_SECONDS', '1')),
+        )
+        self.deadband_overrides: str = os.environ.get('DEADBAND_OVERRIDES', '')
+        # Heartbeat refreshes in flight; referenced so they are not garbage-collected early
+        self._heartbeat_refresh_tasks: Set[asyncio.Task] = set()
+
+        # Multi-rate polling (MULTI_RATE_SAMPLING=1): parameters are assigned to sampling classes
+        # (SAMPLING_CLASSES, e.g. "fast:0.1,normal:1,slow:5,static:60") from their metadata,
+        # or per parameter / component id / component name via SAMPLING_CLASS_OVERRIDES (JSON).
+        # Each tick reads only the parameters of the classes that are due.
+        self.multi_rate_enabled: bool = os.environ.get('MULTI_RATE_SAMPLING', '0') == '1'
+        self.sampling_classes: Dict[str, float] = (
+            parse_sampling_classes(os.environ.get('SAMPLING_CLASSES', '')) or dict(DEFAULT_SAMPLING_CLASSES)
+        )
+        self.sampling_class_overrides: str = os.environ.get('SAMPLING_CLASS_OVERRIDES', '')
+        self.sampling_scheduler: Optional[MultiRateScheduler] = None
+        # Level of the per-cycle progress lines; DEBUG under multi-rate polling (up to 10 per second)
+        self.cycle_log_level: int = logging.INFO
+
+        # Double-buffered acquisition (ACQUISITION_PIPELINE=1): the collection loop only reads
+        # the PLC; building, filtering and enqueueing cycle N runs while cycle N+1 is read.
+        # Rows are stamped with the monotonic instant the PLC read completed, mapped to UTC.
+        self.acquisition_pipeline_enabled: bool = os.environ.get('ACQUISITION_PIPELINE', '1') == '1'
+        self.acquisition_clock = MonotonicWallClock()
+        self.acquisition_pipeline = AcquisitionPipeline(
+            self._process_cycle, expected_interval=self.data_collection_interval
+        )
 
         # Throttle how often we read setpoints (reduced from 10s to 0.5s for responsiveness)
         # Lower interval = faster UI feedback when setpoints change
         self.setpoint_refresh_interval: float = float(os.environ.get('SETPOINT_REFRESH_INTERVAL', '0.5'))
         self._last_setpoint_read_time: float = 0.0
 
+        # Setpoint sync diffs PLC setpoints against an in-memory shadow of the last confirmed
+        # DB set_value (seeded at startup, kept current by Realtime UPDATE notifications)
+        # instead of a SELECT per read. Without Realtime the shadow is re-seeded every
+        # SETPOINT_SHADOW_RESEED_SECONDS.
+        self.setpoint_shadow = SetpointShadow(
+            reseed_interval=float(os.environ.get('SETPOINT_SHADOW_RESEED_SECONDS', '60'))
+        )
+        self.setpoint_channel = None
+
         # Verbose per-parameter INFO logs can be noisy; default to INFO summary only
         self.verbose_parameter_logging: bool = os.environ.get('VERBOSE_PARAMETER_LOGS', '0') == '1'
 
@@ -153,6 +276,13 @@ class PLCDataService:
 
             # Initialize parameter metadata cache for enhanced logging
             await self._initialize_parameter_metadata()
+            await self._load_column_mapping()
+            await self._seed_setpoint_shadow()
+            await self._subscribe_setpoint_changes()
+            if self.deadband_enabled:
+                self._configure_deadband()
+            if self.multi_rate_enabled:
+                self._configure_sampling_classes()
 
             # Initialize PLC connection using global singleton (shared with Terminals 2 & 3)
             plc_logger.info(f"🔗 Using global singleton PLCManager (shared across all terminals)")
@@ -181,15 +311,24 @@ class PLCDataService:
             self.is_running = True
 
             # Start core service tasks
+            if self.async_writer_enabled:
+                # Recover readings left in the write-ahead log by a previous run before collecting
+                self.wal.open()
+                self.wal.start()
+            if self.acquisition_pipeline_enabled:
+                self.acquisition_pipeline.start()
+
             self.data_collection_task = asyncio.create_task(self._data_collection_loop())
             if self.async_writer_enabled:
                 self.writer_task = asyncio.create_task(self._db_writer_loop())
             self.recovery_task = asyncio.create_task(self._dead_letter_queue_recovery_loop())
+            if self.column_mapping.pending():
+                self.column_probe_task = asyncio.create_task(self._column_probe_loop())
 
             plc_logger.info("🚀 PLC Data Service started - data collection operational with zero data loss guarantee")
             plc_logger.info(f"🧵 Async DB writer: {'ENABLED' if self.async_writer_enabled else 'DISABLED'}")
             plc_logger.info(f"⚙️  Setpoint refresh interval: {self.setpoint_refresh_interval:.1f}s")
-            plc_logger.info("🔄 Dead letter queue recovery enabled - failed batches will be replayed automatically")
+            plc_logger.info("🔄 Dead letter queue recovery enabled - failed batches will be replayed automatically in bulk")
 
             # Wait for tasks to complete
             await asyncio.gather(
@@ -218,7 +357,7 @@ class PLCDataService:
             self.shutdown_event.set()
 
             # Cancel all tasks with timeout
-            tasks = [self.data_collection_task, self.writer_task, self.recovery_task]
+            tasks = [self.data_collection_task, self.writer_task, self.recovery_task, self.column_probe_task]
             active_tasks = [t for t in tasks if t and not t.done()]
 
             if active_tasks:
@@ -236,6 +375,9 @@ class PLCDataService:
                 except asyncio.TimeoutError:
                     plc_logger.warning(f"⏱️ Task cancellation timed out after {self.shutdown_timeout * 0.5}s")
 
+            # Process the cycle still buffered in the acquisition pipeline before the WAL closes
+            await self.acquisition_pipeline.close(timeout=5.0)
+
             # Cleanup resources with timeout
             cleanup_tasks = []
 
@@ -255,6 +397,44 @@ class PLCDataService:
 
                 cleanup_tasks.append(cleanup_registry())
 
+            # Flush pending write-ahead log appends and the upload checkpoint
+            if self.async_writer_enabled:
+                async def cleanup_wal():
+                    try:
+                        await asyncio.wait_for(self.wal.close(), timeout=5.0)
+                        plc_logger.info("✅ Write-ahead log flushed")
+                    except asyncio.TimeoutError:
+                        plc_logger.warning("⏱️ Write-ahead log flush timed out")
+                    except Exception as e:
+                        plc_logger.error(f"Write-ahead log cleanup error: {e}")
+
+                cleanup_tasks.append(cleanup_wal())
+
+            # Finish latest_parameter_readings heartbeat refreshes still in flight
+            if self._heartbeat_refresh_tasks:
+                async def cleanup_heartbeat_refreshes():
+                    pending = list(self._heartbeat_refresh_tasks)
+                    done, not_done = await asyncio.wait(pending, timeout=5.0)
+                    for task in not_done:
+                        task.cancel()
+                    if not_done:
+                        plc_logger.warning(f"⏱️ Cancelled {len(not_done)} heartbeat refreshes on shutdown")
+
+                cleanup_tasks.append(cleanup_heartbeat_refreshes())
+
+            # Stop Realtime setpoint notifications
+            if self.setpoint_channel:
+                async def cleanup_setpoint_channel():
+                    try:
+                        await asyncio.wait_for(self.setpoint_channel.unsubscribe(), timeout=5.0)
+                        plc_logger.info("✅ Setpoint Realtime unsubscribed")
+                    except asyncio.TimeoutError:
+                        plc_logger.warning("⏱️ Setpoint Realtime unsubscribe timed out")
+                    except Exception as e:
+                        plc_logger.error(f"Setpoint Realtime cleanup error: {e}")
+
+                cleanup_tasks.append(cleanup_setpoint_channel())
+
             # Disconnect PLC
             async def cleanup_plc():
                 try:
@@ -282,6 +462,9 @@ class PLCDataService:
             # Cleanup parameter metadata cache
             self.parameter_metadata = {}
 
+            # Release DB writer threads (in-flight calls finish in the background)
+            self._db_executor.shutdown(wait=False)
+
             # Calculate shutdown duration
             duration = asyncio.get_event_loop().time() - start_time
             plc_logger.info(f"✅ Graceful shutdown complete in {duration:.2f}s")
@@ -305,6 +488,10 @@ class PLCDataService:
 
         Maintains ±100ms precision for data collection intervals.
         """
+        if self.sampling_scheduler is not None:
+            await self._multi_rate_collection_loop()
+            return
+
         plc_logger.info("Starting precise data collection loop (1s ±100ms)")
 
         # Initialize next deadline to align to now
@@ -401,70 +588,197 @@ class PLCDataService:
                 # Continue with error backoff
                 await asyncio.sleep(min(5.0, self.data_collection_interval))
 
-    async def _collect_and_log_data(self):
+    async def _multi_rate_collection_loop(self):
         """
-        Collect PLC data and log to database with transactional guarantees.
+        Data collection loop for multi-rate polling.
+
+        Sleeps until the next sampling class deadline, then reads and logs the
+        parameters of every class due in that tick in one bulk read.
         """
-        # ⏱️ INSTRUMENTATION: Measure what's causing 4-5s delay in collection
-        collect_start = time.time()
+        scheduler = self.sampling_scheduler
+        plc_logger.info(
+            "Starting multi-rate data collection loop ("
+            + ", ".join(f"{name}={scheduler.intervals[name]}s" for name in scheduler.active_classes) + ")"
+        )
+        loop = asyncio.get_event_loop()
+        scheduler.start(loop.time())
+
+        while not self.shutdown_event.is_set():
+            deadline, due_classes = scheduler.next_tick()
+            sleep_time = deadline - loop.time()
+            if sleep_time > 0:
+                try:
+                    await asyncio.wait_for(self.shutdown_event.wait(), timeout=sleep_time)
+                    data_logger.info("Shutdown event detected during sleep")
+                    break
+                except asyncio.TimeoutError:
+                    pass
 
+            started = loop.time()
+            success = True
+            try:
+                await self._collect_and_log_data(scheduler.parameters_for(due_classes))
+            except asyncio.CancelledError:
+                plc_logger.info("Data collection loop cancelled")
+                break
+            except Exception as e:
+                success = False
+                self.metrics['failed_readings'] += 1
+                data_logger.error(f"Error in multi-rate data collection loop: {e}", exc_info=True)
+            finally:
+                now = loop.time()
+                self.metrics['last_collection_duration'] = now - started
+                scheduler.complete(due_classes, started, now - started, now, success=success)
+
+    def _configure_sampling_classes(self):
+        """Assign every known parameter to a sampling class for multi-rate polling."""
+        if not self.parameter_metadata:
+            data_logger.warning("No parameter metadata - multi-rate polling disabled, using the fixed 1s loop")
+            return
+
+        overrides = {}
+        if self.sampling_class_overrides:
+            try:
+                overrides = json.loads(self.sampling_class_overrides)
+            except ValueError as e:
+                data_logger.error(f"Ignoring invalid SAMPLING_CLASS_OVERRIDES: {e}")
+
+        scheduler = MultiRateScheduler(self.sampling_classes)
+        for param_id, metadata in self.parameter_metadata.items():
+            scheduler.assign(param_id, sampling_class_for(param_id, metadata, overrides, self.sampling_classes))
+        self.sampling_scheduler = scheduler
+        self.cycle_log_level = logging.DEBUG
+        # Rows now arrive at the fastest class's rate
+        self.wide_batcher.arrival_interval = scheduler.fastest_interval
+        self.acquisition_pipeline.expected_interval = scheduler.fastest_interval
+
+        data_logger.info(
+            "📐 Multi-rate polling: " + ", ".join(
+                f"{name}={scheduler.intervals[name]}s ({scheduler.metrics[name].parameters} params)"
+                for name in scheduler.active_classes
+            )
+        )
+
+    async def _collect_and_log_data(self, parameter_ids: Optional[List[str]] = None):
+        """
+        Collect PLC data and log to database with transactional guarantees.
+
+        Reads the PLC and hands the cycle to the acquisition pipeline, so the next
+        read can start while this cycle is still being logged. Without a running
+        pipeline the cycle is processed inline.
+
+        Args:
+            parameter_ids: Parameters to read (multi-rate tick); None reads all parameters
+        """
         self.metrics['total_readings'] += 1
 
         try:
-            # Check PLC connection
-            if not self.plc_manager.is_connected():
-                data_logger.debug("PLC not connected - skipping data collection")
-                return
+            cycle = await self._acquire_cycle(parameter_ids)
+        except Exception as e:
+            self._record_collection_error(e)
+            raise
 
-            # Read all parameters from PLC (current values)
-            plc_read_start = time.time()
-            parameter_values = await self.plc_manager.read_all_parameters()
-            plc_read_duration = time.time() - plc_read_start
+        if cycle is None:
+            return
+        if self.acquisition_pipeline.running:
+            await self.acquisition_pipeline.submit(cycle)
+        else:
+            await self._process_cycle(cycle)
 
-            if not parameter_values:
-                data_logger.debug("No parameters available from PLC")
-                return
+    async def _acquire_cycle(self, parameter_ids: Optional[List[str]] = None) -> Optional[AcquiredCycle]:
+        """
+        Acquisition stage: read current values (and throttled setpoints) from the PLC.
 
-            # Read all setpoints from PLC (for synchronization), throttled
-            setpoint_values = {}
-            setpoint_read_duration = 0
-            now = asyncio.get_event_loop().time()
-            if (now - self._last_setpoint_read_time) >= self.setpoint_refresh_interval:
-                try:
-                    setpoint_read_start = time.time()
-                    setpoint_values = await self.plc_manager.read_all_setpoints()
-                    setpoint_read_duration = time.time() - setpoint_read_start
-                    self.metrics['setpoint_reads_successful'] += 1
-                    data_logger.info(f"📊 Read {len(setpoint_values)} setpoints from PLC for synchronization")
-                except Exception as e:
-                    self.metrics['setpoint_reads_failed'] += 1
-                    data_logger.warning(f"Failed to read setpoints: {e}", exc_info=True)
-                finally:
-                    self._last_setpoint_read_time = now
+        The cycle is stamped with the monotonic instant the parameter read completed,
+        not the time it is logged.
+
+        Args:
+            parameter_ids: Parameters to read; None reads all parameters
+
+        Returns:
+            Optional[AcquiredCycle]: None if the PLC is not connected or returned nothing
+        """
+        # Check PLC connection
+        if not self.plc_manager.is_connected():
+            data_logger.debug("PLC not connected - skipping data collection")
+            return None
+
+        # Read all parameters from PLC (current values)
+        started = time.monotonic()
+        if parameter_ids is None:
+            parameter_values = await self.plc_manager.read_all_parameters()
+        else:
+            parameter_values = await self.plc_manager.read_parameters(parameter_ids)
+        read_completed_at = time.monotonic()
+
+        if not parameter_values:
+            data_logger.debug("No parameters available from PLC")
+            return None
+
+        # Read all setpoints from PLC (for synchronization), throttled
+        setpoint_values = {}
+        setpoint_read_duration = 0
+        now = asyncio.get_event_loop().time()
+        if (now - self._last_setpoint_read_time) >= self.setpoint_refresh_interval:
+            try:
+                setpoint_read_start = time.monotonic()
+                setpoint_values = await self.plc_manager.read_all_setpoints()
+                setpoint_read_duration = time.monotonic() - setpoint_read_start
+                self.metrics['setpoint_reads_successful'] += 1
+                data_logger.info(f"📊 Read {len(setpoint_values)} setpoints from PLC for synchronization")
+            except Exception as e:
+                self.metrics['setpoint_reads_failed'] += 1
+                data_logger.warning(f"Failed to read setpoints: {e}", exc_info=True)
+            finally:
+                self._last_setpoint_read_time = now
+
+        return AcquiredCycle(
+            parameter_values=parameter_values,
+            setpoint_values=setpoint_values,
+            read_completed_at=read_completed_at,
+            timestamp=self.acquisition_clock.to_datetime(read_completed_at),
+            started_at=started,
+            plc_read_ms=(read_completed_at - started) * 1000,
+            setpoint_read_ms=setpoint_read_duration * 1000,
+        )
+
+    async def _process_cycle(self, cycle: AcquiredCycle):
+        """
+        Processing stage: build, filter and enqueue the wide row of an acquired cycle.
 
+        Args:
+            cycle: Values read by _acquire_cycle
+        """
+        parameter_values = cycle.parameter_values
+
+        try:
             # Log parameters to database with enhanced logging (includes setpoint sync)
-            log_start = time.time()
-            success_count = await self._log_parameters_with_metadata(parameter_values, setpoint_values)
-            log_duration = time.time() - log_start
+            log_start = time.monotonic()
+            success_count = await self._log_parameters_with_metadata(
+                parameter_values, cycle.setpoint_values, timestamp=cycle.timestamp.isoformat()
+            )
+            log_duration = time.monotonic() - log_start
 
-            total_collect_duration = time.time() - collect_start
-            data_logger.info(
-                f"⏱️ Collection breakdown: total={total_collect_duration*1000:.0f}ms "
-                f"(plc_read={plc_read_duration*1000:.0f}ms, setpoint={setpoint_read_duration*1000:.0f}ms, "
-                f"log={log_duration*1000:.0f}ms)"
+            data_logger.log(
+                self.cycle_log_level,
+                f"⏱️ Collection breakdown: plc_read={cycle.plc_read_ms:.0f}ms, "
+                f"setpoint={cycle.setpoint_read_ms:.0f}ms, "
+                f"read_to_log={(log_start - cycle.read_completed_at)*1000:.0f}ms, log={log_duration*1000:.0f}ms"
             )
 
             if success_count > 0:
                 if self.async_writer_enabled:
                     # Don't claim success yet - data is only queued, not written
                     # Success metrics will be updated in _db_writer_loop after actual write
-                    data_logger.info(
+                    data_logger.log(
+                        self.cycle_log_level,
                         f"📤 Queued for database write: {success_count}/{len(parameter_values)} parameters"
                     )
                 else:
                     # Sync mode: write completed, update metrics
                     self.metrics['successful_readings'] += 1
-                    data_logger.info(
+                    data_logger.log(
+                        self.cycle_log_level,
                         f"✅ PLC data collection completed: {success_count}/{len(parameter_values)} parameters logged successfully"
                     )
 
@@ -480,14 +794,16 @@ class PLCDataService:
                     self.registry.record_error("PLC data collection failed for all parameters")
 
         except Exception as e:
-            self.metrics['failed_readings'] += 1
-            data_logger.error(f"Failed to collect and log PLC data: {e}", exc_info=True)
+            self._record_collection_error(e)
+            raise
 
-            # Record error in liveness system
-            if self.registry:
-                self.registry.record_error(f"PLC data collection exception: {str(e)}")
+    def _record_collection_error(self, error: Exception):
+        self.metrics['failed_readings'] += 1
+        data_logger.error(f"Failed to collect and log PLC data: {error}", exc_info=True)
 
-            raise
+        # Record error in liveness system
+        if self.registry:
+            self.registry.record_error(f"PLC data collection exception: {str(error)}")
 
 
 
@@ -593,8 +909,101 @@ class PLCDataService:
             data_logger.error(f"Failed to load parameter metadata: {e}", exc_info=True)
             # Continue with empty metadata - service should still work
 
+    async def _load_column_mapping(self):
+        """Generate the wide table column mapping from component_parameters_full."""
+        try:
+            self.column_mapping = await asyncio.to_thread(
+                WideColumnMapping.load, self.supabase, self.column_mapping_cache
+            )
+        except Exception as e:
+            data_logger.error(f"Failed to load wide column mapping, keeping the static map: {e}", exc_info=True)
+            return
+
+        pending = self.column_mapping.pending()
+        data_logger.info(
+            f"🗺️ Wide column mapping ({self.column_mapping.metrics.source}): "
+            f"{len(self.column_mapping.parameter_to_column)} columns, {len(pending)} pending"
+        )
+        if pending:
+            data_logger.warning(
+                f"⚠️ {len(pending)} parameters have no parameter_readings column yet "
+                f"({', '.join(column.column for column in pending[:5])}{'...' if len(pending) > 5 else ''}) - "
+                f"generate the DDL with: python -m src.data_collection.wide_column_mapping"
+            )
+
+    async def _column_probe_loop(self):
+        """Re-probe pending wide columns until every one of them exists."""
+        while self.column_mapping.pending() and not self.shutdown_event.is_set():
+            try:
+                await asyncio.wait_for(self.shutdown_event.wait(), timeout=self.column_probe_interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self._probe_pending_columns()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                data_logger.error(f"Error probing pending wide columns: {e}", exc_info=True)
+
+    async def _probe_pending_columns(self) -> int:
+        """
+        Start writing pending columns that have been added to parameter_readings.
+
+        Returns:
+            int: Number of columns activated
+        """
+        mapping = self.column_mapping
+        created = await asyncio.to_thread(mapping.find_created, self.supabase)
+        if not created:
+            return 0
+
+        mapping.activate(created)
+        if self.deadband_enabled:
+            self._configure_deadband()
+        data_logger.info(
+            f"🗺️ {len(created)} wide columns now exist ({', '.join(c.column for c in created[:5])}"
+            f"{'...' if len(created) > 5 else ''}); {len(mapping.pending())} still pending"
+        )
+        try:
+            await asyncio.to_thread(mapping.save, self.column_mapping_cache)
+        except Exception as e:
+            data_logger.warning(f"Failed to cache wide column mapping: {e}")
+        return len(created)
+
+    def _configure_deadband(self):
+        """Apply binary columns (from parameter metadata) and per-parameter overrides."""
+        parameter_to_column = self.column_mapping.parameter_to_column
+        binary_columns = [
+            parameter_to_column[param_id]
+            for param_id, metadata in self.parameter_metadata.items()
+            if metadata.get('data_type') in ('binary', 'valve_state') and param_id in parameter_to_column
+        ]
+        self.deadband.set_binary_columns(binary_columns)
+
+        overrides = {}
+        if self.deadband_overrides:
+            try:
+                overrides = json.loads(self.deadband_overrides)
+            except ValueError as e:
+                data_logger.error(f"Ignoring invalid DEADBAND_OVERRIDES: {e}")
+        for key, rule in overrides.items():
+            column = parameter_to_column.get(key, key)
+            self.deadband.set_threshold(
+                column,
+                absolute=rule.get('absolute'),
+                percent=rule.get('percent'),
+                binary=rule.get('binary'),
+            )
+        self.deadband.request_keyframe()
+        data_logger.info(
+            f"📉 Report-by-exception enabled: {len(binary_columns)} binary columns, "
+            f"{len(overrides)} overrides, keyframe every {self.deadband.keyframe_interval:.0f}s, "
+            f"heartbeat every {self.deadband.heartbeat_interval:.1f}s"
+        )
+
     async def _batch_insert_with_retry(self, history_records: List[Dict[str, Any]],
-                                       log_success: bool = True) -> bool:
+                                       log_success: bool = True, dead_letter: bool = True) -> bool:
         """
         Batch insert using PostgreSQL RPC for optimal performance.
 
@@ -607,6 +1016,8 @@ class PLCDataService:
         Args:
             history_records: List of parameter records to insert
             log_success: If False, suppress success logs (used by async writer to avoid duplicate logging)
+            dead_letter: If False, do not write to the dead letter queue on final failure
+                (the async writer keeps failed records in the write-ahead log instead)
 
         Returns:
             bool: True if insert succeeded, False if all retries failed
@@ -655,6 +1066,12 @@ class PLCDataService:
                 else:
                     # Final attempt failed - write to dead letter queue
                     self.metrics['batch_insert_failures'] += 1
+                    if not dead_letter:
+                        data_logger.error(
+                            f"❌ RPC insert failed after {max_attempts} attempts: {e}. "
+                            f"{len(history_records)} records stay in the write-ahead log for replay"
+                        )
+                        return False
                     data_logger.error(
                         f"❌ RPC insert failed after {max_attempts} attempts: {e}. "
                         f"Writing {len(history_records)} records to dead letter queue..."
@@ -665,7 +1082,7 @@ class PLCDataService:
         return False
 
     async def _insert_wide_record_with_retry(self, timestamp: str, wide_record: Dict[str, float],
-                                             log_success: bool = True) -> bool:
+                                             log_success: bool = True, dead_letter: bool = True) -> bool:
         """
         Insert single WIDE-FORMAT row using PostgreSQL RPC for optimal performance.
 
@@ -678,6 +1095,8 @@ class PLCDataService:
             timestamp: ISO format timestamp for the reading
             wide_record: Dictionary of column_name -> value for all parameters
             log_success: If False, suppress success logs (used by async writer to avoid duplicate logging)
+            dead_letter: If False, do not write to the dead letter queue on final failure
+                (the async writer keeps failed records in the write-ahead log instead)
 
         Returns:
             bool: True if insert succeeded, False if all retries failed
@@ -695,14 +1114,8 @@ class PLCDataService:
                 # ⏱️ INSTRUMENTATION: Measure actual RPC timing to find 4.5s bottleneck
                 rpc_start = time.time()
 
-                # Call wide RPC function with timestamp and JSONB parameters
-                response = self.supabase.rpc(
-                    'insert_parameter_reading_wide',
-                    params={
-                        'p_timestamp': timestamp,
-                        'p_params': wide_record
-                    }
-                ).execute()
+                # Call wide RPC function with timestamp and JSONB parameters (in the DB thread pool)
+                inserted_count = await self._run_db_call(self._rpc_insert_wide_sync, timestamp, wide_record)
 
                 rpc_duration = time.time() - rpc_start
 
@@ -712,9 +1125,6 @@ class PLCDataService:
                     f"(attempt {attempt + 1}/{max_attempts})"
                 )
 
-                # RPC returns count of parameters inserted
-                inserted_count = response.data if response.data else 0
-
                 if inserted_count > 0:
                     # Log retry success if this wasn't the first attempt
                     if attempt > 0:
@@ -746,6 +1156,12 @@ class PLCDataService:
                 else:
                     # Final attempt failed - write to dead letter queue
                     self.metrics['batch_insert_failures'] += 1
+                    if not dead_letter:
+                        data_logger.error(
+                            f"❌ Wide insert failed after {max_attempts} attempts: {e}. "
+                            f"Row stays in the write-ahead log for replay"
+                        )
+                        return False
                     data_logger.error(
                         f"❌ Wide insert failed after {max_attempts} attempts: {e}. "
                         f"Writing to dead letter queue..."
@@ -755,6 +1171,80 @@ class PLCDataService:
 
         return False
 
+    async def _insert_wide_batch_with_retry(self, rows: List[Tuple[str, Dict[str, float]]],
+                                            log_success: bool = True, dead_letter: bool = True) -> bool:
+        """
+        Insert several WIDE-FORMAT rows with one batched RPC (one row per timestamp).
+
+        A single row uses the regular insert_parameter_reading_wide RPC. The batch
+        is committed in one transaction, so it is retried and dead-lettered as a unit.
+
+        Args:
+            rows: List of (timestamp, wide_record) tuples in timestamp order
+            log_success: If False, suppress success logs (used by async writer to avoid duplicate logging)
+            dead_letter: If False, do not write to the dead letter queue on final failure
+
+        Returns:
+            bool: True if insert succeeded, False if all retries failed
+        """
+        if len(rows) == 1:
+            timestamp, wide_record = rows[0]
+            return await self._insert_wide_record_with_retry(
+                timestamp, wide_record, log_success=log_success, dead_letter=dead_letter
+            )
+
+        max_attempts = 3
+        backoff_delays = [0.1, 0.2, 0.5]  # Fast retry: 100ms, 200ms, 500ms
+
+        for attempt in range(max_attempts):
+            try:
+                rpc_start = time.time()
+                inserted_rows = await self._run_db_call(self._rpc_insert_wide_batch_sync, rows)
+                rpc_duration = time.time() - rpc_start
+
+                data_logger.info(
+                    f"⏱️ Batch RPC timing: {rpc_duration*1000:.0f}ms for {len(rows)} rows "
+                    f"(attempt {attempt + 1}/{max_attempts})"
+                )
+
+                if inserted_rows > 0:
+                    if attempt > 0:
+                        self.metrics['batch_insert_retries'] += attempt
+                    if log_success:
+                        data_logger.info(f"✅ Batched wide insert: {inserted_rows} rows in 1 request")
+                    return True
+                else:
+                    raise Exception("Batched wide RPC returned 0 rows inserted")
+
+            except Exception as e:
+                self.metrics['batch_insert_retries'] += 1
+
+                if attempt < max_attempts - 1:
+                    delay = backoff_delays[attempt]
+                    data_logger.warning(
+                        f"⚠️ Batched wide insert of {len(rows)} rows failed (attempt {attempt + 1}/{max_attempts}): {e}. "
+                        f"Retrying in {delay}s..."
+                    )
+                    await asyncio.sleep(delay)
+                else:
+                    # Final attempt failed - dead-letter every row of the batch
+                    self.metrics['batch_insert_failures'] += 1
+                    if not dead_letter:
+                        data_logger.error(
+                            f"❌ Batched wide insert failed after {max_attempts} attempts: {e}. "
+                            f"{len(rows)} rows stay in the write-ahead log for replay"
+                        )
+                        return False
+                    data_logger.error(
+                        f"❌ Batched wide insert failed after {max_attempts} attempts: {e}. "
+                        f"Writing {len(rows)} rows to dead letter queue..."
+                    )
+                    for timestamp, wide_record in rows:
+                        await self._write_wide_record_to_dlq(timestamp, wide_record)
+                    return False
+
+        return False
+
     async def _write_to_dead_letter_queue(self, history_records: List[Dict[str, Any]]):
         """
         Write failed batch to dead letter queue for later recovery.
@@ -786,8 +1276,9 @@ class PLCDataService:
                 raise
 
             # Only update metrics and log success AFTER fsync completes
+            self.dlq_index.add(dlq_file)
             self.metrics['dead_letter_queue_writes'] += 1
-            self.metrics['dead_letter_queue_depth'] = len(list(self.dead_letter_queue_dir.glob('*.jsonl')))
+            self.metrics['dead_letter_queue_depth'] = len(self.dlq_index)
 
             data_logger.warning(
                 f"📝 Dead letter queue: Wrote {len(history_records)} records to {dlq_file.name}. "
@@ -838,8 +1329,9 @@ class PLCDataService:
                 raise
 
             # Only update metrics and log success AFTER fsync completes
+            self.dlq_index.add(dlq_file)
             self.metrics['dead_letter_queue_writes'] += 1
-            self.metrics['dead_letter_queue_depth'] = len(list(self.dead_letter_queue_dir.glob('*.json'))) + len(list(self.dead_letter_queue_dir.glob('*.jsonl')))
+            self.metrics['dead_letter_queue_depth'] = len(self.dlq_index)
 
             data_logger.warning(
                 f"📝 Dead letter queue: Wrote wide record ({len(wide_record)} params) to {dlq_file.name}. "
@@ -854,6 +1346,10 @@ class PLCDataService:
             )
             data_logger.error(f"Lost wide record (for manual recovery): timestamp={timestamp}, params={json.dumps(wide_record)}")
 
+    async def _run_db_call(self, func, *args):
+        """Run a blocking Supabase call in the DB thread pool without blocking the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, func, *args)
+
     def _rpc_bulk_insert_sync(self, history_records: List[Dict[str, Any]]) -> int:
         """Synchronous RPC call executed in a threadpool to avoid blocking the event loop."""
         response = self.supabase.rpc(
@@ -862,150 +1358,105 @@ class PLCDataService:
         ).execute()
         return int(response.data) if response and response.data else 0
 
+    def _rpc_insert_wide_sync(self, timestamp: str, wide_record: Dict[str, float]) -> int:
+        """Synchronous wide-row RPC executed in the DB thread pool; returns parameters inserted."""
+        response = self.supabase.rpc(
+            'insert_parameter_reading_wide',
+            params={
+                'p_timestamp': timestamp,
+                'p_params': wide_record
+            }
+        ).execute()
+        return int(response.data) if response and response.data else 0
+
+    def _rpc_insert_wide_batch_sync(self, rows: List[Tuple[str, Dict[str, float]]]) -> int:
+        """Synchronous batched wide-row RPC executed in the DB thread pool; returns rows inserted."""
+        response = self.supabase.rpc(
+            'insert_parameter_readings_wide_batch',
+            params={'p_rows': [{'timestamp': timestamp, 'params': params} for timestamp, params in rows]}
+        ).execute()
+        return int(response.data) if response and response.data else 0
+
+    async def _replay_wide_rows(self, rows: List[Tuple[str, Dict[str, float]]]) -> int:
+        """Bulk insert of dead-lettered wide rows (one batched RPC); returns rows inserted."""
+        return await self._run_db_call(self._rpc_insert_wide_batch_sync, rows)
+
+    async def _replay_history_records(self, history_records: List[Dict[str, Any]]) -> int:
+        """Bulk insert of dead-lettered narrow records (one RPC); returns records inserted."""
+        return await self._run_db_call(self._rpc_bulk_insert_sync, history_records)
+
+    def _live_writer_behind(self) -> bool:
+        """True while live readings are waiting for upload (replay yields to them)."""
+        if not self.async_writer_enabled:
+            return False
+        return self.wal.last_offset - self.wal.committed_offset > self.wide_batcher.max_rows
+
     async def _dead_letter_queue_recovery_loop(self):
         """
-        Background task that attempts to replay failed batches from dead letter queue.
+        Background task that replays failed batches from the dead letter queue.
 
-        Runs every 60 seconds. For each file in DLQ:
-        1. Try to insert the batch
-        2. On success, delete the DLQ file
-        3. On failure, leave for next attempt
+        Indexes the DLQ directory once, then replays the oldest files in bulk: many
+        files per RPC, deleted together after the server acknowledges. Replay is paced
+        to DLQ_REPLAY_ROWS_PER_SECOND and pauses while live readings are waiting for
+        upload. When the queue is empty or a replay is rejected, waits 60 seconds
+        (the directory is rescanned only while the index is empty).
 
         Supports both narrow format (.jsonl) and wide format (.json) files.
         """
-        data_logger.info("🔄 Dead letter queue recovery loop started (60s interval)")
+        data_logger.info("🔄 Dead letter queue recovery loop started (indexed bulk replay)")
 
+        try:
+            pending = await self.dlq_replayer.rescan(self.dead_letter_queue_dir)
+            self.metrics['dead_letter_queue_depth'] = pending
+            if pending:
+                data_logger.info(f"🔄 Dead letter queue recovery: {pending} failed batches indexed for replay")
+        except Exception as e:
+            data_logger.error(f"Failed to index dead letter queue: {e}", exc_info=True)
+
+        wait_seconds = 0.0
         while not self.shutdown_event.is_set():
             try:
-                # Shutdown-aware sleep for 60 seconds
-                try:
-                    await asyncio.wait_for(
-                        self.shutdown_event.wait(),
-                        timeout=60.0
-                    )
-                    # Shutdown signaled, exit loop
-                    data_logger.info("Shutdown event detected in DLQ recovery loop")
-                    break
-                except asyncio.TimeoutError:
-                    # Normal timeout, continue with recovery
-                    pass
-
-                # Get all DLQ files (both narrow .jsonl and wide .json formats)
-                narrow_files = list(self.dead_letter_queue_dir.glob('*.jsonl'))
-                wide_files = list(self.dead_letter_queue_dir.glob('*.json'))
-                dlq_files = sorted(narrow_files + wide_files)
-
-                if not dlq_files:
-                    continue  # No files to recover
+                # Shutdown-aware wait (retry interval, rate pacing or yielding to live writes)
+                if wait_seconds > 0:
+                    try:
+                        await asyncio.wait_for(self.shutdown_event.wait(), timeout=wait_seconds)
+                        data_logger.info("Shutdown event detected in DLQ recovery loop")
+                        break
+                    except asyncio.TimeoutError:
+                        pass
+
+                if not len(self.dlq_index):
+                    # Pick up files that were not written through this process
+                    await self.dlq_replayer.rescan(self.dead_letter_queue_dir)
+                    self.metrics['dead_letter_queue_depth'] = len(self.dlq_index)
+                    if not len(self.dlq_index):
+                        wait_seconds = self.dlq_retry_interval
+                        continue
+
+                if self._live_writer_behind():
+                    wait_seconds = 1.0
+                    continue
 
-                data_logger.info(f"🔄 Dead letter queue recovery: Processing {len(dlq_files)} failed batches...")
+                batch_start = time.perf_counter()
+                replayed_rows, acknowledged = await self.dlq_replayer.replay_batch()
+                elapsed = time.perf_counter() - batch_start
 
-                for dlq_file in dlq_files:
-                    try:
-                        # Detect file format by extension
-                        is_wide_format = dlq_file.suffix == '.json'
-
-                        if is_wide_format:
-                            # WIDE FORMAT (.json): Single reading with timestamp + params
-                            with open(dlq_file, 'r') as f:
-                                dlq_data = json.load(f)
-
-                            timestamp = dlq_data.get('timestamp')
-                            wide_record = dlq_data.get('params')
-
-                            if not timestamp or not wide_record:
-                                # Invalid file - delete it
-                                data_logger.warning(f"Invalid wide DLQ file {dlq_file.name} - deleting")
-                                dlq_file.unlink()
-                                continue
-
-                            # Attempt recovery using wide RPC
-                            try:
-                                response = self.supabase.rpc(
-                                    'insert_parameter_reading_wide',
-                                    params={
-                                        'p_timestamp': timestamp,
-                                        'p_params': wide_record
-                                    }
-                                ).execute()
-
-                                inserted_count = response.data if response.data else 0
-
-                                if inserted_count > 0:
-                                    # Success! Delete the DLQ file
-                                    dlq_file.unlink()
-                                    self.metrics['dead_letter_queue_replays'] += inserted_count
-
-                                    # Recalculate depth (both formats)
-                                    narrow_depth = len(list(self.dead_letter_queue_dir.glob('*.jsonl')))
-                                    wide_depth = len(list(self.dead_letter_queue_dir.glob('*.json')))
-                                    self.metrics['dead_letter_queue_depth'] = narrow_depth + wide_depth
-
-                                    data_logger.info(
-                                        f"✅ Dead letter queue recovery: Replayed wide record ({inserted_count} params) from {dlq_file.name}. "
-                                        f"Remaining queue depth: {self.metrics['dead_letter_queue_depth']} files"
-                                    )
-                                else:
-                                    # No records inserted - leave file for next attempt
-                                    data_logger.warning(
-                                        f"⚠️ Dead letter queue recovery failed for {dlq_file.name}: Wide RPC returned 0 parameters. "
-                                        f"Will retry in 60s."
-                                    )
-
-                            except Exception as e:
-                                # Insert failed - leave file for next attempt
-                                data_logger.warning(
-                                    f"⚠️ Dead letter queue recovery failed for {dlq_file.name}: {e}. "
-                                    f"Will retry in 60s."
-                                )
-
-                        else:
-                            # NARROW FORMAT (.jsonl): Multiple records, one per line
-                            history_records = []
-                            with open(dlq_file, 'r') as f:
-                                for line in f:
-                                    history_records.append(json.loads(line.strip()))
-
-                            if not history_records:
-                                # Empty file - delete it
-                                dlq_file.unlink()
-                                continue
-
-                            # Attempt recovery using narrow RPC
-                            try:
-                                # Run recovery RPC in a thread to keep loop responsive
-                                inserted_count = await asyncio.to_thread(self._rpc_bulk_insert_sync, history_records)
-
-                                if inserted_count > 0:
-                                    # Success! Delete the DLQ file
-                                    dlq_file.unlink()
-                                    self.metrics['dead_letter_queue_replays'] += inserted_count
-
-                                    # Recalculate depth (both formats)
-                                    narrow_depth = len(list(self.dead_letter_queue_dir.glob('*.jsonl')))
-                                    wide_depth = len(list(self.dead_letter_queue_dir.glob('*.json')))
-                                    self.metrics['dead_letter_queue_depth'] = narrow_depth + wide_depth
-
-                                    data_logger.info(
-                                        f"✅ Dead letter queue recovery: Replayed {inserted_count} records from {dlq_file.name}. "
-                                        f"Remaining queue depth: {self.metrics['dead_letter_queue_depth']}"
-                                    )
-                                else:
-                                    # No records inserted - leave file for next attempt
-                                    data_logger.warning(
-                                        f"⚠️ Dead letter queue recovery failed for {dlq_file.name}: RPC returned 0 records. "
-                                        f"Will retry in 60s."
-                                    )
-
-                            except Exception as e:
-                                # Insert failed - leave file for next attempt
-                                data_logger.warning(
-                                    f"⚠️ Dead letter queue recovery failed for {dlq_file.name}: {e}. "
-                                    f"Will retry in 60s."
-                                )
+                self.metrics['dead_letter_queue_replays'] += replayed_rows
+                self.metrics['dead_letter_queue_depth'] = len(self.dlq_index)
+                if replayed_rows:
+                    data_logger.info(
+                        f"✅ Dead letter queue recovery: Replayed {replayed_rows} rows in {elapsed*1000:.0f}ms. "
+                        f"Remaining queue depth: {self.metrics['dead_letter_queue_depth']} files"
+                    )
 
-                    except Exception as e:
-                        data_logger.error(f"Error processing DLQ file {dlq_file.name}: {e}", exc_info=True)
+                if not acknowledged:
+                    data_logger.warning(
+                        f"⚠️ Dead letter queue recovery failed; "
+                        f"will retry in {self.dlq_retry_interval:.0f}s."
+                    )
+                    wait_seconds = self.dlq_retry_interval
+                else:
+                    wait_seconds = self.dlq_replayer.pause_after(replayed_rows, elapsed)
 
             except asyncio.CancelledError:
                 data_logger.info("Dead letter queue recovery loop cancelled")
@@ -1013,9 +1464,11 @@ class PLCDataService:
             except Exception as e:
                 data_logger.error(f"Error in dead letter queue recovery loop: {e}", exc_info=True)
                 # Continue loop despite error
+                wait_seconds = self.dlq_retry_interval
 
     async def _log_parameters_with_metadata(self, parameter_values: Dict[str, float], 
-                                            setpoint_values: Dict[str, float]) -> int:
+                                            setpoint_values: Dict[str, float],
+                                            timestamp: Optional[str] = None) -> int:
         """
         Log parameters to database using WIDE TABLE format - ONE row with all parameters.
         
@@ -1026,6 +1479,7 @@ class PLCDataService:
         Args:
             parameter_values: Dictionary of parameter_id -> current_value
             setpoint_values: Dictionary of parameter_id -> setpoint_value
+            timestamp: Row timestamp (ISO); defaults to now
 
         Returns:
             int: Number of parameters successfully logged
@@ -1033,26 +1487,16 @@ class PLCDataService:
         success_count = 0
 
         try:
-            from datetime import datetime
-            timestamp = datetime.utcnow().isoformat()
+            if timestamp is None:
+                timestamp = datetime.utcnow().isoformat()
 
             # Build WIDE-FORMAT record with column names based on parameter IDs
-            wide_record = {}
+            # (unmapped parameters are skipped; the mapping warns once per parameter)
+            wide_record = self.column_mapping.build_row(parameter_values)
             
-            for param_id, value in parameter_values.items():
-                # Get column name from mapping
-                column_name = PARAMETER_TO_COLUMN_MAP.get(param_id)
-                
-                if column_name is None:
-                    # Parameter not in wide table mapping - log warning and skip
-                    data_logger.warning(f"Parameter {param_id} not in wide table mapping - skipping")
-                    continue
-                
-                # Add to wide record
-                wide_record[column_name] = float(value)
-                
-                # Per-parameter log (optional) with metadata
-                if self.verbose_parameter_logging:
+            # Per-parameter log (optional) with metadata
+            if self.verbose_parameter_logging:
+                for param_id, value in parameter_values.items():
                     metadata = self.parameter_metadata.get(param_id, {})
                     param_name = metadata.get('name', f'param_{param_id}')
                     component_name = metadata.get('component_name', 'unknown_component')
@@ -1066,15 +1510,28 @@ class PLCDataService:
                         f"📊 PLC Read: {component_name}.{param_name} = {value_str}"
                     )
 
+            # Report-by-exception: keep only changed columns (full row on keyframes).
+            # Unchanged values are still accounted for - they equal the last reported ones.
+            covered_count = len(wide_record)
+            if self.deadband_enabled and wide_record:
+                wide_record = self.deadband.filter(wide_record)
+                if not wide_record:
+                    success_count = covered_count
+                unchanged = self.deadband.take_unchanged()
+                if unchanged:
+                    task = asyncio.create_task(self._refresh_unchanged_readings(timestamp, unchanged))
+                    self._heartbeat_refresh_tasks.add(task)
+                    task.add_done_callback(self._heartbeat_refresh_tasks.discard)
+
             # Insert wide record (single row) or enqueue
             if wide_record:
                 if self.async_writer_enabled:
                     await self._enqueue_wide_record(timestamp, wide_record)
-                    success_count = len(wide_record)
+                    success_count = covered_count
                 else:
                     insert_success = await self._insert_wide_record_with_retry(timestamp, wide_record)
                     if insert_success:
-                        success_count = len(wide_record)
+                        success_count = covered_count
                     else:
                         # Failed after retries - data is in DLQ for recovery
                         data_logger.error(
@@ -1091,156 +1548,241 @@ class PLCDataService:
         return success_count
 
     async def _db_writer_loop(self):
-        """Background task that consumes batches and writes them to DB without blocking the poller."""
-        data_logger.info("🧵 DB writer started (async queue)")
+        """
+        Background task that uploads logged readings to the DB without blocking the poller.
+
+        Streams durable write-ahead log records from the upload cursor in batches, hands
+        them to the writer pool and advances the committed-offset checkpoint as batches
+        commit in order. After a failed batch it waits for in-flight batches, backs off
+        and replays everything after the checkpoint.
+        """
+        data_logger.info(f"🧵 DB writer started (write-ahead log, {self.wide_writer_workers} workers)")
+        self.wide_writer.start()
+        self._wal_cursor = self.wal.committed_offset + 1
         try:
             while not self.shutdown_event.is_set():
                 try:
-                    # Use wait to allow immediate exit on shutdown
-                    queue_task = asyncio.create_task(self._write_queue.get())
-                    shutdown_task = asyncio.create_task(self.shutdown_event.wait())
-
-                    done, pending = await asyncio.wait(
-                        [queue_task, shutdown_task],
-                        return_when=asyncio.FIRST_COMPLETED
-                    )
-
-                    # Cancel pending tasks
-                    for task in pending:
-                        task.cancel()
+                    if self._wal_rewind:
+                        await self.wide_writer.flush()
+                        self._wal_rewind = False
+                        self._wal_cursor = self.wal.committed_offset + 1
+                        data_logger.warning(
+                            f"🔁 Replaying write-ahead log from offset {self._wal_cursor} "
+                            f"in {self._wal_retry_delay:.0f}s ({self.wal.last_offset - self.wal.committed_offset} readings pending)"
+                        )
                         try:
-                            await task
-                        except asyncio.CancelledError:
+                            await asyncio.wait_for(self.shutdown_event.wait(), timeout=self._wal_retry_delay)
+                            break
+                        except asyncio.TimeoutError:
                             pass
-
-                    # Check if shutdown was signaled
-                    if shutdown_task in done:
-                        data_logger.info("Shutdown event detected in DB writer loop")
-                        break
-
-                    # Get the batch from completed queue task
-                    batch = queue_task.result()
-
-                    # Check if this is a wide record (tuple) or narrow record (list)
-                    if isinstance(batch, tuple) and len(batch) == 3 and batch[0] == 'wide':
-                        # Wide format: ('wide', timestamp, wide_record)
-                        _, timestamp, wide_record = batch
-
-                        # ⏱️ INSTRUMENTATION: Measure full write cycle (including retries)
-                        write_cycle_start = time.time()
-
-                        # Suppress internal success logs - we'll log at this level instead
-                        success = await self._insert_wide_record_with_retry(timestamp, wide_record, log_success=False)
-
-                        write_cycle_duration = time.time() - write_cycle_start
-
-                        # Log ACTUAL database write completion (after retry logic completes)
-                        if success:
-                            self.metrics['successful_readings'] += 1
-                            data_logger.info(
-                                f"✅ Database write completed: {len(wide_record)} parameters written successfully "
-                                f"(total cycle: {write_cycle_duration*1000:.0f}ms)"
-                            )
-                        else:
-                            self.metrics['failed_readings'] += 1
-                            data_logger.error(
-                                f"❌ Database write failed: {len(wide_record)} parameters moved to dead letter queue "
-                                f"(total cycle: {write_cycle_duration*1000:.0f}ms)"
-                            )
-                    else:
-                        # Narrow format (legacy): list of records
-                        # Suppress internal success logs - we'll log at this level instead
-                        success = await self._batch_insert_with_retry(batch, log_success=False)
-
-                        # Log ACTUAL database write completion
-                        if success:
-                            self.metrics['successful_readings'] += 1
-                            data_logger.info(
-                                f"✅ Database write completed: {len(batch)} records written successfully"
-                            )
-                        else:
-                            self.metrics['failed_readings'] += 1
-                            data_logger.error(
-                                f"❌ Database write failed: {len(batch)} records moved to dead letter queue"
-                            )
+                        self._wal_retry_delay = min(self._wal_retry_delay * 2, self.wal_replay_max_delay)
+                        continue
+
+                    # Wait (shutdown-aware) until a reading beyond the cursor is durable
+                    if not await self.wal.wait_for_records(self._wal_cursor - 1, timeout=1.0):
+                        continue
+
+                    backlog = self.wal.last_offset - self._wal_cursor + 1
+                    target = self.wide_batcher.target_size(backlog)
+                    entries = await self.wal.read(self._wal_cursor, target)
+                    if len(entries) < target and await self.wal.wait_for_records(
+                        entries[-1][0], timeout=self.wide_batcher.max_wait_ms / 1000.0
+                    ):
+                        entries += await self.wal.read(entries[-1][0] + 1, target - len(entries))
+                    self._wal_cursor = entries[-1][0] + 1
+
+                    for _, group in itertools.groupby(entries, key=lambda entry: entry[1].get('kind')):
+                        # Consecutive wide rows -> one batched RPC, handed to the writer
+                        # pool (waits only while all workers are busy)
+                        await self.wide_writer.submit(list(group))
 
                 except asyncio.CancelledError:
                     break
                 except Exception as e:
-                    self.metrics['failed_readings'] += 1
                     data_logger.error(f"DB writer error: {e}", exc_info=True)
+                    await asyncio.sleep(1.0)
         finally:
+            # Let batches already handed to the workers finish before stopping
+            await self.wide_writer.close(timeout=self.shutdown_timeout * 0.25)
             data_logger.info("🧵 DB writer stopped")
 
+    async def _write_wal_batch(self, entries: List[Tuple[int, Dict[str, Any]]]) -> bool:
+        """Writer pool worker: insert one batch of logged readings (all of one kind)."""
+        # Suppress internal success logs - we'll log at commit instead. Failed batches
+        # stay in the write-ahead log, so nothing goes to the dead letter queue.
+        if entries[0][1].get('kind') == 'wide':
+            rows = [(record['t'], record['p']) for _, record in entries]
+            return await self._insert_wide_batch_with_retry(rows, log_success=False, dead_letter=False)
+        history_records = [row for _, record in entries for row in record['records']]
+        return await self._batch_insert_with_retry(history_records, log_success=False, dead_letter=False)
+
+    def _commit_wal_batch(self, entries: List[Tuple[int, Dict[str, Any]]], success: bool,
+                          write_cycle_duration: float):
+        """Writer pool commit callback (offset order): advance the checkpoint or schedule a replay."""
+        first_offset, last_offset = entries[0][0], entries[-1][0]
+
+        # Log ACTUAL database write completion (after retry logic completes)
+        if success:
+            self.wide_batcher.record_success(len(entries), write_cycle_duration)
+            if self._wal_rewind:
+                return  # An earlier batch failed; this one is re-sent with the replay
+            self.wal.commit(last_offset)
+            self._wal_retry_delay = 1.0
+            self.metrics['successful_readings'] += len(entries)
+            data_logger.info(
+                f"✅ Database write completed: {len(entries)} reading(s) (offsets {first_offset}-{last_offset}) "
+                f"written successfully (total cycle: {write_cycle_duration*1000:.0f}ms)"
+            )
+        else:
+            self.wide_batcher.record_failure()
+            if not self._wal_rewind:
+                self._wal_rewind = True
+                self.metrics['failed_readings'] += len(entries)
+                data_logger.error(
+                    f"❌ Database write failed: {len(entries)} reading(s) (offsets {first_offset}-{last_offset}) "
+                    f"kept in write-ahead log for replay (total cycle: {write_cycle_duration*1000:.0f}ms)"
+                )
+
     async def _enqueue_history_records(self, history_records: List[Dict[str, Any]]):
-        """Enqueue a batch for background DB writing. Drop oldest batch if the queue is full."""
+        """Append a narrow-format batch to the write-ahead log for background DB writing."""
         try:
-            self._write_queue.put_nowait(history_records)
-        except asyncio.QueueFull:
-            try:
-                dropped_batch = self._write_queue.get_nowait()  # drop oldest
-                self.metrics['batches_dropped'] += 1
-
-                # CRITICAL: Log queue drop with full context - operators must see this immediately!
-                dropped_count = len(dropped_batch) if isinstance(dropped_batch, list) else 1
-                data_logger.warning(
-                    f"⚠️ QUEUE FULL: Dropped oldest batch ({dropped_count} records) to make room. "
-                    f"Total queue drops: {self.metrics['batches_dropped']}. "
-                    f"DB writer is falling behind data collection!"
-                )
+            self.wal.append({'kind': 'narrow', 'records': history_records})
+        except Exception as e:
+            # As a last resort, fall back to DLQ to avoid data loss
+            data_logger.error(f"🚨 Write-ahead log append failed: {e}")
+            await self._write_to_dead_letter_queue(history_records)
+            return
+        self.metrics['batches_enqueued'] += 1
+        self.metrics['records_enqueued'] += len(history_records)
 
-                self._write_queue.put_nowait(history_records)
-            except Exception:
-                # As a last resort, fall back to DLQ to avoid data loss
-                await self._write_to_dead_letter_queue(history_records)
-                return
-        finally:
-            self.metrics['batches_enqueued'] += 1
-            self.metrics['records_enqueued'] += len(history_records)
-    
     async def _enqueue_wide_record(self, timestamp: str, wide_record: Dict[str, float]):
-        """Enqueue a WIDE-FORMAT record for background DB writing. Drop oldest if queue is full."""
+        """Append a WIDE-FORMAT reading to the write-ahead log for background DB writing (never drops)."""
         try:
-            # Store as tuple (timestamp, wide_record) to distinguish from narrow records
-            self._write_queue.put_nowait(('wide', timestamp, wide_record))
-        except asyncio.QueueFull:
-            try:
-                dropped_batch = self._write_queue.get_nowait()  # drop oldest
-                self.metrics['batches_dropped'] += 1
+            self.wal.append({'kind': 'wide', 't': timestamp, 'p': wide_record})
+        except Exception as e:
+            # As a last resort, fall back to DLQ to avoid data loss
+            data_logger.error(f"🚨 Write-ahead log append failed: {e}")
+            await self._write_wide_record_to_dlq(timestamp, wide_record)
+            return
+        self.metrics['batches_enqueued'] += 1
+        self.metrics['records_enqueued'] += len(wide_record)
 
-                # CRITICAL: Log queue drop with full context - operators must see this immediately!
-                if isinstance(dropped_batch, tuple) and len(dropped_batch) == 3 and dropped_batch[0] == 'wide':
-                    # Wide format dropped
-                    dropped_timestamp, dropped_params = dropped_batch[1], dropped_batch[2]
-                    data_logger.warning(
-                        f"⚠️ QUEUE FULL: Dropped oldest wide-format batch ({len(dropped_params)} parameters, "
-                        f"timestamp={dropped_timestamp}) to make room. "
-                        f"Total queue drops: {self.metrics['batches_dropped']}. "
-                        f"DB writer is falling behind data collection!"
-                    )
-                else:
-                    # Narrow format dropped
-                    dropped_count = len(dropped_batch) if isinstance(dropped_batch, list) else 1
-                    data_logger.warning(
-                        f"⚠️ QUEUE FULL: Dropped oldest narrow-format batch ({dropped_count} records) to make room. "
-                        f"Total queue drops: {self.metrics['batches_dropped']}. "
-                        f"DB writer is falling behind data collection!"
-                    )
+    async def _seed_setpoint_shadow(self, param_ids: Optional[List[str]] = None):
+        """
+        Load set_values from the database into the setpoint shadow.
 
-                self._write_queue.put_nowait(('wide', timestamp, wide_record))
-            except Exception:
-                # As a last resort, fall back to DLQ to avoid data loss
-                await self._write_wide_record_to_dlq(timestamp, wide_record)
+        Args:
+            param_ids: Parameters seen for the first time (lazy seed); None re-seeds
+                every writable parameter (startup / periodic re-seed)
+        """
+        full = param_ids is None
+        if full:
+            param_ids = [
+                param_id for param_id, metadata in self.parameter_metadata.items()
+                if metadata.get('is_writable')
+            ]
+            if not param_ids:
                 return
-        finally:
-            self.metrics['batches_enqueued'] += 1
-            self.metrics['records_enqueued'] += len(wide_record)
-    
+        try:
+            db_setpoints = await asyncio.to_thread(self._supabase_select_setvalues_sync, param_ids)
+            self.setpoint_shadow.seed(db_setpoints, param_ids, full=full)
+            if full:
+                data_logger.info(f"🪞 Setpoint shadow seeded with {len(param_ids)} set_values")
+        except Exception as e:
+            data_logger.warning(f"Failed to seed setpoint shadow: {e}")
+
+    async def _subscribe_setpoint_changes(self):
+        """Keep the setpoint shadow current via Realtime UPDATEs on component_parameters."""
+        try:
+            async_supabase = await create_async_supabase()
+            channel = async_supabase.channel(f"setpoint-shadow-{MACHINE_ID}")
+            channel = channel.on_postgres_changes(
+                event="UPDATE",
+                schema="public",
+                table="component_parameters",
+                callback=self._on_setpoint_change
+            )
+            # subscribe() reports join results (SUBSCRIBED, CHANNEL_ERROR, TIMED_OUT,
+            # also on rejoin); a later drop is caught by _check_setpoint_channel()
+            await asyncio.wait_for(channel.subscribe(self._on_setpoint_channel_status), timeout=10.0)
+            self.setpoint_channel = channel
+            data_logger.info("✅ Setpoint shadow subscribed to component_parameters Realtime updates")
+        except Exception as e:
+            self.setpoint_shadow.set_realtime_connected(False)
+            data_logger.warning(
+                f"⚠️ Setpoint Realtime unavailable ({e}) - re-seeding the shadow every "
+                f"{self.setpoint_shadow.reseed_interval:.0f}s"
+            )
+
+    def _on_setpoint_channel_status(self, status: str, error: Optional[Exception] = None):
+        """Realtime channel state callback: track whether the shadow is kept current."""
+        connected = status == "SUBSCRIBED"
+        if self.setpoint_shadow.metrics.realtime_connected and not connected:
+            data_logger.warning(
+                f"⚠️ Setpoint Realtime channel {status}{f' ({error})' if error else ''} - "
+                f"re-seeding the shadow every {self.setpoint_shadow.reseed_interval:.0f}s"
+            )
+        self.setpoint_shadow.set_realtime_connected(connected)
+
+    def _check_setpoint_channel(self):
+        """
+        Clear realtime_connected when the subscribed channel is no longer joined.
+
+        A dropped channel must clear the flag, or the periodic re-seed never
+        resumes and missed UPDATEs go unnoticed.
+        """
+        channel = self.setpoint_channel
+        if channel is None or not self.setpoint_shadow.metrics.realtime_connected:
+            return
+        # Unknown channel API counts as disconnected: re-seeding is the safe side
+        if getattr(channel, 'is_joined', False):
+            return
+        self._on_setpoint_channel_status("CLOSED" if getattr(channel, 'is_closed', True) else "CHANNEL_ERROR")
+
+    def _on_setpoint_change(self, payload: Dict[str, Any]):
+        """Realtime callback: apply a changed set_value to the shadow."""
+        record = (payload.get('data') or {}).get('record') or {}
+        if self.setpoint_shadow.apply_remote(record):
+            data_logger.debug(f"🪞 Setpoint shadow updated from Realtime: {record.get('id')} = {record.get('set_value')}")
+
+    async def _refresh_unchanged_readings(self, timestamp: str, unchanged: Dict[str, float]):
+        """
+        Move the latest_parameter_readings timestamp of deadband-suppressed parameters forward.
+
+        The wide row leaves them NULL, so the sync trigger does not touch them; only
+        parameters read in this cycle are refreshed, never ones whose read failed.
+
+        Args:
+            timestamp: Row timestamp (ISO) of the cycle
+            unchanged: column -> last reported value (DeadbandFilter.take_unchanged())
+        """
+        column_to_parameter = self.column_mapping.column_to_parameter
+        rows = [
+            {'parameter_id': column_to_parameter[column], 'value': value,
+             'timestamp': timestamp, 'updated_at': 'now()'}
+            for column, value in unchanged.items() if column in column_to_parameter
+        ]
+        if not rows:
+            return
+        try:
+            await self._run_db_call(self._supabase_upsert_latest_readings_sync, rows)
+            self.metrics['deadband_heartbeat_refreshes'] += len(rows)
+        except Exception as e:
+            # The next heartbeat refreshes them again
+            data_logger.warning(f"⚠️ Failed to refresh {len(rows)} unchanged latest readings: {e}")
+
+    def _supabase_upsert_latest_readings_sync(self, rows: List[Dict[str, Any]]):
+        """Synchronous upsert executed in threadpool: refreshes latest_parameter_readings rows."""
+        self.supabase.table('latest_parameter_readings').upsert(
+            rows, on_conflict='parameter_id'
+        ).execute()
+
     async def _sync_setpoints_to_database(self, setpoint_values: Dict[str, float]):
         """
         Synchronize setpoint values from PLC to database.
         
-        Detects external changes by comparing PLC setpoints with database values.
+        Detects external changes by comparing PLC setpoints with the setpoint shadow
+        (last confirmed database values); only real deltas are written.
         
         Args:
             setpoint_values: Dictionary of parameter_id -> setpoint from PLC
@@ -1249,38 +1791,34 @@ class PLCDataService:
             if not setpoint_values:
                 return
             
-            # Get current set_values from database for comparison (off the event loop)
-            param_ids = list(setpoint_values.keys())
-            db_setpoints = await asyncio.to_thread(self._supabase_select_setvalues_sync, param_ids)
+            # Only query the database when the shadow cannot answer
+            self._check_setpoint_channel()
+            if self.setpoint_shadow.needs_reseed():
+                await self._seed_setpoint_shadow()
+            missing = self.setpoint_shadow.missing(setpoint_values)
+            if missing:
+                await self._seed_setpoint_shadow(missing)
             
             # Detect changes and prepare batch update
-            updates_needed = []
-            external_changes = []
+            updates_needed, external_changes = self.setpoint_shadow.diff(setpoint_values)
             
-            for param_id, plc_setpoint in setpoint_values.items():
-                db_setpoint = db_setpoints.get(param_id)
+            # Log external change detection
+            for param_id, db_setpoint in external_changes:
+                plc_setpoint = setpoint_values[param_id]
+                metadata = self.parameter_metadata.get(param_id, {})
+                component_name = metadata.get('component_name', 'unknown')
+                param_name = metadata.get('name', 'unknown')
+                unit = metadata.get('unit', '')
                 
-                # Check if values differ (with small tolerance for floating point)
-                if db_setpoint is None or abs(plc_setpoint - db_setpoint) > 0.01:
-                    updates_needed.append(param_id)
-                    
-                    # Log external change detection
-                    if db_setpoint is not None:
-                        metadata = self.parameter_metadata.get(param_id, {})
-                        component_name = metadata.get('component_name', 'unknown')
-                        param_name = metadata.get('name', 'unknown')
-                        unit = metadata.get('unit', '')
-                        
-                        delta = plc_setpoint - db_setpoint
-                        pct_change = (delta / db_setpoint * 100) if db_setpoint != 0 else 0
-                        
-                        unit_str = f" {unit}" if unit else ""
-                        data_logger.info(
-                            f"🔄 External change detected: {component_name}.{param_name} "
-                            f"set_value: DB={db_setpoint:.2f}{unit_str}, PLC={plc_setpoint:.2f}{unit_str} "
-                            f"(Δ={delta:+.2f}, {pct_change:+.1f}%)"
-                        )
-                        external_changes.append(param_id)
+                delta = plc_setpoint - db_setpoint
+                pct_change = (delta / db_setpoint * 100) if db_setpoint != 0 else 0
+                
+                unit_str = f" {unit}" if unit else ""
+                data_logger.info(
+                    f"🔄 External change detected: {component_name}.{param_name} "
+                    f"set_value: DB={db_setpoint:.2f}{unit_str}, PLC={plc_setpoint:.2f}{unit_str} "
+                    f"(Δ={delta:+.2f}, {pct_change:+.1f}%)"
+                )
             
             # Update metrics
             if external_changes:
@@ -1300,15 +1838,21 @@ class PLCDataService:
                     ]
                     
                     # Execute batch update via RPC (single transaction)
-                    updated_count = await asyncio.to_thread(
+                    updated_count, updated_ids = await asyncio.to_thread(
                         self._supabase_batch_update_setvalues_sync,
                         batch_updates
                     )
+                    # Shadow follows what was written; rows the RPC did not update
+                    # (or a failed RPC) stay pending so the next diff() retries them
+                    self.setpoint_shadow.confirm({
+                        param_id: setpoint_values[param_id]
+                        for param_id in updates_needed if param_id in updated_ids
+                    })
                     
                     if updated_count != len(updates_needed):
                         data_logger.warning(
                             f"⚠️ Batch setpoint update: expected {len(updates_needed)} updates, "
-                            f"got {updated_count}"
+                            f"got {updated_count}; {len(updates_needed) - len(updated_ids)} left for retry"
                         )
                     
                     data_logger.info(
@@ -1342,14 +1886,14 @@ class PLCDataService:
             'updated_at': 'now()'
         }).eq('id', param_id).execute()
     
-    def _supabase_batch_update_setvalues_sync(self, updates: List[Dict[str, Any]]) -> int:
+    def _supabase_batch_update_setvalues_sync(self, updates: List[Dict[str, Any]]) -> Tuple[int, Set[str]]:
         """Synchronous batch update executed in threadpool: updates multiple set_values in one RPC call.
         
         Args:
             updates: List of dicts with keys 'id' (str/UUID) and 'set_value' (float)
             
         Returns:
-            int: Count of successfully updated parameters
+            Tuple[int, Set[str]]: Count of updated parameters and the ids known to be updated
         """
         # Call batch RPC function
         response = self.supabase.rpc(
@@ -1357,8 +1901,15 @@ class PLCDataService:
             {'p_updates': updates}
         ).execute()
         
-        # RPC returns count of updated records
-        return response.data if response.data else 0
+        # RPC returns the ids of updated records
+        if isinstance(response.data, list):
+            updated_ids = {str(param_id) for param_id in response.data}
+            return len(updated_ids), updated_ids
+        # The original RPC returns only a count: confirm all or nothing
+        updated_count = response.data if response.data else 0
+        if updated_count == len(updates):
+            return updated_count, {str(update['id']) for update in updates}
+        return updated_count, set()
 
     def get_status(self) -> Dict[str, Any]:
         """Get current service status and metrics."""
@@ -1369,7 +1920,17 @@ class PLCDataService:
             'is_running': self.is_running,
             'plc_connected': self.plc_manager.is_connected(),
             'uptime_seconds': uptime,
-            'metrics': self.metrics.copy()
+            'metrics': self.metrics.copy(),
+            'wide_batching': self.wide_batcher.get_metrics(),
+            'db_writer': self.wide_writer.get_metrics(),
+            'write_ahead_log': self.wal.get_metrics(),
+            'dead_letter_replay': self.dlq_replayer.get_metrics(),
+            'deadband': self.deadband.get_metrics() if self.deadband_enabled else None,
+            'sampling_classes': self.sampling_scheduler.get_metrics() if self.sampling_scheduler else None,
+            'acquisition_pipeline': self.acquisition_pipeline.get_metrics(),
+            'setpoint_shadow': self.setpoint_shadow.get_metrics(),
+            'column_mapping': self.column_mapping.get_metrics(),
+            'plc_metrics': self.plc_manager.get_performance_metrics()
         }
 
 
@@ -71,12 +71,82 @@ PLC_AUTO_DISCOVER = os.getenv("PLC_AUTO_DISCOVER", "false").lower() in {"1", "tr
 # 'cdab' (little-byte/big-word), 'dcba' (little-endian)
 PLC_BYTE_ORDER = os.getenv("PLC_BYTE_ORDER", "badc")
 
+# Maximum number of simultaneous Modbus TCP connections the PLC accepts from
+# this process: the communicator's own socket plus the bulk-read connection
+# pool, which therefore opens at most PLC_MAX_CONNECTIONS - 1.
+PLC_MAX_CONNECTIONS = int(os.getenv("PLC_MAX_CONNECTIONS", "8"))
+
+# Starting number of concurrent bulk range reads. The adaptive (AIMD) limiter
+# raises it towards the pool size while p95 read latency stays flat and
+# cuts it on timeouts or refused connections.
+PLC_INITIAL_CONCURRENCY = int(os.getenv("PLC_INITIAL_CONCURRENCY", "2"))
+
+# Opt-in Modbus request pipelining: number of requests kept in flight on the
+# communicator's single PLC socket (matched by MBAP transaction ID). 0 or 1
+# keeps the standard serial client. Falls back to serial automatically if the
+# PLC answers out of spec.
+PLC_PIPELINE_DEPTH = int(os.getenv("PLC_PIPELINE_DEPTH", "0"))
+
+# Starvation guard for the PLC request scheduler: a queued request is promoted
+# one priority class for every interval (milliseconds) it has waited.
+PLC_PRIORITY_AGING_MS = float(os.getenv("PLC_PRIORITY_AGING_MS", "500"))
+
+# Bulk read planner cost model (milliseconds): one request round-trip plus a
+# per-register / per-coil transfer cost. Used until enough measured bulk-read
+# latencies are available to fit the model.
+PLC_REQUEST_COST_MS = float(os.getenv("PLC_REQUEST_COST_MS", "5.0"))
+PLC_REGISTER_COST_MS = float(os.getenv("PLC_REGISTER_COST_MS", "0.02"))
+PLC_COIL_COST_MS = float(os.getenv("PLC_COIL_COST_MS", "0.002"))
+
+# Largest run of unused registers/coils the bulk read planner may bridge inside
+# one range. Bridged addresses are read too; a PLC that leaves them unmapped
+# answers the whole range with Illegal Data Address.
+PLC_MAX_BRIDGE_GAP = int(os.getenv("PLC_MAX_BRIDGE_GAP", "16"))
+
+# Flush cadence (seconds) for the batched component_parameters
+# current_value/set_value write-behind buffer in RealPLC.
+PARAMETER_WRITE_BEHIND_INTERVAL = float(os.getenv("PARAMETER_WRITE_BEHIND_INTERVAL", "1.0"))
+
+# High-rate burst capture around valve pulses and purges (RealPLC).
+# BURST_CAPTURE_PARAMETERS: comma-separated parameter IDs to sample (empty = disabled)
+# BURST_CAPTURE_RATE_HZ: sampling rate while a burst is captured (clamped to 20-100 Hz)
+# BURST_CAPTURE_PRE_ROLL_MS / BURST_CAPTURE_POST_ROLL_MS: window before the trigger / after the pulse
+# BURST_CAPTURE_BUFFER_SECONDS: ring buffer length (must cover pre-roll + pulse + post-roll)
+BURST_CAPTURE_PARAMETERS = [
+    x.strip() for x in os.getenv("BURST_CAPTURE_PARAMETERS", "").split(",") if x.strip()
+]
+BURST_CAPTURE_RATE_HZ = float(os.getenv("BURST_CAPTURE_RATE_HZ", "50"))
+BURST_CAPTURE_PRE_ROLL_MS = float(os.getenv("BURST_CAPTURE_PRE_ROLL_MS", "200"))
+BURST_CAPTURE_POST_ROLL_MS = float(os.getenv("BURST_CAPTURE_POST_ROLL_MS", "500"))
+BURST_CAPTURE_BUFFER_SECONDS = float(os.getenv("BURST_CAPTURE_BUFFER_SECONDS", "10"))
+
+# Minimum interval (milliseconds) between process_execution_state updates while
+# a recipe runs. Step progress is kept in memory and published coalesced; the
+# final state is always flushed on completion, error or abort.
+PROGRESS_FLUSH_INTERVAL_MS = float(os.getenv("PROGRESS_FLUSH_INTERVAL_MS", "500"))
+
+# Deadline-driven step timeline: valve pulses and purges start and end at
+# absolute monotonic deadlines so step overhead does not stretch the cycle.
+# A step that starts more than RECIPE_TIMELINE_SLIP_MS late shifts the rest of
+# the timeline instead of being shortened.
+RECIPE_STEP_TIMELINE = os.getenv("RECIPE_STEP_TIMELINE", "true").lower() in {"1", "true", "yes", "on"}
+RECIPE_TIMELINE_SLIP_MS = float(os.getenv("RECIPE_TIMELINE_SLIP_MS", "20"))
+
+# Recipe audit trail (recipe_execution_audit, parameter_control_commands):
+# records are queued in memory and bulk-inserted every AUDIT_FLUSH_INTERVAL_MS
+# in batches of up to AUDIT_BATCH_SIZE rows. Batches that cannot be written are
+# appended to JSONL files in AUDIT_SPILL_DIR and replayed once the database is back.
+AUDIT_FLUSH_INTERVAL_MS = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "1000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_SPILL_DIR = os.getenv("AUDIT_SPILL_DIR", "logs/audit_spill")
+
 PLC_CONFIG = {
     'ip_address': PLC_IP,
     'port': PLC_PORT,
     'byte_order': PLC_BYTE_ORDER,
     'hostname': PLC_HOSTNAME,
     'auto_discover': PLC_AUTO_DISCOVER,
+    'max_connections': PLC_MAX_CONNECTIONS,
 }
 
 # --- Feature Flags / Machine-Specific Toggles ---
@@ -0,0 +1,259 @@
+# File: data_collection/acquisition_pipeline.py
+"""
+Double-buffered acquisition pipeline for Terminal 1.
+
+The collection loop used to read the PLC, read setpoints, build the wide row
+and enqueue it strictly one after another. It stamped the row with
+datetime.utcnow() after the read had finished, so the timestamp drifted by
+however long the read took. The work is now split into two stages:
+
+- Acquisition (collection loop): PLC reads only. A cycle is stamped with the
+  monotonic instant its range reads completed.
+- Processing (pipeline task): row building, report-by-exception filtering,
+  enqueueing and setpoint sync for cycle N, while cycle N+1 is being
+  acquired.
+
+There are two buffers: one cycle being processed and one waiting. If
+processing falls a full cycle behind, acquisition waits (counted as a stall)
+rather than dropping readings.
+
+MonotonicWallClock maps monotonic instants to UTC wall-clock time, so row
+timestamps are spaced by the monotonic clock, not by wall-clock steps.
+
+Per-stage latency and inter-sample jitter are exported as fixed-bucket
+histograms.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from src.log_setup import get_data_collection_logger
+
+data_logger = get_data_collection_logger()
+
+# Histogram bucket upper bounds in milliseconds (a final +Inf bucket is implicit)
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (cumulative counts, Prometheus style)."""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(sorted(buckets_ms))
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        value_ms = max(0.0, value_ms)
+        index = len(self.buckets_ms)
+        for i, bound in enumerate(self.buckets_ms):
+            if value_ms <= bound:
+                index = i
+                break
+        self._counts[index] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound containing quantile q (max_ms for the +Inf bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets_ms[i] if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(self.buckets_ms, self._counts):
+            cumulative += bucket_count
+            buckets[f'le_{bound:g}'] = cumulative
+        buckets['le_inf'] = self.count
+        return {
+            'count': self.count,
+            'sum_ms': self.sum_ms,
+            'avg_ms': self.sum_ms / self.count if self.count else 0.0,
+            'max_ms': self.max_ms,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'buckets': buckets,
+        }
+
+
+class MonotonicWallClock:
+    """
+    Maps monotonic instants to UTC wall-clock time.
+
+    The wall-clock offset is re-read every resync_interval seconds (to follow
+    NTP corrections). Returned times never go backwards, which keeps wide-row
+    timestamps (the parameter_readings primary key) ordered across a re-sync.
+    """
+
+    def __init__(self, resync_interval: float = 60.0,
+                 monotonic: Callable[[], float] = time.monotonic,
+                 wall: Callable[[], float] = time.time):
+        self.resync_interval = resync_interval
+        self._monotonic = monotonic
+        self._wall = wall
+        self._anchored_at = 0.0
+        self._offset = 0.0
+        self._last_wall = 0.0
+        self.last_step_ms = 0.0
+        self._resync()
+
+    def _resync(self):
+        mono = self._monotonic()
+        offset = self._wall() - mono
+        if self._anchored_at:
+            self.last_step_ms = (offset - self._offset) * 1000
+        self._offset = offset
+        self._anchored_at = mono
+
+    def to_wall(self, mono: float) -> float:
+        """Wall-clock seconds (epoch) for a monotonic instant."""
+        if self._monotonic() - self._anchored_at >= self.resync_interval:
+            self._resync()
+        wall = max(mono + self._offset, self._last_wall)
+        self._last_wall = wall
+        return wall
+
+    def to_datetime(self, mono: float) -> datetime:
+        """UTC datetime for a monotonic instant."""
+        return datetime.fromtimestamp(self.to_wall(mono), tz=timezone.utc)
+
+
+@dataclass
+class AcquiredCycle:
+    """PLC values of one collection cycle, stamped at read completion."""
+    parameter_values: Dict[str, float]
+    setpoint_values: Dict[str, float]
+    read_completed_at: float  # monotonic
+    timestamp: datetime  # read_completed_at mapped to UTC
+    started_at: float  # monotonic
+    plc_read_ms: float = 0.0
+    setpoint_read_ms: float = 0.0
+    handed_off_at: float = 0.0
+
+
+class AcquisitionPipeline:
+    """
+    Two-stage acquire/process pipeline with double buffering.
+
+    Usage:
+        pipeline = AcquisitionPipeline(process_cycle, expected_interval=1.0)
+        pipeline.start()
+        await pipeline.submit(cycle)  # from the collection loop
+        await pipeline.close()        # processes what is buffered
+    """
+
+    def __init__(
+        self,
+        process_fn: Callable[[AcquiredCycle], Awaitable[Any]],
+        expected_interval: float = 1.0,
+        buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS,
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            process_fn: Post-processing stage for one cycle
+            expected_interval: Nominal seconds between cycles (for jitter)
+            buckets_ms: Histogram bucket bounds in milliseconds
+        """
+        self._process_fn = process_fn
+        self.expected_interval = expected_interval
+        # One cycle waiting here plus one in process_fn = two buffers
+        self._buffer: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._task: Optional[asyncio.Task] = None
+        self._last_read_completed_at: Optional[float] = None
+
+        self.histograms: Dict[str, LatencyHistogram] = {
+            'acquire_ms': LatencyHistogram(buckets_ms),
+            'handoff_wait_ms': LatencyHistogram(buckets_ms),
+            'process_ms': LatencyHistogram(buckets_ms),
+            'read_to_processed_ms': LatencyHistogram(buckets_ms),
+            'inter_sample_jitter_ms': LatencyHistogram(buckets_ms),
+        }
+        self.cycles_submitted = 0
+        self.cycles_processed = 0
+        self.process_errors = 0
+        self.stalls = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the processing stage."""
+        if not self.running:
+            self._task = asyncio.create_task(self._process_loop())
+
+    async def submit(self, cycle: AcquiredCycle):
+        """Hand a cycle to the processing stage (waits only if both buffers are busy)."""
+        self.cycles_submitted += 1
+        self.histograms['acquire_ms'].observe((cycle.read_completed_at - cycle.started_at) * 1000)
+        if self._last_read_completed_at is not None and self.expected_interval > 0:
+            spacing = cycle.read_completed_at - self._last_read_completed_at
+            # Spacing is a multiple of the interval for multi-rate or skipped ticks
+            periods = max(1, round(spacing / self.expected_interval))
+            self.histograms['inter_sample_jitter_ms'].observe(
+                abs(spacing - periods * self.expected_interval) * 1000
+            )
+        self._last_read_completed_at = cycle.read_completed_at
+
+        if self._buffer.full():
+            self.stalls += 1
+        cycle.handed_off_at = time.monotonic()
+        await self._buffer.put(cycle)
+
+    async def close(self, timeout: float = 10.0):
+        """Process buffered cycles, then stop the processing stage."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._buffer.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            data_logger.warning(f"⚠️ Acquisition pipeline: {self._buffer.qsize()} cycles left unprocessed")
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _process_loop(self):
+        while True:
+            cycle = await self._buffer.get()
+            started = time.monotonic()
+            self.histograms['handoff_wait_ms'].observe((started - cycle.handed_off_at) * 1000)
+            try:
+                await self._process_fn(cycle)
+                self.cycles_processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.process_errors += 1
+                data_logger.error(f"Error processing acquired cycle: {e}", exc_info=True)
+            finally:
+                finished = time.monotonic()
+                self.histograms['process_ms'].observe((finished - started) * 1000)
+                self.histograms['read_to_processed_ms'].observe((finished - cycle.read_completed_at) * 1000)
+                self._buffer.task_done()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return cycle counters and per-stage histograms."""
+        return {
+            'cycles_submitted': self.cycles_submitted,
+            'cycles_processed': self.cycles_processed,
+            'process_errors': self.process_errors,
+            'stalls': self.stalls,
+            'buffered': self._buffer.qsize(),
+            'histograms': {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
@@ -0,0 +1,204 @@
+# File: data_collection/deadband_filter.py
+"""
+Deadband / report-by-exception filtering for Terminal 1 wide rows.
+
+Without filtering, every collection cycle writes all parameters into a new
+wide row, although most binary valve states and idle setpoints have not
+changed for hours. DeadbandFilter passes on only the columns whose value has
+moved beyond their deadband since it was last reported:
+
+- Analog columns: reported when |value - last reported| exceeds
+  max(absolute, percent% of |last reported|). With both thresholds at 0,
+  any change is reported.
+- Binary columns (valve states, on/off flags): reported when the value changed.
+- Keyframes: every keyframe_interval seconds the full row is sent and the
+  reference values are reset, so readers can rebuild the complete state from
+  the latest keyframe plus the sparse rows after it (unreported columns are
+  NULL in parameter_readings).
+
+Rows in which nothing changed are suppressed entirely.
+
+With a heartbeat_interval, at least that often take_unchanged() returns the
+columns that were read in the current row but stayed within their deadband,
+with their last reported values. The caller refreshes their
+latest_parameter_readings timestamps, so stable parameters stay fresh for
+readers between keyframes. Columns missing from the row (failed or skipped
+reads) are never refreshed.
+"""
+import json
+import math
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+@dataclass
+class DeadbandThreshold:
+    """Report-by-exception rule for one wide-table column."""
+    absolute: float = 0.0
+    percent: float = 0.0
+    binary: bool = False
+
+
+@dataclass
+class DeadbandMetrics:
+    """Metrics for report-by-exception filtering."""
+    rows_in: int = 0
+    rows_published: int = 0
+    rows_suppressed: int = 0
+    keyframes: int = 0
+    heartbeats: int = 0
+    values_in: int = 0
+    values_published: int = 0
+    bytes_in: int = 0
+    bytes_published: int = 0
+    # Share of values / JSON payload bytes not sent
+    value_reduction_pct: float = 0.0
+    payload_reduction_pct: float = 0.0
+
+
+class DeadbandFilter:
+    """
+    Reduces wide rows to the columns that changed beyond their deadband.
+
+    Usage:
+        deadband = DeadbandFilter(absolute=0.0, percent=0.5, keyframe_interval=60)
+        deadband.set_threshold('param_1583a79b', binary=True)
+        published = deadband.filter(wide_record)
+        if published:
+            ...insert (timestamp, published)...
+    """
+
+    def __init__(
+        self,
+        absolute: float = 0.0,
+        percent: float = 0.0,
+        keyframe_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        heartbeat_interval: Optional[float] = None,
+    ):
+        """
+        Initialize the filter.
+
+        Args:
+            absolute: Default absolute deadband for analog columns
+            percent: Default deadband as a percentage of the last reported value
+            keyframe_interval: Seconds between full keyframe rows
+            clock: Monotonic time source (seconds)
+            heartbeat_interval: Longest gap between reports of unchanged columns
+                through take_unchanged() (None never reports them)
+        """
+        self.default = DeadbandThreshold(absolute=max(0.0, absolute), percent=max(0.0, percent))
+        self.keyframe_interval = max(0.0, keyframe_interval)
+        self._clock = clock
+        self.heartbeat_interval = None if heartbeat_interval is None else max(0.0, heartbeat_interval)
+        self._thresholds: Dict[str, DeadbandThreshold] = {}
+        self._last_reported: Dict[str, float] = {}
+        self._last_keyframe_at: Optional[float] = None
+        self._last_heartbeat_at: Optional[float] = None
+        self._unchanged: Dict[str, float] = {}
+        self.metrics = DeadbandMetrics()
+
+    def set_threshold(self, column: str, absolute: Optional[float] = None,
+                      percent: Optional[float] = None, binary: Optional[bool] = None):
+        """Override the deadband for one column; unspecified fields keep their current value."""
+        current = self._thresholds.get(column, self.default)
+        self._thresholds[column] = DeadbandThreshold(
+            absolute=current.absolute if absolute is None else max(0.0, float(absolute)),
+            percent=current.percent if percent is None else max(0.0, float(percent)),
+            binary=current.binary if binary is None else bool(binary),
+        )
+
+    def set_binary_columns(self, columns: Iterable[str]):
+        """Mark columns that use the changed test instead of a deadband."""
+        for column in columns:
+            self.set_threshold(column, binary=True)
+
+    def request_keyframe(self):
+        """Send the next row in full (e.g. after a reconnect or a configuration change)."""
+        self._last_keyframe_at = None
+
+    def filter(self, record: Dict[str, float]) -> Dict[str, float]:
+        """
+        Return the part of a wide row that should be published.
+
+        Returns:
+            Dict[str, float]: The full row for a keyframe, otherwise only the
+            changed columns (empty if nothing changed)
+        """
+        now = self._clock()
+        self.metrics.rows_in += 1
+        self.metrics.values_in += len(record)
+        self.metrics.bytes_in += _payload_bytes(record)
+
+        if self._last_keyframe_at is None or now - self._last_keyframe_at >= self.keyframe_interval:
+            self._last_keyframe_at = self._last_heartbeat_at = now
+            self._last_reported = dict(record)
+            self._unchanged = {}
+            self.metrics.keyframes += 1
+            return self._published(dict(record))
+
+        changed = {}
+        for column, value in record.items():
+            last = self._last_reported.get(column)
+            if last is None or self._exceeds(column, value, last):
+                changed[column] = value
+                self._last_reported[column] = value
+
+        if self._heartbeat_due(now):
+            self._last_heartbeat_at = now
+            self._unchanged = {
+                column: self._last_reported[column] for column in record
+                if column not in changed and not math.isnan(self._last_reported[column])
+            }
+            self.metrics.heartbeats += 1
+
+        if not changed:
+            self.metrics.rows_suppressed += 1
+            return changed
+        return self._published(changed)
+
+    def take_unchanged(self) -> Dict[str, float]:
+        """
+        Columns of the latest heartbeat that were read but not published.
+
+        Returns:
+            Dict[str, float]: column -> last reported value (empty between
+            heartbeats); cleared by the call
+        """
+        unchanged, self._unchanged = self._unchanged, {}
+        return unchanged
+
+    def _heartbeat_due(self, now: float) -> bool:
+        if self.heartbeat_interval is None:
+            return False
+        return self._last_heartbeat_at is None or now - self._last_heartbeat_at >= self.heartbeat_interval
+
+    def _exceeds(self, column: str, value: float, last: float) -> bool:
+        if value == last:
+            return False
+        if math.isnan(value) or math.isnan(last):
+            return math.isnan(value) != math.isnan(last)
+        threshold = self._thresholds.get(column, self.default)
+        if threshold.binary:
+            return True
+        band = max(threshold.absolute, abs(last) * threshold.percent / 100.0)
+        return abs(value - last) > band
+
+    def _published(self, row: Dict[str, float]) -> Dict[str, float]:
+        self.metrics.rows_published += 1
+        self.metrics.values_published += len(row)
+        self.metrics.bytes_published += _payload_bytes(row)
+        return row
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return row, value and payload reduction figures."""
+        m = self.metrics
+        m.value_reduction_pct = 100.0 * (1 - m.values_published / m.values_in) if m.values_in else 0.0
+        m.payload_reduction_pct = 100.0 * (1 - m.bytes_published / m.bytes_in) if m.bytes_in else 0.0
+        return asdict(m)
+
+
+def _payload_bytes(row: Dict[str, float]) -> int:
+    """Size of a row's params as sent to the insert RPC."""
+    return len(json.dumps(row, separators=(',', ':')))
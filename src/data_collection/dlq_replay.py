@@ -0,0 +1,263 @@
+# File: data_collection/dlq_replay.py
+"""
+Indexed, bulk dead letter queue replay for Terminal 1.
+
+The dead letter queue holds one file per failed insert: failed_wide_*.json
+(one wide row) and failed_batch_*.jsonl (narrow history records). Replaying
+each file with its own RPC, and globbing the directory after every success to
+recompute the depth, is quadratic on large backlogs. It also blocks the event
+loop while files are parsed.
+
+DeadLetterIndex keeps the pending files in memory (oldest first). It is
+filled by one directory scan at startup and then updated by the DLQ writers
+and the replayer, so the queue depth is O(1) and the directory is only
+rescanned while the queue is empty.
+
+DeadLetterReplayer packs many files into one bulk RPC per kind (batched wide
+insert / bulk history insert). Files are parsed and deleted in bulk in a
+worker thread, and only after the server acknowledges the insert. Replay is
+paced to a configurable rows-per-second rate so a long backlog drains in
+minutes without starving live writes.
+"""
+import json
+import time
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from src.log_setup import get_data_collection_logger
+
+data_logger = get_data_collection_logger()
+
+WIDE_PATTERN = '*.json'
+NARROW_PATTERN = '*.jsonl'
+
+
+@dataclass
+class DeadLetterEntry:
+    """One pending dead letter queue file."""
+    path: Path
+    kind: str  # 'wide' (.json) or 'narrow' (.jsonl)
+
+
+@dataclass
+class ReplayMetrics:
+    """Metrics for dead letter queue replay."""
+    pending_files: int = 0
+    replayed_files: int = 0
+    replayed_rows: int = 0
+    bulk_requests: int = 0
+    failed_requests: int = 0
+    deleted_invalid_files: int = 0
+    skipped_corrupted_files: int = 0
+    scans: int = 0
+    rows_per_second_limit: float = 0.0
+    last_batch_files: int = 0
+    last_batch_ms: float = 0.0
+
+
+@dataclass
+class _LoadedBatch:
+    wide_rows: List[Tuple[str, Dict[str, float]]] = field(default_factory=list)
+    wide_paths: List[Path] = field(default_factory=list)
+    history_records: List[Dict[str, Any]] = field(default_factory=list)
+    narrow_paths: List[Path] = field(default_factory=list)
+    invalid_paths: List[Path] = field(default_factory=list)
+    corrupted_paths: List[Path] = field(default_factory=list)
+
+    @property
+    def rows(self) -> int:
+        return len(self.wide_rows) + len(self.history_records)
+
+
+def _kind_for(path: Path) -> str:
+    return 'narrow' if path.suffix == '.jsonl' else 'wide'
+
+
+class DeadLetterIndex:
+    """Pending dead letter queue files, oldest first, without re-globbing."""
+
+    def __init__(self):
+        self._entries: Dict[Path, DeadLetterEntry] = {}
+        self._skipped: set = set()
+
+    def scan(self, directory: Path) -> int:
+        """Rebuild the index from the directory (blocking; run in a thread)."""
+        paths = list(directory.glob(NARROW_PATTERN)) + list(directory.glob(WIDE_PATTERN))
+        paths.sort(key=lambda p: (p.stat().st_mtime, p.name))
+        self._entries = {p: DeadLetterEntry(p, _kind_for(p)) for p in paths if p not in self._skipped}
+        return len(self._entries)
+
+    def add(self, path: Path):
+        """Register a file written by a DLQ writer."""
+        self._entries[path] = DeadLetterEntry(path, _kind_for(path))
+
+    def discard(self, paths: List[Path]):
+        for path in paths:
+            self._entries.pop(path, None)
+
+    def skip(self, paths: List[Path]):
+        """Keep corrupted files on disk for manual recovery but stop retrying them."""
+        self._skipped.update(paths)
+        self.discard(paths)
+
+    def oldest(self, limit: int) -> List[DeadLetterEntry]:
+        entries = []
+        for entry in self._entries.values():
+            if len(entries) >= limit:
+                break
+            entries.append(entry)
+        return entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DeadLetterReplayer:
+    """
+    Replays indexed DLQ files with one bulk RPC per kind and batch.
+
+    Usage:
+        replayer = DeadLetterReplayer(index, insert_wide_rows, insert_history_records, run_io)
+        await replayer.rescan(dead_letter_queue_dir)
+        rows, acknowledged = await replayer.replay_batch()
+        await asyncio.sleep(replayer.pause_after(rows, elapsed))
+    """
+
+    def __init__(
+        self,
+        index: DeadLetterIndex,
+        insert_wide_rows: Callable[[List[Tuple[str, Dict[str, float]]]], Awaitable[int]],
+        insert_history_records: Callable[[List[Dict[str, Any]]], Awaitable[int]],
+        run_io: Callable[..., Awaitable[Any]],
+        rows_per_second: float = 50.0,
+        max_batch_rows: int = 200,
+    ):
+        """
+        Initialize the replayer.
+
+        Args:
+            index: Pending file index
+            insert_wide_rows: Bulk wide-row insert; returns rows inserted
+            insert_history_records: Bulk narrow insert; returns records inserted
+            run_io: Runs a blocking function off the event loop (func, *args)
+            rows_per_second: Replay rate limit (0 = unlimited)
+            max_batch_rows: Rows packed into one bulk RPC
+        """
+        self.index = index
+        self._insert_wide_rows = insert_wide_rows
+        self._insert_history_records = insert_history_records
+        self._run_io = run_io
+        self.rows_per_second = rows_per_second
+        self.max_batch_rows = max(1, int(max_batch_rows))
+        self.metrics = ReplayMetrics(rows_per_second_limit=rows_per_second)
+
+    async def rescan(self, directory: Path) -> int:
+        """Rebuild the index from the DLQ directory in a worker thread."""
+        self.metrics.scans += 1
+        return await self._run_io(self.index.scan, directory)
+
+    async def replay_batch(self) -> Tuple[int, bool]:
+        """
+        Replay the oldest pending files as one bulk RPC per kind.
+
+        Returns:
+            Tuple[int, bool]: (rows replayed, True if every RPC was acknowledged)
+        """
+        started = time.perf_counter()
+        entries = self.index.oldest(self.max_batch_rows)
+        if not entries:
+            return 0, True
+
+        batch: _LoadedBatch = await self._run_io(self._load, entries)
+        if batch.invalid_paths:
+            await self._run_io(self._delete, batch.invalid_paths)
+            self.index.discard(batch.invalid_paths)
+            self.metrics.deleted_invalid_files += len(batch.invalid_paths)
+        if batch.corrupted_paths:
+            self.index.skip(batch.corrupted_paths)
+            self.metrics.skipped_corrupted_files += len(batch.corrupted_paths)
+
+        replayed_rows = 0
+        all_acknowledged = True
+        for rows, paths, insert in (
+            (batch.wide_rows, batch.wide_paths, self._insert_wide_rows),
+            (batch.history_records, batch.narrow_paths, self._insert_history_records),
+        ):
+            if not rows:
+                continue
+            self.metrics.bulk_requests += 1
+            try:
+                inserted = await insert(rows)
+            except Exception as e:
+                inserted = 0
+                data_logger.warning(f"⚠️ Dead letter queue bulk replay of {len(paths)} files failed: {e}")
+            if inserted <= 0:
+                self.metrics.failed_requests += 1
+                all_acknowledged = False
+                continue
+            # Acknowledged: delete the replayed files in one pass
+            await self._run_io(self._delete, paths)
+            self.index.discard(paths)
+            replayed_rows += len(rows)
+            self.metrics.replayed_files += len(paths)
+            self.metrics.replayed_rows += len(rows)
+
+        self.metrics.last_batch_files = (
+            len(batch.wide_paths) + len(batch.narrow_paths) + len(batch.invalid_paths) + len(batch.corrupted_paths)
+        )
+        self.metrics.last_batch_ms = (time.perf_counter() - started) * 1000
+        return replayed_rows, all_acknowledged
+
+    def pause_after(self, rows: int, elapsed: float) -> float:
+        """Seconds to wait after replaying `rows` in `elapsed` seconds to honour the rate."""
+        if self.rows_per_second <= 0 or rows <= 0:
+            return 0.0
+        return max(0.0, rows / self.rows_per_second - elapsed)
+
+    def _load(self, entries: List[DeadLetterEntry]) -> _LoadedBatch:
+        """Parse files until the batch is full (blocking; runs in a thread)."""
+        batch = _LoadedBatch()
+        for entry in entries:
+            if batch.rows >= self.max_batch_rows:
+                break
+            try:
+                if entry.kind == 'wide':
+                    with open(entry.path, 'r') as f:
+                        dlq_data = json.load(f)
+                    timestamp, wide_record = dlq_data.get('timestamp'), dlq_data.get('params')
+                    if not timestamp or not wide_record:
+                        data_logger.warning(f"Invalid wide DLQ file {entry.path.name} - deleting")
+                        batch.invalid_paths.append(entry.path)
+                        continue
+                    batch.wide_rows.append((timestamp, wide_record))
+                    batch.wide_paths.append(entry.path)
+                else:
+                    with open(entry.path, 'r') as f:
+                        records = [json.loads(line) for line in f if line.strip()]
+                    if not records:
+                        batch.invalid_paths.append(entry.path)  # Empty file
+                        continue
+                    batch.history_records.extend(records)
+                    batch.narrow_paths.append(entry.path)
+            except FileNotFoundError:
+                batch.invalid_paths.append(entry.path)
+            except (ValueError, OSError) as e:
+                data_logger.error(
+                    f"Error processing DLQ file {entry.path.name}: {e} - leaving it for manual recovery"
+                )
+                batch.corrupted_paths.append(entry.path)
+        return batch
+
+    @staticmethod
+    def _delete(paths: List[Path]):
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return replay progress and rate figures."""
+        self.metrics.pending_files = len(self.index)
+        return asdict(self.metrics)
@@ -0,0 +1,195 @@
+# File: data_collection/ordered_writer.py
+"""
+Ordered multi-worker writer stage for Terminal 1 database inserts.
+
+The DB writer loop hands each drained batch of wide rows to
+OrderedWriterPool.submit(). K worker coroutines send batches concurrently (the
+blocking Supabase calls run in the service's thread pool), so one slow RPC no
+longer holds back every later reading.
+
+Batches are committed in submission (timestamp) order through a reorder
+buffer: a batch that finishes before an earlier one waits in the buffer, and
+the on_commit callback always sees batches in the order they were submitted.
+Success accounting, batcher feedback and any later checkpointing therefore
+advance contiguously, never past a batch that is still in flight.
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.log_setup import logger
+from src.utils.stats import p95
+
+
+@dataclass
+class WriterWorkerMetrics:
+    """Per-worker latency and throughput."""
+    worker_id: int
+    batches: int = 0
+    rows: int = 0
+    failures: int = 0
+    busy: bool = False
+    last_latency_ms: float = 0.0
+    avg_latency_ms: float = 0.0
+    p95_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+
+
+@dataclass
+class OrderedWriterMetrics:
+    """Metrics for the ordered writer pool."""
+    workers: int = 0
+    submitted: int = 0
+    committed: int = 0
+    in_flight: int = 0
+    reorder_buffer_depth: int = 0
+    max_reorder_buffer_depth: int = 0
+    # Batches that finished before an earlier batch and had to wait to commit
+    reordered: int = 0
+
+
+class OrderedWriterPool:
+    """
+    K concurrent writers with in-order commit.
+
+    Usage:
+        pool = OrderedWriterPool(write_fn, on_commit, workers=2)
+        pool.start()
+        await pool.submit(rows)        # blocks while all workers are busy
+        await pool.close(timeout=5.0)  # flush and stop
+    """
+
+    def __init__(
+        self,
+        write_fn: Callable[[List[Any]], Awaitable[bool]],
+        on_commit: Callable[[List[Any], bool, float], None],
+        workers: int = 2,
+        latency_window: int = 100,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            write_fn: Coroutine writing one batch; returns True on success
+            on_commit: Called in submission order with (batch, success, seconds)
+            workers: Number of concurrent writers (K)
+            latency_window: Latency samples kept per worker for p95
+        """
+        self._write_fn = write_fn
+        self._on_commit = on_commit
+        self.workers = max(1, int(workers))
+
+        # Bounded to K so submit() applies backpressure to the writer loop
+        self._jobs: asyncio.Queue = asyncio.Queue(maxsize=self.workers)
+        self._tasks: List[asyncio.Task] = []
+        self._next_seq = 0
+        self._next_commit_seq = 0
+        self._completed: Dict[int, Tuple[List[Any], bool, float]] = {}
+
+        self._worker_metrics = [WriterWorkerMetrics(worker_id=i) for i in range(self.workers)]
+        self._latencies: List[Deque[float]] = [deque(maxlen=latency_window) for _ in range(self.workers)]
+        self._latency_totals = [0.0] * self.workers
+        self.metrics = OrderedWriterMetrics(workers=self.workers)
+
+    def start(self):
+        """Start the worker tasks."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def submit(self, batch: List[Any]) -> int:
+        """
+        Queue a batch for writing; waits while all K workers are busy.
+
+        Returns:
+            int: Sequence number of the batch (its commit position)
+        """
+        seq = self._next_seq
+        self._next_seq += 1
+        self.metrics.submitted += 1
+        await self._jobs.put((seq, batch))
+        return seq
+
+    async def _worker(self, worker_id: int):
+        stats = self._worker_metrics[worker_id]
+        while True:
+            seq, batch = await self._jobs.get()
+            stats.busy = True
+            self.metrics.in_flight += 1
+            started = time.perf_counter()
+            success = False
+            cancelled = False
+            try:
+                success = await self._write_fn(batch)
+            except asyncio.CancelledError:
+                # Stopped mid-write: the batch outcome is unknown, so it is not committed
+                cancelled = True
+                raise
+            except Exception as e:
+                logger.error(f"DB writer worker {worker_id} failed: {e}", exc_info=True)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.metrics.in_flight -= 1
+                stats.busy = False
+                if not cancelled:
+                    self._record_latency(worker_id, len(batch), success, elapsed)
+                    self._complete(seq, batch, success, elapsed)
+                self._jobs.task_done()
+
+    def _record_latency(self, worker_id: int, rows: int, success: bool, seconds: float):
+        stats = self._worker_metrics[worker_id]
+        latency_ms = seconds * 1000
+        stats.batches += 1
+        stats.rows += rows
+        if not success:
+            stats.failures += 1
+        stats.last_latency_ms = latency_ms
+        stats.max_latency_ms = max(stats.max_latency_ms, latency_ms)
+        self._latency_totals[worker_id] += latency_ms
+        stats.avg_latency_ms = self._latency_totals[worker_id] / stats.batches
+        self._latencies[worker_id].append(latency_ms)
+
+    def _complete(self, seq: int, batch: List[Any], success: bool, seconds: float):
+        self._completed[seq] = (batch, success, seconds)
+        if seq != self._next_commit_seq:
+            self.metrics.reordered += 1
+        # Release every batch that is now contiguous with the commit point
+        while self._next_commit_seq in self._completed:
+            ready = self._completed.pop(self._next_commit_seq)
+            self._next_commit_seq += 1
+            self.metrics.committed += 1
+            try:
+                self._on_commit(*ready)
+            except Exception as e:
+                logger.error(f"DB writer commit callback failed: {e}", exc_info=True)
+        self.metrics.reorder_buffer_depth = len(self._completed)
+        self.metrics.max_reorder_buffer_depth = max(
+            self.metrics.max_reorder_buffer_depth, self.metrics.reorder_buffer_depth
+        )
+
+    async def flush(self):
+        """Wait until every submitted batch has been written and committed."""
+        await self._jobs.join()
+
+    async def close(self, timeout: Optional[float] = None):
+        """Flush outstanding batches (up to timeout seconds) and stop the workers."""
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"⏱️ DB writer pool flush timed out with {self.metrics.submitted - self.metrics.committed} "
+                f"batches uncommitted"
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return pool metrics with per-worker latency figures."""
+        for worker_id, stats in enumerate(self._worker_metrics):
+            stats.p95_latency_ms = p95(self._latencies[worker_id])
+        snapshot = asdict(self.metrics)
+        snapshot['per_worker'] = [asdict(stats) for stats in self._worker_metrics]
+        return snapshot
@@ -0,0 +1,203 @@
+# File: data_collection/sampling_scheduler.py
+"""
+Multi-rate polling for Terminal 1.
+
+The fixed collection loop reads every parameter once per second. Chamber
+pressure needs ~10 Hz, temperatures are fine at 0.2 Hz and configuration
+registers hardly change. MultiRateScheduler assigns every parameter to a
+sampling class with its own interval. It keeps one drift-free deadline per
+class, and on each tick it returns the classes that are due (classes due
+within merge_window_ms of each other share the tick). The parameters of
+those classes are read together, with bulk ranges planned over just that
+set, so a fast class never forces slow registers to be re-read.
+
+Each class records its own scheduling jitter (tick start - deadline) and
+read latency. If a class falls more than one interval behind, its missed
+ticks are skipped rather than read back to back.
+"""
+import math
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Deque, Dict, Iterable, List, Tuple
+
+from src.utils.stats import p95
+
+# Default classes (seconds between reads); override with SAMPLING_CLASSES
+DEFAULT_SAMPLING_CLASSES = {'fast': 0.1, 'normal': 1.0, 'slow': 5.0, 'static': 60.0}
+DEFAULT_CLASS = 'normal'
+
+# Metadata-based defaults; per-parameter/component overrides take precedence
+CLASS_BY_DATA_TYPE = {'pressure': 'fast', 'temperature': 'slow'}
+CLASS_BY_COMPONENT_TYPE = {'gauge': 'fast', 'heater': 'slow'}
+
+
+def parse_sampling_classes(spec: str) -> Dict[str, float]:
+    """Parse "fast:0.1,normal:1,slow:5" into {name: interval seconds}."""
+    classes = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, _, interval = item.partition(':')
+        classes[name.strip()] = float(interval)
+    return classes
+
+
+def sampling_class_for(parameter_id: str, metadata: Dict[str, Any],
+                       overrides: Dict[str, str], classes: Iterable[str]) -> str:
+    """
+    Pick the sampling class of a parameter.
+
+    Overrides are looked up by parameter id, component id and component name,
+    then the data type and component type defaults apply.
+    """
+    classes = set(classes)
+    for key in (parameter_id, metadata.get('component_id'), metadata.get('component_name')):
+        if key is not None and overrides.get(key) in classes:
+            return overrides[key]
+    for candidate in (CLASS_BY_DATA_TYPE.get(metadata.get('data_type')),
+                      CLASS_BY_COMPONENT_TYPE.get(metadata.get('component_type'))):
+        if candidate in classes:
+            return candidate
+    return DEFAULT_CLASS if DEFAULT_CLASS in classes else sorted(classes)[0]
+
+
+@dataclass
+class SamplingClassMetrics:
+    """Timing metrics for one sampling class."""
+    interval_s: float = 0.0
+    parameters: int = 0
+    ticks: int = 0
+    skipped_ticks: int = 0
+    read_errors: int = 0
+    last_jitter_ms: float = 0.0
+    avg_jitter_ms: float = 0.0
+    p95_jitter_ms: float = 0.0
+    max_jitter_ms: float = 0.0
+    last_read_latency_ms: float = 0.0
+    avg_read_latency_ms: float = 0.0
+    p95_read_latency_ms: float = 0.0
+    max_read_latency_ms: float = 0.0
+
+
+class MultiRateScheduler:
+    """
+    Per-class deadlines for multi-rate parameter polling.
+
+    Usage:
+        scheduler = MultiRateScheduler({'fast': 0.1, 'normal': 1.0})
+        scheduler.assign(parameter_id, 'fast')
+        scheduler.start(loop.time())
+        deadline, due = scheduler.next_tick()
+        ...sleep until deadline, read scheduler.parameters_for(due)...
+        scheduler.complete(due, started, latency_s, loop.time())
+    """
+
+    def __init__(self, classes: Dict[str, float], merge_window_ms: float = 5.0, window: int = 100):
+        """
+        Initialize the scheduler.
+
+        Args:
+            classes: Sampling class name -> interval in seconds
+            merge_window_ms: Classes due within this window share a tick
+            window: Samples kept per class for p95 figures
+        """
+        if not classes:
+            raise ValueError("At least one sampling class is required")
+        self.intervals = {name: float(interval) for name, interval in classes.items()}
+        for name, interval in self.intervals.items():
+            if interval <= 0:
+                raise ValueError(f"Sampling class {name} needs a positive interval")
+        self.merge_window = max(0.0, merge_window_ms) / 1000.0
+        self._members: Dict[str, List[str]] = {name: [] for name in self.intervals}
+        self._deadlines: Dict[str, float] = {}
+        self._jitter: Dict[str, Deque[float]] = {name: deque(maxlen=window) for name in self.intervals}
+        self._latency: Dict[str, Deque[float]] = {name: deque(maxlen=window) for name in self.intervals}
+        self._jitter_total: Dict[str, float] = {name: 0.0 for name in self.intervals}
+        self._latency_total: Dict[str, float] = {name: 0.0 for name in self.intervals}
+        self.metrics: Dict[str, SamplingClassMetrics] = {
+            name: SamplingClassMetrics(interval_s=interval) for name, interval in self.intervals.items()
+        }
+
+    def assign(self, parameter_id: str, class_name: str):
+        """Poll a parameter in the given class."""
+        if class_name not in self.intervals:
+            raise ValueError(f"Unknown sampling class: {class_name}")
+        self._members[class_name].append(parameter_id)
+        self.metrics[class_name].parameters += 1
+
+    @property
+    def active_classes(self) -> List[str]:
+        """Classes with at least one parameter."""
+        return [name for name, members in self._members.items() if members]
+
+    @property
+    def fastest_interval(self) -> float:
+        return min((self.intervals[name] for name in self.active_classes), default=math.inf)
+
+    def start(self, now: float):
+        """Make every active class due immediately."""
+        self._deadlines = {name: now for name in self.active_classes}
+
+    def next_tick(self) -> Tuple[float, List[str]]:
+        """
+        Return the next deadline and the classes that are due by then.
+
+        Returns:
+            Tuple[float, List[str]]: (deadline, class names in that tick)
+        """
+        if not self._deadlines:
+            raise RuntimeError("Scheduler has no active classes (call start() after assign())")
+        deadline = min(self._deadlines.values())
+        due = [name for name, at in self._deadlines.items() if at <= deadline + self.merge_window]
+        return deadline, due
+
+    def parameters_for(self, class_names: Iterable[str]) -> List[str]:
+        """Parameters to read in one tick (merged across the due classes)."""
+        parameter_ids: List[str] = []
+        for name in class_names:
+            parameter_ids.extend(self._members[name])
+        return parameter_ids
+
+    def complete(self, class_names: Iterable[str], started: float, latency_s: float,
+                 now: float, success: bool = True):
+        """Record a tick's timing and advance the deadlines of its classes."""
+        for name in class_names:
+            stats = self.metrics[name]
+            stats.ticks += 1
+            if not success:
+                stats.read_errors += 1
+            # Jitter against the class's own deadline (merged classes may be due slightly later)
+            jitter_ms = max(0.0, started - self._deadlines[name]) * 1000
+            latency_ms = latency_s * 1000
+            self._record(name, stats, jitter_ms, latency_ms)
+
+            interval = self.intervals[name]
+            next_deadline = self._deadlines[name] + interval
+            if next_deadline <= now:
+                # More than one interval behind: skip the missed ticks instead of bursting
+                missed = int((now - next_deadline) // interval) + 1
+                stats.skipped_ticks += missed
+                next_deadline += missed * interval
+            self._deadlines[name] = next_deadline
+
+    def _record(self, name: str, stats: SamplingClassMetrics, jitter_ms: float, latency_ms: float):
+        stats.last_jitter_ms = jitter_ms
+        stats.max_jitter_ms = max(stats.max_jitter_ms, jitter_ms)
+        self._jitter_total[name] += jitter_ms
+        stats.avg_jitter_ms = self._jitter_total[name] / stats.ticks
+        self._jitter[name].append(jitter_ms)
+
+        stats.last_read_latency_ms = latency_ms
+        stats.max_read_latency_ms = max(stats.max_read_latency_ms, latency_ms)
+        self._latency_total[name] += latency_ms
+        stats.avg_read_latency_ms = self._latency_total[name] / stats.ticks
+        self._latency[name].append(latency_ms)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return per-class jitter and latency figures."""
+        result = {}
+        for name, stats in self.metrics.items():
+            stats.p95_jitter_ms = p95(self._jitter[name])
+            stats.p95_read_latency_ms = p95(self._latency[name])
+            result[name] = asdict(stats)
+        return result
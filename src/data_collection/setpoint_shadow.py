@@ -0,0 +1,164 @@
+# File: data_collection/setpoint_shadow.py
+"""
+In-memory shadow of confirmed setpoints for Terminal 1 setpoint sync.
+
+Setpoints are read from the PLC every SETPOINT_REFRESH_INTERVAL (0.5 s).
+Terminal 1 used to SELECT id, set_value from component_parameters on every
+read, only to diff it against what the PLC returned. In steady state nothing
+has changed, so that is two round-trips per second that find nothing.
+
+SetpointShadow keeps the last set_value confirmed in the database for each
+parameter and diffs PLC setpoints against it:
+
+- Seeded with one SELECT at startup (and lazily for parameters not seen yet).
+- Kept current by Realtime UPDATE notifications on component_parameters,
+  e.g. when Terminal 3 writes a new setpoint or an operator edits one in the UI.
+- Updated after batch_update_setpoints confirms our own writes. A failed
+  write leaves the shadow unchanged, so the delta is retried on the next read.
+- Re-seeded when the Realtime channel closes or errors, and every
+  reseed_interval while it is not connected, so a missed notification
+  cannot hide a DB change for long.
+"""
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class SetpointShadowMetrics:
+    """Metrics for shadow-state setpoint sync."""
+    parameters: int = 0
+    seeds: int = 0
+    lazy_seeds: int = 0
+    realtime_updates: int = 0
+    realtime_connected: bool = False
+    diffs: int = 0
+    deltas_found: int = 0
+    deltas_confirmed: int = 0
+
+
+class SetpointShadow:
+    """
+    Last confirmed database set_value per parameter.
+
+    Usage:
+        shadow = SetpointShadow(tolerance=0.01)
+        shadow.seed(db_set_values, param_ids)
+        updates, external = shadow.diff(plc_setpoints)
+        ...  # batch update
+        shadow.confirm({pid: plc_setpoints[pid] for pid in updates})
+    """
+
+    def __init__(self, tolerance: float = 0.01, reseed_interval: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the shadow.
+
+        Args:
+            tolerance: Absolute difference treated as unchanged
+            reseed_interval: Seconds between re-seeds while Realtime is not connected
+            clock: Monotonic time source (seconds)
+        """
+        self.tolerance = tolerance
+        self.reseed_interval = reseed_interval
+        self._clock = clock
+        self._values: Dict[str, Optional[float]] = {}
+        self._seeded_at: Optional[float] = None
+        self.metrics = SetpointShadowMetrics()
+
+    def __contains__(self, param_id: str) -> bool:
+        return param_id in self._values
+
+    def get(self, param_id: str) -> Optional[float]:
+        return self._values.get(param_id)
+
+    def seed(self, db_set_values: Dict[str, Optional[float]], param_ids: Iterable[str], full: bool = True):
+        """
+        Replace shadow entries with values read from the database.
+
+        Args:
+            db_set_values: parameter_id -> set_value (None when the column is NULL)
+            param_ids: Parameters that were queried; ones missing from the result are
+                recorded as None so they are not queried again
+            full: True for a startup/periodic seed, False for parameters seen for the first time
+        """
+        for param_id in param_ids:
+            self._values[param_id] = db_set_values.get(param_id)
+        if full:
+            self._seeded_at = self._clock()
+            self.metrics.seeds += 1
+        else:
+            self.metrics.lazy_seeds += 1
+        self.metrics.parameters = len(self._values)
+
+    def missing(self, param_ids: Iterable[str]) -> List[str]:
+        """Parameters that have never been seeded."""
+        return [param_id for param_id in param_ids if param_id not in self._values]
+
+    def needs_reseed(self) -> bool:
+        """True before the first seed, after Realtime drops, or when a periodic re-seed is due without Realtime."""
+        if self._seeded_at is None:
+            return True
+        if self.metrics.realtime_connected:
+            return False
+        return self._clock() - self._seeded_at >= self.reseed_interval
+
+    def set_realtime_connected(self, connected: bool):
+        """
+        Record the Realtime channel state.
+
+        Losing the channel forces a re-seed on the next read, since UPDATEs sent
+        while it was down are never delivered.
+        """
+        if self.metrics.realtime_connected and not connected:
+            self._seeded_at = None
+        self.metrics.realtime_connected = connected
+
+    def apply_remote(self, record: Dict[str, Any]) -> bool:
+        """
+        Apply a component_parameters row from a Realtime UPDATE notification.
+
+        Returns:
+            bool: True if the shadow tracks the parameter and was updated
+        """
+        param_id = record.get('id')
+        if param_id is None or param_id not in self._values or 'set_value' not in record:
+            return False
+        value = record['set_value']
+        self._values[param_id] = float(value) if value is not None else None
+        self.metrics.realtime_updates += 1
+        return True
+
+    def diff(self, plc_setpoints: Dict[str, float]) -> Tuple[List[str], List[Tuple[str, float]]]:
+        """
+        Compare PLC setpoints with the shadow.
+
+        Args:
+            plc_setpoints: parameter_id -> setpoint read from the PLC
+
+        Returns:
+            Tuple of (parameter ids to write, [(parameter id, previous DB value)] for
+            external changes - parameters whose DB value was set and differs)
+        """
+        updates: List[str] = []
+        external_changes: List[Tuple[str, float]] = []
+        for param_id, plc_setpoint in plc_setpoints.items():
+            db_setpoint = self._values.get(param_id)
+            if db_setpoint is None or abs(plc_setpoint - db_setpoint) > self.tolerance:
+                updates.append(param_id)
+                if db_setpoint is not None:
+                    external_changes.append((param_id, db_setpoint))
+        self.metrics.diffs += 1
+        self.metrics.deltas_found += len(updates)
+        return updates, external_changes
+
+    def confirm(self, written: Dict[str, float]):
+        """Record set_values that the database accepted."""
+        for param_id, value in written.items():
+            self._values[param_id] = float(value)
+        self.metrics.deltas_confirmed += len(written)
+        self.metrics.parameters = len(self._values)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return seed, Realtime and diff figures."""
+        return asdict(self.metrics)
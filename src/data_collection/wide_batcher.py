@@ -0,0 +1,136 @@
+# File: data_collection/wide_batcher.py
+"""
+Adaptive micro-batching for Terminal 1 wide-row inserts.
+
+The PLC data service produces one wide row (all parameters at one timestamp)
+per collection interval. Writing each row with its own RPC means the writer
+falls behind as soon as RPC latency approaches the collection interval.
+AdaptiveWideBatcher groups several pending rows so they can be sent
+in a single insert_parameter_readings_wide_batch RPC.
+
+Batch size policy:
+- Target = max(queued backlog, rows that arrive during one RPC), so the
+  writer catches up after a latency spike and keeps up while latency is high.
+- Cap = upper bound on the target. It is halved when a batch fails or its RPC
+  exceeds the latency budget, and doubled again after healthy batches (never
+  above max_rows).
+- Linger: if fewer rows than the target are available, the writer waits up
+  to max_wait_ms for more before sending.
+"""
+import math
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class WideBatchMetrics:
+    """Metrics for wide-row micro-batching."""
+    requests: int = 0
+    rows: int = 0
+    failed_requests: int = 0
+    rows_per_request: float = 0.0
+    last_batch_rows: int = 0
+    max_batch_rows: int = 0
+    target_batch_rows: int = 1
+    batch_cap: int = 0
+    avg_rpc_latency_ms: float = 0.0
+    # Rows per second the writer sustains when saturated (rows / RPC time)
+    throughput_ceiling_rows_per_s: float = 0.0
+    # Rows per second actually written since the first batch
+    achieved_rows_per_s: float = 0.0
+
+
+class AdaptiveWideBatcher:
+    """
+    Decides how many queued wide rows go into the next batched insert.
+
+    Usage:
+        rows = await read_rows(batcher.target_size(backlog))
+        ...send rows...
+        batcher.record_success(len(rows), rpc_seconds)  # or record_failure()
+    """
+
+    def __init__(
+        self,
+        max_rows: int = 60,
+        max_wait_ms: float = 250.0,
+        arrival_interval: float = 1.0,
+        latency_budget_ms: float = 2000.0,
+        latency_alpha: float = 0.2,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            max_rows: Hard upper bound on rows per batched RPC
+            max_wait_ms: Longest time to wait for more rows once a batch is started
+            arrival_interval: Seconds between rows produced by the collection loop
+            latency_budget_ms: RPC latency above which the batch cap is halved
+            latency_alpha: Smoothing factor for the RPC latency average
+        """
+        self.max_rows = max(1, int(max_rows))
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.arrival_interval = arrival_interval
+        self.latency_budget_ms = latency_budget_ms
+        self.latency_alpha = latency_alpha
+
+        self.cap = self.max_rows
+        self._latency_ewma_s: Optional[float] = None
+        self._rpc_seconds_total = 0.0
+        self._first_write_at: Optional[float] = None
+        self.metrics = WideBatchMetrics(batch_cap=self.cap)
+
+    def target_size(self, backlog: int) -> int:
+        """Return how many rows the next batch should hold given the queued backlog."""
+        keep_up = 1
+        if self._latency_ewma_s is not None and self.arrival_interval > 0:
+            # Rows that arrive while one request is in flight
+            keep_up = math.ceil(self._latency_ewma_s / self.arrival_interval)
+        target = max(1, min(self.cap, max(backlog, keep_up)))
+        self.metrics.target_batch_rows = target
+        return target
+
+    def record_success(self, rows: int, rpc_seconds: float):
+        """Record a committed batch and adapt the cap to its latency."""
+        now = time.monotonic()
+        if self._first_write_at is None:
+            self._first_write_at = now - rpc_seconds
+
+        self.metrics.requests += 1
+        self.metrics.rows += rows
+        self.metrics.last_batch_rows = rows
+        self.metrics.max_batch_rows = max(self.metrics.max_batch_rows, rows)
+        self._rpc_seconds_total += rpc_seconds
+
+        if self._latency_ewma_s is None:
+            self._latency_ewma_s = rpc_seconds
+        else:
+            self._latency_ewma_s += (rpc_seconds - self._latency_ewma_s) * self.latency_alpha
+
+        if rpc_seconds * 1000 > self.latency_budget_ms and rows > 1:
+            self._set_cap(self.cap // 2)
+        elif rows >= self.cap:
+            self._set_cap(self.cap * 2)
+
+    def record_failure(self):
+        """Record a batch that failed after retries; smaller batches isolate bad rows."""
+        self.metrics.failed_requests += 1
+        self._set_cap(self.cap // 2)
+
+    def _set_cap(self, cap: int):
+        self.cap = max(1, min(self.max_rows, cap))
+        self.metrics.batch_cap = self.cap
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return rows-per-request, latency and throughput figures."""
+        m = self.metrics
+        m.rows_per_request = m.rows / m.requests if m.requests else 0.0
+        m.avg_rpc_latency_ms = (self._latency_ewma_s or 0.0) * 1000
+        m.throughput_ceiling_rows_per_s = (
+            m.rows / self._rpc_seconds_total if self._rpc_seconds_total > 0 else 0.0
+        )
+        if self._first_write_at is not None:
+            elapsed = time.monotonic() - self._first_write_at
+            m.achieved_rows_per_s = m.rows / elapsed if elapsed > 0 else 0.0
+        return asdict(m)
@@ -0,0 +1,421 @@
+# File: data_collection/wide_column_mapping.py
+"""
+Wide-table column mapping generated from parameter metadata.
+
+PARAMETER_TO_COLUMN_MAP (src/parameter_wide_table_mapping.py) and the
+latest_parameter_readings trigger (migrations/20251029_latest_parameter_readings.sql)
+were written by hand for 51 parameters. A parameter added to a machine had no
+column, so Terminal 1 logged a "not in wide table mapping" warning for it on
+every cycle and never stored its value.
+
+WideColumnMapping is built from component_parameters_full at startup:
+
+- Parameters already in PARAMETER_TO_COLUMN_MAP keep their column. New ones get
+  param_<first 8 hex digits of the id>, the same scheme, made longer on a
+  collision.
+- New columns are probed against parameter_readings. A column that does not
+  exist yet is held back (one warning per parameter) until the DDL from
+  generate_wide_table_sql() has been applied, so the row insert never fails
+  on an unknown column. Terminal 1 re-probes pending columns every
+  WIDE_COLUMN_PROBE_SECONDS, so applying the DDL needs no restart.
+- The mapping is cached as JSON, so a restart while the database is unreachable
+  still uses the last generated mapping (falling back to the static map).
+
+build_row() compiles the key order of a PLC read into an index array of
+column names once; each later read with the same parameters zips values
+against it instead of looking up every parameter id.
+
+Generate the matching DDL and trigger SQL with:
+    python -m src.data_collection.wide_column_mapping > wide_columns.sql
+"""
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.log_setup import get_data_collection_logger
+from src.parameter_wide_table_mapping import PARAMETER_TO_COLUMN_MAP
+
+data_logger = get_data_collection_logger()
+
+# Compiled index arrays kept for this many distinct read layouts (multi-rate subsets)
+MAX_COMPILED_LAYOUTS = 64
+
+
+@dataclass
+class WideColumn:
+    """One parameter_readings column and the parameter it stores."""
+    parameter_id: str
+    column: str
+    data_type: Optional[str] = None
+    component_name: Optional[str] = None
+    parameter_name: Optional[str] = None
+    active: bool = True  # column exists in parameter_readings
+
+
+@dataclass
+class WideColumnMappingMetrics:
+    """Metrics for the wide-table column mapping."""
+    source: str = 'static'
+    columns: int = 0
+    pending_columns: int = 0
+    layouts_compiled: int = 0
+    rows_built: int = 0
+    unmapped_values: int = 0
+
+
+def column_name_for(parameter_id: str, taken: Set[str]) -> str:
+    """
+    Column name for a parameter id: param_<8 hex digits>, longer if already taken.
+
+    Args:
+        parameter_id: component_parameters id (UUID)
+        taken: Column names already in use
+
+    Returns:
+        str: A lower-case identifier safe to use unquoted in SQL
+    """
+    key = re.sub(r'[^0-9a-z]', '', parameter_id.lower()) or 'x'
+    for length in (8, 12, 16, len(key)):
+        column = f"param_{key[:length]}"
+        if column not in taken:
+            return column
+    suffix = 2
+    while f"param_{key}_{suffix}" in taken:
+        suffix += 1
+    return f"param_{key}_{suffix}"
+
+
+class WideColumnMapping:
+    """
+    Parameter id <-> parameter_readings column mapping with compiled row layouts.
+
+    Usage:
+        mapping = WideColumnMapping.load(supabase, 'logs/wide_column_mapping.json')
+        wide_record = mapping.build_row(parameter_values)
+        mapping.parameter_to_column['<parameter id>']
+    """
+
+    def __init__(self, columns: List[WideColumn], source: str = 'static'):
+        """
+        Initialize the mapping.
+
+        Args:
+            columns: Every known column, active or pending
+            source: Where the mapping came from ('database', 'cache' or 'static')
+        """
+        self.columns = columns
+        self.parameter_to_column: Dict[str, str] = {c.parameter_id: c.column for c in columns if c.active}
+        self.column_to_parameter: Dict[str, str] = {c.column: c.parameter_id for c in columns if c.active}
+        self._pending: Dict[str, WideColumn] = {c.parameter_id: c for c in columns if not c.active}
+        self._layouts: Dict[Tuple[str, ...], List[Optional[str]]] = {}
+        self._warned: Set[str] = set()
+        self.metrics = WideColumnMappingMetrics(
+            source=source,
+            columns=len(self.parameter_to_column),
+            pending_columns=len(self._pending),
+        )
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_static(cls) -> 'WideColumnMapping':
+        """Mapping from the hand-written PARAMETER_TO_COLUMN_MAP."""
+        return cls([WideColumn(pid, column) for pid, column in PARAMETER_TO_COLUMN_MAP.items()], source='static')
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], known: Optional[Dict[str, str]] = None,
+                  source: str = 'database') -> 'WideColumnMapping':
+        """
+        Build the mapping from component_parameters_full rows.
+
+        Args:
+            rows: Rows with id and optionally data_type, component_name, parameter_name
+            known: parameter_id -> existing column (defaults to PARAMETER_TO_COLUMN_MAP);
+                these columns are assumed to exist, new ones start out pending
+            source: Label reported in metrics
+        """
+        known = PARAMETER_TO_COLUMN_MAP if known is None else known
+        taken = set(known.values())
+        columns = []
+        seen = set()
+        for row in sorted(rows, key=lambda r: str(r.get('id'))):
+            parameter_id = row.get('id')
+            if not parameter_id or parameter_id in seen:
+                continue
+            seen.add(parameter_id)
+            column = known.get(parameter_id)
+            active = column is not None
+            if column is None:
+                column = column_name_for(parameter_id, taken)
+                taken.add(column)
+            columns.append(WideColumn(
+                parameter_id=parameter_id,
+                column=column,
+                data_type=row.get('data_type'),
+                component_name=row.get('component_name'),
+                parameter_name=row.get('parameter_name'),
+                active=active,
+            ))
+        return cls(columns, source=source)
+
+    @classmethod
+    def from_cache(cls, cache_path: Any) -> 'WideColumnMapping':
+        """Mapping saved by save()."""
+        with open(cache_path) as f:
+            data = json.load(f)
+        return cls([WideColumn(**column) for column in data['columns']], source='cache')
+
+    def save(self, cache_path: Any):
+        """Cache the mapping as JSON (written atomically)."""
+        path = Path(cache_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({
+                'generated_at': datetime.now(timezone.utc).isoformat(),
+                'columns': [asdict(column) for column in self.columns],
+            }, f, indent=1)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, supabase, cache_path: Any, table: str = 'parameter_readings') -> 'WideColumnMapping':
+        """
+        Generate the mapping from component_parameters_full (blocking; run in a thread).
+
+        Columns that were active in the cached mapping stay active; other new columns
+        are probed against the wide table. Falls back to the cache, then the static map.
+
+        Args:
+            supabase: Sync Supabase client
+            cache_path: JSON cache location
+            table: Wide table to probe for new columns
+        """
+        cached_known: Dict[str, str] = {}
+        try:
+            cached = cls.from_cache(cache_path)
+            cached_known = {c.parameter_id: c.column for c in cached.columns if c.active}
+        except FileNotFoundError:
+            cached = None
+        except Exception as e:
+            data_logger.warning(f"Ignoring unreadable wide column mapping cache {cache_path}: {e}")
+            cached = None
+
+        try:
+            result = supabase.table('component_parameters_full').select(
+                'id, data_type, component_name, parameter_name'
+            ).execute()
+            rows = result.data or []
+            if not rows:
+                raise ValueError("component_parameters_full returned no parameters")
+        except Exception as e:
+            if cached is not None:
+                data_logger.warning(f"⚠️ Using cached wide column mapping ({e})")
+                return cached
+            data_logger.warning(f"⚠️ Using static wide column mapping ({e})")
+            return cls.from_static()
+
+        known = dict(PARAMETER_TO_COLUMN_MAP)
+        known.update(cached_known)
+        mapping = cls.from_rows(rows, known=known)
+        mapping.probe_pending(supabase, table)
+        try:
+            mapping.save(cache_path)
+        except Exception as e:
+            data_logger.warning(f"Failed to cache wide column mapping: {e}")
+        return mapping
+
+    def probe_pending(self, supabase, table: str = 'parameter_readings') -> List[WideColumn]:
+        """
+        Activate pending columns that already exist in the wide table.
+
+        Returns:
+            List[WideColumn]: The columns that were activated
+        """
+        created = self.find_created(supabase, table)
+        self.activate(created)
+        return created
+
+    def find_created(self, supabase, table: str = 'parameter_readings') -> List[WideColumn]:
+        """
+        Pending columns that the wide table has by now (blocking; does not change the mapping).
+
+        Lets the service probe in a worker thread and activate on the event loop.
+        """
+        created = []
+        for column in list(self._pending.values()):
+            try:
+                supabase.table(table).select(column.column).limit(1).execute()
+            except Exception:
+                continue
+            created.append(column)
+        return created
+
+    def activate(self, columns: Iterable[WideColumn]):
+        """Start writing the given pending columns."""
+        for column in columns:
+            if column.parameter_id in self._pending:
+                self._activate(column)
+                self._warned.discard(column.parameter_id)
+
+    def _activate(self, column: WideColumn):
+        column.active = True
+        self._pending.pop(column.parameter_id, None)
+        self.parameter_to_column[column.parameter_id] = column.column
+        self.column_to_parameter[column.column] = column.parameter_id
+        self._layouts.clear()
+        self.metrics.columns = len(self.parameter_to_column)
+        self.metrics.pending_columns = len(self._pending)
+
+    # ------------------------------------------------------------------
+    # Row building
+    # ------------------------------------------------------------------
+
+    def template(self) -> List[str]:
+        """Active column names in a stable order (the wide-row template)."""
+        return [column.column for column in self.columns if column.active]
+
+    def pending(self) -> List[WideColumn]:
+        """Columns generated for new parameters that the wide table does not have yet."""
+        return list(self._pending.values())
+
+    def _compile(self, keys: Tuple[str, ...]) -> List[Optional[str]]:
+        if len(self._layouts) >= MAX_COMPILED_LAYOUTS:
+            self._layouts.clear()
+        layout = [self.parameter_to_column.get(parameter_id) for parameter_id in keys]
+        for parameter_id, column in zip(keys, layout):
+            if column is None and parameter_id not in self._warned:
+                self._warned.add(parameter_id)
+                if parameter_id in self._pending:
+                    data_logger.warning(
+                        f"Parameter {parameter_id} has no {self._pending[parameter_id].column} column yet - "
+                        f"apply the SQL from python -m src.data_collection.wide_column_mapping"
+                    )
+                else:
+                    data_logger.warning(f"Parameter {parameter_id} not in wide table mapping - skipping")
+        self._layouts[keys] = layout
+        self.metrics.layouts_compiled += 1
+        return layout
+
+    def build_row(self, parameter_values: Dict[str, float]) -> Dict[str, float]:
+        """
+        Build a wide record (column -> value) from PLC values.
+
+        Args:
+            parameter_values: parameter_id -> value, in the PLC read order
+
+        Returns:
+            Dict[str, float]: Values of the mapped parameters
+        """
+        keys = tuple(parameter_values)
+        layout = self._layouts.get(keys)
+        if layout is None:
+            layout = self._compile(keys)
+        row = {}
+        for column, value in zip(layout, parameter_values.values()):
+            if column is not None:
+                row[column] = float(value)
+        self.metrics.rows_built += 1
+        self.metrics.unmapped_values += len(keys) - len(row)
+        return row
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return mapping source, column counts and row-building figures."""
+        return asdict(self.metrics)
+
+
+def generate_wide_table_sql(mapping: WideColumnMapping, table: str = 'parameter_readings') -> str:
+    """
+    DDL for every mapped column plus the latest_parameter_readings sync trigger.
+
+    Args:
+        mapping: Mapping whose columns (active and pending) are emitted
+        table: Wide table that receives the columns and the trigger
+
+    Returns:
+        str: SQL script (idempotent: ADD COLUMN IF NOT EXISTS / CREATE OR REPLACE)
+    """
+    columns = sorted(mapping.columns, key=lambda c: c.column)
+    lines = [
+        "-- Migration: Wide Table Columns and Latest Readings Trigger (generated)",
+        "-- Purpose: Add a parameter_readings column per component parameter and sync",
+        "--          latest_parameter_readings from it",
+        "-- Depends on: create_parameter_readings_wide_table.sql, 20251029_latest_parameter_readings.sql",
+        f"-- Generated: {datetime.now(timezone.utc).strftime('%Y-%m-%d')} by "
+        "python -m src.data_collection.wide_column_mapping",
+        "",
+    ]
+    for column in columns:
+        detail = ', '.join(str(part) for part in (column.component_name, column.parameter_name, column.data_type) if part)
+        comment = f"  -- {column.parameter_id}" + (f" ({detail})" if detail else '')
+        lines.append(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column.column} float8;{comment}")
+
+    values = ',\n'.join(
+        f"        ('{column.parameter_id}'::uuid, NEW.{column.column})" for column in columns
+    )
+    lines += [
+        "",
+        "CREATE OR REPLACE FUNCTION sync_latest_readings_from_wide()",
+        "RETURNS TRIGGER AS $$",
+        "BEGIN",
+        "    -- One UPSERT for every parameter present in the new wide row",
+        "    INSERT INTO latest_parameter_readings (parameter_id, value, timestamp)",
+        "    SELECT v.parameter_id, v.value, NEW.timestamp",
+        "    FROM (VALUES",
+        values,
+        "    ) AS v(parameter_id, value)",
+        "    WHERE v.value IS NOT NULL",
+        "    ON CONFLICT (parameter_id)",
+        "    DO UPDATE SET",
+        "        value = EXCLUDED.value,",
+        "        timestamp = EXCLUDED.timestamp,",
+        "        updated_at = NOW();",
+        "",
+        "    RETURN NEW;",
+        "END;",
+        "$$ LANGUAGE plpgsql;",
+        "",
+        f"DROP TRIGGER IF EXISTS sync_latest_readings_trigger ON {table};",
+        "",
+        "CREATE TRIGGER sync_latest_readings_trigger",
+        f"AFTER INSERT OR UPDATE ON {table}",
+        "FOR EACH ROW",
+        "EXECUTE FUNCTION sync_latest_readings_from_wide();",
+        "",
+    ]
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Print wide-table DDL and trigger SQL for the current component parameters"
+    )
+    parser.add_argument('--table', default='parameter_readings',
+                        help="Wide table (the 20251029 trigger was attached to parameter_value_history)")
+    parser.add_argument('--cache', default='logs/wide_column_mapping.json',
+                        help="Use this cached mapping if the database is unreachable")
+    parser.add_argument('--offline', action='store_true',
+                        help="Do not query the database; use the cache or the static map")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        try:
+            mapping = WideColumnMapping.from_cache(args.cache)
+        except FileNotFoundError:
+            mapping = WideColumnMapping.from_static()
+    else:
+        from src.db import get_supabase
+        mapping = WideColumnMapping.load(get_supabase(), args.cache, table=args.table)
+
+    sys.stdout.write(generate_wide_table_sql(mapping, table=args.table))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,421 @@
+# File: data_collection/write_ahead_log.py
+"""
+Durable, segment-rotated write-ahead log for Terminal 1 readings.
+
+Every reading is appended to the log before it is uploaded, so a database
+outage no longer drops queued readings or produces one DLQ file (and one
+fsync) per reading:
+
+- Append-only segments: records are JSON lines ({"o": offset, "r": record})
+  in files named wal-<first offset>.log. A segment is rotated once it exceeds
+  segment_max_bytes. All disk I/O is sequential.
+- Group commit: appends are buffered and written with a single fsync every
+  group_commit_ms, so a burst of readings costs one fsync.
+- Committed-offset checkpoint: the uploader calls commit(offset) once every
+  record up to offset is in the database. The checkpoint is persisted
+  (atomically) with the next group commit and segments that are fully
+  committed are deleted.
+- Replay: read() serves recent records from an in-memory tail and streams
+  older ones back from the segments in bulk, continuing from where the
+  previous read stopped.
+
+Only durable (fsynced) records are handed to the uploader. On restart the
+log recovers the last segment (truncating a torn final line) and resumes
+from the persisted checkpoint.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.log_setup import logger
+
+SEGMENT_PREFIX = 'wal-'
+SEGMENT_SUFFIX = '.log'
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+@dataclass
+class WriteAheadLogMetrics:
+    """Metrics for the write-ahead log."""
+    appended: int = 0
+    durable_offset: int = 0
+    committed_offset: int = 0
+    pending_records: int = 0
+    segments: int = 0
+    bytes_written: int = 0
+    fsyncs: int = 0
+    avg_group_commit_records: float = 0.0
+    last_fsync_ms: float = 0.0
+    replayed_from_disk: int = 0
+    segments_deleted: int = 0
+    recovered_records: int = 0
+    truncated_bytes: int = 0
+
+
+class SegmentedWriteAheadLog:
+    """
+    Append-only record log with group-commit fsync and an upload checkpoint.
+
+    Usage:
+        wal = SegmentedWriteAheadLog('logs/wal')
+        wal.open()
+        wal.start()
+        offset = wal.append({'kind': 'wide', 't': timestamp, 'p': params})
+        entries = await wal.read(wal.committed_offset + 1, max_records=60)
+        ...upload entries...
+        wal.commit(entries[-1][0])
+        await wal.close()
+    """
+
+    def __init__(
+        self,
+        directory: Any,
+        segment_max_bytes: int = 4 * 1024 * 1024,
+        group_commit_ms: float = 50.0,
+        tail_cache_records: int = 4096,
+    ):
+        """
+        Initialize the log (call open() before use).
+
+        Args:
+            directory: Directory holding segments and the checkpoint
+            segment_max_bytes: Rotate to a new segment beyond this size
+            group_commit_ms: Interval for batching appends into one fsync
+            tail_cache_records: Recent records kept in memory for the uploader
+        """
+        self.directory = Path(directory)
+        self.segment_max_bytes = max(1, int(segment_max_bytes))
+        self.group_commit_ms = group_commit_ms
+        self.tail_cache_records = max(1, int(tail_cache_records))
+
+        # All file I/O runs on one thread, in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='t1-wal')
+        self._segments: List[Tuple[int, Path]] = []  # (first offset, path), oldest first
+        self._active = None
+        self._active_bytes = 0
+        self._buffer: List[Tuple[int, str]] = []  # appended, not yet fsynced
+        self._tail: Deque[Tuple[int, Dict[str, Any]]] = deque()
+        self._read_cursor: Optional[Tuple[int, Path, int]] = None  # (next offset, segment, byte position)
+
+        self._next_offset = 1
+        self._durable_offset = 0
+        self._committed_offset = 0
+        self._persisted_checkpoint = 0
+
+        self._sync_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._durable_changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._opened = False
+        self._group_records_total = 0
+        self.metrics = WriteAheadLogMetrics()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def open(self):
+        """Recover segments and checkpoint from disk (synchronous, at startup)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._committed_offset = self._persisted_checkpoint = self._load_checkpoint()
+
+        self._segments = sorted(
+            (int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]), path)
+            for path in self.directory.glob(f'{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}')
+        )
+        last_offset = self._committed_offset
+        if self._segments:
+            first_offset, path = self._segments[-1]
+            last_offset = max(last_offset, self._recover_segment(first_offset, path))
+
+        self._next_offset = last_offset + 1
+        self._durable_offset = last_offset
+        self.metrics.recovered_records = max(0, last_offset - self._committed_offset)
+
+        if self._segments and self._segments[-1][1].stat().st_size < self.segment_max_bytes:
+            path = self._segments[-1][1]
+            self._active = open(path, 'ab')
+            self._active_bytes = path.stat().st_size
+        else:
+            self._open_segment(self._next_offset)
+        self._opened = True
+
+        if self.metrics.recovered_records:
+            logger.warning(
+                f"📼 Write-ahead log: {self.metrics.recovered_records} readings from a previous run "
+                f"await upload (checkpoint offset {self._committed_offset})"
+            )
+
+    def start(self):
+        """Start the group-commit task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._group_commit_loop())
+
+    async def close(self):
+        """Flush pending appends and the checkpoint, then release the segment file."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if not self._opened:
+            return
+        await self.sync()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._close_active)
+        self._opened = False
+
+    # ------------------------------------------------------------------
+    # Producer / uploader API
+    # ------------------------------------------------------------------
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Append a record; it becomes durable (and readable) at the next group commit."""
+        if not self._opened:
+            raise RuntimeError("Write-ahead log is not open")
+        offset = self._next_offset
+        self._next_offset += 1
+        line = json.dumps({'o': offset, 'r': record}, separators=(',', ':')) + '\n'
+        self._buffer.append((offset, line))
+        self._tail.append((offset, record))
+        while len(self._tail) > self.tail_cache_records:
+            self._tail.popleft()
+        self.metrics.appended += 1
+        self._wakeup.set()
+        return offset
+
+    async def read(self, from_offset: int, max_records: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Return up to max_records durable records starting at from_offset.
+
+        Returns:
+            List[Tuple[int, Dict]]: (offset, record) pairs in offset order
+        """
+        last = min(self._durable_offset, from_offset + max_records - 1)
+        if last < from_offset:
+            return []
+        if self._tail and self._tail[0][0] <= from_offset:
+            start = from_offset - self._tail[0][0]
+            return [self._tail[i] for i in range(start, start + last - from_offset + 1)]
+
+        loop = asyncio.get_running_loop()
+        entries = await loop.run_in_executor(self._executor, self._read_segments, from_offset, last)
+        self.metrics.replayed_from_disk += len(entries)
+        return entries
+
+    async def wait_for_records(self, after_offset: int, timeout: float) -> bool:
+        """Wait until a record beyond after_offset is durable; False on timeout."""
+        if self._durable_offset > after_offset:
+            return True
+        self._durable_changed.clear()
+        try:
+            await asyncio.wait_for(self._durable_changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._durable_offset > after_offset
+
+    def commit(self, offset: int):
+        """Mark every record up to offset as uploaded (persisted at the next group commit)."""
+        if offset > self._committed_offset:
+            self._committed_offset = min(offset, self._durable_offset)
+            self._wakeup.set()
+
+    @property
+    def committed_offset(self) -> int:
+        return self._committed_offset
+
+    @property
+    def durable_offset(self) -> int:
+        return self._durable_offset
+
+    @property
+    def last_offset(self) -> int:
+        return self._next_offset - 1
+
+    # ------------------------------------------------------------------
+    # Group commit
+    # ------------------------------------------------------------------
+
+    async def _group_commit_loop(self):
+        while True:
+            await self._wakeup.wait()
+            # Let appends arriving within the interval share one fsync
+            await asyncio.sleep(self.group_commit_ms / 1000.0)
+            self._wakeup.clear()
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"🚨 Write-ahead log group commit failed: {e}", exc_info=True)
+
+    async def sync(self):
+        """Write and fsync buffered appends and persist the checkpoint if it moved."""
+        async with self._sync_lock:
+            lines, self._buffer = self._buffer, []
+            checkpoint = self._committed_offset if self._committed_offset != self._persisted_checkpoint else None
+            if not lines and checkpoint is None:
+                return
+
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self._executor, self._write_group, lines, checkpoint)
+            except Exception:
+                # Keep the records for the next attempt
+                self._buffer = lines + self._buffer
+                raise
+
+            if lines:
+                self._durable_offset = lines[-1][0]
+                self._group_records_total += len(lines)
+                self.metrics.last_fsync_ms = (time.perf_counter() - started) * 1000
+                self._durable_changed.set()
+            if checkpoint is not None:
+                self._persisted_checkpoint = checkpoint
+
+    # ------------------------------------------------------------------
+    # File I/O (WAL thread only)
+    # ------------------------------------------------------------------
+
+    def _segment_path(self, first_offset: int) -> Path:
+        return self.directory / f'{SEGMENT_PREFIX}{first_offset:020d}{SEGMENT_SUFFIX}'
+
+    def _open_segment(self, first_offset: int):
+        path = self._segment_path(first_offset)
+        self._active = open(path, 'ab')
+        self._active_bytes = 0
+        self._segments.append((first_offset, path))
+        self._fsync_directory()
+
+    def _close_active(self):
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+
+    def _fsync_directory(self):
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return  # Directory fsync is not supported on every platform
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _write_group(self, lines: List[Tuple[int, str]], checkpoint: Optional[int]):
+        for offset, line in lines:
+            if self._active_bytes >= self.segment_max_bytes:
+                self._active.flush()
+                os.fsync(self._active.fileno())
+                self._close_active()
+                self._open_segment(offset)
+            data = line.encode('utf-8')
+            self._active.write(data)
+            self._active_bytes += len(data)
+            self.metrics.bytes_written += len(data)
+        if lines:
+            self._active.flush()
+            os.fsync(self._active.fileno())
+            self.metrics.fsyncs += 1
+        if checkpoint is not None:
+            self._write_checkpoint(checkpoint)
+            self._delete_committed_segments(checkpoint)
+
+    def _write_checkpoint(self, offset: int):
+        path = self.directory / CHECKPOINT_FILE
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'committed_offset': offset}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _load_checkpoint(self) -> int:
+        try:
+            with open(self.directory / CHECKPOINT_FILE, 'r') as f:
+                return int(json.load(f).get('committed_offset', 0))
+        except FileNotFoundError:
+            return 0
+        except (ValueError, OSError) as e:
+            logger.error(f"🚨 Unreadable write-ahead log checkpoint ({e}); replaying all segments")
+            return 0
+
+    def _delete_committed_segments(self, committed: int):
+        # A segment is fully committed when the next one starts at or before committed + 1
+        while len(self._segments) > 1 and self._segments[1][0] <= committed + 1:
+            _, path = self._segments.pop(0)
+            try:
+                path.unlink()
+                self.metrics.segments_deleted += 1
+            except FileNotFoundError:
+                pass
+
+    def _recover_segment(self, first_offset: int, path: Path) -> int:
+        """Return the last valid offset in a segment, truncating a torn tail."""
+        last_offset = first_offset - 1
+        good_bytes = 0
+        with open(path, 'rb') as f:
+            data = f.read()
+        for raw in data.splitlines(keepends=True):
+            if not raw.endswith(b'\n'):
+                break
+            try:
+                last_offset = int(json.loads(raw)['o'])
+            except (ValueError, KeyError, TypeError):
+                break
+            good_bytes += len(raw)
+        if good_bytes < len(data):
+            self.metrics.truncated_bytes += len(data) - good_bytes
+            logger.warning(f"📼 Write-ahead log: truncating {len(data) - good_bytes} torn bytes from {path.name}")
+            with open(path, 'r+b') as f:
+                f.truncate(good_bytes)
+                os.fsync(f.fileno())
+        return last_offset
+
+    def _read_segments(self, first: int, last: int) -> List[Tuple[int, Dict[str, Any]]]:
+        entries: List[Tuple[int, Dict[str, Any]]] = []
+        segment_paths = [path for _, path in self._segments]
+
+        # Continue sequentially from the previous read when possible
+        if self._read_cursor and self._read_cursor[0] == first and self._read_cursor[1] in segment_paths:
+            index, position = segment_paths.index(self._read_cursor[1]), self._read_cursor[2]
+        else:
+            index = max((i for i, (start, _) in enumerate(self._segments) if start <= first), default=0)
+            position = 0
+
+        while index < len(self._segments):
+            path = self._segments[index][1]
+            with open(path, 'rb') as f:
+                f.seek(position)
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        break
+                    entry = json.loads(raw)
+                    offset = entry['o']
+                    if offset > last:
+                        break
+                    position += len(raw)
+                    if offset >= first:
+                        entries.append((offset, entry['r']))
+                    if offset == last:
+                        self._read_cursor = (last + 1, path, position)
+                        return entries
+            index += 1
+            position = 0
+        self._read_cursor = None
+        return entries
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return offsets, backlog and I/O statistics."""
+        self.metrics.durable_offset = self._durable_offset
+        self.metrics.committed_offset = self._committed_offset
+        self.metrics.pending_records = self.last_offset - self._committed_offset
+        self.metrics.segments = len(self._segments)
+        self.metrics.avg_group_commit_records = (
+            self._group_records_total / self.metrics.fsyncs if self.metrics.fsyncs else 0.0
+        )
+        return asdict(self.metrics)
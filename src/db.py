@@ -5,6 +5,8 @@ from datetime import datetime, timezone
 import traceback
 import time
 import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
 from supabase import create_client, Client
 from supabase import create_async_client
 
@@ -17,9 +19,26 @@ _supabase_client = None
 # Singleton instance for the async client
 _async_supabase_client = None
 
+# Client override for the current context only (recipe dry runs use an in-memory database)
+_supabase_override: ContextVar = ContextVar('supabase_override', default=None)
+
+
+@contextmanager
+def supabase_override(client):
+    """Make get_supabase() return another client inside the block (current context only)."""
+    token = _supabase_override.set(client)
+    try:
+        yield client
+    finally:
+        _supabase_override.reset(token)
+
+
 def get_supabase():
     """Get the Supabase client instance (singleton) with retry logic."""
     global _supabase_client
+    override = _supabase_override.get()
+    if override is not None:
+        return override
     if _supabase_client is None:
         if not is_supabase_config_present():
             raise ValueError(
@@ -0,0 +1,34 @@
+-- Migration: Create Table for High-Rate Burst Captures
+-- Purpose: Store 20-100 Hz parameter samples captured around valve pulses and purges
+--          (one compact row per burst, linked to the process execution and recipe step)
+-- Created: 2026-10-16
+
+CREATE TABLE IF NOT EXISTS parameter_bursts (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  process_id uuid REFERENCES process_executions(id) ON DELETE SET NULL,
+  step_id uuid,
+  trigger text NOT NULL,             -- 'valve', 'purge', ...
+  label text,                        -- e.g. 'valve_3'
+  triggered_at timestamptz NOT NULL,
+  pulse_duration_ms float8 NOT NULL DEFAULT 0,
+  pre_roll_ms float8 NOT NULL,
+  post_roll_ms float8 NOT NULL,
+  rate_hz float8 NOT NULL,
+  sample_count integer NOT NULL,
+  parameter_ids text[] NOT NULL,
+  -- Sample times in ms relative to triggered_at (negative = pre-roll)
+  offsets_ms float8[] NOT NULL,
+  -- Column-wise values: {"<parameter id>": [v0, v1, ...]} aligned with offsets_ms
+  samples jsonb NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_parameter_bursts_process_step
+  ON parameter_bursts (process_id, step_id, triggered_at);
+
+CREATE INDEX IF NOT EXISTS idx_parameter_bursts_triggered_at
+  ON parameter_bursts (triggered_at DESC);
+
+COMMENT ON TABLE parameter_bursts IS
+'High-rate parameter samples around valve pulses and purges, written by RealPLC burst capture
+(BURST_CAPTURE_PARAMETERS). One row per pulse window: trigger - pre-roll to pulse end + post-roll.';
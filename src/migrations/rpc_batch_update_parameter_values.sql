@@ -0,0 +1,65 @@
+-- Migration: RPC Function for Batched current_value/set_value Updates
+-- Purpose: Single-call flush target for RealPLC's write-behind buffer
+-- Created: 2025-11-14
+-- Replaces: one single-row component_parameters UPDATE per PLC read/write/setpoint poll
+
+-- Drop existing function if it exists
+DROP FUNCTION IF EXISTS batch_update_parameter_values(JSONB);
+
+-- Create batched update function
+CREATE OR REPLACE FUNCTION batch_update_parameter_values(p_updates JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  updated_count INTEGER;
+BEGIN
+  -- Input format (either value key may be omitted):
+  --   [{"id": "uuid", "current_value": 1.23, "set_value": 4.56}, ...]
+  -- Omitted keys leave the existing column value untouched.
+  UPDATE component_parameters AS cp
+  SET
+    current_value = CASE WHEN u.rec ? 'current_value'
+                         THEN (u.rec->>'current_value')::numeric
+                         ELSE cp.current_value END,
+    set_value     = CASE WHEN u.rec ? 'set_value'
+                         THEN (u.rec->>'set_value')::numeric
+                         ELSE cp.set_value END,
+    updated_at    = now()
+  FROM jsonb_array_elements(p_updates) AS u(rec)
+  WHERE cp.id = (u.rec->>'id')::uuid
+    -- Skip no-op rows so unchanged values cause no write or Realtime event
+    AND (
+      (u.rec ? 'current_value' AND cp.current_value IS DISTINCT FROM (u.rec->>'current_value')::numeric)
+      OR (u.rec ? 'set_value' AND cp.set_value IS DISTINCT FROM (u.rec->>'set_value')::numeric)
+    );
+
+  GET DIAGNOSTICS updated_count = ROW_COUNT;
+
+  -- Return the number of successfully updated records
+  RETURN updated_count;
+
+EXCEPTION
+  WHEN OTHERS THEN
+    -- Log error and re-raise for client-side handling
+    RAISE WARNING 'batch_update_parameter_values failed: %', SQLERRM;
+    RAISE;
+END;
+$$;
+
+-- Grant execute permissions to authenticated users
+GRANT EXECUTE ON FUNCTION batch_update_parameter_values(JSONB) TO authenticated;
+
+-- Grant execute permissions to anonymous users (for service account)
+GRANT EXECUTE ON FUNCTION batch_update_parameter_values(JSONB) TO anon;
+
+-- Add comment for documentation
+COMMENT ON FUNCTION batch_update_parameter_values(JSONB) IS
+'Batched update of component_parameters.current_value and/or set_value.
+Accepts JSONB array of records with keys: id (UUID), current_value (numeric, optional),
+set_value (numeric, optional). Omitted keys are left unchanged; rows whose values are already current are skipped.
+Returns count of updated records.
+Used by the RealPLC write-behind buffer, which coalesces to the latest value per
+parameter and flushes all changed rows in one call per interval.';
@@ -2,6 +2,8 @@
 -- Purpose: High-performance batch update for component_parameters.set_value
 -- Created: 2025-11-10
 -- Fixes: 4.5s bottleneck in setpoint sync (30 params × 150ms → single 150ms call)
+-- Superseded by supabase/migrations/20261016090000_batch_update_setpoints_return_ids.sql
+-- (returns the updated ids instead of a count)
 
 -- Drop existing function if it exists
 DROP FUNCTION IF EXISTS batch_update_setpoints(JSONB);
@@ -0,0 +1,61 @@
+-- Migration: RPC Function to Reconstruct Parameter State from Sparse Wide Rows
+-- Purpose: Read the full parameter state when Terminal 1 runs in report-by-exception
+--          (deadband) mode and only writes changed columns between keyframes
+-- Depends on: create_parameter_readings_wide_table.sql
+-- Created: 2026-10-16
+
+-- Drop existing function if it exists
+DROP FUNCTION IF EXISTS get_parameter_readings_state(timestamptz, integer);
+
+-- Returns {"param_XXXXXXXX": value, ...}: for every column, the latest non-NULL
+-- value at or before p_at. Terminal 1 writes a full keyframe row at least every
+-- DEADBAND_KEYFRAME_SECONDS, so the search only looks back p_lookback_seconds
+-- (set it to at least the keyframe interval).
+CREATE OR REPLACE FUNCTION get_parameter_readings_state(
+  p_at timestamptz DEFAULT now(),
+  p_lookback_seconds integer DEFAULT 120
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  select_list text;
+  result jsonb;
+BEGIN
+  SELECT string_agg(
+    format(
+      'jsonb_build_object(%L, (SELECT %I FROM parameter_readings
+         WHERE timestamp <= $1 AND timestamp > $1 - make_interval(secs => $2)
+           AND %I IS NOT NULL
+         ORDER BY timestamp DESC LIMIT 1))',
+      column_name, column_name, column_name
+    ),
+    ' || '
+  )
+  INTO select_list
+  FROM information_schema.columns
+  WHERE table_schema = 'public'
+    AND table_name = 'parameter_readings'
+    AND column_name LIKE 'param\_%';
+
+  -- One jsonb_build_object per column (a single call would exceed the 100 argument limit)
+  EXECUTE format('SELECT jsonb_strip_nulls(%s)', select_list)
+  INTO result
+  USING p_at, p_lookback_seconds;
+
+  RETURN result;
+END;
+$$;
+
+-- Grant execute permissions
+GRANT EXECUTE ON FUNCTION get_parameter_readings_state(timestamptz, integer) TO authenticated;
+GRANT EXECUTE ON FUNCTION get_parameter_readings_state(timestamptz, integer) TO anon;
+
+-- Add documentation
+COMMENT ON FUNCTION get_parameter_readings_state(timestamptz, integer) IS
+'Reconstructs the full parameter state at p_at from parameter_readings.
+Each column takes its latest non-NULL value within p_lookback_seconds before p_at.
+Needed when Terminal 1 writes sparse rows (DEADBAND_MODE=1) between full keyframes.';
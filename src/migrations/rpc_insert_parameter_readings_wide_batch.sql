@@ -0,0 +1,54 @@
+-- Migration: RPC Function for Batched Wide Parameter Insert
+-- Purpose: Insert several parameter_readings wide rows in one round-trip
+-- Depends on: rpc_insert_parameter_reading_wide.sql
+-- Created: 2026-10-16
+
+-- Drop existing function if it exists
+DROP FUNCTION IF EXISTS insert_parameter_readings_wide_batch(jsonb);
+
+-- Create batched wide insert function
+-- p_rows: JSONB array of {"timestamp": "<iso>", "params": {"param_XXXXXXXX": value, ...}}
+CREATE OR REPLACE FUNCTION insert_parameter_readings_wide_batch(
+  p_rows jsonb
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  row_item jsonb;
+  inserted_rows integer := 0;
+BEGIN
+  -- One transaction for the whole batch: either every row lands or none do,
+  -- so the caller can safely retry or dead-letter the batch as a unit
+  FOR row_item IN
+    SELECT value FROM jsonb_array_elements(p_rows)
+  LOOP
+    PERFORM insert_parameter_reading_wide(
+      (row_item->>'timestamp')::timestamptz,
+      row_item->'params'
+    );
+    inserted_rows := inserted_rows + 1;
+  END LOOP;
+
+  -- Return number of rows (timestamps) inserted
+  RETURN inserted_rows;
+
+EXCEPTION
+  WHEN OTHERS THEN
+    RAISE WARNING 'insert_parameter_readings_wide_batch failed: %', SQLERRM;
+    RAISE;
+END;
+$$;
+
+-- Grant execute permissions
+GRANT EXECUTE ON FUNCTION insert_parameter_readings_wide_batch(jsonb) TO authenticated;
+GRANT EXECUTE ON FUNCTION insert_parameter_readings_wide_batch(jsonb) TO anon;
+
+-- Add documentation
+COMMENT ON FUNCTION insert_parameter_readings_wide_batch(jsonb) IS
+'Batched wide-format parameter insert for parameter_readings table.
+Accepts a JSONB array of {timestamp, params} objects, one per row.
+Returns count of rows inserted.
+Used by the Terminal 1 DB writer to send queued readings in one request.';
@@ -0,0 +1,550 @@
+# File: plc/async_communicator.py
+"""
+Native asyncio Modbus TCP communication with the PLC.
+
+Async counterpart of PLCCommunicator built on pymodbus' AsyncModbusTcpClient.
+Every operation is awaited on the event loop and retry backoff uses
+asyncio.sleep, so a slow PLC reply no longer stalls command handling or
+timers in the same process. The synchronous PLCCommunicator is kept for the
+CLI tools.
+"""
+import asyncio
+import errno
+import time
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, List, Optional
+
+from src.log_setup import logger
+from src.config import PLC_BYTE_ORDER
+from src.plc.byte_order import decode_float, decode_int32, encode_float, encode_int32
+from src.plc.communicator import PLCCommunicator
+from src.plc.pipelined_transport import PipelinedModbusClient
+from src.plc.scheduler import RequestPriority, current_request_priority
+
+
+class AsyncPLCCommunicator:
+    """
+    Async Modbus TCP communication between the system and PLC.
+
+    Mirrors the PLCCommunicator API (connect priority, retry semantics,
+    byte-order handling) with awaitable operations.
+    """
+
+    def __init__(self, plc_ip='192.168.1.11', port=502, slave_id=1, byte_order=PLC_BYTE_ORDER,
+                 hostname=None, auto_discover=False, connection_timeout=10, retries=3,
+                 operation_timeout=2.0, scheduler=None, pipeline_depth=0):
+        """
+        Initialize the async PLC communicator with connection parameters.
+
+        Args:
+            plc_ip: Static IP address of the PLC (fallback)
+            port: Port number for PLC communication
+            slave_id: Modbus slave ID
+            byte_order: Byte order for multi-register operations
+            hostname: Hostname for dynamic resolution (e.g., 'plc.local')
+            auto_discover: Enable automatic network discovery if hostname fails
+            connection_timeout: Connection timeout in seconds
+            retries: Number of connection retries
+            operation_timeout: Timeout for individual Modbus requests in seconds
+            scheduler: Optional PLCRequestScheduler every transaction waits on
+                (priority taken from the calling context)
+            pipeline_depth: Outstanding requests allowed on the single PLC
+                socket; above 1 the pipelined MBAP transport is used
+        """
+        self.plc_ip = plc_ip
+        self.hostname = hostname
+        self.port = port
+        self.slave_id = slave_id
+        self.client = None
+        self.debug = True  # Set to False to disable debug messages
+        self.byte_order = byte_order
+        self.auto_discover = auto_discover
+        self.connection_timeout = connection_timeout
+        self.operation_timeout = operation_timeout
+        self.retries = retries
+        self._current_ip = None  # Track the currently connected IP
+        self._operation_retries = 3  # Retries for individual operations
+        self._operation_retry_delay = 0.5  # Delay between operation retries (seconds)
+        self._last_connection_check = 0  # Track last connection health check
+        # Serializes reconnects so concurrent operations don't race to rebuild the client
+        self._connect_lock = asyncio.Lock()
+        self.scheduler = scheduler
+        self.pipeline_depth = pipeline_depth
+        # Sticky: once the device answers pipelined requests out of spec,
+        # every reconnect stays serial
+        self._pipeline_fallback_reason = None
+
+        self.log("INFO", f"Using byte order: {self.byte_order}")
+        if hostname:
+            self.log("INFO", f"Hostname resolution enabled: {hostname}")
+        if auto_discover:
+            self.log("INFO", "Auto-discovery enabled for DHCP environments")
+
+    def log(self, level, message):
+        """Log messages using the application's logger."""
+        if self.debug:
+            if level == "DEBUG":
+                logger.debug(message)
+            elif level == "INFO":
+                logger.info(message)
+            elif level == "WARNING":
+                logger.warning(message)
+            elif level == "ERROR":
+                logger.error(message)
+
+    # ------------------------------------------------------------------
+    # Connection management
+    # ------------------------------------------------------------------
+
+    def _create_client(self, target, timeout):
+        if self.pipeline_depth > 1:
+            return PipelinedModbusClient(
+                target,
+                port=self.port,
+                timeout=timeout,
+                depth=1 if self._pipeline_fallback_reason else self.pipeline_depth,
+                on_fallback=self._on_pipeline_fallback
+            )
+        from pymodbus.client import AsyncModbusTcpClient
+        # reconnect_delay=0 disables pymodbus' background reconnect; recovery is
+        # handled explicitly by _ensure_connection so retries stay bounded.
+        return AsyncModbusTcpClient(
+            target,
+            port=self.port,
+            timeout=timeout,
+            retries=0,
+            reconnect_delay=0
+        )
+
+    def _on_pipeline_fallback(self, reason):
+        self._pipeline_fallback_reason = reason
+
+    def pipelined_client(self) -> Optional[PipelinedModbusClient]:
+        """The connected client if it currently pipelines requests, else None."""
+        client = self.client
+        if isinstance(client, PipelinedModbusClient) and client.connected and client.pipelining:
+            return client
+        return None
+
+    def get_pipeline_metrics(self):
+        """Pipelined transport metrics (empty when pipelining is not enabled)."""
+        if not isinstance(self.client, PipelinedModbusClient):
+            return {}
+        metrics = self.client.get_metrics()
+        metrics['fallback_reason'] = self._pipeline_fallback_reason
+        return metrics
+
+    async def connect(self):
+        """
+        Establish connection to the PLC using dynamic discovery if configured.
+
+        Connection priority:
+        1. Hostname resolution (if hostname provided)
+        2. Auto-discovery (if enabled)
+        3. Static IP address (fallback)
+        """
+        connection_targets = []
+
+        # Priority 1: Try hostname resolution
+        if self.hostname:
+            self.log("INFO", f"Attempting hostname resolution: {self.hostname}")
+            connection_targets.append(('hostname', self.hostname))
+
+        # Priority 2: Try auto-discovery (discovery is natively async)
+        if self.auto_discover:
+            self.log("INFO", "Attempting auto-discovery...")
+            try:
+                from src.plc.discovery import auto_discover_plc
+                discovered_ip = await auto_discover_plc(port=self.port)
+                if discovered_ip:
+                    connection_targets.append(('discovery', discovered_ip))
+            except ImportError:
+                self.log("WARNING", "Discovery module not available, using static IP")
+            except Exception as e:
+                self.log("WARNING", f"Auto-discovery failed: {e}")
+
+        # Priority 3: Static IP fallback
+        connection_targets.append(('static', self.plc_ip))
+
+        for method, target in connection_targets:
+            if await self._attempt_connection(target, method):
+                self._current_ip = target
+                return True
+
+        self.log("ERROR", "All connection attempts failed")
+        return False
+
+    async def _attempt_connection(self, target, method):
+        """Attempt connection to a specific target."""
+        for attempt in range(self.retries):
+            try:
+                self.log("DEBUG", f"Connecting to PLC at {target}:{self.port} via {method} (attempt {attempt + 1}/{self.retries})")
+
+                self._close_client()
+                self.client = self._create_client(target, self.operation_timeout)
+
+                connected = await asyncio.wait_for(self.client.connect(), timeout=self.connection_timeout)
+                if connected:
+                    self.log("INFO", f"Connected to PLC successfully via {method} (Target: {target}, Port: {self.port}, Slave ID: {self.slave_id})")
+                    return True
+                else:
+                    self.log("DEBUG", f"Connection attempt {attempt + 1} failed for {target}")
+
+            except Exception as e:
+                self.log("DEBUG", f"Connection attempt {attempt + 1} failed for {target}: {e}")
+
+            # Wait before retry (except on last attempt)
+            if attempt < self.retries - 1:
+                await asyncio.sleep(1)
+
+        self._close_client()
+        self.log("ERROR", f"Failed to connect to PLC at {target} via {method} after {self.retries} attempts")
+        return False
+
+    def _close_client(self):
+        if self.client:
+            try:
+                self.client.close()
+            except Exception:
+                pass
+            self.client = None
+
+    async def disconnect(self):
+        """Close the connection to the PLC."""
+        if self.client and self.client.connected:
+            self._close_client()
+            self.log("INFO", "Disconnected from PLC")
+            return True
+        self._close_client()
+        return True
+
+    @property
+    def connected(self) -> bool:
+        """True if the underlying client has an open transport."""
+        return bool(self.client and self.client.connected)
+
+    async def _is_connection_healthy(self):
+        """Check if the current connection is healthy."""
+        if not self.connected:
+            return False
+
+        # Throttle connection health checks to avoid overhead
+        current_time = time.time()
+        if current_time - self._last_connection_check < 1.0:  # Check at most once per second
+            return True
+
+        self._last_connection_check = current_time
+
+        try:
+            # Read a single coil as a lightweight health check
+            result = await self.client.read_coils(0, count=1, slave=self.slave_id)
+            # Even if the read fails due to invalid address, a proper Modbus
+            # response means the connection is healthy
+            return not result.isError() or 'connection' not in str(result).lower()
+        except Exception as e:
+            self.log("DEBUG", f"Connection health check failed: {e}")
+            return False
+
+    async def _ensure_connection(self):
+        """Ensure we have a healthy connection, reconnect if necessary."""
+        if await self._is_connection_healthy():
+            return True
+
+        stale_client = self.client
+        async with self._connect_lock:
+            # Another task may have reconnected while we waited for the lock
+            if self.client is not stale_client and self.connected:
+                return True
+
+            self.log("WARNING", "Connection unhealthy, attempting to reconnect...")
+            self._close_client()
+            return await self.connect()
+
+    def _handle_modbus_error(self, operation_name, error, attempt, max_attempts):
+        """Handle Modbus operation errors with specific handling for broken pipe."""
+        error_str = str(error).lower()
+
+        is_broken_pipe = (
+            hasattr(error, 'errno') and error.errno == errno.EPIPE
+        ) or (
+            'broken pipe' in error_str or
+            'errno 32' in error_str or
+            'connection reset' in error_str or
+            'connection aborted' in error_str or
+            'not connected' in error_str
+        )
+
+        if is_broken_pipe:
+            self.log("WARNING", f"{operation_name} failed with broken pipe error (attempt {attempt}/{max_attempts}): {error}")
+            # Force reconnection on broken pipe
+            self._close_client()
+            return True  # Should retry
+        else:
+            self.log("ERROR", f"{operation_name} failed with error (attempt {attempt}/{max_attempts}): {error}")
+            return attempt < max_attempts  # Retry for other errors too
+
+    def _schedule(self, default_priority: RequestPriority):
+        """Scheduler slot for one transaction (no-op without a scheduler)."""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.access(current_request_priority(default_priority))
+
+    async def _execute_with_retry(self, operation_func: Callable[[], Awaitable[Any]], operation_name: str,
+                                  default_priority: RequestPriority = RequestPriority.BACKGROUND_READ):
+        """
+        Execute an async Modbus operation with retry logic and connection recovery.
+
+        Each attempt holds a scheduler slot only for the transaction itself,
+        never across reconnects or retry backoff.
+        """
+        last_error = None
+
+        for attempt in range(1, self._operation_retries + 1):
+            try:
+                if not await self._ensure_connection():
+                    self.log("ERROR", f"Cannot establish connection for {operation_name} (attempt {attempt}/{self._operation_retries})")
+                    if attempt < self._operation_retries:
+                        await asyncio.sleep(self._operation_retry_delay * attempt)
+                        continue
+                    raise RuntimeError(f"Failed to establish PLC connection for {operation_name} after {self._operation_retries} attempts")
+
+                async with self._schedule(default_priority):
+                    result = await operation_func()
+
+                if result is not None and (not hasattr(result, 'isError') or not result.isError()):
+                    if attempt > 1:
+                        self.log("INFO", f"{operation_name} succeeded on attempt {attempt}")
+                    return result
+
+                error_msg = str(result) if hasattr(result, 'isError') else "Operation returned None"
+                self.log("WARNING", f"{operation_name} returned error: {error_msg} (attempt {attempt}/{self._operation_retries})")
+
+                if attempt < self._operation_retries:
+                    await asyncio.sleep(self._operation_retry_delay * attempt)
+                    continue
+                return result  # Return the failed result on final attempt
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last_error = e
+                should_retry = self._handle_modbus_error(operation_name, e, attempt, self._operation_retries)
+
+                if not should_retry or attempt >= self._operation_retries:
+                    self.log("ERROR", f"{operation_name} failed permanently after {attempt} attempts: {e}")
+                    raise e
+
+                # Exponential backoff without blocking the event loop
+                delay = self._operation_retry_delay * (2 ** (attempt - 1))
+                await asyncio.sleep(delay)
+
+        if last_error:
+            raise last_error
+        raise RuntimeError(f"{operation_name} failed after all retries")
+
+    # ------------------------------------------------------------------
+    # Register / coil operations
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _param_suffix(param_info) -> str:
+        # Passed per call: concurrent reads share this communicator
+        if param_info:
+            param_name = param_info.get('name', 'unknown')
+            component_name = param_info.get('component_name', 'unknown')
+            return f" [{component_name} - {param_name}]"
+        return ""
+
+    async def read_holding_registers(self, address, count=1, param_info=None):
+        """
+        Read raw holding registers.
+
+        Args:
+            address: Starting register address
+            count: Number of registers to read
+            param_info: Optional dict with parameter name/component_name for logging
+
+        Returns:
+            List of register values or None if read failed
+        """
+        result = await self._execute_with_retry(
+            lambda: self.client.read_holding_registers(address, count=count, slave=self.slave_id),
+            f"read_holding_registers(address={address}, count={count})"
+        )
+        if result is None or result.isError():
+            self.log("ERROR", f"Failed to read holding registers: {result}{self._param_suffix(param_info)}")
+            return None
+        return result.registers[:count]
+
+    async def write_register(self, address, value):
+        """
+        Write a single 16-bit holding register.
+
+        Args:
+            address: Register address
+            value: Unsigned 16-bit value
+
+        Returns:
+            True if successful, False otherwise
+        """
+        result = await self._execute_with_retry(
+            lambda: self.client.write_register(address, int(value), slave=self.slave_id),
+            f"write_register(address={address}, value={value})",
+            RequestPriority.OPERATOR_WRITE
+        )
+        if result is None or result.isError():
+            self.log("ERROR", f"Failed to write register: {result}")
+            return False
+        return True
+
+    async def read_float(self, address, param_info=None):
+        """
+        Read a 32-bit float from the PLC using the configured byte order.
+
+        Args:
+            address: Starting register address
+            param_info: Optional dict with parameter name/component_name for logging
+
+        Returns:
+            Float value or None if read failed
+        """
+        self.log("DEBUG", f"Reading float from address {address}")
+        registers = await self.read_holding_registers(address, count=2, param_info=param_info)
+        if registers is None:
+            return None
+
+        self.log("DEBUG", f"Raw registers: {registers}")
+        float_value = decode_float(registers, self.byte_order)
+        self.log("INFO", f"Float value: {float_value}{self._param_suffix(param_info)}")
+        return float_value
+
+    async def write_float(self, address, value):
+        """
+        Write a 32-bit float to the PLC using the configured byte order.
+
+        Args:
+            address: Starting register address
+            value: Float value to write
+
+        Returns:
+            True if successful, False otherwise
+        """
+        self.log("DEBUG", f"Writing float {value} to address {address}")
+        registers = encode_float(value, self.byte_order)
+        self.log("DEBUG", f"Registers in '{self.byte_order}' order: {registers}")
+
+        result = await self._execute_with_retry(
+            lambda: self.client.write_registers(address, registers, slave=self.slave_id),
+            f"write_float(address={address}, value={value})",
+            RequestPriority.OPERATOR_WRITE
+        )
+        if result is None or result.isError():
+            self.log("ERROR", f"Failed to write float: {result}")
+            return False
+
+        self.log("INFO", f"Successfully wrote float {value} to address {address}")
+        return True
+
+    async def read_integer_32bit(self, address, param_info=None):
+        """
+        Read a 32-bit integer from the PLC using the configured byte order.
+
+        Args:
+            address: Starting register address
+            param_info: Optional dict with parameter name/component_name for logging
+
+        Returns:
+            Integer value or None if read failed
+        """
+        self.log("DEBUG", f"Reading 32-bit integer from address {address}")
+        registers = await self.read_holding_registers(address, count=2, param_info=param_info)
+        if registers is None:
+            return None
+
+        value = decode_int32(registers, self.byte_order)
+        self.log("INFO", f"32-bit Integer value: {value}{self._param_suffix(param_info)}")
+        return value
+
+    async def write_integer_32bit(self, address, value):
+        """
+        Write a 32-bit integer to the PLC using the configured byte order.
+
+        Args:
+            address: Starting register address
+            value: Integer value to write
+
+        Returns:
+            True if successful, False otherwise
+        """
+        self.log("DEBUG", f"Writing 32-bit integer {value} to address {address}")
+        registers = encode_int32(int(value), self.byte_order)
+
+        result = await self._execute_with_retry(
+            lambda: self.client.write_registers(address, registers, slave=self.slave_id),
+            f"write_integer_32bit(address={address}, value={value})",
+            RequestPriority.OPERATOR_WRITE
+        )
+        if result is None or result.isError():
+            self.log("ERROR", f"Failed to write integer: {result}")
+            return False
+
+        self.log("INFO", f"Successfully wrote integer {value} to address {address}")
+        return True
+
+    async def read_coils(self, address, count=1, param_info=None) -> Optional[List[bool]]:
+        """
+        Read binary values (coils) from the PLC.
+
+        Args:
+            address: Starting coil address
+            count: Number of coils to read
+            param_info: Optional dict with parameter name/component_name for logging
+
+        Returns:
+            List of boolean values or None if read failed
+        """
+        self.log("DEBUG", f"Reading {count} coils from address {address}")
+
+        result = await self._execute_with_retry(
+            lambda: self.client.read_coils(address, count=count, slave=self.slave_id),
+            f"read_coils(address={address}, count={count})"
+        )
+        if result is None or result.isError():
+            self.log("ERROR", f"Failed to read coils: {result}{self._param_suffix(param_info)}")
+            return None
+
+        bits = result.bits[:count]
+        for i, bit in enumerate(bits):
+            state = "ON" if bit else "OFF"
+            self.log("INFO", f"Coil {address + i}: {state}{self._param_suffix(param_info)}")
+        return bits
+
+    async def write_coil(self, address, value):
+        """
+        Write a binary value (coil) to the PLC.
+
+        Args:
+            address: Coil address
+            value: Boolean value (True for ON, False for OFF)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        state = "ON" if value else "OFF"
+        self.log("DEBUG", f"Writing {state} to coil {address}")
+
+        result = await self._execute_with_retry(
+            lambda: self.client.write_coil(address, bool(value), slave=self.slave_id),
+            f"write_coil(address={address}, value={value})",
+            RequestPriority.OPERATOR_WRITE
+        )
+        if result is None or result.isError():
+            self.log("ERROR", f"Failed to write coil: {result}")
+            return False
+
+        self.log("INFO", f"Successfully wrote {state} to coil {address}")
+        return True
+
+    # Address range optimization is pure computation and shared with the sync
+    # communicator so both transports plan identical bulk reads.
+    optimize_address_ranges = PLCCommunicator.optimize_address_ranges
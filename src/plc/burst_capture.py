@@ -0,0 +1,314 @@
+# File: plc/burst_capture.py
+"""
+High-rate burst capture around valve pulses and purges.
+
+ALD pulses last 20-500 ms, far shorter than the 1 Hz data collection
+interval, so the pressure transient a pulse causes is never logged.
+BurstCapture samples a configured parameter subset at 20-100 Hz into an
+in-memory ring buffer while a pulse is in progress:
+
+- A trigger (control_valve / execute_purge, or a recipe step) defines the
+  window [trigger - pre-roll, trigger + pulse + post-roll].
+- Sampling starts at the first trigger and continues until idle_timeout
+  after the last window has closed. Consecutive pulses therefore get full
+  pre-roll; arm() starts sampling early when pre-roll is needed for the
+  first pulse too.
+- When the window closes, its samples are uploaded as one compact row
+  (column-wise values) to parameter_bursts, linked to the process_id and
+  step set by burst_step(). If the upload fails, the row is spilled to
+  disk.
+
+Sampling uses the subset bulk read (read_parameters) at background-read
+priority, so valve/purge writes still go first. The regular 1 Hz data
+collection is not changed and never waits for a burst.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from src.log_setup import logger
+
+MIN_RATE_HZ = 20.0
+MAX_RATE_HZ = 100.0
+
+_burst_step: ContextVar[Optional[Tuple[Optional[str], Optional[str]]]] = ContextVar('plc_burst_step', default=None)
+
+
+@contextmanager
+def burst_step(process_id: Optional[str], step_id: Optional[str]):
+    """Link bursts triggered inside the block to a process execution and recipe step."""
+    token = _burst_step.set((process_id, step_id))
+    try:
+        yield
+    finally:
+        _burst_step.reset(token)
+
+
+@dataclass
+class BurstCaptureMetrics:
+    """Metrics for high-rate burst capture."""
+    bursts_triggered: int = 0
+    bursts_uploaded: int = 0
+    bursts_failed: int = 0
+    bursts_spilled: int = 0
+    samples: int = 0
+    read_errors: int = 0
+    overruns: int = 0
+    sampling: bool = False
+    last_burst_samples: int = 0
+    last_burst_rate_hz: float = 0.0
+    last_pre_roll_ms: float = 0.0
+
+
+@dataclass(eq=False)
+class _Burst:
+    trigger: str
+    label: Optional[str]
+    process_id: Optional[str]
+    step_id: Optional[str]
+    triggered_at: datetime
+    trigger_time: float
+    window_start: float
+    window_end: float
+    duration_ms: float
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+class BurstCapture:
+    """
+    Ring-buffered high-rate sampler for pulse transients.
+
+    Usage:
+        capture = BurstCapture(plc.read_parameters, ['pressure_id'], rate_hz=50)
+        with burst_step(process_id, step_id):
+            capture.trigger('valve', duration_ms=150, label='valve_1')
+        ...
+        await capture.stop()  # uploads bursts still in progress
+    """
+
+    TABLE_NAME = 'parameter_bursts'
+
+    def __init__(
+        self,
+        read_fn: Callable[[List[str]], Awaitable[Dict[str, float]]],
+        parameter_ids: List[str],
+        rate_hz: float = 50.0,
+        pre_roll_ms: float = 200.0,
+        post_roll_ms: float = 500.0,
+        buffer_seconds: float = 10.0,
+        idle_timeout: float = 5.0,
+        spill_dir: Any = 'logs/burst_capture',
+        supabase_provider: Optional[Callable[[], Any]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize burst capture.
+
+        Args:
+            read_fn: Bulk read of a parameter subset (e.g. RealPLC.read_parameters)
+            parameter_ids: Parameters sampled during a burst (empty disables capture)
+            rate_hz: Sampling rate, clamped to 20-100 Hz
+            pre_roll_ms: Window captured before the trigger
+            post_roll_ms: Window captured after the pulse ends
+            buffer_seconds: Ring buffer length
+            idle_timeout: Seconds to keep sampling after the last window closes
+            spill_dir: Directory for bursts that could not be uploaded
+            supabase_provider: Callable returning a sync Supabase client
+                (defaults to src.db.get_supabase)
+            clock: Monotonic time source (seconds)
+        """
+        self.parameter_ids = list(parameter_ids)
+        self.rate_hz = min(MAX_RATE_HZ, max(MIN_RATE_HZ, float(rate_hz)))
+        self.pre_roll = max(0.0, pre_roll_ms) / 1000.0
+        self.post_roll = max(0.0, post_roll_ms) / 1000.0
+        self.idle_timeout = max(0.0, idle_timeout)
+        self.spill_dir = Path(spill_dir)
+        self._read_fn = read_fn
+        self._supabase_provider = supabase_provider
+        self._clock = clock
+
+        self._ring: Deque[Tuple[float, Dict[str, float]]] = deque(
+            maxlen=max(1, int(math.ceil(self.rate_hz * buffer_seconds)))
+        )
+        self._sample_until = 0.0
+        self._sampler: Optional[asyncio.Task] = None
+        self._bursts: Set[_Burst] = set()
+        self.metrics = BurstCaptureMetrics()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.parameter_ids)
+
+    def arm(self, seconds: Optional[float] = None):
+        """Start (or keep) sampling so the next trigger has pre-roll."""
+        if not self.enabled:
+            return
+        self._extend_sampling(self._clock() + (self.idle_timeout if seconds is None else seconds))
+
+    def trigger(self, trigger: str, duration_ms: Optional[float] = None, label: Optional[str] = None) -> bool:
+        """
+        Capture the window around a pulse that starts now.
+
+        Args:
+            trigger: What caused the burst ('valve', 'purge', ...)
+            duration_ms: Pulse length (0/None for a single edge)
+            label: Optional detail (e.g. 'valve_3')
+
+        Returns:
+            bool: True if a burst was started
+        """
+        if not self.enabled:
+            return False
+
+        now = self._clock()
+        duration = max(0.0, float(duration_ms or 0)) / 1000.0
+        process_id, step_id = _burst_step.get() or (None, None)
+        burst = _Burst(
+            trigger=trigger,
+            label=label,
+            process_id=process_id,
+            step_id=step_id,
+            triggered_at=datetime.now(timezone.utc),
+            trigger_time=now,
+            window_start=now - self.pre_roll,
+            window_end=now + duration + self.post_roll,
+            duration_ms=duration * 1000,
+        )
+        self.metrics.bursts_triggered += 1
+        self._extend_sampling(burst.window_end + self.idle_timeout)
+        self._bursts.add(burst)
+        burst.task = asyncio.create_task(self._finish(burst))
+        return True
+
+    async def stop(self):
+        """Upload bursts in progress with what was captured and stop sampling."""
+        for burst in list(self._bursts):
+            if burst.task is not None:
+                burst.task.cancel()
+        for burst in list(self._bursts):
+            await asyncio.gather(burst.task, return_exceptions=True)
+            await self._upload(burst)
+            self._bursts.discard(burst)
+        self._sample_until = 0.0
+        if self._sampler is not None:
+            self._sampler.cancel()
+            await asyncio.gather(self._sampler, return_exceptions=True)
+            self._sampler = None
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def _extend_sampling(self, until: float):
+        self._sample_until = max(self._sample_until, until)
+        if self._sampler is None or self._sampler.done():
+            self._sampler = asyncio.create_task(self._sample_loop())
+
+    async def _sample_loop(self):
+        period = 1.0 / self.rate_hz
+        next_at = self._clock()
+        self.metrics.sampling = True
+        try:
+            while self._clock() < self._sample_until:
+                started = self._clock()
+                try:
+                    values = await self._read_fn(self.parameter_ids)
+                    if values:
+                        self._ring.append((started, values))
+                        self.metrics.samples += 1
+                except Exception as e:
+                    self.metrics.read_errors += 1
+                    logger.debug(f"Burst capture read failed: {e}")
+
+                next_at += period
+                now = self._clock()
+                if next_at < now:
+                    # Read took longer than one period: skip, never burst to catch up
+                    self.metrics.overruns += 1
+                    next_at = now
+                await asyncio.sleep(next_at - now)
+        finally:
+            self.metrics.sampling = False
+
+    # ------------------------------------------------------------------
+    # Upload
+    # ------------------------------------------------------------------
+
+    async def _finish(self, burst: _Burst):
+        await asyncio.sleep(max(0.0, burst.window_end - self._clock()))
+        self._bursts.discard(burst)
+        await self._upload(burst)
+
+    def _build_row(self, burst: _Burst) -> Dict[str, Any]:
+        samples = [(t, values) for t, values in self._ring if burst.window_start <= t <= burst.window_end]
+        offsets_ms = [round((t - burst.trigger_time) * 1000, 1) for t, _ in samples]
+        columns = {
+            parameter_id: [values.get(parameter_id) for _, values in samples]
+            for parameter_id in self.parameter_ids
+        }
+        self.metrics.last_burst_samples = len(samples)
+        window = burst.window_end - burst.window_start
+        self.metrics.last_burst_rate_hz = len(samples) / window if window > 0 else 0.0
+        self.metrics.last_pre_roll_ms = -offsets_ms[0] if offsets_ms and offsets_ms[0] < 0 else 0.0
+        return {
+            'process_id': burst.process_id,
+            'step_id': burst.step_id,
+            'trigger': burst.trigger,
+            'label': burst.label,
+            'triggered_at': burst.triggered_at.isoformat(),
+            'pulse_duration_ms': burst.duration_ms,
+            'pre_roll_ms': self.pre_roll * 1000,
+            'post_roll_ms': self.post_roll * 1000,
+            'rate_hz': self.rate_hz,
+            'sample_count': len(samples),
+            'parameter_ids': self.parameter_ids,
+            'offsets_ms': offsets_ms,
+            'samples': columns,
+        }
+
+    def _get_supabase(self):
+        if self._supabase_provider is not None:
+            return self._supabase_provider()
+        from src.db import get_supabase
+        return get_supabase()
+
+    async def _upload(self, burst: _Burst):
+        row = self._build_row(burst)
+        for attempt in range(2):
+            try:
+                supabase = self._get_supabase()
+                await asyncio.to_thread(lambda: supabase.table(self.TABLE_NAME).insert(row).execute())
+                self.metrics.bursts_uploaded += 1
+                logger.info(
+                    f"📈 Burst captured: {burst.trigger} {burst.label or ''} - "
+                    f"{row['sample_count']} samples at {self.rate_hz:.0f} Hz"
+                )
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Burst upload attempt {attempt + 1} failed: {e}")
+        self.metrics.bursts_failed += 1
+        await asyncio.to_thread(self._spill, row)
+
+    def _spill(self, row: Dict[str, Any]):
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S_%f')
+            path = self.spill_dir / f"failed_burst_{stamp}.json"
+            with open(path, 'w') as f:
+                json.dump(row, f)
+            self.metrics.bursts_spilled += 1
+            logger.error(f"Burst upload failed - saved to {path} for manual recovery")
+        except Exception as e:
+            logger.error(f"LOST burst capture ({row['sample_count']} samples): {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return burst, sampling and upload figures."""
+        return asdict(self.metrics)
@@ -0,0 +1,66 @@
+# File: plc/byte_order.py
+"""
+Byte-order helpers for 32-bit values spread over two Modbus registers.
+
+Supported orders (PLC_BYTE_ORDER):
+- 'abcd': big-endian
+- 'badc': big-byte/little-word (default)
+- 'cdab': little-byte/big-word
+- 'dcba': little-endian
+
+Unknown orders fall back to 'badc', matching PLCCommunicator.
+"""
+import struct
+from typing import List, Sequence, Tuple
+
+# (register pack format, register swap, value format prefix) per byte order
+_ORDER_SPECS = {
+    'abcd': ('>HH', False, '>'),
+    'badc': ('>HH', True, '>'),
+    'cdab': ('<HH', False, '<'),
+    'dcba': ('<HH', True, '<'),
+}
+
+
+def _spec(byte_order: str) -> Tuple[str, bool, str]:
+    return _ORDER_SPECS.get(byte_order, _ORDER_SPECS['badc'])
+
+
+def registers_to_bytes(reg1: int, reg2: int, byte_order: str) -> bytes:
+    """Pack two registers into 4 bytes according to the byte order."""
+    pack_fmt, swap, _ = _spec(byte_order)
+    if swap:
+        reg1, reg2 = reg2, reg1
+    return struct.pack(pack_fmt, reg1, reg2)
+
+
+def decode_float(registers: Sequence[int], byte_order: str) -> float:
+    """Decode a 32-bit float from two registers."""
+    _, _, prefix = _spec(byte_order)
+    raw = registers_to_bytes(registers[0], registers[1], byte_order)
+    return struct.unpack(prefix + 'f', raw)[0]
+
+
+def decode_int32(registers: Sequence[int], byte_order: str) -> int:
+    """Decode a signed 32-bit integer from two registers."""
+    _, _, prefix = _spec(byte_order)
+    raw = registers_to_bytes(registers[0], registers[1], byte_order)
+    return struct.unpack(prefix + 'i', raw)[0]
+
+
+def _encode(raw: bytes, byte_order: str) -> List[int]:
+    pack_fmt, swap, _ = _spec(byte_order)
+    high_word, low_word = struct.unpack(pack_fmt, raw)
+    return [low_word, high_word] if swap else [high_word, low_word]
+
+
+def encode_float(value: float, byte_order: str) -> List[int]:
+    """Encode a float into two registers."""
+    _, _, prefix = _spec(byte_order)
+    return _encode(struct.pack(prefix + 'f', value), byte_order)
+
+
+def encode_int32(value: int, byte_order: str) -> List[int]:
+    """Encode a signed 32-bit integer into two registers."""
+    _, _, prefix = _spec(byte_order)
+    return _encode(struct.pack(prefix + 'i', value), byte_order)
@@ -9,7 +9,16 @@ import time
 import asyncio
 import errno
 from src.log_setup import logger
-from src.config import PLC_BYTE_ORDER
+from src.config import (
+    PLC_BYTE_ORDER, PLC_COIL_COST_MS, PLC_MAX_BRIDGE_GAP, PLC_REGISTER_COST_MS, PLC_REQUEST_COST_MS
+)
+from src.plc.range_planner import (
+    MODBUS_MAX_COILS,
+    MODBUS_MAX_REGISTERS,
+    RangeCostModel,
+    plan_coil_ranges,
+    plan_register_ranges,
+)
 
 class PLCCommunicator:
     """
@@ -809,176 +818,51 @@ class PLCCommunicator:
 
         return result.bits[:count]
 
-    def optimize_address_ranges(self, parameter_addresses, max_gap=2, max_range_size=50):
+    def optimize_address_ranges(self, parameter_addresses, cost_model=None,
+                                max_registers=MODBUS_MAX_REGISTERS, max_coils=MODBUS_MAX_COILS,
+                                max_gap=PLC_MAX_BRIDGE_GAP):
         """
-        Optimize parameter addresses into efficient bulk read ranges.
+        Plan parameter addresses into minimal-latency bulk read ranges.
 
         Args:
             parameter_addresses: List of tuples (parameter_id, address, data_type, modbus_type)
-            max_gap: Maximum gap between addresses to still group them
-            max_range_size: Maximum number of registers per range
+            cost_model: RangeCostModel with request/transfer costs (defaults to config)
+            max_registers: Maximum registers per holding register read
+            max_coils: Maximum coils per coil read
+            max_gap: Largest run of unused addresses bridged inside one range
 
         Returns:
-            Dict with 'holding_registers' and 'coils' keys containing optimized ranges
+            Dict with 'holding_registers' and 'coils' keys containing planned ranges
+            and 'predicted_cost_ms' with the plan's total predicted read latency
         """
         if not parameter_addresses:
-            return {'holding_registers': [], 'coils': []}
+            return {'holding_registers': [], 'coils': [], 'predicted_cost_ms': 0.0}
+
+        if cost_model is None:
+            cost_model = RangeCostModel(PLC_REQUEST_COST_MS, PLC_REGISTER_COST_MS, PLC_COIL_COST_MS)
 
         # Separate by Modbus register type
         holding_params = []
         coil_params = []
 
         for param_id, address, data_type, modbus_type in parameter_addresses:
-            if modbus_type in ('coil', 'discrete_input') or data_type == 'binary':
+            modbus_type = (modbus_type or '').lower()
+            # An explicit register type wins over data_type (binary stored in a register)
+            if modbus_type in ('holding', 'input'):
+                holding_params.append((param_id, address, data_type))
+            elif modbus_type in ('coil', 'discrete_input') or data_type == 'binary':
                 coil_params.append((param_id, address, data_type))
             else:
                 holding_params.append((param_id, address, data_type))
 
-        # Optimize holding register ranges
-        holding_ranges = self._optimize_register_ranges(holding_params, max_gap, max_range_size)
+        holding_ranges, holding_cost = plan_register_ranges(holding_params, cost_model, max_registers, max_gap)
+        coil_ranges, coil_cost = plan_coil_ranges(coil_params, cost_model, max_coils, max_gap)
+        predicted_cost_ms = holding_cost + coil_cost
 
-        # Optimize coil ranges
-        coil_ranges = self._optimize_coil_ranges(coil_params, max_gap, max_range_size * 4)  # Coils are smaller
-
-        self.log("INFO", f"Address optimization: {len(parameter_addresses)} parameters -> {len(holding_ranges)} register ranges + {len(coil_ranges)} coil ranges")
+        self.log("INFO", f"Address optimization: {len(parameter_addresses)} parameters -> {len(holding_ranges)} register ranges + {len(coil_ranges)} coil ranges (predicted {predicted_cost_ms:.1f}ms per full read)")
 
         return {
             'holding_registers': holding_ranges,
-            'coils': coil_ranges
-        }
-
-    def _optimize_register_ranges(self, params, max_gap, max_range_size):
-        """Optimize holding register parameters into efficient ranges."""
-        if not params:
-            return []
-
-        # Modbus protocol limit: maximum 125 registers per read
-        MODBUS_MAX_REGISTERS = 125
-        # Use the smaller of user-specified max or Modbus limit
-        effective_max_range = min(max_range_size, MODBUS_MAX_REGISTERS)
-
-        # Sort by address
-        sorted_params = sorted(params, key=lambda x: x[1])
-        ranges = []
-
-        current_range = {
-            'start_address': sorted_params[0][1],
-            'parameters': [sorted_params[0]],
-            'data_types': {sorted_params[0][2]},
-            'end_address': sorted_params[0][1] + (2 if sorted_params[0][2] in ['float', 'int32'] else 1) - 1
-        }
-
-        for param_id, address, data_type in sorted_params[1:]:
-            reg_size = 2 if data_type in ['float', 'int32'] else 1
-            param_end = address + reg_size - 1
-
-            # Check if we can add this parameter to current range
-            gap = address - current_range['end_address'] - 1
-            range_registers = current_range['end_address'] - current_range['start_address'] + 1
-            new_total_registers = param_end - current_range['start_address'] + 1
-
-            if (gap <= max_gap and
-                new_total_registers <= effective_max_range and
-                range_registers + gap + reg_size <= effective_max_range and
-                len(current_range['data_types']) == 1 or data_type in current_range['data_types']):
-
-                # Add to current range
-                current_range['parameters'].append((param_id, address, data_type))
-                current_range['data_types'].add(data_type)
-                current_range['end_address'] = param_end
-            else:
-                # Start new range
-                ranges.append(current_range)
-                current_range = {
-                    'start_address': address,
-                    'parameters': [(param_id, address, data_type)],
-                    'data_types': {data_type},
-                    'end_address': param_end
-                }
-
-        # Add final range
-        if current_range:
-            ranges.append(current_range)
-
-        # Convert to format expected by bulk_read_holding_registers
-        optimized_ranges = []
-        for range_info in ranges:
-            # For mixed data types, use the most common or default to int16
-            data_type = list(range_info['data_types'])[0] if len(range_info['data_types']) == 1 else 'int16'
-
-            total_registers = range_info['end_address'] - range_info['start_address'] + 1
-            
-            # CRITICAL: Enforce Modbus limit - split ranges that exceed 125 registers
-            if total_registers > MODBUS_MAX_REGISTERS:
-                self.log("WARNING", f"Range with {total_registers} registers exceeds Modbus limit ({MODBUS_MAX_REGISTERS}), splitting into individual reads")
-                # Fall back to individual parameter reads
-                for param_id, param_address, param_data_type in range_info['parameters']:
-                    param_size = 2 if param_data_type in ['float', 'int32'] else 1
-                    optimized_ranges.append({
-                        'start_address': param_address,
-                        'count': param_size,
-                        'data_type': param_data_type,
-                        'value_count': 1,
-                        'parameters': [(param_id, param_address, param_data_type)]
-                    })
-            else:
-                value_count = len(range_info['parameters'])
-                optimized_ranges.append({
-                    'start_address': range_info['start_address'],
-                    'count': total_registers,
-                    'data_type': data_type,
-                    'value_count': value_count,
-                    'parameters': range_info['parameters']
-                })
-
-        return optimized_ranges
-
-    def _optimize_coil_ranges(self, params, max_gap, max_range_size):
-        """Optimize coil parameters into efficient ranges."""
-        if not params:
-            return []
-
-        # Sort by address
-        sorted_params = sorted(params, key=lambda x: x[1])
-        ranges = []
-
-        current_range = {
-            'start_address': sorted_params[0][1],
-            'parameters': [sorted_params[0]],
-            'end_address': sorted_params[0][1]
-        }
-
-        for param_id, address, data_type in sorted_params[1:]:
-            # Check if we can add this coil to current range
-            gap = address - current_range['end_address'] - 1
-            range_size = current_range['end_address'] - current_range['start_address'] + 1
-
-            if gap <= max_gap and range_size + gap + 1 <= max_range_size:
-                # Add to current range
-                current_range['parameters'].append((param_id, address, data_type))
-                current_range['end_address'] = address
-            else:
-                # Start new range
-                ranges.append(current_range)
-                current_range = {
-                    'start_address': address,
-                    'parameters': [(param_id, address, data_type)],
-                    'end_address': address
-                }
-
-        # Add final range
-        if current_range:
-            ranges.append(current_range)
-
-        # Convert to format expected by bulk_read_coils
-        optimized_ranges = []
-        for range_info in ranges:
-            count = range_info['end_address'] - range_info['start_address'] + 1
-
-            optimized_ranges.append({
-                'start_address': range_info['start_address'],
-                'count': count,
-                'parameters': range_info['parameters']
-            })
-
-        return optimized_ranges
\ No newline at end of file
+            'coils': coil_ranges,
+            'predicted_cost_ms': predicted_cost_ms,
+        }
\ No newline at end of file
@@ -0,0 +1,203 @@
+# File: plc/concurrency.py
+"""
+Adaptive (AIMD) concurrency limit for parallel PLC range reads.
+
+PLCs differ in how many concurrent Modbus sessions they serve well: some
+handle 8 or more, others start timing out at 3. Instead of a fixed limit,
+this controller adjusts the number of in-flight range reads:
+
+- Additive increase: after every window of successful reads whose p95
+  latency stays within a tolerance of the best p95 seen, allow one more.
+- Additive decrease: if p95 rises beyond the tolerance, step back by one
+  (the extra session queued on the PLC instead of adding throughput).
+- Multiplicative decrease: a timeout or refused/failed connection cuts the
+  limit (halved by default). Failures of requests that started before the
+  last cut are ignored so one overloaded burst only counts once.
+
+Every change is recorded in a bounded history that is exposed through the
+Terminal 1 metrics.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Deque, Dict, List, Optional
+
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+from src.log_setup import logger
+from src.utils.stats import p95
+
+# Exceptions that signal the PLC is overloaded rather than a bad request
+OVERLOAD_EXCEPTIONS = (
+    asyncio.TimeoutError,
+    TimeoutError,
+    ConnectionError,  # includes ConnectionRefusedError / ConnectionResetError
+    ConnectionException,
+    ModbusIOException,
+)
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """Return True if an exception indicates a timeout or refused connection."""
+    return isinstance(exc, OVERLOAD_EXCEPTIONS)
+
+
+@dataclass
+class ConcurrencyMetrics:
+    """Metrics for the adaptive concurrency limiter."""
+    current_limit: int = 0
+    in_flight: int = 0
+    completed: int = 0
+    overload_errors: int = 0
+    increases: int = 0
+    decreases: int = 0
+    last_window_p95_ms: float = 0.0
+    baseline_p95_ms: float = 0.0
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limiter gating concurrent PLC range reads.
+
+    Usage:
+        async with limiter.slot():
+            await client.read_holding_registers(...)
+    """
+
+    def __init__(
+        self,
+        min_limit: int = 1,
+        max_limit: int = 8,
+        initial_limit: int = 2,
+        window_size: int = 20,
+        latency_tolerance: float = 0.25,
+        min_latency_delta_ms: float = 1.0,
+        decrease_factor: float = 0.5,
+        history_size: int = 50,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            min_limit: Lowest concurrency the limiter will go to
+            max_limit: Hard ceiling (the PLC connection pool size)
+            initial_limit: Starting concurrency
+            window_size: Successful reads per p95 evaluation
+            latency_tolerance: Allowed relative p95 rise over the baseline
+                before concurrency is considered to be hurting latency
+            min_latency_delta_ms: p95 rises smaller than this are treated as
+                noise regardless of the relative tolerance
+            decrease_factor: Multiplier applied to the limit on overload
+            history_size: Number of limit changes kept for metrics
+        """
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.limit = min(max(int(initial_limit), self.min_limit), self.max_limit)
+        self.window_size = window_size
+        self.latency_tolerance = latency_tolerance
+        self.min_latency_delta_ms = min_latency_delta_ms
+        self.decrease_factor = decrease_factor
+
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+        self._window: List[float] = []
+        self._baseline_p95_ms: Optional[float] = None
+        self._last_decrease = 0.0
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self.metrics = ConcurrencyMetrics(current_limit=self.limit)
+
+        self._record_change(self.limit, 'initial')
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot for the duration of a PLC request."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+        started = time.monotonic()
+        error: Optional[BaseException] = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            latency_ms = (time.monotonic() - started) * 1000
+            async with self._condition:
+                self._in_flight -= 1
+                if error is None:
+                    self._on_success(latency_ms)
+                elif is_overload_error(error):
+                    self._on_overload(started, error)
+                self._condition.notify_all()
+
+    def _on_success(self, latency_ms: float):
+        self.metrics.completed += 1
+        self._window.append(latency_ms)
+        if len(self._window) < self.window_size:
+            return
+
+        window_p95 = p95(self._window)
+        self._window = []
+        self.metrics.last_window_p95_ms = window_p95
+
+        if self._baseline_p95_ms is None or window_p95 < self._baseline_p95_ms:
+            self._baseline_p95_ms = window_p95
+
+        allowed_p95 = max(
+            self._baseline_p95_ms * (1 + self.latency_tolerance),
+            self._baseline_p95_ms + self.min_latency_delta_ms,
+        )
+        if window_p95 <= allowed_p95:
+            if self.limit < self.max_limit:
+                self._set_limit(self.limit + 1, 'p95 flat', window_p95)
+                self.metrics.increases += 1
+        else:
+            # Let the baseline follow slow drift so it cannot pin the limit low
+            self._baseline_p95_ms += (window_p95 - self._baseline_p95_ms) * 0.1
+            if self.limit > self.min_limit:
+                self._set_limit(self.limit - 1, 'p95 rising', window_p95)
+                self.metrics.decreases += 1
+
+    def _on_overload(self, started: float, error: BaseException):
+        self.metrics.overload_errors += 1
+        if started < self._last_decrease:
+            return  # Already cut for this burst
+        self._last_decrease = time.monotonic()
+        self._window = []
+        new_limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+        if new_limit < self.limit:
+            self._set_limit(new_limit, f'overload: {type(error).__name__}')
+            self.metrics.decreases += 1
+
+    def _set_limit(self, new_limit: int, reason: str, p95_ms: Optional[float] = None):
+        old_limit, self.limit = self.limit, new_limit
+        self.metrics.current_limit = new_limit
+        self._record_change(new_limit, reason, p95_ms)
+        log = logger.warning if new_limit < old_limit and reason.startswith('overload') else logger.info
+        log(f"🔧 PLC read concurrency {old_limit} → {new_limit} ({reason})")
+
+    def _record_change(self, limit: int, reason: str, p95_ms: Optional[float] = None):
+        self.history.append({
+            'timestamp': time.time(),
+            'limit': limit,
+            'reason': reason,
+            'p95_ms': round(p95_ms, 2) if p95_ms is not None else None,
+        })
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return the current limit, counters and limit-change history."""
+        self.metrics.in_flight = self._in_flight
+        self.metrics.baseline_p95_ms = self._baseline_p95_ms or 0.0
+        snapshot = asdict(self.metrics)
+        snapshot['min_limit'] = self.min_limit
+        snapshot['max_limit'] = self.max_limit
+        snapshot['history'] = list(self.history)
+        return snapshot
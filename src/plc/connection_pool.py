@@ -0,0 +1,234 @@
+# File: plc/connection_pool.py
+"""
+Persistent Modbus TCP connection pool for bulk PLC reads.
+
+The bulk-read path used to open a fresh Modbus client for every address
+range on every collection cycle (TCP connect, one read, close). On the
+production line the handshake costs more than the register read itself, so
+this pool keeps a small number of long-lived connections open and lends them
+out to concurrent range reads.
+
+Features:
+- Sized to the PLC's concurrent connection limit (PLC_MAX_CONNECTIONS) minus
+  the communicator's own socket, so together they never exceed it
+- Idle connections are checked for a live transport before being lent out
+- Broken connections are discarded and transparently re-opened
+- Connections are re-created when the communicator's resolved IP changes
+- Optional adaptive limiter (src/plc/concurrency.py) decides how many of the
+  pooled connections may be in use at once
+- Metrics: open connections, reuse count, connect latency
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+from src.log_setup import logger
+
+
+@dataclass
+class ModbusPoolMetrics:
+    """Metrics for Modbus connection pool monitoring."""
+    open_connections: int = 0
+    in_use_connections: int = 0
+    total_connects: int = 0
+    connect_failures: int = 0
+    reuse_count: int = 0
+    discarded_connections: int = 0
+    last_connect_latency_ms: float = 0.0
+    avg_connect_latency_ms: float = 0.0
+    max_connect_latency_ms: float = 0.0
+
+
+class _PooledConnection:
+    """A pooled Modbus client plus the bookkeeping the pool needs."""
+
+    __slots__ = ('client', 'host', 'last_used', 'uses')
+
+    def __init__(self, client: Any, host: str):
+        self.client = client
+        self.host = host
+        self.last_used = time.monotonic()
+        self.uses = 0
+
+
+class ModbusConnectionPool:
+    """
+    Pool of long-lived Modbus TCP connections.
+
+    Usage:
+        async with pool.connection() as client:
+            result = await client.read_holding_registers(...)
+
+    Any exception raised inside the ``async with`` block marks the connection
+    as broken: it is closed and a new one is opened on the next checkout.
+    """
+
+    def __init__(
+        self,
+        host_provider: Callable[[], str],
+        port: int,
+        max_connections: int = 4,
+        timeout: float = 2.0,
+        client_factory: Optional[Callable[..., Any]] = None,
+        limiter: Optional[Any] = None,
+    ):
+        """
+        Initialize the connection pool.
+
+        Args:
+            host_provider: Callable returning the current PLC IP/hostname
+                (re-evaluated on every checkout so DHCP changes are followed)
+            port: Modbus TCP port
+            max_connections: Maximum number of simultaneously open connections
+            timeout: Per-operation timeout for pooled clients in seconds
+            client_factory: Optional factory ``(host, port=, timeout=)`` used to
+                build clients (defaults to pymodbus AsyncModbusTcpClient)
+            limiter: Optional AdaptiveConcurrencyLimiter gating checkouts below
+                max_connections
+        """
+        self._host_provider = host_provider
+        self.port = port
+        self.max_connections = max(1, int(max_connections))
+        self.timeout = timeout
+        self._client_factory = client_factory
+        self.limiter = limiter
+
+        self._idle: List[_PooledConnection] = []
+        self._semaphore = asyncio.Semaphore(self.max_connections)
+        self._open_count = 0
+        self._in_use = 0
+        self._closed = False
+
+        self.metrics = ModbusPoolMetrics()
+        self._connect_latency_total_ms = 0.0
+
+    def _create_client(self, host: str) -> Any:
+        if self._client_factory is not None:
+            return self._client_factory(host, port=self.port, timeout=self.timeout)
+        from pymodbus.client import AsyncModbusTcpClient
+        # Reconnection is managed by the pool, not pymodbus' background reconnect
+        return AsyncModbusTcpClient(
+            host,
+            port=self.port,
+            timeout=self.timeout,
+            retries=0,
+            reconnect_delay=0
+        )
+
+    async def _open_connection(self, host: str) -> Optional[_PooledConnection]:
+        """Open a new connection, recording connect latency."""
+        client = self._create_client(host)
+        start = time.perf_counter()
+        try:
+            connected = await asyncio.wait_for(client.connect(), timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"⚠️ Modbus pool connect to {host}:{self.port} raised: {e}")
+            connected = False
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        if not connected:
+            self.metrics.connect_failures += 1
+            try:
+                client.close()
+            except Exception:
+                pass
+            return None
+
+        self.metrics.total_connects += 1
+        self.metrics.last_connect_latency_ms = latency_ms
+        self.metrics.max_connect_latency_ms = max(self.metrics.max_connect_latency_ms, latency_ms)
+        self._connect_latency_total_ms += latency_ms
+        self.metrics.avg_connect_latency_ms = self._connect_latency_total_ms / self.metrics.total_connects
+
+        self._open_count += 1
+        logger.debug(f"Modbus pool opened connection to {host}:{self.port} in {latency_ms:.1f}ms")
+        return _PooledConnection(client, host)
+
+    async def _discard(self, conn: _PooledConnection):
+        """Close a pooled connection and drop it from the open count."""
+        self._open_count = max(0, self._open_count - 1)
+        self.metrics.discarded_connections += 1
+        try:
+            conn.client.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled Modbus client: {e}")
+
+    def _is_healthy(self, conn: _PooledConnection, host: str) -> bool:
+        """Cheap health check for an idle connection (no PLC round-trip)."""
+        if conn.host != host:
+            return False
+        try:
+            return bool(conn.client.connected)
+        except Exception:
+            return False
+
+    async def _checkout(self) -> Optional[_PooledConnection]:
+        host = self._host_provider()
+        while self._idle:
+            conn = self._idle.pop()  # LIFO keeps the warmest connection busy
+            if self._is_healthy(conn, host):
+                self.metrics.reuse_count += 1
+                return conn
+            await self._discard(conn)
+        return await self._open_connection(host)
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Borrow a connection from the pool.
+
+        Yields:
+            A connected Modbus client
+
+        Raises:
+            ConnectionError: If no connection to the PLC could be established
+            RuntimeError: If the pool has been closed
+        """
+        if self._closed:
+            raise RuntimeError("Modbus connection pool is closed")
+
+        slot = self.limiter.slot() if self.limiter is not None else nullcontext()
+        async with slot, self._semaphore:
+            conn = await self._checkout()
+            if conn is None:
+                raise ConnectionError(f"Could not connect to PLC at {self._host_provider()}:{self.port}")
+
+            self._in_use += 1
+            broken = False
+            try:
+                yield conn.client
+            except BaseException:
+                broken = True
+                raise
+            finally:
+                self._in_use -= 1
+                conn.uses += 1
+                conn.last_used = time.monotonic()
+                if broken or self._closed:
+                    await self._discard(conn)
+                else:
+                    self._idle.append(conn)
+
+    def invalidate(self):
+        """Mark all idle connections stale so they are re-opened on next use."""
+        for conn in self._idle:
+            conn.host = ''
+
+    async def close(self):
+        """Close all idle connections and refuse further checkouts."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn)
+        logger.info("Modbus connection pool closed")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of pool metrics."""
+        self.metrics.open_connections = self._open_count
+        self.metrics.in_use_connections = self._in_use
+        snapshot = asdict(self.metrics)
+        snapshot['max_connections'] = self.max_connections
+        snapshot['idle_connections'] = len(self._idle)
+        return snapshot
@@ -8,12 +8,17 @@ with a cleaner per-terminal approach.
 Each terminal creates its own PLC instance and sets it here.
 Step executors access it via get_plc().
 """
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Optional
 from src.plc.interface import PLCInterface
 
 # Module-level PLC instance (set by each terminal)
 _current_plc: Optional[PLCInterface] = None
 
+# PLC override for the current context only (recipe dry runs use a no-op PLC)
+_plc_override: ContextVar = ContextVar('plc_override', default=None)
+
 
 def set_plc(plc: PLCInterface):
     """Set the current PLC instance for this terminal."""
@@ -23,9 +28,22 @@ def set_plc(plc: PLCInterface):
 
 def get_plc() -> Optional[PLCInterface]:
     """Get the current PLC instance."""
+    override = _plc_override.get()
+    if override is not None:
+        return override
     return _current_plc
 
 
+@contextmanager
+def plc_override(plc):
+    """Make get_plc() return another PLC inside the block (current context only)."""
+    token = _plc_override.set(plc)
+    try:
+        yield plc
+    finally:
+        _plc_override.reset(token)
+
+
 def clear_plc():
     """Clear the current PLC instance."""
     global _current_plc
@@ -0,0 +1,266 @@
+# File: plc/decode_plan.py
+"""
+Compiled decode plans for bulk Modbus reads.
+
+Instead of looping over (param_id, address, data_type) tuples after every
+bulk read and re-packing register pairs with struct.pack per parameter, each
+range gets a plan compiled once at startup:
+
+- Register ranges: the raw registers are packed into one byte buffer and all
+  fields are decoded with a single precompiled ``struct.Struct.unpack_from``
+  (pad bytes skip gaps). Overlapping fields go into additional layers.
+- Coil ranges: a precomputed ``operator.itemgetter`` over the bit list.
+- Optional NumPy path: for large maps a structured dtype decodes the buffer
+  with one ``numpy.frombuffer`` call (used only when NumPy is installed).
+
+Byte-order note: with two 16-bit registers (r1, r2), 'abcd' and 'dcba' both
+decode as (r1 << 16) | r2, while 'badc', 'cdab' and unknown orders decode as
+(r2 << 16) | r1 (see src/plc/byte_order.py). So a whole range can be packed
+once with a single endianness and every 32-bit field unpacked in place.
+"""
+import struct
+from operator import itemgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.log_setup import logger
+
+try:  # Optional acceleration for large register maps
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+# Field formats and register widths per data type
+_FIELD_FORMATS = {
+    'float': ('f', 2),
+    'int32': ('i', 2),
+    'int16': ('H', 1),
+    'binary': ('H', 1),  # binary stored in a register: non-zero is ON
+}
+
+# Use the NumPy path automatically once a range carries this many fields
+NUMPY_FIELD_THRESHOLD = 64
+
+
+def _endianness(byte_order: str) -> str:
+    return '>' if byte_order in ('abcd', 'dcba') else '<'
+
+
+class _Layer:
+    """One non-overlapping set of fields decoded by a single Struct."""
+
+    __slots__ = ('struct', 'ids', 'binary_indices')
+
+    def __init__(self, fmt: str, ids: List[Tuple[str, ...]], binary_indices: List[int]):
+        self.struct = struct.Struct(fmt)
+        self.ids = ids
+        self.binary_indices = binary_indices
+
+
+class RegisterDecodePlan:
+    """
+    Precompiled decoder for one holding-register bulk-read range.
+
+    Args:
+        start_address: First register address of the range
+        count: Number of registers read
+        parameters: List of (param_id, address, data_type)
+        byte_order: PLC byte order ('abcd', 'badc', 'cdab', 'dcba')
+        use_numpy: Force (True) or disable (False) the NumPy path; None picks
+            it automatically for large maps when NumPy is available
+    """
+
+    def __init__(
+        self,
+        start_address: int,
+        count: int,
+        parameters: Sequence[Tuple[str, int, str]],
+        byte_order: str,
+        use_numpy: Optional[bool] = None,
+    ):
+        self.start_address = start_address
+        self.count = count
+        self.byte_order = byte_order
+        self.unsupported: List[Tuple[str, str]] = []
+        endian = _endianness(byte_order)
+        self._buffer_struct = struct.Struct(f'{endian}{count}H')
+
+        # Group parameters sharing the same (address, data_type) so each field
+        # is decoded once and fanned out to every parameter ID.
+        fields: Dict[Tuple[int, str], List[str]] = {}
+        for param_id, address, data_type in parameters:
+            if data_type not in _FIELD_FORMATS:
+                self.unsupported.append((param_id, data_type))
+                continue
+            fields.setdefault((address - start_address, data_type), []).append(param_id)
+
+        # Assign fields to layers so no layer contains overlapping fields
+        layers: List[Dict] = []
+        self._field_ends: List[Tuple[str, int]] = []
+        for (offset, data_type), ids in sorted(fields.items()):
+            width = _FIELD_FORMATS[data_type][1]
+            self._field_ends.extend((param_id, offset + width) for param_id in ids)
+            for layer in layers:
+                if offset >= layer['cursor']:
+                    break
+            else:
+                layer = {'cursor': 0, 'fmt': endian, 'ids': [], 'binary': []}
+                layers.append(layer)
+            gap = offset - layer['cursor']
+            if gap:
+                layer['fmt'] += f'{gap * 2}x'
+            layer['fmt'] += _FIELD_FORMATS[data_type][0]
+            if data_type == 'binary':
+                layer['binary'].append(len(layer['ids']))
+            layer['ids'].append(tuple(ids))
+            layer['cursor'] = offset + width
+
+        self._layers = [
+            _Layer(layer['fmt'], layer['ids'], layer['binary'])
+            for layer in layers
+        ]
+        self.field_count = sum(len(layer.ids) for layer in self._layers)
+        self._single_ids = all(len(ids) == 1 for layer in self._layers for ids in layer.ids)
+        self._flat_ids = [ids[0] for layer in self._layers for ids in layer.ids] if self._single_ids else None
+
+        self._numpy_dtype = None
+        if use_numpy is None:
+            use_numpy = self.field_count >= NUMPY_FIELD_THRESHOLD
+        if use_numpy and np is not None:
+            self._numpy_dtype = self._compile_numpy_dtype(fields, endian)
+
+    def _compile_numpy_dtype(self, fields, endian):
+        np_formats = {'float': 'f4', 'int32': 'i4', 'int16': 'u2', 'binary': 'u2'}
+        names, formats, offsets = [], [], []
+        self._numpy_ids = []
+        self._numpy_binary = []
+        for index, ((offset, data_type), ids) in enumerate(sorted(fields.items())):
+            names.append(f'f{index}')
+            formats.append(endian + np_formats[data_type])
+            offsets.append(offset * 2)
+            self._numpy_ids.append(tuple(ids))
+            if data_type == 'binary':
+                self._numpy_binary.append(index)
+        return np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': self.count * 2})
+
+    @property
+    def uses_numpy(self) -> bool:
+        return self._numpy_dtype is not None
+
+    def decode(self, registers: Sequence[int]) -> Dict[str, float]:
+        """
+        Decode all parameters of the range from raw registers.
+
+        Args:
+            registers: Register values returned by the bulk read
+
+        Returns:
+            Dict[str, float]: Parameter ID to value mapping
+        """
+        if len(registers) < self.count:
+            return self._decode_partial(registers)
+
+        buffer = self._buffer_struct.pack(*registers[:self.count])
+
+        if self._numpy_dtype is not None:
+            values = np.frombuffer(buffer, dtype=self._numpy_dtype, count=1)[0].tolist()
+            return self._fan_out(self._numpy_ids, values, self._numpy_binary)
+
+        if len(self._layers) == 1 and self._flat_ids is not None:
+            layer = self._layers[0]
+            values = layer.struct.unpack_from(buffer)
+            result = dict(zip(self._flat_ids, map(float, values)))
+            for index in layer.binary_indices:
+                result[self._flat_ids[index]] = 1.0 if values[index] else 0.0
+            return result
+
+        result = {}
+        for layer in self._layers:
+            result.update(self._fan_out(layer.ids, layer.struct.unpack_from(buffer), layer.binary_indices))
+        return result
+
+    @staticmethod
+    def _fan_out(ids_list, values, binary_indices) -> Dict[str, float]:
+        result = {}
+        binary = set(binary_indices)
+        for index, (ids, value) in enumerate(zip(ids_list, values)):
+            value = (1.0 if value else 0.0) if index in binary else float(value)
+            for param_id in ids:
+                result[param_id] = value
+        return result
+
+    def _decode_partial(self, registers: Sequence[int]) -> Dict[str, float]:
+        """Slow path for short responses: decode only fields that fit."""
+        available = len(registers)
+        decoded = self.decode(list(registers) + [0] * (self.count - available))
+        return {
+            param_id: decoded[param_id]
+            for param_id, end_register in self._field_ends
+            if end_register <= available
+        }
+
+
+class CoilDecodePlan:
+    """
+    Precompiled decoder for one coil bulk-read range.
+
+    Args:
+        start_address: First coil address of the range
+        count: Number of coils read
+        parameters: List of (param_id, address, data_type)
+    """
+
+    def __init__(self, start_address: int, count: int, parameters: Sequence[Tuple[str, int, str]]):
+        self.start_address = start_address
+        self.count = count
+        self._ids = [param_id for param_id, _, _ in parameters]
+        self._offsets = [address - start_address for _, address, _ in parameters]
+        self._max_offset = max(self._offsets) if self._offsets else -1
+        self._getter = itemgetter(*self._offsets) if len(self._offsets) > 1 else None
+
+    def decode(self, bits: Sequence[bool]) -> Dict[str, float]:
+        """
+        Decode all coil parameters of the range.
+
+        Args:
+            bits: Coil states returned by the bulk read
+
+        Returns:
+            Dict[str, float]: Parameter ID to value mapping (1.0 ON, 0.0 OFF)
+        """
+        if not self._ids:
+            return {}
+        if self._max_offset >= len(bits):
+            return {
+                param_id: (1.0 if bits[offset] else 0.0)
+                for param_id, offset in zip(self._ids, self._offsets)
+                if offset < len(bits)
+            }
+        if self._getter is None:
+            return {self._ids[0]: 1.0 if bits[self._offsets[0]] else 0.0}
+        return {param_id: (1.0 if bit else 0.0) for param_id, bit in zip(self._ids, self._getter(bits))}
+
+
+def compile_decode_plans(ranges: Dict[str, List[Dict]], byte_order: str) -> None:
+    """
+    Attach a compiled 'decode_plan' to every range of an optimized range map.
+
+    Args:
+        ranges: Output of optimize_address_ranges ({'holding_registers': [...], 'coils': [...]})
+        byte_order: PLC byte order used for 32-bit values
+    """
+    for range_info in ranges.get('holding_registers', []):
+        plan = RegisterDecodePlan(
+            range_info['start_address'],
+            range_info['count'],
+            range_info['parameters'],
+            byte_order,
+        )
+        for param_id, data_type in plan.unsupported:
+            logger.warning(f"Unsupported data type {data_type} for parameter {param_id} - excluded from decode plan")
+        range_info['decode_plan'] = plan
+    for range_info in ranges.get('coils', []):
+        range_info['decode_plan'] = CoilDecodePlan(
+            range_info['start_address'],
+            range_info['count'],
+            range_info['parameters'],
+        )
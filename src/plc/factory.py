@@ -38,13 +38,21 @@ class PLCFactory:
             port = config.get('port', 502)  # Default Modbus port
             hostname = config.get('hostname')  # Optional hostname for DHCP
             auto_discover = config.get('auto_discover', False)  # Enable auto-discovery
+            max_connections = config.get('max_connections')  # PLC connection limit for the pool
             
             logger.info(f"PLC connection config - IP: {ip_address}, Port: {port}, "
-                       f"Hostname: {hostname}, Auto-discover: {auto_discover}")
+                       f"Hostname: {hostname}, Auto-discover: {auto_discover}, "
+                       f"Max connections: {max_connections}")
             
             # Lazy import to avoid requiring pymodbus in simulation-only environments
             from src.plc.real_plc import RealPLC  # noqa: WPS433
-            plc = RealPLC(ip_address, port, hostname=hostname, auto_discover=auto_discover)
+            plc = RealPLC(
+                ip_address,
+                port,
+                hostname=hostname,
+                auto_discover=auto_discover,
+                max_connections=max_connections,
+            )
             
         else:
             raise ValueError(f"Invalid PLC type: {plc_type}. Must be 'simulation' or 'real'")
@@ -73,6 +73,34 @@ class PLCInterface(ABC):
         """
         pass
     
+    async def read_parameters(self, parameter_ids: List[str]) -> Dict[str, float]:
+        """
+        Read a subset of parameter values from the PLC.
+        
+        The default implementation reads each parameter individually;
+        implementations with bulk reads plan ranges over the subset.
+        
+        Args:
+            parameter_ids: IDs of the parameters to read
+            
+        Returns:
+            Dict[str, float]: Dictionary of parameter IDs to values
+        """
+        result = {}
+        for parameter_id in parameter_ids:
+            result[parameter_id] = await self.read_parameter(parameter_id)
+        return result
+    
+    def get_valve_mapping(self) -> Optional[Dict[int, Dict[str, Any]]]:
+        """
+        Valve mappings loaded by this PLC, for validating valve numbers up front.
+        
+        Returns:
+            Optional[Dict[int, Dict[str, Any]]]: Valve number -> mapping (e.g.
+            {'address': ...}), or None if this PLC has no valve map
+        """
+        return None
+    
     @abstractmethod
     async def read_setpoint(self, parameter_id: str) -> Optional[float]:
         """
@@ -106,7 +134,8 @@ class PLCInterface(ABC):
         pass
     
     @abstractmethod
-    async def control_valve(self, valve_number: int, state: bool, duration_ms: Optional[int] = None) -> bool:
+    async def control_valve(self, valve_number: int, state: bool, duration_ms: Optional[int] = None,
+                            auto_close: bool = True) -> bool:
         """
         Control a valve state.
         
@@ -114,6 +143,8 @@ class PLCInterface(ABC):
             valve_number: The valve number to control
             state: True to open, False to close
             duration_ms: Optional duration to keep valve open in milliseconds
+            auto_close: If False, duration_ms only describes the pulse and the
+                caller closes the valve itself (deadline-driven step timeline)
             
         Returns:
             bool: True if successful, False otherwise
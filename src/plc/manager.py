@@ -9,6 +9,8 @@ USAGE PATTERN (CORRECT):
     from src.plc.manager import plc_manager  # Import the global singleton instance
     await plc_manager.initialize()
     value = await plc_manager.read_parameter(param_id)
+    # Accept the latest bulk-read value if it is at most 200ms old
+    value = await plc_manager.read_parameter(param_id, max_age_ms=200)
 
 ANTI-PATTERN (INCORRECT):
     from src.plc.manager import PLCManager  # DO NOT import the class
@@ -25,13 +27,15 @@ TERMINAL USAGE:
 - Terminal 3 (Parameter Service): Uses plc_manager for parameter control
 All terminals share the SAME connection instance via the singleton pattern.
 """
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional
 from src.log_setup import get_plc_logger
 
 logger = get_plc_logger()
 from src.config import PLC_TYPE, PLC_CONFIG
 from src.plc.interface import PLCInterface
 from src.plc.factory import PLCFactory
+from src.plc.snapshot_cache import ParameterSnapshotCache
 
 class PLCManager:
     """
@@ -53,12 +57,15 @@ class PLCManager:
         if cls._instance is None:
             cls._instance = super(PLCManager, cls).__new__(cls)
             cls._instance._plc = None
+            cls._instance._snapshot = ParameterSnapshotCache()
         return cls._instance
     
     def __init__(self):
         # Only initialize if not already initialized
         if not hasattr(self, '_plc'):
             self._plc = None
+        if not hasattr(self, '_snapshot'):
+            self._snapshot = ParameterSnapshotCache()
     
     @property
     def plc(self) -> Optional[PLCInterface]:
@@ -107,6 +114,7 @@ class PLCManager:
         Returns:
             bool: True if disconnected successfully, False otherwise
         """
+        self._snapshot.invalidate()
         if self._plc is not None:
             try:
                 success = await self._plc.disconnect()
@@ -127,13 +135,41 @@ class PLCManager:
         """
         return self._plc is not None and getattr(self._plc, 'connected', False)
         
-    async def read_parameter(self, parameter_id: str, skip_noise: bool = False) -> float:
+    def get_performance_metrics(self) -> Dict[str, Any]:
+        """
+        Get PLC transport performance metrics (connection pool, etc.).
+        
+        Returns:
+            Dict[str, Any]: Metrics from the active PLC plus the manager's
+            read snapshot cache ('snapshot_cache')
+        """
+        metrics: Dict[str, Any] = {}
+        get_metrics = getattr(self._plc, 'get_performance_metrics', None) if self._plc is not None else None
+        if get_metrics is not None:
+            try:
+                metrics = dict(get_metrics())
+            except Exception as e:
+                logger.debug(f"Failed to collect PLC performance metrics: {e}")
+        metrics['snapshot_cache'] = self._snapshot.get_metrics()
+        return metrics
+        
+    async def read_parameter(
+        self,
+        parameter_id: str,
+        skip_noise: bool = False,
+        max_age_ms: Optional[float] = None,
+    ) -> float:
         """
         Read a parameter value from the PLC.
 
         Args:
             parameter_id: The ID of the parameter to read
             skip_noise: If True, skip noise generation in simulation (confirmation reads)
+            max_age_ms: Accept the value from the latest bulk/wire read if it is at
+                most this old; None (default) always reads from the PLC.
+                Concurrent wire reads of the same parameter share one request.
+                Only reads made by this process are cached (see snapshot_cache);
+                never pass it for a read-back that verifies a write.
 
         Returns:
             float: The current value of the parameter
@@ -141,7 +177,13 @@ class PLCManager:
         if self._plc is None:
             raise RuntimeError("Not connected to PLC")
 
-        value = await self._plc.read_parameter(parameter_id, skip_noise=skip_noise)
+        plc = self._plc
+        value = await self._snapshot.read_through(
+            parameter_id,
+            max_age_ms,
+            lambda: plc.read_parameter(parameter_id, skip_noise=skip_noise),
+            flight_variant=skip_noise
+        )
         logger.debug(f"PLC read parameter {parameter_id}: {value}")
         return value
         
@@ -160,6 +202,8 @@ class PLCManager:
             raise RuntimeError("Not connected to PLC")
 
         logger.info(f"PLC write parameter {parameter_id}: {value}")
+        # Any cached value is stale once the write is on its way
+        self._snapshot.invalidate(parameter_id)
         success = await self._plc.write_parameter(parameter_id, value)
         if success:
             logger.info(f"✅ PLC write successful: {parameter_id} = {value}")
@@ -177,10 +221,31 @@ class PLCManager:
         if self._plc is None:
             raise RuntimeError("Not connected to PLC")
 
+        read_at = time.monotonic()
         parameter_values = await self._plc.read_all_parameters()
+        self._snapshot.update_many(parameter_values, read_at)
         logger.debug(f"PLC read all parameters: {len(parameter_values)} values retrieved")
         return parameter_values
     
+    async def read_parameters(self, parameter_ids: List[str]) -> Dict[str, float]:
+        """
+        Read a subset of parameter values from the PLC in bulk.
+
+        Args:
+            parameter_ids: IDs of the parameters to read
+
+        Returns:
+            Dict[str, float]: Dictionary of parameter IDs to values
+        """
+        if self._plc is None:
+            raise RuntimeError("Not connected to PLC")
+
+        read_at = time.monotonic()
+        parameter_values = await self._plc.read_parameters(parameter_ids)
+        self._snapshot.update_many(parameter_values, read_at)
+        logger.debug(f"PLC read parameters: {len(parameter_values)}/{len(parameter_ids)} values retrieved")
+        return parameter_values
+    
     async def read_setpoint(self, parameter_id: str) -> Optional[float]:
         """
         Read the setpoint value for a parameter from the PLC.
@@ -215,7 +280,8 @@ class PLCManager:
         logger.debug(f"PLC read all setpoints: {len(setpoint_values)} values retrieved")
         return setpoint_values
         
-    async def control_valve(self, valve_number: int, state: bool, duration_ms: Optional[int] = None) -> bool:
+    async def control_valve(self, valve_number: int, state: bool, duration_ms: Optional[int] = None,
+                            auto_close: bool = True) -> bool:
         """
         Control a valve state.
         
@@ -223,13 +289,16 @@ class PLCManager:
             valve_number: The valve number to control
             state: True to open, False to close
             duration_ms: Optional duration to keep valve open in milliseconds
+            auto_close: If False, the caller closes the valve after duration_ms
             
         Returns:
             bool: True if successful, False otherwise
         """
         if self._plc is None:
             raise RuntimeError("Not connected to PLC")
-        return await self._plc.control_valve(valve_number, state, duration_ms)
+        # Valve and purge parameters are not known here, so drop the snapshot
+        self._snapshot.invalidate()
+        return await self._plc.control_valve(valve_number, state, duration_ms, auto_close=auto_close)
         
     async def execute_purge(self, duration_ms: int) -> bool:
         """
@@ -243,6 +312,7 @@ class PLCManager:
         """
         if self._plc is None:
             raise RuntimeError("Not connected to PLC")
+        self._snapshot.invalidate()
         return await self._plc.execute_purge(duration_ms)
 
 # ============================================================================
@@ -0,0 +1,339 @@
+# File: plc/pipelined_transport.py
+"""
+Pipelined Modbus TCP transport (opt-in via PLC_PIPELINE_DEPTH).
+
+Modbus TCP carries a transaction ID in every MBAP header, and many PLCs
+accept several outstanding requests on one socket. PipelinedModbusClient
+keeps up to `depth` requests in flight on a single connection and matches
+responses to requests by transaction ID, so parallel range reads no longer
+need one socket each.
+
+It implements the subset of the pymodbus async client API used by
+AsyncPLCCommunicator and RealPLC (connect/close/connected,
+read_holding_registers, read_coils, write_register, write_registers,
+write_coil), so it is a drop-in client.
+
+Safety net: if the device answers out of spec (unknown transaction ID,
+mismatched function code or unit, malformed MBAP header) or drops a request
+while answering later ones, the client falls back to serial mode (one
+request in flight) for the rest of its life and reports it through the
+on_fallback callback so the communicator keeps serial mode across reconnects.
+"""
+import asyncio
+import struct
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+from src.log_setup import logger
+
+_MBAP = struct.Struct('>HHHB')  # transaction id, protocol id, length, unit id
+
+READ_COILS = 0x01
+READ_HOLDING_REGISTERS = 0x03
+WRITE_SINGLE_COIL = 0x05
+WRITE_SINGLE_REGISTER = 0x06
+WRITE_MULTIPLE_REGISTERS = 0x10
+
+# Transaction IDs that timed out are remembered so a late answer is dropped
+# quietly instead of being treated as a protocol violation
+_LATE_TID_MEMORY = 256
+
+
+class ModbusResponse:
+    """Minimal response object compatible with pymodbus response checks."""
+
+    __slots__ = ('function_code', 'registers', 'bits', 'exception_code')
+
+    def __init__(self, function_code: int, registers: Optional[List[int]] = None,
+                 bits: Optional[List[bool]] = None, exception_code: Optional[int] = None):
+        self.function_code = function_code
+        self.registers = registers or []
+        self.bits = bits or []
+        self.exception_code = exception_code
+
+    def isError(self) -> bool:  # noqa: N802 - pymodbus naming
+        return self.exception_code is not None
+
+    def __str__(self) -> str:
+        if self.exception_code is not None:
+            return f"Modbus exception response (function {self.function_code:#04x}, code {self.exception_code})"
+        return f"Modbus response (function {self.function_code:#04x})"
+
+
+@dataclass
+class PipelineMetrics:
+    """Metrics for the pipelined Modbus transport."""
+    mode: str = 'pipelined'
+    depth: int = 0
+    requests: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    timeouts: int = 0
+    late_responses: int = 0
+    protocol_violations: int = 0
+    fallbacks: int = 0
+    avg_latency_ms: float = 0.0
+
+
+class _Pending:
+    __slots__ = ('future', 'function_code', 'unit_id', 'seq')
+
+    def __init__(self, future: asyncio.Future, function_code: int, unit_id: int, seq: int):
+        self.future = future
+        self.function_code = function_code
+        self.unit_id = unit_id
+        self.seq = seq
+
+
+class PipelinedModbusClient:
+    """
+    Modbus TCP client keeping several transactions in flight on one socket.
+
+    Usage:
+        client = PipelinedModbusClient('192.168.1.11', port=502, depth=4)
+        await client.connect()
+        results = await asyncio.gather(*[
+            client.read_holding_registers(addr, count=10, slave=1) for addr in starts
+        ])
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 502,
+        timeout: float = 2.0,
+        depth: int = 4,
+        on_fallback: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Initialize the pipelined client.
+
+        Args:
+            host: PLC IP address or hostname
+            port: Modbus TCP port
+            timeout: Per-request timeout in seconds
+            depth: Maximum outstanding requests on the socket (1 = serial)
+            on_fallback: Called with the reason when the client drops to serial mode
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.depth = max(1, int(depth))
+        self._on_fallback = on_fallback
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, _Pending] = {}
+        self._timed_out: List[int] = []
+        self._slots = asyncio.Condition()
+        self._in_flight = 0
+        self._next_tid = 0
+        self._send_seq = 0
+        self._max_completed_seq = 0
+
+        self.metrics = PipelineMetrics(mode='pipelined' if self.depth > 1 else 'serial', depth=self.depth)
+        self._latency_total_ms = 0.0
+        self._completed = 0
+
+    # ------------------------------------------------------------------
+    # Connection management (pymodbus-compatible)
+    # ------------------------------------------------------------------
+
+    async def connect(self) -> bool:
+        """Open the TCP connection and start the response reader."""
+        self.close()
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), timeout=self.timeout
+            )
+        except Exception as e:
+            logger.debug(f"Pipelined Modbus connect to {self.host}:{self.port} failed: {e}")
+            self._reader = self._writer = None
+            return False
+        self._reader_task = asyncio.create_task(self._read_responses())
+        return True
+
+    @property
+    def connected(self) -> bool:
+        return (
+            self._writer is not None
+            and not self._writer.is_closing()
+            and self._reader_task is not None
+            and not self._reader_task.done()
+        )
+
+    @property
+    def pipelining(self) -> bool:
+        """True while more than one request may be in flight."""
+        return self.depth > 1
+
+    def close(self):
+        """Close the socket and fail all outstanding requests."""
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+            self._writer = None
+        self._reader = None
+        self._fail_pending(ConnectionException(f"Connection to {self.host}:{self.port} closed"))
+
+    def _fail_pending(self, error: Exception):
+        pending, self._pending = self._pending, {}
+        for entry in pending.values():
+            if not entry.future.done():
+                entry.future.set_exception(error)
+
+    # ------------------------------------------------------------------
+    # Pipelining
+    # ------------------------------------------------------------------
+
+    def _fall_back(self, reason: str):
+        self.metrics.protocol_violations += 1
+        if self.depth == 1:
+            return
+        self.depth = 1
+        self.metrics.mode = 'serial'
+        self.metrics.depth = 1
+        self.metrics.fallbacks += 1
+        logger.warning(f"⚠️ PLC answered out of spec for pipelined Modbus ({reason}); falling back to serial requests")
+        if self._on_fallback is not None:
+            self._on_fallback(reason)
+
+    def _allocate_tid(self) -> int:
+        for _ in range(0xFFFF):
+            self._next_tid = self._next_tid % 0xFFFF + 1
+            if self._next_tid not in self._pending:
+                return self._next_tid
+        raise ModbusIOException("No free Modbus transaction IDs")
+
+    async def _read_responses(self):
+        """Reader loop: route each MBAP frame to the request with its transaction ID."""
+        try:
+            while True:
+                header = await self._reader.readexactly(_MBAP.size)
+                tid, protocol_id, length, unit_id = _MBAP.unpack(header)
+                if protocol_id != 0 or length < 2 or length > 254:
+                    # Framing can no longer be trusted: drop the connection
+                    self._fall_back(f"malformed MBAP header (protocol {protocol_id}, length {length})")
+                    raise ModbusIOException("Malformed MBAP header from PLC")
+                pdu = await self._reader.readexactly(length - 1)
+                self._route(tid, unit_id, pdu)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Pipelined Modbus reader stopped: {e}")
+            self._fail_pending(e if isinstance(e, (ModbusIOException, ConnectionException))
+                               else ConnectionException(str(e)))
+            if self._writer is not None:
+                self._writer.close()
+
+    def _route(self, tid: int, unit_id: int, pdu: bytes):
+        entry = self._pending.pop(tid, None)
+        if entry is None:
+            if tid in self._timed_out:
+                self.metrics.late_responses += 1
+            else:
+                self._fall_back(f"unknown transaction id {tid}")
+            return
+
+        function_code = pdu[0]
+        if function_code & 0x7F != entry.function_code or unit_id != entry.unit_id:
+            self._fall_back(f"mismatched response for transaction {tid}")
+            entry.future.set_exception(ModbusIOException(f"Mismatched response for transaction {tid}"))
+            return
+
+        self._max_completed_seq = max(self._max_completed_seq, entry.seq)
+        if not entry.future.done():
+            entry.future.set_result(self._decode(pdu))
+
+    @staticmethod
+    def _decode(pdu: bytes) -> ModbusResponse:
+        function_code = pdu[0]
+        if function_code & 0x80:
+            return ModbusResponse(function_code & 0x7F, exception_code=pdu[1] if len(pdu) > 1 else 0)
+        if function_code == READ_HOLDING_REGISTERS:
+            byte_count = pdu[1]
+            return ModbusResponse(function_code, registers=list(struct.unpack(f'>{byte_count // 2}H', pdu[2:2 + byte_count])))
+        if function_code == READ_COILS:
+            byte_count = pdu[1]
+            bits = [bool(byte >> bit & 1) for byte in pdu[2:2 + byte_count] for bit in range(8)]
+            return ModbusResponse(function_code, bits=bits)
+        return ModbusResponse(function_code)
+
+    async def _execute(self, unit_id: int, pdu: bytes) -> ModbusResponse:
+        if not self.connected:
+            raise ConnectionException(f"Not connected[{self.host}:{self.port}]")
+
+        async with self._slots:
+            await self._slots.wait_for(lambda: self._in_flight < self.depth)
+            self._in_flight += 1
+            self.metrics.max_in_flight = max(self.metrics.max_in_flight, self._in_flight)
+
+        tid = self._allocate_tid()
+        self._send_seq += 1
+        seq = self._send_seq
+        future = asyncio.get_running_loop().create_future()
+        self._pending[tid] = _Pending(future, pdu[0], unit_id, seq)
+        self.metrics.requests += 1
+        start = time.perf_counter()
+        try:
+            self._writer.write(_MBAP.pack(tid, 0, len(pdu) + 1, unit_id) + pdu)
+            await self._writer.drain()
+            response = await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._timed_out.append(tid)
+            del self._timed_out[:-_LATE_TID_MEMORY]
+            self.metrics.timeouts += 1
+            if self._max_completed_seq > seq:
+                # Later requests were answered but this one was dropped
+                self._fall_back(f"request {tid} dropped while later requests were answered")
+            raise ModbusIOException(f"Request timed out after {self.timeout}s (transaction {tid})")
+        except asyncio.CancelledError:
+            # The caller gave up (outer wait_for, task cancel); a late answer is not a desync
+            self._timed_out.append(tid)
+            del self._timed_out[:-_LATE_TID_MEMORY]
+            raise
+        finally:
+            self._pending.pop(tid, None)
+            async with self._slots:
+                self._in_flight -= 1
+                self._slots.notify_all()
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self._completed += 1
+        self._latency_total_ms += latency_ms
+        self.metrics.avg_latency_ms = self._latency_total_ms / self._completed
+        return response
+
+    # ------------------------------------------------------------------
+    # Modbus functions (pymodbus-compatible signatures)
+    # ------------------------------------------------------------------
+
+    async def read_holding_registers(self, address: int, count: int = 1, slave: int = 1) -> ModbusResponse:
+        return await self._execute(slave, struct.pack('>BHH', READ_HOLDING_REGISTERS, address, count))
+
+    async def read_coils(self, address: int, count: int = 1, slave: int = 1) -> ModbusResponse:
+        return await self._execute(slave, struct.pack('>BHH', READ_COILS, address, count))
+
+    async def write_coil(self, address: int, value: bool, slave: int = 1) -> ModbusResponse:
+        return await self._execute(slave, struct.pack('>BHH', WRITE_SINGLE_COIL, address, 0xFF00 if value else 0))
+
+    async def write_register(self, address: int, value: int, slave: int = 1) -> ModbusResponse:
+        return await self._execute(slave, struct.pack('>BHH', WRITE_SINGLE_REGISTER, address, value))
+
+    async def write_registers(self, address: int, values: List[int], slave: int = 1) -> ModbusResponse:
+        pdu = struct.pack(f'>BHHB{len(values)}H', WRITE_MULTIPLE_REGISTERS, address, len(values), len(values) * 2, *values)
+        return await self._execute(slave, pdu)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of transport metrics."""
+        self.metrics.in_flight = self._in_flight
+        return asdict(self.metrics)
@@ -0,0 +1,274 @@
+# File: plc/range_planner.py
+"""
+Latency-aware bulk read range planner.
+
+Replaces the greedy max_gap/max_range_size grouping with an exact
+minimum-cost partition. Reading a range costs one request round-trip plus a
+per-register (or per-coil) transfer cost for every address it spans, gaps
+included:
+
+    cost(range) = request_cost_ms + unit_cost_ms * span
+
+Fields sorted by address are split into contiguous groups by dynamic
+programming so the summed cost is minimal while every group stays within the
+Modbus limits (125 registers per read holding request, 2000 coils per read
+coils request). Mixed data types may share a range; the compiled decode plan
+(src/plc/decode_plan.py) decodes each field by its own type.
+
+The costs can be configured (PLC_REQUEST_COST_MS, PLC_REGISTER_COST_MS,
+PLC_COIL_COST_MS) or fitted from measured bulk-read latencies with
+RangeCostModel.fit().
+
+Bridged gaps are read too, and a PLC may not map every address in a gap. A
+group never bridges more than max_gap unused addresses (PLC_MAX_BRIDGE_GAP),
+and a range the PLC rejects with an exception response can be re-read in the
+pieces returned by split_range().
+"""
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Modbus protocol limits per request
+MODBUS_MAX_REGISTERS = 125
+MODBUS_MAX_COILS = 2000
+
+# Modbus exception code for a request touching an unmapped address
+MODBUS_ILLEGAL_DATA_ADDRESS = 2
+
+# Data types that occupy two registers
+_WIDE_TYPES = ('float', 'int32')
+
+
+def register_width(data_type: str) -> int:
+    """Number of 16-bit registers a field of this data type occupies."""
+    return 2 if data_type in _WIDE_TYPES else 1
+
+
+@dataclass
+class RangeCostModel:
+    """Linear latency model for one bulk read request."""
+    request_cost_ms: float = 5.0
+    register_cost_ms: float = 0.02
+    coil_cost_ms: float = 0.002
+
+    def range_cost(self, span: int, coils: bool = False) -> float:
+        """Predicted latency of a single read spanning `span` addresses."""
+        unit = self.coil_cost_ms if coils else self.register_cost_ms
+        return self.request_cost_ms + unit * span
+
+    @classmethod
+    def fit(cls, samples: Iterable[Tuple[int, float]], fallback: 'RangeCostModel',
+            min_samples: int = 20) -> 'RangeCostModel':
+        """
+        Fit request/register costs from measured holding-register reads.
+
+        Args:
+            samples: (register_count, latency_ms) pairs of completed bulk reads
+            fallback: Model returned when the samples cannot support a fit
+            min_samples: Minimum number of samples required
+
+        Returns:
+            RangeCostModel: Least-squares fit (coil cost scaled like the
+            fallback), or the fallback model
+        """
+        samples = list(samples)
+        if len(samples) < min_samples:
+            return fallback
+
+        n = len(samples)
+        mean_x = sum(x for x, _ in samples) / n
+        mean_y = sum(y for _, y in samples) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in samples)
+        if var_x == 0:
+            # All reads had the same size: only the total is observable
+            return fallback
+
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in samples) / var_x
+        slope = max(slope, 0.0)
+        intercept = max(mean_y - slope * mean_x, 0.0)
+
+        coil_ratio = (
+            fallback.coil_cost_ms / fallback.register_cost_ms
+            if fallback.register_cost_ms > 0 else 0.0
+        )
+        return cls(
+            request_cost_ms=intercept,
+            register_cost_ms=slope,
+            coil_cost_ms=slope * coil_ratio,
+        )
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+def _gaps(fields: Sequence[Tuple[int, int]]) -> List[int]:
+    """Unused addresses between field i and field i+1 of address-sorted fields."""
+    gaps, covered = [], 0
+    for (_, end), (next_start, _) in zip(fields, fields[1:]):
+        covered = max(covered, end)
+        gaps.append(max(0, next_start - covered))
+    return gaps
+
+
+def _partition(
+    fields: Sequence[Tuple[int, int]],
+    max_span: int,
+    cost_fn,
+    max_gap: Optional[int] = None,
+) -> Tuple[List[Tuple[int, int]], float]:
+    """
+    Minimum-cost split of address-sorted fields into contiguous groups.
+
+    Args:
+        fields: (start, end_exclusive) per field, sorted by start
+        max_span: Largest allowed end - start of a group
+        cost_fn: Cost of a group given its span
+        max_gap: Largest run of unused addresses a group may bridge (None = any)
+
+    Returns:
+        Tuple of ([(first_index, last_index_exclusive), ...], total_cost)
+    """
+    n = len(fields)
+    best = [0.0] + [float('inf')] * n
+    split = [0] * (n + 1)
+    gaps = _gaps(fields)
+
+    for j in range(1, n + 1):
+        group_end = 0
+        # Grow the last group backwards from field j-1; its span only increases
+        for i in range(j - 1, -1, -1):
+            if max_gap is not None and i < j - 1 and gaps[i] > max_gap:
+                break
+            group_end = max(group_end, fields[i][1])
+            span = group_end - fields[i][0]
+            if span > max_span:
+                break
+            cost = best[i] + cost_fn(span)
+            if cost < best[j]:
+                best[j] = cost
+                split[j] = i
+
+    groups = []
+    j = n
+    while j > 0:
+        groups.append((split[j], j))
+        j = split[j]
+    groups.reverse()
+    return groups, best[n]
+
+
+def plan_register_ranges(
+    params: Sequence[Tuple[str, int, str]],
+    cost_model: RangeCostModel,
+    max_registers: int = MODBUS_MAX_REGISTERS,
+    max_gap: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Plan holding-register bulk reads with minimal predicted latency.
+
+    Args:
+        params: (param_id, address, data_type) per parameter
+        cost_model: Request/transfer cost model
+        max_registers: Maximum registers per read (capped at the Modbus limit)
+        max_gap: Largest run of unused registers a range may bridge (None = any)
+
+    Returns:
+        Tuple of (ranges, predicted_cost_ms). Each range has start_address,
+        count, data_type, value_count and parameters.
+    """
+    if not params:
+        return [], 0.0
+
+    max_registers = min(max_registers, MODBUS_MAX_REGISTERS)
+    sorted_params = sorted(params, key=lambda p: (p[1], -register_width(p[2])))
+    fields = [(address, address + register_width(data_type)) for _, address, data_type in sorted_params]
+
+    groups, total_cost = _partition(
+        fields, max_registers, lambda span: cost_model.range_cost(span), max_gap
+    )
+    return [_register_range(sorted_params[first:last]) for first, last in groups], total_cost
+
+
+def _register_range(members: Sequence[Tuple[str, int, str]]) -> Dict[str, Any]:
+    start = min(address for _, address, _ in members)
+    end = max(address + register_width(data_type) for _, address, data_type in members)
+    data_types = {data_type for _, _, data_type in members}
+    return {
+        'start_address': start,
+        'count': end - start,
+        # Mixed ranges are decoded per field; 'int16' keeps the legacy label
+        'data_type': data_types.pop() if len(data_types) == 1 else 'int16',
+        'value_count': len(members),
+        'parameters': list(members),
+    }
+
+
+def plan_coil_ranges(
+    params: Sequence[Tuple[str, int, str]],
+    cost_model: RangeCostModel,
+    max_coils: int = MODBUS_MAX_COILS,
+    max_gap: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Plan coil bulk reads with minimal predicted latency.
+
+    Args:
+        params: (param_id, address, data_type) per parameter
+        cost_model: Request/transfer cost model
+        max_coils: Maximum coils per read (capped at the Modbus limit)
+        max_gap: Largest run of unused coils a range may bridge (None = any)
+
+    Returns:
+        Tuple of (ranges, predicted_cost_ms). Each range has start_address,
+        count and parameters.
+    """
+    if not params:
+        return [], 0.0
+
+    max_coils = min(max_coils, MODBUS_MAX_COILS)
+    sorted_params = sorted(params, key=lambda p: p[1])
+    fields = [(address, address + 1) for _, address, _ in sorted_params]
+
+    groups, total_cost = _partition(
+        fields, max_coils, lambda span: cost_model.range_cost(span, coils=True), max_gap
+    )
+    return [_coil_range(sorted_params[first:last]) for first, last in groups], total_cost
+
+
+def _coil_range(members: Sequence[Tuple[str, int, str]]) -> Dict[str, Any]:
+    start = min(address for _, address, _ in members)
+    end = max(address for _, address, _ in members) + 1
+    return {'start_address': start, 'count': end - start, 'parameters': list(members)}
+
+
+def split_range(range_info: Dict[str, Any], coils: bool = False) -> List[Dict[str, Any]]:
+    """
+    Split a planned range the PLC rejected into smaller ranges.
+
+    The range is cut at every bridged gap, so the pieces only cover addresses
+    that belong to a parameter. A range without gaps is split into one range
+    per parameter.
+
+    Args:
+        range_info: Range from plan_register_ranges / plan_coil_ranges
+        coils: True for a coil range
+
+    Returns:
+        List of ranges (empty if the range holds a single parameter)
+    """
+    members = sorted(range_info['parameters'], key=lambda p: (p[1], -register_width(p[2])))
+    if len(members) < 2:
+        return []
+    width = (lambda data_type: 1) if coils else register_width
+    fields = [(address, address + width(data_type)) for _, address, data_type in members]
+
+    pieces, first = [], 0
+    for index, gap in enumerate(_gaps(fields), start=1):
+        if gap > 0:
+            pieces.append(members[first:index])
+            first = index
+    pieces.append(members[first:])
+    if len(pieces) == 1:
+        pieces = [[member] for member in members]
+
+    build = _coil_range if coils else _register_range
+    return [build(piece) for piece in pieces]
@@ -7,12 +7,41 @@ import errno
 import re
 import struct
 import time
+from collections import deque
+from contextlib import asynccontextmanager
 from typing import Dict, Optional, List, Tuple, Any
 from src.log_setup import logger
 from src.plc.interface import PLCInterface
-from src.plc.communicator import PLCCommunicator
+from src.plc.async_communicator import AsyncPLCCommunicator
+from src.plc.concurrency import AdaptiveConcurrencyLimiter
+from src.plc.connection_pool import ModbusConnectionPool
+from src.plc.decode_plan import compile_decode_plans
+from src.plc.range_planner import MODBUS_ILLEGAL_DATA_ADDRESS, RangeCostModel, split_range
+from src.plc.scheduler import (
+    PLCRequestScheduler,
+    RequestPriority,
+    current_request_priority,
+    scheduled,
+)
+from src.plc.write_behind import ParameterWriteBehindBuffer
+from src.plc.burst_capture import BurstCapture
 from src.db import get_supabase
-from src.config import is_essentials_filter_enabled
+from src.config import (
+    is_essentials_filter_enabled,
+    PLC_MAX_CONNECTIONS,
+    PLC_INITIAL_CONCURRENCY,
+    PLC_PRIORITY_AGING_MS,
+    PLC_PIPELINE_DEPTH,
+    PARAMETER_WRITE_BEHIND_INTERVAL,
+    PLC_REQUEST_COST_MS,
+    PLC_REGISTER_COST_MS,
+    PLC_COIL_COST_MS,
+    BURST_CAPTURE_PARAMETERS,
+    BURST_CAPTURE_RATE_HZ,
+    BURST_CAPTURE_PRE_ROLL_MS,
+    BURST_CAPTURE_POST_ROLL_MS,
+    BURST_CAPTURE_BUFFER_SECONDS,
+)
 
 class RealPLC(PLCInterface):
     """Real PLC implementation for production use."""
@@ -35,6 +64,7 @@ class RealPLC(PLCInterface):
         port: int,
         hostname: str = None,
         auto_discover: bool = False,
+        max_connections: Optional[int] = None,
     ):
         """
         Initialize with PLC connection details.
@@ -44,6 +74,9 @@ class RealPLC(PLCInterface):
             port: Port number for PLC communication
             hostname: Optional hostname for dynamic resolution (e.g., 'plc.local')
             auto_discover: Enable automatic network discovery for DHCP environments
+            max_connections: PLC concurrent connection limit, shared by the
+                communicator socket and the bulk-read connection pool (defaults
+                to PLC_MAX_CONNECTIONS)
         """
         self.ip_address = ip_address
         self.hostname = hostname
@@ -51,14 +84,69 @@ class RealPLC(PLCInterface):
         self.auto_discover = auto_discover
         self.connected = False
         
-        # Create communicator with dynamic discovery capabilities
-        self.communicator = PLCCommunicator(
+        # Create async communicator with dynamic discovery capabilities.
+        # All Modbus I/O is awaited so a slow PLC reply never blocks the loop.
+        self.communicator = AsyncPLCCommunicator(
             plc_ip=ip_address,
             port=port,
             hostname=hostname,
             auto_discover=auto_discover,
             connection_timeout=10,
-            retries=3
+            retries=3,
+            pipeline_depth=PLC_PIPELINE_DEPTH
+        )
+        
+        # The communicator keeps its own socket open (writes, single reads), so
+        # the bulk-read pool gets one connection less than the PLC accepts
+        max_connections = max_connections or PLC_MAX_CONNECTIONS
+        pool_size = max(1, max_connections - 1)
+        if max_connections < 2:
+            logger.warning(
+                f"⚠️ PLC connection limit {max_connections} leaves no room for a read pool next to "
+                f"the communicator socket; using 1 pooled connection"
+            )
+        
+        # Adaptive limit on concurrent range reads: converges to the fastest
+        # level this PLC sustains, up to the pool size
+        self.concurrency_limiter = AdaptiveConcurrencyLimiter(
+            max_limit=pool_size,
+            initial_limit=PLC_INITIAL_CONCURRENCY
+        )
+        
+        # Priority gate for every PLC transaction: safety/valve writes, then
+        # operator writes, then setpoint polling, then background reads.
+        # Writes keep a reserved slot beyond the read concurrency limit.
+        self.scheduler = PLCRequestScheduler(
+            capacity_provider=lambda: self.concurrency_limiter.limit,
+            reserved_write_slots=1,
+            aging_interval=PLC_PRIORITY_AGING_MS / 1000
+        )
+        self.communicator.scheduler = self.scheduler
+        
+        # Persistent connection pool for parallel bulk reads.
+        # Follows the communicator's resolved IP so DHCP changes are picked up.
+        self.connection_pool = ModbusConnectionPool(
+            host_provider=lambda: self.communicator._current_ip or self.ip_address,
+            port=port,
+            max_connections=pool_size,
+            timeout=2.0,  # 2 second timeout for faster failure detection
+            limiter=self.concurrency_limiter
+        )
+        
+        # Coalescing write-behind buffer for component_parameters
+        # current_value/set_value (one batched RPC per flush interval)
+        self.value_buffer = ParameterWriteBehindBuffer(
+            flush_interval=PARAMETER_WRITE_BEHIND_INTERVAL
+        )
+        
+        # High-rate sampling of BURST_CAPTURE_PARAMETERS around valve pulses and purges
+        self.burst_capture = BurstCapture(
+            self.read_parameters,
+            BURST_CAPTURE_PARAMETERS,
+            rate_hz=BURST_CAPTURE_RATE_HZ,
+            pre_roll_ms=BURST_CAPTURE_PRE_ROLL_MS,
+            post_roll_ms=BURST_CAPTURE_POST_ROLL_MS,
+            buffer_seconds=BURST_CAPTURE_BUFFER_SECONDS,
         )
         
         # Cache for parameter metadata
@@ -66,6 +154,8 @@ class RealPLC(PLCInterface):
         
         # Cache for valve mappings
         self._valve_cache = {}
+        # Valves opened for a pulse the caller closes itself (auto_close=False)
+        self._caller_timed_valves = set()
         
         # Purge operation parameters
         self._purge_address = None
@@ -81,6 +171,17 @@ class RealPLC(PLCInterface):
         # Bulk read optimization cache
         self._bulk_read_ranges = None
         self._use_bulk_reads = True  # Enable bulk reads by default
+        # Range plans for parameter subsets (multi-rate polling), keyed by parameter set
+        self._subset_read_ranges: Dict[frozenset, Dict] = {}
+        
+        # Bulk setpoint read plan (ranges keyed on write_modbus_address/type)
+        self._bulk_setpoint_ranges = None
+        self._setpoint_plan_stats = {}
+        
+        # Measured (register_count, latency_ms) of bulk register reads, used to
+        # fit the range planner's cost model on the next (re)initialization
+        self._range_latency_samples = deque(maxlen=256)
+        self._range_plan_stats = {}
     
     async def initialize(self) -> bool:
         """Initialize connection to the real PLC."""
@@ -88,7 +189,7 @@ class RealPLC(PLCInterface):
         
         try:
             # Connect to the PLC using the communicator
-            success = self.communicator.connect()
+            success = await self.communicator.connect()
             
             if success:
                 self.connected = True
@@ -110,6 +211,9 @@ class RealPLC(PLCInterface):
                 if self._use_bulk_reads:
                     await self._initialize_bulk_read_optimization()
                 
+                # Start batched DB flushes for parameter value updates
+                self.value_buffer.start()
+                
                 return True
             else:
                 logger.error("Failed to connect to PLC")
@@ -120,6 +224,10 @@ class RealPLC(PLCInterface):
             self.connected = False
             return False
     
+    def get_valve_mapping(self) -> Optional[Dict[int, Dict[str, Any]]]:
+        """Valve number -> valve mapping loaded at initialization."""
+        return self._valve_cache
+
     async def disconnect(self) -> bool:
         """Disconnect from the real PLC."""
         logger.info("Disconnecting from PLC")
@@ -128,7 +236,10 @@ class RealPLC(PLCInterface):
             return True
             
         try:
-            success = self.communicator.disconnect()
+            await self.value_buffer.stop()
+            await self.burst_capture.stop()
+            await self.connection_pool.close()
+            success = await self.communicator.disconnect()
             if success:
                 self.connected = False
                 logger.info("Successfully disconnected from PLC")
@@ -138,6 +249,24 @@ class RealPLC(PLCInterface):
             logger.error(f"Error disconnecting from PLC: {str(e)}", exc_info=True)
             return False
     
+    def get_performance_metrics(self) -> Dict[str, Any]:
+        """
+        Get PLC transport performance metrics.
+        
+        Returns:
+            Dict[str, Any]: Metrics grouped by subsystem (e.g. 'connection_pool')
+        """
+        return {
+            'connection_pool': self.connection_pool.get_metrics(),
+            'concurrency': self.concurrency_limiter.get_metrics(),
+            'scheduler': self.scheduler.get_metrics(),
+            'pipeline': self.communicator.get_pipeline_metrics(),
+            'range_plan': dict(self._range_plan_stats),
+            'setpoint_plan': dict(self._setpoint_plan_stats),
+            'value_write_behind': self.value_buffer.get_metrics(),
+            'burst_capture': self.burst_capture.get_metrics(),
+        }
+    
     async def _load_parameter_metadata(self):
         """
         Load parameter metadata from the database.
@@ -383,6 +512,7 @@ class RealPLC(PLCInterface):
             logger.error(f"Error loading purge parameters: {str(e)}", exc_info=True)
             # TODO: Decide on safe fallback behavior for purge if addresses are missing
     
+    @scheduled(RequestPriority.BACKGROUND_READ)
     async def read_parameter(self, parameter_id: str, skip_noise: bool = False) -> float:
         """
         Read a parameter value from the PLC.
@@ -422,12 +552,11 @@ class RealPLC(PLCInterface):
             # TODO: Decide if we should raise instead of returning DB value
             return param_meta.get('current_value', 0.0)
 
-        # Set parameter info for enhanced logging
+        # Labels the communicator's log lines for this read
         param_info = {
             'name': param_meta.get('name', 'unknown'),
             'component_name': param_meta.get('component_name', 'unknown')
         }
-        self.communicator.set_current_parameter_info(param_info)
 
         # Read the parameter using explicit read_modbus_type when available.
         # Fallback: infer from data_type (binary -> coils, else holding regs).
@@ -437,53 +566,53 @@ class RealPLC(PLCInterface):
         try:
             if read_type in ('coil', 'discrete_input'):
                 # For now, read discrete inputs via coils until supported
-                result = self.communicator.read_coils(address, count=1)
+                result = await self.communicator.read_coils(address, count=1, param_info=param_info)
                 if result is not None:
                     value = 1.0 if result[0] else 0.0
             elif read_type in ('holding', 'input'):
                 # For now, treat input registers like holding until supported
                 if data_type == 'float':
-                    value = self.communicator.read_float(address)
+                    value = await self.communicator.read_float(address, param_info=param_info)
                 elif data_type == 'int32':
-                    value = self.communicator.read_integer_32bit(address)
+                    value = await self.communicator.read_integer_32bit(address, param_info=param_info)
                 elif data_type == 'int16':
-                    result = self.communicator.client.read_holding_registers(
-                        address, count=1, slave=self.communicator.slave_id
+                    registers = await self.communicator.read_holding_registers(
+                        address, count=1, param_info=param_info
                     )
-                    if not result.isError():
-                        value = result.registers[0]
+                    if registers is not None:
+                        value = registers[0]
                     else:
                         logger.error(
-                            f"Failed to read holding register: {result}"
+                            f"Failed to read holding register at {address}"
                         )
                 elif data_type == 'binary':
                     # Edge case: binary stored in a register
-                    result = self.communicator.client.read_holding_registers(
-                        address, count=1, slave=self.communicator.slave_id
+                    registers = await self.communicator.read_holding_registers(
+                        address, count=1, param_info=param_info
                     )
-                    if not result.isError():
-                        value = 1.0 if result.registers[0] else 0.0
+                    if registers is not None:
+                        value = 1.0 if registers[0] else 0.0
                 else:
                     raise ValueError(f"Unsupported data type: {data_type}")
             else:
                 # Fallback to data_type-based behavior
                 if data_type == 'binary':
-                    result = self.communicator.read_coils(address, count=1)
+                    result = await self.communicator.read_coils(address, count=1, param_info=param_info)
                     if result is not None:
                         value = 1.0 if result[0] else 0.0
                 elif data_type == 'float':
-                    value = self.communicator.read_float(address)
+                    value = await self.communicator.read_float(address, param_info=param_info)
                 elif data_type == 'int32':
-                    value = self.communicator.read_integer_32bit(address)
+                    value = await self.communicator.read_integer_32bit(address, param_info=param_info)
                 elif data_type == 'int16':
-                    result = self.communicator.client.read_holding_registers(
-                        address, count=1, slave=self.communicator.slave_id
+                    registers = await self.communicator.read_holding_registers(
+                        address, count=1, param_info=param_info
                     )
-                    if not result.isError():
-                        value = result.registers[0]
+                    if registers is not None:
+                        value = registers[0]
                     else:
                         logger.error(
-                            f"Failed to read holding register: {result}"
+                            f"Failed to read holding register at {address}"
                         )
                 else:
                     raise ValueError(f"Unsupported data type: {data_type}")
@@ -536,44 +665,17 @@ class RealPLC(PLCInterface):
                 f"Error reading parameter {parameter_id} ({param_meta.get('name')}): "
                 f"{str(e)}"
             )
-        finally:
-            # Clear parameter info regardless of success/failure
-            self.communicator.clear_current_parameter_info()
 
         if value is None:
             logger.warning(f"Failed to read value for parameter {parameter_id}. Returning None.")
             return None
 
-        # Update database with current value (in background task)
-        asyncio.create_task(self._update_parameter_value(parameter_id, value))
+        # Queue current value for the next batched DB flush (latest value wins)
+        self.value_buffer.update(parameter_id, current_value=value)
 
         return float(value)
     
-    async def _update_parameter_value(self, parameter_id: str, value: float):
-        """Update the current value of a parameter in the database."""
-        try:
-            supabase = get_supabase()
-            
-            # Get parameter details from cache to log more info
-            param_meta = self._parameter_cache.get(parameter_id, {})
-            # Use the pre-truncated component name from the cache
-            component_name = param_meta.get('short_component_name', '')
-            param_name = param_meta.get('name', '')
-                
-            # Log parameter update with truncated names
-            logger.debug(
-                f"Updating current value of parameter: {param_name} ({component_name}) "
-                f"with value: {value}"
-            )
-            
-            supabase.table('component_parameters').update({
-                'current_value': value,
-                'updated_at': 'now()'
-            }).eq('id', parameter_id).execute()
-            
-        except Exception as e:
-            logger.error(f"Error updating parameter value in database: {str(e)}")
-    
+    @scheduled(RequestPriority.OPERATOR_WRITE)
     async def write_parameter(self, parameter_id: str, value: float) -> bool:
         """
         Write a parameter value to the PLC.
@@ -660,43 +762,39 @@ class RealPLC(PLCInterface):
             # Fallback: infer from data_type (binary -> coil, else holding regs).
             # TODO: Add communicator methods for input/discrete inputs (read-only types).
             if write_type == 'coil':
-                success = self.communicator.write_coil(address, value > 0)
+                success = await self.communicator.write_coil(address, value > 0)
             elif write_type == 'holding':
                 if data_type == 'float':
-                    success = self.communicator.write_float(address, value)
+                    success = await self.communicator.write_float(address, value)
                 elif data_type == 'int32':
-                    success = self.communicator.write_integer_32bit(
+                    success = await self.communicator.write_integer_32bit(
                         address, int(value)
                     )
                 elif data_type == 'int16':
-                    result = self.communicator.client.write_register(
-                        address, int(value), slave=self.communicator.slave_id
+                    success = await self.communicator.write_register(
+                        address, int(value)
                     )
-                    success = not result.isError()
                 elif data_type == 'binary':
                     # Edge case: binary stored in register (treat non-zero as 1)
-                    result = self.communicator.client.write_register(
-                        address, 1 if value > 0 else 0,
-                        slave=self.communicator.slave_id
+                    success = await self.communicator.write_register(
+                        address, 1 if value > 0 else 0
                     )
-                    success = not result.isError()
                 else:
                     raise ValueError(f"Unsupported data type: {data_type}")
             else:
                 # Fallback to data_type-based behavior
                 if data_type == 'binary':
-                    success = self.communicator.write_coil(address, value > 0)
+                    success = await self.communicator.write_coil(address, value > 0)
                 elif data_type == 'float':
-                    success = self.communicator.write_float(address, value)
+                    success = await self.communicator.write_float(address, value)
                 elif data_type == 'int32':
-                    success = self.communicator.write_integer_32bit(
+                    success = await self.communicator.write_integer_32bit(
                         address, int(value)
                     )
                 elif data_type == 'int16':
-                    result = self.communicator.client.write_register(
-                        address, int(value), slave=self.communicator.slave_id
+                    success = await self.communicator.write_register(
+                        address, int(value)
                     )
-                    success = not result.isError()
                 else:
                     raise ValueError(f"Unsupported data type: {data_type}")
         except Exception as e:
@@ -707,33 +805,12 @@ class RealPLC(PLCInterface):
             success = False
         
         if success:
-            # Update database with new set value (in background task)
-            asyncio.create_task(self._update_parameter_set_value(parameter_id, original_value))
+            # Queue new set value for the next batched DB flush
+            self.value_buffer.update(parameter_id, set_value=original_value)
             
         return success
     
-    async def _update_parameter_set_value(self, parameter_id: str, value: float):
-        """Update the set value of a parameter in the database."""
-        try:
-            supabase = get_supabase()
-            
-            # Get parameter details from cache to log more info
-            param_meta = self._parameter_cache.get(parameter_id, {})
-            # Use the pre-truncated component name from the cache
-            component_name = param_meta.get('short_component_name', '')
-            param_name = param_meta.get('name', '')
-                
-            # Log parameter update with truncated names
-            logger.debug(f"Updating parameter: {param_name} ({component_name}) with value: {value}")
-            
-            supabase.table('component_parameters').update({
-                'set_value': value,
-                'updated_at': 'now()'
-            }).eq('id', parameter_id).execute()
-            
-        except Exception as e:
-            logger.error(f"Error updating parameter set value in database: {str(e)}")
-    
+    @scheduled(RequestPriority.BACKGROUND_READ)
     async def read_all_parameters(self) -> Dict[str, float]:
         """
         Read all parameter values from the PLC.
@@ -783,6 +860,36 @@ class RealPLC(PLCInterface):
         
         return result
     
+    @scheduled(RequestPriority.BACKGROUND_READ)
+    async def read_parameters(self, parameter_ids: List[str]) -> Dict[str, float]:
+        """
+        Read a subset of parameters with bulk reads planned over that subset only.
+        
+        Args:
+            parameter_ids: IDs of the parameters to read
+        
+        Returns:
+            Dict[str, float]: Dictionary of parameter IDs to values
+        """
+        if not self.connected:
+            raise RuntimeError("Not connected to PLC")
+        
+        if self._use_bulk_reads and self._bulk_read_ranges:
+            try:
+                return await self._read_planned_ranges(self._read_ranges_for(parameter_ids))
+            except Exception as e:
+                logger.warning(f"Subset bulk read failed, falling back to individual reads: {e}", exc_info=True)
+        
+        result = {}
+        for parameter_id in parameter_ids:
+            try:
+                value = await self.read_parameter(parameter_id)
+                if value is not None:
+                    result[parameter_id] = value
+            except Exception as e:
+                logger.error(f"Error reading parameter {parameter_id}: {str(e)}")
+        return result
+    
     async def _initialize_bulk_read_optimization(self):
         """
         Initialize bulk read optimization by analyzing parameter addresses.
@@ -794,34 +901,28 @@ class RealPLC(PLCInterface):
             logger.info("Initializing bulk read optimization...")
             
             # Collect all parameter addresses for optimization
-            parameter_addresses = []
-            
-            for param_id, param_meta in self._parameter_cache.items():
-                read_addr = param_meta.get('read_modbus_address')
-                if read_addr is None:
-                    continue
-                
-                data_type = param_meta.get('data_type', 'float')
-                read_modbus_type = param_meta.get('read_modbus_type', '')
-                
-                parameter_addresses.append((
-                    param_id,
-                    read_addr,
-                    data_type,
-                    read_modbus_type
-                ))
+            parameter_addresses = self._parameter_read_addresses(self._parameter_cache)
+            self._subset_read_ranges = {}
             
             if not parameter_addresses:
                 logger.warning("No parameters with read addresses found for bulk optimization")
                 self._use_bulk_reads = False
                 return
             
-            # Optimize address ranges using communicator's built-in optimizer
+            # Plan minimal-latency ranges (measured cost model when available)
+            cost_model = self._range_cost_model()
             self._bulk_read_ranges = self.communicator.optimize_address_ranges(
                 parameter_addresses,
-                max_gap=10,  # Group parameters within 10 addresses
-                max_range_size=50  # Up to 50 registers per bulk read
+                cost_model=cost_model
             )
+            self._range_plan_stats = {
+                'cost_model': cost_model.to_dict(),
+                'latency_samples': len(self._range_latency_samples),
+                'predicted_cost_ms': self._bulk_read_ranges.get('predicted_cost_ms', 0.0),
+            }
+            
+            # Compile per-range decode plans once (single unpack per range)
+            compile_decode_plans(self._bulk_read_ranges, self.communicator.byte_order)
             
             # Log optimization results
             holding_count = len(self._bulk_read_ranges.get('holding_registers', []))
@@ -839,6 +940,126 @@ class RealPLC(PLCInterface):
         except Exception as e:
             logger.error(f"Failed to initialize bulk read optimization: {e}", exc_info=True)
             self._use_bulk_reads = False
+            return
+        
+        self._initialize_bulk_setpoint_optimization()
+    
+    def _parameter_read_addresses(self, parameter_ids) -> List[Tuple[str, int, str, str]]:
+        """(parameter_id, read address, data_type, read_modbus_type) for the range planner."""
+        parameter_addresses = []
+        for param_id in parameter_ids:
+            param_meta = self._parameter_cache.get(param_id)
+            if not param_meta:
+                continue
+            read_addr = param_meta.get('read_modbus_address')
+            if read_addr is None:
+                continue
+            
+            parameter_addresses.append((
+                param_id,
+                read_addr,
+                param_meta.get('data_type', 'float'),
+                param_meta.get('read_modbus_type', '')
+            ))
+        return parameter_addresses
+    
+    def _read_ranges_for(self, parameter_ids: List[str]) -> Dict:
+        """
+        Bulk read ranges covering only the given parameters.
+        
+        Planned once per parameter set with the same planner and cost model as
+        the full plan, so polling a fast sampling class never re-reads the
+        registers of slower classes.
+        """
+        key = frozenset(parameter_ids)
+        ranges = self._subset_read_ranges.get(key)
+        if ranges is None:
+            ranges = self.communicator.optimize_address_ranges(
+                self._parameter_read_addresses(sorted(key)),
+                cost_model=self._range_cost_model()
+            )
+            compile_decode_plans(ranges, self.communicator.byte_order)
+            self._subset_read_ranges[key] = ranges
+            logger.info(
+                f"📊 Planned subset bulk read: {len(key)} parameters → "
+                f"{len(ranges.get('holding_registers', []))} register ranges + "
+                f"{len(ranges.get('coils', []))} coil ranges"
+            )
+        return ranges
+    
+    def _range_cost_model(self) -> RangeCostModel:
+        """
+        Cost model for the bulk read range planner.
+        
+        Fitted from measured bulk register read latencies once enough samples
+        exist; otherwise the configured request/register/coil costs.
+        """
+        configured = RangeCostModel(PLC_REQUEST_COST_MS, PLC_REGISTER_COST_MS, PLC_COIL_COST_MS)
+        return RangeCostModel.fit(self._range_latency_samples, fallback=configured)
+    
+    def _initialize_bulk_setpoint_optimization(self):
+        """
+        Plan bulk setpoint reads over write addresses.
+        
+        Uses the same range planner as parameter reads, keyed on
+        write_modbus_address/write_modbus_type, so all setpoints come back in a
+        handful of bulk register and coil reads instead of one round-trip each.
+        """
+        try:
+            setpoint_addresses = []
+            
+            for param_id, param_meta in self._parameter_cache.items():
+                if not param_meta.get('is_writable', False):
+                    continue
+                write_addr = param_meta.get('write_modbus_address')
+                if write_addr is None:
+                    continue
+                
+                data_type = param_meta.get('data_type', 'float')
+                write_type = (param_meta.get('write_modbus_type') or '').lower()
+                
+                # Same classification as read_setpoint: coil only when the write
+                # type says so (or is absent for binary); otherwise a register.
+                if write_type == 'coil' or (not write_type and data_type == 'binary'):
+                    modbus_type = 'coil'
+                else:
+                    modbus_type = 'holding'
+                    if data_type not in ('float', 'int32', 'int16', 'binary'):
+                        data_type = 'int16'  # read_setpoint default: single register
+                
+                setpoint_addresses.append((param_id, write_addr, data_type, modbus_type))
+            
+            if not setpoint_addresses:
+                logger.info("No writable parameters with write addresses - bulk setpoint reads disabled")
+                self._bulk_setpoint_ranges = None
+                self._setpoint_plan_stats = {}
+                return
+            
+            self._bulk_setpoint_ranges = self.communicator.optimize_address_ranges(
+                setpoint_addresses,
+                cost_model=self._range_cost_model()
+            )
+            compile_decode_plans(self._bulk_setpoint_ranges, self.communicator.byte_order)
+            
+            bulk_reads = (
+                len(self._bulk_setpoint_ranges.get('holding_registers', []))
+                + len(self._bulk_setpoint_ranges.get('coils', []))
+            )
+            self._setpoint_plan_stats = {
+                'setpoints': len(setpoint_addresses),
+                'bulk_reads_per_refresh': bulk_reads,
+                'round_trips_saved_per_refresh': len(setpoint_addresses) - bulk_reads,
+                'predicted_cost_ms': self._bulk_setpoint_ranges.get('predicted_cost_ms', 0.0),
+            }
+            
+            logger.info(
+                f"✅ Bulk setpoint plan: {len(setpoint_addresses)} setpoints → {bulk_reads} bulk reads "
+                f"({len(setpoint_addresses) - bulk_reads} Modbus round-trips saved per refresh)"
+            )
+            
+        except Exception as e:
+            logger.error(f"Failed to initialize bulk setpoint optimization: {e}", exc_info=True)
+            self._bulk_setpoint_ranges = None
     
     async def _read_all_parameters_bulk(self) -> Dict[str, float]:
         """
@@ -850,31 +1071,58 @@ class RealPLC(PLCInterface):
         if not self._bulk_read_ranges:
             raise RuntimeError("Bulk read ranges not initialized")
         
+        return await self._read_planned_ranges(self._bulk_read_ranges)
+    
+    async def _read_planned_ranges(self, planned_ranges: Dict) -> Dict[str, float]:
+        """
+        Execute the holding register and coil reads of a range plan.
+        
+        Returns:
+            Dict[str, float]: Dictionary of parameter IDs to values
+        """
         result = {}
         
         # Execute bulk reads for holding registers
-        holding_ranges = self._bulk_read_ranges.get('holding_registers', [])
+        holding_ranges = planned_ranges.get('holding_registers', [])
         if holding_ranges:
-            logger.info(f"📊 Executing {len(holding_ranges)} holding register bulk read range(s)")
+            logger.debug(f"📊 Executing {len(holding_ranges)} holding register bulk read range(s)")
             holding_results = await self._bulk_read_holding_registers(holding_ranges)
             result.update(holding_results)
         
         # Execute bulk reads for coils
-        coil_ranges = self._bulk_read_ranges.get('coils', [])
+        coil_ranges = planned_ranges.get('coils', [])
         if coil_ranges:
-            logger.info(f"📊 Executing {len(coil_ranges)} coil bulk read range(s)")
+            logger.debug(f"📊 Executing {len(coil_ranges)} coil bulk read range(s)")
             coil_results = await self._bulk_read_coils(coil_ranges)
             result.update(coil_results)
         
         return result
     
+    @asynccontextmanager
+    async def _range_client(self):
+        """
+        Client for one bulk range read.
+        
+        With pipelining enabled (PLC_PIPELINE_DEPTH) all ranges share the
+        communicator's socket, each as its own in-flight transaction; otherwise
+        (or after falling back to serial) each range borrows a pooled
+        connection (reconnects transparently if broken).
+        """
+        client = self.communicator.pipelined_client()
+        if client is None:
+            async with self.connection_pool.connection() as pooled_client:
+                yield pooled_client
+        else:
+            async with self.concurrency_limiter.slot():
+                yield client
+    
     async def _bulk_read_holding_registers(self, ranges: List[Dict]) -> Dict[str, float]:
         """
         Execute bulk reads for holding register ranges.
         
-        OPTIMIZED: Execute all ranges in parallel using separate Modbus connections.
-        Modbus TCP typically only supports 1 request per connection, so we create
-        separate connections for each parallel read.
+        OPTIMIZED: Execute all ranges in parallel on connections borrowed from the
+        persistent pool. Modbus TCP typically only supports 1 request per
+        connection, so each parallel read holds its own pooled connection.
         
         Args:
             ranges: List of optimized register ranges
@@ -886,99 +1134,56 @@ class RealPLC(PLCInterface):
         
         # Execute all bulk reads in parallel for maximum performance
         async def read_single_range(range_info: Dict) -> Dict[str, float]:
-            """Read a single range using a dedicated Modbus connection."""
+            """Read a single range using a pooled Modbus connection."""
+            if range_info.get('split'):
+                return await self._read_split_ranges(range_info['split'], read_single_range)
             range_result = {}
-            client = None
             try:
                 start_addr = range_info['start_address']
                 total_registers = range_info['count']
                 parameters = range_info['parameters']
                 
-                # Create a dedicated Modbus client for this parallel read
-                # Use shorter timeout (2s) for faster failure detection
-                from pymodbus.client import ModbusTcpClient
-                
-                # Get the target IP (use current IP from communicator if available)
-                target_ip = self.communicator._current_ip or self.ip_address
-                
-                client = ModbusTcpClient(
-                    target_ip,
-                    port=self.port,
-                    timeout=2.0  # 2 second timeout for operations
-                )
-                
-                # Connect in thread to avoid blocking
-                connected = await asyncio.to_thread(client.connect)
-                if not connected:
-                    logger.error(f"Failed to connect dedicated client for range {start_addr}")
-                    return range_result
-                
-                # Execute bulk read in thread
-                raw_results = await asyncio.to_thread(
-                    client.read_holding_registers,
-                    address=start_addr,
-                    count=total_registers,
-                    slave=self.communicator.slave_id
-                )
+                # Wait for a scheduler slot at the caller's priority, then get a
+                # client: the pipelined PLC socket or a pooled connection
+                async with self.scheduler.access(current_request_priority()), \
+                        self._range_client() as client:
+                    request_start = time.perf_counter()
+                    raw_results = await client.read_holding_registers(
+                        start_addr,
+                        count=total_registers,
+                        slave=self.communicator.slave_id
+                    )
+                    request_ms = (time.perf_counter() - request_start) * 1000
                 
                 if raw_results.isError():
+                    pieces = self._split_rejected_range(range_info, raw_results, coils=False)
+                    if pieces:
+                        return await self._read_split_ranges(pieces, read_single_range)
                     logger.error(f"Bulk read failed for range {start_addr}-{start_addr + total_registers}: {raw_results}")
                     return range_result
                 
+                self._range_latency_samples.append((total_registers, request_ms))
+                
                 registers = raw_results.registers
                 
-                # Parse individual parameter values from bulk read results
-                for param_id, param_addr, data_type in parameters:
-                    try:
-                        # Calculate offset in the bulk read result
-                        offset = param_addr - start_addr
-                        
-                        if data_type == 'float':
-                            if offset + 1 < len(registers):
-                                value = self._parse_float_from_registers(
-                                    registers[offset], 
-                                    registers[offset + 1]
-                                )
-                                range_result[param_id] = value
-                        elif data_type == 'int32':
-                            if offset + 1 < len(registers):
-                                value = self._parse_int32_from_registers(
-                                    registers[offset], 
-                                    registers[offset + 1]
-                                )
-                                range_result[param_id] = float(value)
-                        elif data_type == 'int16':
-                            if offset < len(registers):
-                                range_result[param_id] = float(registers[offset])
-                        else:
-                            logger.warning(f"Unsupported data type {data_type} for parameter {param_id}")
-                    
-                    except Exception as e:
-                        logger.error(f"Error parsing parameter {param_id} from bulk read: {e}")
+                decode_plan = range_info.get('decode_plan')
+                if decode_plan is not None:
+                    # Compiled plan: one unpack over the whole register buffer
+                    range_result = decode_plan.decode(registers)
+                else:
+                    range_result = self._decode_registers_per_parameter(
+                        parameters, start_addr, registers
+                    )
                 
             except Exception as e:
                 logger.error(f"Error in bulk read for range: {e}", exc_info=True)
-            finally:
-                # Always close the dedicated client
-                if client:
-                    try:
-                        await asyncio.to_thread(client.close)
-                    except Exception as e:
-                        logger.debug(f"Error closing dedicated client: {e}")
             
             return range_result
         
-        # Execute all ranges in parallel with limited concurrency
-        # Use semaphore to limit concurrent connections (avoid overwhelming PLC)
-        # Conservative limit: 4 concurrent connections
+        # Execute all ranges in parallel; the pool's adaptive limiter decides
+        # how many run at once (never above the PLC's connection limit)
         if ranges:
-            semaphore = asyncio.Semaphore(4)  # Limit to 4 concurrent connections
-            
-            async def read_with_semaphore(range_info):
-                async with semaphore:
-                    return await read_single_range(range_info)
-            
-            range_results = await asyncio.gather(*[read_with_semaphore(r) for r in ranges], return_exceptions=True)
+            range_results = await asyncio.gather(*[read_single_range(r) for r in ranges], return_exceptions=True)
             
             # Merge all results
             for range_result in range_results:
@@ -1005,84 +1210,51 @@ class RealPLC(PLCInterface):
         
         # Execute all bulk reads in parallel using separate Modbus connections
         async def read_single_coil_range(range_info: Dict) -> Dict[str, float]:
-            """Read a single coil range using a dedicated Modbus connection."""
+            """Read a single coil range using a pooled Modbus connection."""
+            if range_info.get('split'):
+                return await self._read_split_ranges(range_info['split'], read_single_coil_range)
             range_result = {}
-            client = None
             try:
                 start_addr = range_info['start_address']
                 count = range_info['count']
                 parameters = range_info['parameters']
                 
-                # Create a dedicated Modbus client for this parallel read
-                # Use shorter timeout (2s) for faster failure detection
-                from pymodbus.client import ModbusTcpClient
-                
-                # Get the target IP (use current IP from communicator if available)
-                target_ip = self.communicator._current_ip or self.ip_address
-                
-                client = ModbusTcpClient(
-                    target_ip,
-                    port=self.port,
-                    timeout=2.0  # 2 second timeout for operations
-                )
-                
-                # Connect in thread to avoid blocking
-                connected = await asyncio.to_thread(client.connect)
-                if not connected:
-                    logger.error(f"Failed to connect dedicated client for coil range {start_addr}")
-                    return range_result
-                
-                # Execute bulk read in thread
-                raw_results = await asyncio.to_thread(
-                    client.read_coils,
-                    address=start_addr,
-                    count=count,
-                    slave=self.communicator.slave_id
-                )
+                # Wait for a scheduler slot at the caller's priority, then get a
+                # client: the pipelined PLC socket or a pooled connection
+                async with self.scheduler.access(current_request_priority()), \
+                        self._range_client() as client:
+                    raw_results = await client.read_coils(
+                        start_addr,
+                        count=count,
+                        slave=self.communicator.slave_id
+                    )
                 
                 if raw_results.isError():
+                    pieces = self._split_rejected_range(range_info, raw_results, coils=True)
+                    if pieces:
+                        return await self._read_split_ranges(pieces, read_single_coil_range)
                     logger.error(f"Bulk coil read failed for range {start_addr}-{start_addr + count}: {raw_results}")
                     return range_result
                 
                 bits = raw_results.bits
                 
-                # Parse individual parameter values from bulk read results
-                for param_id, param_addr, data_type in parameters:
-                    try:
-                        # Calculate offset in the bulk read result
-                        offset = param_addr - start_addr
-                        
-                        if offset < len(bits):
-                            range_result[param_id] = 1.0 if bits[offset] else 0.0
-                        else:
-                            logger.warning(f"Coil offset {offset} out of range for parameter {param_id}")
-                    
-                    except Exception as e:
-                        logger.error(f"Error parsing coil {param_id} from bulk read: {e}")
+                decode_plan = range_info.get('decode_plan')
+                if decode_plan is not None:
+                    range_result = decode_plan.decode(bits)
+                else:
+                    range_result = self._decode_coils_per_parameter(
+                        parameters, start_addr, bits
+                    )
                 
             except Exception as e:
                 logger.error(f"Error in bulk coil read for range: {e}", exc_info=True)
-            finally:
-                # Always close the dedicated client
-                if client:
-                    try:
-                        await asyncio.to_thread(client.close)
-                    except Exception as e:
-                        logger.debug(f"Error closing dedicated coil client: {e}")
             
             return range_result
         
-        # Execute all ranges in parallel with limited concurrency
-        # Use semaphore to limit concurrent connections (avoid overwhelming PLC)
-        # Conservative limit: 4 concurrent connections
+        # Execute all ranges in parallel; the pool's adaptive limiter decides
+        # how many run at once (never above the PLC's connection limit)
         if ranges:
-            semaphore = asyncio.Semaphore(4)  # Limit to 4 concurrent connections
-            
-            async def read_with_semaphore(range_info):
-                async with semaphore:
-                    return await read_single_coil_range(range_info)
-            
-            range_results = await asyncio.gather(*[read_with_semaphore(r) for r in ranges], return_exceptions=True)
+            range_results = await asyncio.gather(*[read_single_coil_range(r) for r in ranges], return_exceptions=True)
             
             # Merge all results
             for range_result in range_results:
@@ -1093,6 +1265,98 @@ class RealPLC(PLCInterface):
         
         return result
     
+    def _split_rejected_range(self, range_info: Dict, response, coils: bool) -> List[Dict]:
+        """
+        Split a range the PLC answered with Illegal Data Address.
+        
+        The range is cut at its bridged gaps (or into single parameters when it
+        has none). The pieces are kept on the range, so later reads go straight
+        to them instead of failing again.
+        
+        Returns:
+            List[Dict]: Ranges to read instead (empty if the range cannot be split)
+        """
+        if getattr(response, 'exception_code', None) != MODBUS_ILLEGAL_DATA_ADDRESS:
+            return []
+        pieces = split_range(range_info, coils=coils)
+        if not pieces:
+            return []
+        compile_decode_plans({'coils' if coils else 'holding_registers': pieces}, self.communicator.byte_order)
+        range_info['split'] = pieces
+        start_addr = range_info['start_address']
+        logger.warning(
+            f"⚠️ PLC rejected {'coil' if coils else 'register'} range {start_addr}-{start_addr + range_info['count']} "
+            f"(illegal data address); reading it as {len(pieces)} smaller ranges"
+        )
+        return pieces
+    
+    async def _read_split_ranges(self, pieces: List[Dict], read_range) -> Dict[str, float]:
+        """Read the pieces of a split range in parallel and merge their values."""
+        result = {}
+        for piece_result in await asyncio.gather(*[read_range(piece) for piece in pieces]):
+            result.update(piece_result)
+        return result
+    
+    def _decode_registers_per_parameter(
+        self, parameters: List[Tuple[str, int, str]], start_addr: int, registers: List[int]
+    ) -> Dict[str, float]:
+        """
+        Decode parameters from a bulk register read one at a time.
+        
+        Fallback for ranges without a compiled decode plan.
+        """
+        range_result = {}
+        for param_id, param_addr, data_type in parameters:
+            try:
+                # Calculate offset in the bulk read result
+                offset = param_addr - start_addr
+                
+                if data_type == 'float':
+                    if offset + 1 < len(registers):
+                        value = self._parse_float_from_registers(
+                            registers[offset], 
+                            registers[offset + 1]
+                        )
+                        range_result[param_id] = value
+                elif data_type == 'int32':
+                    if offset + 1 < len(registers):
+                        value = self._parse_int32_from_registers(
+                            registers[offset], 
+                            registers[offset + 1]
+                        )
+                        range_result[param_id] = float(value)
+                elif data_type == 'int16':
+                    if offset < len(registers):
+                        range_result[param_id] = float(registers[offset])
+                elif data_type == 'binary':
+                    # Edge case: binary stored in a register (non-zero is ON)
+                    if offset < len(registers):
+                        range_result[param_id] = 1.0 if registers[offset] else 0.0
+                else:
+                    logger.warning(f"Unsupported data type {data_type} for parameter {param_id}")
+            
+            except Exception as e:
+                logger.error(f"Error parsing parameter {param_id} from bulk read: {e}")
+        
+        return range_result
+    
+    def _decode_coils_per_parameter(
+        self, parameters: List[Tuple[str, int, str]], start_addr: int, bits: List[bool]
+    ) -> Dict[str, float]:
+        """
+        Decode coil parameters from a bulk coil read one at a time.
+        
+        Fallback for ranges without a compiled decode plan.
+        """
+        range_result = {}
+        for param_id, param_addr, data_type in parameters:
+            offset = param_addr - start_addr
+            if offset < len(bits):
+                range_result[param_id] = 1.0 if bits[offset] else 0.0
+            else:
+                logger.warning(f"Coil offset {offset} out of range for parameter {param_id}")
+        return range_result
+    
     def _parse_float_from_registers(self, reg1: int, reg2: int) -> float:
         """Parse a float value from two registers using configured byte order."""
         if self.communicator.byte_order == 'abcd':  # Big-endian
@@ -1131,6 +1395,7 @@ class RealPLC(PLCInterface):
             raw_data = struct.pack('>HH', reg2, reg1)
             return struct.unpack('>i', raw_data)[0]
     
+    @scheduled(RequestPriority.SETPOINT_POLL)
     async def read_setpoint(self, parameter_id: str) -> Optional[float]:
         """
         Read the setpoint value for a parameter from the PLC.
@@ -1164,87 +1429,61 @@ class RealPLC(PLCInterface):
         data_type = param_meta['data_type']
         write_type = (param_meta.get('write_modbus_type') or '').lower()
         
-        # Set parameter info for enhanced logging
+        # Labels the communicator's log lines for this read
         param_info = {
             'name': param_meta.get('name', 'unknown'),
             'component_name': param_meta.get('component_name', 'unknown')
         }
-        self.communicator.set_current_parameter_info(param_info)
         
         # Read setpoint using write address
         value = None
         try:
             if write_type == 'coil' or (not write_type and data_type == 'binary'):
                 # Binary parameter - read from coil
-                result = self.communicator.read_coils(address, count=1)
+                result = await self.communicator.read_coils(address, count=1, param_info=param_info)
                 if result is not None:
                     value = 1.0 if result[0] else 0.0
             else:
                 # Numeric parameter - read from holding register
                 if data_type == 'float':
-                    value = self.communicator.read_float(address)
+                    value = await self.communicator.read_float(address, param_info=param_info)
                 elif data_type == 'int32':
-                    value = self.communicator.read_integer_32bit(address)
+                    value = await self.communicator.read_integer_32bit(address, param_info=param_info)
                 elif data_type == 'int16':
-                    result = self.communicator.client.read_holding_registers(
-                        address, count=1, slave=self.communicator.slave_id
+                    registers = await self.communicator.read_holding_registers(
+                        address, count=1, param_info=param_info
                     )
-                    if not result.isError():
-                        value = result.registers[0]
+                    if registers is not None:
+                        value = registers[0]
                 elif data_type == 'binary':
                     # Binary stored in register
-                    result = self.communicator.client.read_holding_registers(
-                        address, count=1, slave=self.communicator.slave_id
+                    registers = await self.communicator.read_holding_registers(
+                        address, count=1, param_info=param_info
                     )
-                    if not result.isError():
-                        value = 1.0 if result.registers[0] else 0.0
+                    if registers is not None:
+                        value = 1.0 if registers[0] else 0.0
                 else:
                     # Default to holding register read
-                    result = self.communicator.client.read_holding_registers(
-                        address, count=1, slave=self.communicator.slave_id
+                    registers = await self.communicator.read_holding_registers(
+                        address, count=1, param_info=param_info
                     )
-                    if not result.isError():
-                        value = float(result.registers[0])
+                    if registers is not None:
+                        value = float(registers[0])
         
         except Exception as e:
             logger.error(f"Error reading setpoint for parameter {parameter_id}: {e}")
             return None
-        finally:
-            # Clear parameter info
-            self.communicator.clear_current_parameter_info()
         
         if value is None:
             logger.warning(f"Failed to read setpoint for parameter {parameter_id}")
             return None
         
-        # Update database with setpoint value (in background task)
-        asyncio.create_task(self._update_parameter_setpoint(parameter_id, value))
+        # Queue setpoint for the next batched DB flush
+        self.value_buffer.update(parameter_id, set_value=value)
         
         return float(value)
     
-    async def _update_parameter_setpoint(self, parameter_id: str, value: float):
-        """Update the set value of a parameter in the database."""
-        try:
-            supabase = get_supabase()
-            
-            # Get parameter details from cache for logging
-            param_meta = self._parameter_cache.get(parameter_id, {})
-            component_name = param_meta.get('short_component_name', '')
-            param_name = param_meta.get('name', '')
-            
-            logger.debug(
-                f"Updating set_value of parameter: {param_name} ({component_name}) "
-                f"with value: {value}"
-            )
-            
-            supabase.table('component_parameters').update({
-                'set_value': value,
-                'updated_at': 'now()'
-            }).eq('id', parameter_id).execute()
-            
-        except Exception as e:
-            logger.error(f"Error updating parameter setpoint in database: {str(e)}")
-    
+    @scheduled(RequestPriority.SETPOINT_POLL)
     async def read_all_setpoints(self) -> Dict[str, float]:
         """
         Read all setpoint values from the PLC.
@@ -1255,6 +1494,20 @@ class RealPLC(PLCInterface):
         if not self.connected:
             raise RuntimeError("Not connected to PLC")
         
+        # Try bulk setpoint reads first (planned over write addresses)
+        if self._use_bulk_reads and self._bulk_setpoint_ranges:
+            try:
+                bulk_start = time.time()
+                result = await self._read_all_setpoints_bulk()
+                bulk_duration = time.time() - bulk_start
+                logger.debug(
+                    f"Bulk setpoint read completed: {len(result)} setpoints in "
+                    f"{bulk_duration*1000:.0f}ms"
+                )
+                return result
+            except Exception as e:
+                logger.warning(f"Bulk setpoint read failed, falling back to individual reads: {e}", exc_info=True)
+        
         result = {}
         
         for parameter_id in self._parameter_cache:
@@ -1275,11 +1528,39 @@ class RealPLC(PLCInterface):
         
         return result
     
+    async def _read_all_setpoints_bulk(self) -> Dict[str, float]:
+        """
+        Read all setpoints using the planned write-address bulk ranges.
+        
+        Returns:
+            Dict[str, float]: Dictionary of parameter IDs to setpoint values
+        """
+        if not self._bulk_setpoint_ranges:
+            raise RuntimeError("Bulk setpoint ranges not initialized")
+        
+        result = {}
+        
+        holding_ranges = self._bulk_setpoint_ranges.get('holding_registers', [])
+        if holding_ranges:
+            result.update(await self._bulk_read_holding_registers(holding_ranges))
+        
+        coil_ranges = self._bulk_setpoint_ranges.get('coils', [])
+        if coil_ranges:
+            result.update(await self._bulk_read_coils(coil_ranges))
+        
+        # Keep component_parameters.set_value in sync (coalesced write-behind)
+        for parameter_id, value in result.items():
+            self.value_buffer.update(parameter_id, set_value=value)
+        
+        return result
+    
+    @scheduled(RequestPriority.SAFETY)
     async def control_valve(
         self,
         valve_number: int,
         state: bool,
         duration_ms: Optional[int] = None,
+        auto_close: bool = True,
     ) -> bool:
         """
         Control a valve state.
@@ -1288,6 +1569,8 @@ class RealPLC(PLCInterface):
             valve_number: The valve number to control
             state: True to open, False to close
             duration_ms: Optional duration to keep valve open in milliseconds
+            auto_close: If False, duration_ms only sizes the burst window and the
+                caller closes the valve itself (deadline-driven step timeline)
             
         Returns:
             bool: True if successful, False otherwise
@@ -1312,19 +1595,28 @@ class RealPLC(PLCInterface):
         )
         
         # Write to the valve coil
-        success = self.communicator.write_coil(address, state)
+        success = await self.communicator.write_coil(address, state)
 
         if not success:
             logger.error(f"Failed to {'open' if state else 'close'} valve {valve_number}")
             return False
 
-        # Update database with new set value for valve parameter (in background task)
+        # Sample the pulse transient (no-op unless BURST_CAPTURE_PARAMETERS is set).
+        # The closing edge of a caller-timed pulse is already inside its window.
+        if state and not auto_close:
+            self._caller_timed_valves.add(valve_number)
+        if state or valve_number not in self._caller_timed_valves:
+            self.burst_capture.trigger('valve', duration_ms if state else 0, label=f'valve_{valve_number}')
+        else:
+            self._caller_timed_valves.discard(valve_number)
+
+        # Queue new set value for valve parameter (batched write-behind)
         parameter_id = valve_meta['parameter_id']
         valve_set_value = 1.0 if state else 0.0
-        asyncio.create_task(self._update_parameter_set_value(parameter_id, valve_set_value))
+        self.value_buffer.update(parameter_id, set_value=valve_set_value)
 
         # If duration specified, schedule valve to close after duration
-        if state and duration_ms is not None and duration_ms > 0:
+        if state and auto_close and duration_ms is not None and duration_ms > 0:
             # Create a background task to close the valve after the specified duration
             asyncio.create_task(self._auto_close_valve(valve_number, address, duration_ms))
 
@@ -1351,14 +1643,14 @@ class RealPLC(PLCInterface):
 
     async def _ensure_plc_connection(self) -> bool:
         """Ensure PLC connection is established, reconnect if necessary."""
-        if self.connected and self.communicator and self.communicator._is_connection_healthy():
+        if self.connected and self.communicator and await self.communicator._is_connection_healthy():
             return True
 
         logger.info("Attempting to establish PLC connection...")
 
         try:
             # Try to connect
-            success = self.communicator.connect()
+            success = await self.communicator.connect()
 
             if success:
                 self.connected = True
@@ -1374,6 +1666,7 @@ class RealPLC(PLCInterface):
             self.connected = False
             return False
     
+    @scheduled(RequestPriority.SAFETY)
     async def _auto_close_valve(self, valve_number: int, address: int, duration_ms: int):
         """
         Automatically close a valve after a specified duration.
@@ -1396,14 +1689,14 @@ class RealPLC(PLCInterface):
             
             # Close the valve
             logger.info(f"Auto-closing valve {valve_number} after {duration_ms}ms")
-            success = self.communicator.write_coil(address, False)
+            success = await self.communicator.write_coil(address, False)
 
             if success:
                 # Update database with new set value for valve parameter (closed state)
                 valve_meta = self._valve_cache.get(valve_number)
                 if valve_meta:
                     parameter_id = valve_meta['parameter_id']
-                    asyncio.create_task(self._update_parameter_set_value(parameter_id, 0.0))
+                    self.value_buffer.update(parameter_id, set_value=0.0)
             else:
                 logger.error(f"Failed to auto-close valve {valve_number}")
             
@@ -1558,6 +1851,7 @@ class RealPLC(PLCInterface):
             self._mfc_scaling_cache = {}
             self._pressure_scaling_cache = {}
     
+    @scheduled(RequestPriority.SAFETY)
     async def execute_purge(self, duration_ms: int) -> bool:
         """
         Execute a purge operation for the specified duration.
@@ -1587,11 +1881,11 @@ class RealPLC(PLCInterface):
         # Activate purge operation
         if self._purge_data_type == 'binary':
             # Trigger purge by setting coil
-            success = self.communicator.write_coil(self._purge_address, True)
+            success = await self.communicator.write_coil(self._purge_address, True)
             logger.info(f"Sending purge command to coil address {self._purge_address}")
         else:
             # Trigger purge by writing 1 to register
-            success = self.communicator.write_integer_32bit(self._purge_address, 1)
+            success = await self.communicator.write_integer_32bit(self._purge_address, 1)
             logger.info(
                 f"Sending purge command to register address {self._purge_address} "
                 f"(value: 1)"
@@ -1601,16 +1895,19 @@ class RealPLC(PLCInterface):
             logger.error("Failed to start purge operation")
             return False
 
+        self.burst_capture.trigger('purge', duration_ms, label='purge')
+
         # Update database with new set value for purge parameter (activated state)
         if self._purge_parameter_id:
             purge_set_value = 1.0
-            asyncio.create_task(self._update_parameter_set_value(self._purge_parameter_id, purge_set_value))
+            self.value_buffer.update(self._purge_parameter_id, set_value=purge_set_value)
 
         # Create a background task to complete the purge
         asyncio.create_task(self._complete_purge(duration_ms))
 
         return True
     
+    @scheduled(RequestPriority.SAFETY)
     async def _complete_purge(self, duration_ms: int):
         """
         Complete a purge operation after the specified duration.
@@ -1632,16 +1929,16 @@ class RealPLC(PLCInterface):
             
             if self._purge_data_type == 'binary':
                 # End purge by clearing coil
-                success = self.communicator.write_coil(self._purge_address, False)
+                success = await self.communicator.write_coil(self._purge_address, False)
             else:
                 # End purge by writing 0 to register
-                success = self.communicator.write_integer_32bit(self._purge_address, 0)
+                success = await self.communicator.write_integer_32bit(self._purge_address, 0)
             
             if success:
                 # Update database with new set value for purge parameter (deactivated state)
                 if self._purge_parameter_id:
                     purge_set_value = 0.0
-                    asyncio.create_task(self._update_parameter_set_value(self._purge_parameter_id, purge_set_value))
+                    self.value_buffer.update(self._purge_parameter_id, set_value=purge_set_value)
             else:
                 logger.error("Failed to complete purge operation")
             
@@ -1662,7 +1959,7 @@ class RealPLC(PLCInterface):
         if not self.connected:
             raise RuntimeError("Not connected to PLC")
 
-        return await asyncio.to_thread(self.communicator.write_coil, address, value)
+        return await self.communicator.write_coil(address, value)
 
     async def read_coils(self, address: int, count: int) -> List[bool]:
         """
@@ -1678,7 +1975,7 @@ class RealPLC(PLCInterface):
         if not self.connected:
             raise RuntimeError("Not connected to PLC")
 
-        return await asyncio.to_thread(self.communicator.read_coils, address, count)
+        return await self.communicator.read_coils(address, count)
 
     async def write_float(self, address: int, value: float) -> bool:
         """
@@ -1694,7 +1991,7 @@ class RealPLC(PLCInterface):
         if not self.connected:
             raise RuntimeError("Not connected to PLC")
 
-        return await asyncio.to_thread(self.communicator.write_float, address, value)
+        return await self.communicator.write_float(address, value)
 
     async def read_float(self, address: int) -> float:
         """
@@ -1709,7 +2006,7 @@ class RealPLC(PLCInterface):
         if not self.connected:
             raise RuntimeError("Not connected to PLC")
 
-        return await asyncio.to_thread(self.communicator.read_float, address)
+        return await self.communicator.read_float(address)
 
     async def write_integer_32bit(self, address: int, value: int) -> bool:
         """
@@ -1725,7 +2022,7 @@ class RealPLC(PLCInterface):
         if not self.connected:
             raise RuntimeError("Not connected to PLC")
 
-        return await asyncio.to_thread(self.communicator.write_integer_32bit, address, value)
+        return await self.communicator.write_integer_32bit(address, value)
 
     async def read_integer_32bit(self, address: int) -> int:
         """
@@ -1740,4 +2037,4 @@ class RealPLC(PLCInterface):
         if not self.connected:
             raise RuntimeError("Not connected to PLC")
 
-        return await asyncio.to_thread(self.communicator.read_integer_32bit, address)
+        return await self.communicator.read_integer_32bit(address)
@@ -0,0 +1,222 @@
+# File: plc/scheduler.py
+"""
+Priority-scheduled access to the PLC.
+
+Polling, valve pulses and operator writes used to reach the PLC in arrival
+order, so a valve-close could sit behind a burst of bulk reads and stretch an
+ALD pulse. Every Modbus transaction now passes through PLCRequestScheduler,
+which grants slots by priority class:
+
+    SAFETY          valve / purge writes
+    OPERATOR_WRITE  parameter and other operator writes
+    SETPOINT_POLL   setpoint refresh reads
+    BACKGROUND_READ parameter polling and other reads
+
+Write classes also have a reserved slot, so they never wait for a full set
+of in-flight reads. A starvation guard promotes a waiting request by one
+class for every aging interval it has waited.
+
+The priority is carried in a context variable: RealPLC methods are
+decorated with @scheduled(...) and every transaction issued underneath
+(communicator operations, pooled bulk reads) inherits that class.
+"""
+import asyncio
+import functools
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from src.log_setup import logger
+from src.utils.stats import p95
+
+
+class RequestPriority(IntEnum):
+    """PLC request classes; lower value is served first."""
+    SAFETY = 0
+    OPERATOR_WRITE = 1
+    SETPOINT_POLL = 2
+    BACKGROUND_READ = 3
+
+
+# Classes allowed to use the reserved write slot(s)
+WRITE_PRIORITIES = (RequestPriority.SAFETY, RequestPriority.OPERATOR_WRITE)
+
+_request_priority: ContextVar[Optional[RequestPriority]] = ContextVar('plc_request_priority', default=None)
+
+
+def current_request_priority(default: RequestPriority = RequestPriority.BACKGROUND_READ) -> RequestPriority:
+    """Priority of the PLC request being issued in the current context."""
+    priority = _request_priority.get()
+    return default if priority is None else priority
+
+
+@contextmanager
+def request_priority(priority: RequestPriority):
+    """Issue all PLC transactions inside the block with the given priority."""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def scheduled(priority: RequestPriority):
+    """Decorator running an async PLC method under a request priority."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with request_priority(priority):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _Ticket:
+    __slots__ = ('priority', 'seq', 'enqueued', 'future')
+
+    def __init__(self, priority: RequestPriority, seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.future = future
+
+
+class _ClassStats:
+    __slots__ = ('requests', 'promoted', 'total_wait_ms', 'max_wait_ms', 'recent_waits')
+
+    def __init__(self):
+        self.requests = 0
+        self.promoted = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=200)
+
+    def record(self, wait_ms: float, promoted: bool):
+        self.requests += 1
+        self.promoted += int(promoted)
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.recent_waits.append(wait_ms)
+
+
+class PLCRequestScheduler:
+    """
+    Priority gate in front of PLC transactions.
+
+    Usage:
+        async with scheduler.access(RequestPriority.SAFETY):
+            await client.write_coil(...)
+    """
+
+    def __init__(
+        self,
+        capacity_provider: Callable[[], int] = lambda: 1,
+        reserved_write_slots: int = 1,
+        aging_interval: float = 0.5,
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            capacity_provider: Callable returning how many transactions of any
+                class may run at once (e.g. the adaptive concurrency limit)
+            reserved_write_slots: Extra slots usable only by write classes
+            aging_interval: Seconds of waiting that promote a request one class
+        """
+        self._capacity_provider = capacity_provider
+        self.reserved_write_slots = max(0, int(reserved_write_slots))
+        self.aging_interval = aging_interval
+
+        self._waiters: List[_Ticket] = []
+        self._in_use = 0
+        self._seq = 0
+        self._stats: Dict[RequestPriority, _ClassStats] = {p: _ClassStats() for p in RequestPriority}
+
+    def _can_run(self, priority: RequestPriority) -> bool:
+        general = max(1, int(self._capacity_provider()))
+        if self._in_use < general:
+            return True
+        return priority in WRITE_PRIORITIES and self._in_use < general + self.reserved_write_slots
+
+    def _effective_priority(self, ticket: _Ticket, now: float) -> int:
+        if self.aging_interval <= 0:
+            return ticket.priority
+        promotions = int((now - ticket.enqueued) / self.aging_interval)
+        return max(0, ticket.priority - promotions)
+
+    def _dispatch(self):
+        """Grant free slots to the highest (effective) priority waiters."""
+        while self._waiters:
+            now = time.monotonic()
+            ranked = sorted(self._waiters, key=lambda t: (self._effective_priority(t, now), t.seq))
+            ticket = next((t for t in ranked if self._can_run(t.priority)), None)
+            if ticket is None:
+                return
+            self._waiters.remove(ticket)
+            if ticket.future.done():
+                continue  # Cancelled while queued
+            self._in_use += 1
+            ticket.future.set_result(self._effective_priority(ticket, now) < ticket.priority)
+
+    @asynccontextmanager
+    async def access(self, priority: RequestPriority):
+        """Hold a PLC transaction slot for the given priority class."""
+        self._seq += 1
+        ticket = _Ticket(priority, self._seq, asyncio.get_running_loop().create_future())
+
+        # Waiters left after dispatching cannot run, so a request that can run
+        # now does not overtake anyone who could have been served
+        self._dispatch()
+        if self._can_run(priority):
+            self._in_use += 1
+            promoted = False
+        else:
+            self._waiters.append(ticket)
+            try:
+                promoted = await ticket.future
+            except asyncio.CancelledError:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                elif ticket.future.done() and not ticket.future.cancelled():
+                    # Slot was granted just before the cancellation landed
+                    self._in_use -= 1
+                    self._dispatch()
+                raise
+
+        wait_ms = (time.monotonic() - ticket.enqueued) * 1000
+        self._stats[priority].record(wait_ms, promoted)
+        if promoted:
+            logger.debug(f"PLC scheduler promoted {priority.name} request after {wait_ms:.0f}ms wait")
+
+        try:
+            yield
+        finally:
+            self._in_use -= 1
+            self._dispatch()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return per-class queue latency metrics."""
+        classes = {}
+        for priority, stats in self._stats.items():
+            classes[priority.name.lower()] = {
+                'requests': stats.requests,
+                'queued': sum(1 for t in self._waiters if t.priority == priority),
+                'promoted': stats.promoted,
+                'avg_wait_ms': stats.total_wait_ms / stats.requests if stats.requests else 0.0,
+                'p95_wait_ms': p95(stats.recent_waits),
+                'max_wait_ms': stats.max_wait_ms,
+            }
+        return {
+            'in_use': self._in_use,
+            'queued': len(self._waiters),
+            'reserved_write_slots': self.reserved_write_slots,
+            'aging_interval_s': self.aging_interval,
+            'classes': classes,
+        }
@@ -10,7 +10,7 @@ Notes on Modbus types:
 """
 import asyncio
 import random
-from typing import Dict, Optional, Set
+from typing import Any, Dict, Optional, Set
 from src.log_setup import logger
 from src.db import get_supabase
 from src.plc.interface import PLCInterface
@@ -169,6 +169,10 @@ class SimulationPLC(PLCInterface):
         # Default to allowing fluctuation for other parameters
         return True
     
+    def get_valve_mapping(self) -> Optional[Dict[int, Dict[str, Any]]]:
+        """Valve number -> valve mapping loaded at initialization."""
+        return self._valve_cache
+
     async def disconnect(self) -> bool:
         """Disconnect from the simulated PLC."""
         logger.info("Disconnecting simulation PLC")
@@ -473,10 +477,12 @@ class SimulationPLC(PLCInterface):
         valve_number: int,
         state: bool,
         duration_ms: Optional[int] = None,
+        auto_close: bool = True,
     ) -> bool:
         """Control a valve in the simulation.
         
         Updates both memory cache and database to properly reflect valve state.
+        With auto_close=False the caller closes the valve after duration_ms.
         """
         if not self.connected:
             raise RuntimeError("Not connected to simulation PLC")
@@ -498,7 +504,7 @@ class SimulationPLC(PLCInterface):
             asyncio.create_task(self._update_parameter_both_values(parameter_id, valve_value))
 
         # If duration specified, close after duration
-        if state and duration_ms is not None:
+        if state and auto_close and duration_ms is not None:
             await asyncio.sleep(duration_ms / 1000)
             self.valves[valve_number] = False
             logger.info(f"Simulation: Auto-closing valve {valve_number} after {duration_ms}ms")
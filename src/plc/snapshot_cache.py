@@ -0,0 +1,165 @@
+# File: plc/snapshot_cache.py
+"""
+Timestamped snapshot of the latest PLC parameter values.
+
+PLCManager stores every bulk read (read_all_parameters) and every wire read
+here, so read_parameter(..., max_age_ms=...) can answer from memory when the
+value is fresh enough instead of issuing another Modbus request for a
+register that was read milliseconds earlier.
+
+Concurrent misses for the same parameter share one wire read (single
+flight). Writes invalidate the affected entry so a read-back after a write
+always goes to the PLC; values from reads that started before the
+invalidation are not cached.
+
+Scope: the snapshot lives in one process's PLCManager. Only the process that
+runs the bulk reads (Terminal 1, PLC data service) has fresh entries; the
+recipe service (Terminal 2) and parameter service (Terminal 3) run their own
+PLCManager and never see Terminal 1's reads, so the cache cannot serve them.
+
+Callers and the age they may accept:
+- Terminal 1 reads of a parameter it bulk-reads every cycle: about one
+  collection interval (e.g. max_age_ms=1000)
+- read-back after a write (Terminal 3 verification, confirmation reads):
+  never cached; must be a wire read that starts after the write
+- idle readiness checks (Terminal 2): evaluated from
+  component_parameters.current_value, i.e. Terminal 1's last logged reading,
+  not from the PLC
+"""
+import asyncio
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+@dataclass
+class SnapshotCacheMetrics:
+    """Metrics for the parameter snapshot cache."""
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    wire_reads: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    hit_rate: float = 0.0
+    last_bulk_age_ms: float = 0.0
+
+
+class ParameterSnapshotCache:
+    """Latest value per parameter plus the monotonic time it was read."""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[float, float]] = {}
+        self._in_flight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._last_bulk_update: Optional[float] = None
+        self._invalidated_at: Dict[str, float] = {}
+        self._invalidated_all_at = float('-inf')
+        self.metrics = SnapshotCacheMetrics()
+
+    def update(self, parameter_id: str, value: Optional[float], read_at: Optional[float] = None):
+        """Store one freshly read value (None values are not cached)."""
+        if value is None:
+            return
+        read_at = read_at if read_at is not None else time.monotonic()
+        if read_at < max(self._invalidated_all_at, self._invalidated_at.get(parameter_id, float('-inf'))):
+            return  # Read started before a write/invalidation; may be stale
+        self._values[parameter_id] = (value, read_at)
+
+    def update_many(self, values: Dict[str, float], read_at: Optional[float] = None):
+        """Store a bulk read snapshot taken at `read_at` (defaults to now)."""
+        read_at = read_at if read_at is not None else time.monotonic()
+        for parameter_id, value in values.items():
+            self.update(parameter_id, value, read_at)
+        self._last_bulk_update = read_at
+
+    def get(self, parameter_id: str, max_age_ms: float) -> Optional[float]:
+        """Return the cached value if it is at most max_age_ms old, else None."""
+        entry = self._values.get(parameter_id)
+        if entry is None:
+            return None
+        value, read_at = entry
+        if (time.monotonic() - read_at) * 1000 > max_age_ms:
+            return None
+        return value
+
+    def invalidate(self, parameter_id: Optional[str] = None):
+        """Drop one parameter (or every parameter) from the snapshot."""
+        self.metrics.invalidations += 1
+        now = time.monotonic()
+        if parameter_id is None:
+            self._values.clear()
+            self._invalidated_at.clear()
+            self._invalidated_all_at = now
+            self._in_flight.clear()
+        else:
+            self._values.pop(parameter_id, None)
+            self._invalidated_at[parameter_id] = now
+            # Reads already on the wire may predate the write: later callers
+            # start a fresh read instead of joining them
+            for key in [key for key in self._in_flight if key[0] == parameter_id]:
+                del self._in_flight[key]
+
+    async def read_through(
+        self,
+        parameter_id: str,
+        max_age_ms: Optional[float],
+        loader: Callable[[], Awaitable[Optional[float]]],
+        flight_variant: Hashable = None,
+    ) -> Optional[float]:
+        """
+        Serve from the snapshot when fresh, otherwise read from the wire.
+
+        Args:
+            parameter_id: Parameter to read
+            max_age_ms: Maximum acceptable value age; None always reads the wire
+            loader: Coroutine factory performing the wire read
+            flight_variant: Distinguishes wire reads of the same parameter that
+                are not interchangeable; concurrent misses with the same
+                parameter and variant share one read
+
+        Returns:
+            Optional[float]: Cached or freshly read value
+        """
+        if max_age_ms is not None:
+            cached = self.get(parameter_id, max_age_ms)
+            if cached is not None:
+                self.metrics.hits += 1
+                return cached
+        self.metrics.misses += 1
+
+        key = (parameter_id, flight_variant)
+        shared = self._in_flight.get(key)
+        if shared is not None:
+            self.metrics.coalesced += 1
+            return await asyncio.shield(shared)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            self.metrics.wire_reads += 1
+            read_at = time.monotonic()
+            value = await loader()
+            self.update(parameter_id, value, read_at)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unshared failure does not log "never retrieved"
+            future.exception()
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return hit rate and snapshot statistics."""
+        lookups = self.metrics.hits + self.metrics.misses
+        self.metrics.hit_rate = self.metrics.hits / lookups if lookups else 0.0
+        self.metrics.entries = len(self._values)
+        self.metrics.last_bulk_age_ms = (
+            (time.monotonic() - self._last_bulk_update) * 1000 if self._last_bulk_update is not None else 0.0
+        )
+        return asdict(self.metrics)
@@ -0,0 +1,232 @@
+# File: plc/write_behind.py
+"""
+Coalescing write-behind buffer for component_parameters value updates.
+
+RealPLC used to spawn one background task per read/write/setpoint poll, each
+sending its own single-row component_parameters UPDATE. This buffer keeps
+only the latest current_value/set_value per parameter and flushes all changed
+rows in one batched RPC (batch_update_parameter_values) on a fixed cadence.
+
+Setpoints are fed in on every read_all_setpoints poll, most of them
+unchanged. Values equal to the last value flushed for the same field are
+dropped at flush time, so an idle machine sends no UPDATEs (and no Realtime
+traffic). A value is re-sent once resync_interval has passed since it was
+last flushed, which repairs rows changed by another writer.
+
+Metrics: flush latency, rows flushed, rows coalesced (updates overwritten
+before they reached the database), values skipped as unchanged and flush
+failures.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.log_setup import logger
+
+VALUE_FIELDS = ('current_value', 'set_value')
+
+
+@dataclass
+class WriteBehindMetrics:
+    """Metrics for the parameter value write-behind buffer."""
+    updates_received: int = 0
+    rows_flushed: int = 0
+    fields_coalesced: int = 0
+    values_unchanged: int = 0
+    flushes: int = 0
+    flush_failures: int = 0
+    pending_rows: int = 0
+    last_flush_latency_ms: float = 0.0
+    avg_flush_latency_ms: float = 0.0
+    max_flush_latency_ms: float = 0.0
+
+
+class ParameterWriteBehindBuffer:
+    """
+    Latest-value-wins buffer flushed to Supabase in one RPC per interval.
+
+    Usage:
+        buffer = ParameterWriteBehindBuffer(flush_interval=1.0)
+        buffer.start()
+        buffer.update(parameter_id, current_value=12.3)
+        ...
+        await buffer.stop()  # flushes what is left
+    """
+
+    RPC_NAME = 'batch_update_parameter_values'
+
+    def __init__(
+        self,
+        flush_interval: float = 1.0,
+        supabase_provider: Optional[Callable[[], Any]] = None,
+        resync_interval: float = 60.0,
+    ):
+        """
+        Initialize the write-behind buffer.
+
+        Args:
+            flush_interval: Seconds between flushes of changed rows
+            supabase_provider: Callable returning a sync Supabase client
+                (defaults to src.db.get_supabase)
+            resync_interval: Seconds after which an unchanged value is sent again
+        """
+        self.flush_interval = flush_interval
+        self._supabase_provider = supabase_provider
+        self.resync_interval = resync_interval
+        self._pending: Dict[str, Dict[str, float]] = {}
+        # Last flushed value and monotonic flush time per (parameter, field)
+        self._flushed: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._inflight: Optional[asyncio.Task] = None
+        self._running = False
+
+        self.metrics = WriteBehindMetrics()
+        self._flush_latency_total_ms = 0.0
+
+    def _get_supabase(self):
+        if self._supabase_provider is not None:
+            return self._supabase_provider()
+        from src.db import get_supabase
+        return get_supabase()
+
+    def update(self, parameter_id: str, current_value: Optional[float] = None,
+               set_value: Optional[float] = None):
+        """
+        Record the latest value(s) for a parameter.
+
+        Args:
+            parameter_id: component_parameters.id
+            current_value: Latest value read from the PLC (optional)
+            set_value: Latest setpoint written to / read from the PLC (optional)
+        """
+        row = self._pending.setdefault(parameter_id, {})
+        for field, value in (('current_value', current_value), ('set_value', set_value)):
+            if value is None:
+                continue
+            self.metrics.updates_received += 1
+            if field in row:
+                self.metrics.fields_coalesced += 1
+            row[field] = float(value)
+
+        if not row:
+            del self._pending[parameter_id]
+
+    @property
+    def pending_count(self) -> int:
+        """Number of parameters with unflushed changes."""
+        return len(self._pending)
+
+    def start(self):
+        """Start the periodic flush loop on the running event loop."""
+        if self._flush_task and not self._flush_task.done():
+            return
+        self._running = True
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Parameter write-behind buffer started (flush every {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the flush loop and flush any remaining rows."""
+        self._running = False
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while self._running:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush loop error: {e}", exc_info=True)
+
+    async def flush(self) -> int:
+        """
+        Flush all pending rows in a single RPC.
+
+        Returns:
+            int: Number of rows sent (0 if nothing was pending or the flush failed)
+        """
+        async with self._flush_lock:
+            # Cancelling a flush (stop()) releases the lock but not its RPC:
+            # let it finish (and requeue on failure) before sending again
+            if self._inflight is not None and not self._inflight.done():
+                await asyncio.wait({self._inflight})
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._changed(self._pending), {}
+            if not batch:
+                return 0
+            self._inflight = asyncio.create_task(self._send(batch))
+            return await asyncio.shield(self._inflight)
+
+    async def _send(self, batch: Dict[str, Dict[str, float]]) -> int:
+        """Send one batch; requeues it when the RPC fails."""
+        updates: List[Dict[str, Any]] = [
+            {'id': parameter_id, **fields} for parameter_id, fields in batch.items()
+        ]
+
+        start = time.perf_counter()
+        try:
+            supabase = self._get_supabase()
+            await asyncio.to_thread(
+                lambda: supabase.rpc(self.RPC_NAME, {'p_updates': updates}).execute()
+            )
+        except Exception as e:
+            self.metrics.flush_failures += 1
+            self._requeue(batch)
+            logger.warning(
+                f"⚠️ Write-behind flush of {len(updates)} rows failed, will retry next interval: {e}"
+            )
+            return 0
+
+        flushed_at = time.monotonic()
+        for parameter_id, fields in batch.items():
+            for field, value in fields.items():
+                self._flushed[(parameter_id, field)] = (value, flushed_at)
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.metrics.flushes += 1
+        self.metrics.rows_flushed += len(updates)
+        self.metrics.last_flush_latency_ms = latency_ms
+        self.metrics.max_flush_latency_ms = max(self.metrics.max_flush_latency_ms, latency_ms)
+        self._flush_latency_total_ms += latency_ms
+        self.metrics.avg_flush_latency_ms = self._flush_latency_total_ms / self.metrics.flushes
+
+        logger.debug(f"Write-behind flushed {len(updates)} parameter rows in {latency_ms:.0f}ms")
+        return len(updates)
+
+    def _changed(self, pending: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        """Drop values equal to the last flushed value (unless due for resync)."""
+        now = time.monotonic()
+        batch: Dict[str, Dict[str, float]] = {}
+        for parameter_id, fields in pending.items():
+            changed = {}
+            for field, value in fields.items():
+                last = self._flushed.get((parameter_id, field))
+                if last is not None and last[0] == value and now - last[1] < self.resync_interval:
+                    self.metrics.values_unchanged += 1
+                    continue
+                changed[field] = value
+            if changed:
+                batch[parameter_id] = changed
+        return batch
+
+    def _requeue(self, batch: Dict[str, Dict[str, float]]):
+        """Put a failed batch back without overwriting newer values."""
+        for parameter_id, fields in batch.items():
+            row = self._pending.setdefault(parameter_id, {})
+            for field, value in fields.items():
+                row.setdefault(field, value)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of buffer metrics."""
+        self.metrics.pending_rows = len(self._pending)
+        return asdict(self.metrics)
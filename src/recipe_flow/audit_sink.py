@@ -0,0 +1,317 @@
+"""
+Batched, non-blocking audit trail of recipe operations.
+
+Every valve step used to insert its recipe_execution_audit row synchronously
+between the pulse and the next step, after two SELECTs for recipe_id and
+current_overall_step, and every parameter write inserted its own
+parameter_control_commands row.
+
+During execute_recipe() step handlers hand audit records to the in-process
+AuditSink with submit_audit(), which returns immediately:
+
+- recipe_id, step_sequence and loop_iteration are filled in from the
+  compiled plan and the progress publisher's state, so no reads are needed
+- a background task bulk-inserts the queued records every
+  AUDIT_FLUSH_INTERVAL_MS, grouped by table, in batches of AUDIT_BATCH_SIZE
+- records that cannot be written (database unreachable) are appended to a
+  JSONL file in AUDIT_SPILL_DIR and replayed on a later flush, or by the next
+  run's sink, once inserts succeed again
+
+Outside a running recipe (no sink in context) submit_audit() writes directly,
+in a worker thread started as a background task, so a parameter write from
+the command processor does not wait for the insert either.
+"""
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.config import AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL_MS, AUDIT_SPILL_DIR
+from src.db import get_supabase
+from src.log_setup import get_recipe_flow_logger
+from src.recipe_flow.plan import current_plan
+from src.recipe_flow.progress_publisher import current_progress_publisher
+
+logger = get_recipe_flow_logger()
+
+RECIPE_AUDIT_TABLE = 'recipe_execution_audit'
+
+_current_sink: ContextVar[Optional['AuditSink']] = ContextVar('recipe_audit_sink', default=None)
+
+AuditRecord = Tuple[str, Dict[str, Any]]
+
+# Direct inserts in flight; referenced so they are not garbage-collected early
+_direct_writes: Set[asyncio.Task] = set()
+
+
+@dataclass
+class AuditSinkMetrics:
+    """Metrics for the batched audit trail."""
+    records_submitted: int = 0
+    records_written: int = 0
+    batches_written: int = 0
+    write_errors: int = 0
+    records_spilled: int = 0
+    records_replayed: int = 0
+
+
+class AuditSink:
+    """
+    In-memory audit queue of one recipe run, bulk-inserted on a timer.
+
+    Usage:
+        sink = AuditSink(supabase)
+        sink.start()
+        with audit_sink(sink):
+            ...  # handlers call submit_audit()
+        await sink.close('completed')
+    """
+
+    def __init__(self, supabase, flush_interval_ms: float = AUDIT_FLUSH_INTERVAL_MS,
+                 batch_size: int = AUDIT_BATCH_SIZE, spill_dir: Any = AUDIT_SPILL_DIR,
+                 clock: Callable[[], float] = time.monotonic, inline: bool = False):
+        """
+        Initialize the sink.
+
+        Args:
+            supabase: Sync Supabase client
+            flush_interval_ms: Interval between bulk inserts
+            batch_size: Maximum rows per insert
+            spill_dir: Directory for records that could not be written (None disables spilling)
+            clock: Monotonic time source (seconds)
+            inline: Flush synchronously from submit() on the clock instead of
+                from a background task (virtual-clock dry runs)
+        """
+        self.supabase = supabase
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.batch_size = max(1, int(batch_size))
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self._clock = clock
+        self.inline = inline
+        self._queue: List[AuditRecord] = []
+        self._last_flush = clock()
+        self._spill_pending = self._has_spill_files()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._closed = False
+        self.metrics = AuditSinkMetrics()
+
+    def start(self):
+        """Start the background flush task."""
+        if self._task is None and not self.inline:
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, table: str, record: Dict[str, Any]):
+        """Queue one audit row for the given table."""
+        self._queue.append((table, record))
+        self.metrics.records_submitted += 1
+        if self.inline and (len(self._queue) >= self.batch_size
+                            or self._clock() - self._last_flush >= self.flush_interval):
+            self._flush_batches()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _has_spill_files(self) -> bool:
+        return self.spill_dir is not None and any(self.spill_dir.glob('audit_*.jsonl'))
+
+    def _insert(self, records: List[AuditRecord]) -> List[AuditRecord]:
+        """Insert records grouped by table in batches; returns those not written."""
+        by_table: Dict[str, List[Dict[str, Any]]] = {}
+        for table, record in records:
+            by_table.setdefault(table, []).append(record)
+        failed: List[AuditRecord] = []
+        for table, rows in by_table.items():
+            for i in range(0, len(rows), self.batch_size):
+                batch = rows[i:i + self.batch_size]
+                if failed:
+                    # Database unreachable: don't wait for every batch to fail
+                    failed.extend((table, row) for row in batch)
+                    continue
+                try:
+                    self.supabase.table(table).insert(batch).execute()
+                    self.metrics.records_written += len(batch)
+                    self.metrics.batches_written += 1
+                except Exception as e:
+                    self.metrics.write_errors += 1
+                    logger.warning(f"⚠️ Audit insert of {len(batch)} {table} rows failed: {e}")
+                    failed.extend((table, row) for row in batch)
+        return failed
+
+    def _spill(self, records: List[AuditRecord]):
+        if self.spill_dir is None:
+            logger.error(f"LOST {len(records)} audit records (no spill directory)")
+            return
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S_%f')
+            path = self.spill_dir / f"audit_{stamp}.jsonl"
+            with open(path, 'a') as f:
+                for table, record in records:
+                    f.write(json.dumps({'table': table, 'record': record}, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.metrics.records_spilled += len(records)
+            self._spill_pending = True
+            logger.error(f"Audit insert failed - {len(records)} records saved to {path} for replay")
+        except Exception as e:
+            logger.error(f"LOST {len(records)} audit records: {e}")
+
+    def _replay_spilled(self):
+        for path in sorted(self.spill_dir.glob('audit_*.jsonl')):
+            try:
+                with open(path) as f:
+                    records = [(entry['table'], entry['record']) for entry in map(json.loads, filter(str.strip, f))]
+            except Exception as e:
+                logger.error(f"❌ Unreadable audit spill file {path}: {e}")
+                continue
+            failed = self._insert(records)
+            if failed:
+                # Keep only what is still missing; try again on a later flush
+                with open(path, 'w') as f:
+                    for table, record in failed:
+                        f.write(json.dumps({'table': table, 'record': record}, default=str) + '\n')
+                self.metrics.records_replayed += len(records) - len(failed)
+                return
+            path.unlink()
+            self.metrics.records_replayed += len(records)
+            logger.info(f"🧾 Replayed {len(records)} spilled audit records from {path}")
+        self._spill_pending = False
+
+    def _flush_batches(self) -> int:
+        records, self._queue = self._queue, []
+        self._last_flush = self._clock()
+        failed = self._insert(records) if records else []
+        if failed:
+            self._spill(failed)
+        elif self._spill_pending:
+            self._replay_spilled()
+        return len(records) - len(failed)
+
+    async def flush(self) -> int:
+        """
+        Write queued records now (spilling what cannot be written).
+
+        Returns:
+            int: Number of records written
+        """
+        async with self._flush_lock:
+            # Cancelling a flush releases the lock but not its worker thread:
+            # never run _flush_batches() next to one that is still writing
+            if self._inflight is not None and not self._inflight.done():
+                await asyncio.wait({self._inflight})
+            if not self._queue and not self._spill_pending:
+                return 0
+            if self.inline:
+                return self._flush_batches()
+            self._inflight = asyncio.ensure_future(asyncio.to_thread(self._flush_batches))
+            return await asyncio.shield(self._inflight)
+
+    async def close(self, reason: str) -> Dict[str, Any]:
+        """
+        Stop the flush task and write (or spill) everything still queued.
+
+        Args:
+            reason: Why the run ended ('completed', 'error', 'aborted')
+
+        Returns:
+            Dict: Sink metrics
+        """
+        if self._closed:
+            return self.get_metrics()
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        # Waits for a flush the cancelled task left running before writing the rest
+        await self.flush()
+        metrics = self.get_metrics()
+        logger.info(
+            f"🧾 Audit sink ({reason}): {metrics['records_written']} of {metrics['records_submitted']} "
+            f"records written in {metrics['batches_written']} batches, {metrics['records_spilled']} spilled"
+        )
+        return metrics
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return submitted, written and spilled record counts."""
+        return asdict(self.metrics)
+
+
+@contextmanager
+def audit_sink(sink: AuditSink):
+    """Route submit_audit() inside the block to a sink."""
+    token = _current_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _current_sink.reset(token)
+
+
+def current_audit_sink() -> Optional[AuditSink]:
+    """The audit sink of the recipe being executed, if any."""
+    return _current_sink.get()
+
+
+def _with_context(record: Dict[str, Any]) -> Dict[str, Any]:
+    # Recipe and step context of recipe_execution_audit rows from the compiled plan
+    plan = current_plan()
+    compiled = plan.step(record.get('step_id')) if plan is not None else None
+    if plan is not None and record.get('recipe_id') is None:
+        record['recipe_id'] = plan.recipe_id
+    if compiled is not None:
+        if record.get('step_sequence') is None:
+            record['step_sequence'] = compiled.overall_step
+        publisher = current_progress_publisher()
+        if compiled.parent_step_id and publisher is not None and not record.get('loop_iteration'):
+            record['loop_iteration'] = publisher.state.get('current_loop_iteration', 0)
+    if record.get('step_sequence') is None:
+        record['step_sequence'] = 0
+    return record
+
+
+def submit_audit(table: str, record: Dict[str, Any], supabase=None):
+    """
+    Record an audit row without waiting for the database.
+
+    Args:
+        table: Audit table ('recipe_execution_audit', 'parameter_control_commands')
+        record: Row to insert
+        supabase: Client for the direct write when no sink is active
+    """
+    if table == RECIPE_AUDIT_TABLE:
+        record = _with_context(record)
+    sink = _current_sink.get()
+    if sink is not None:
+        sink.submit(table, record)
+        return
+
+    client = supabase or get_supabase()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _insert_direct(client, table, record)
+        return
+    # Keep the blocking insert off the event loop
+    task = loop.create_task(asyncio.to_thread(_insert_direct, client, table, record))
+    _direct_writes.add(task)
+    task.add_done_callback(_direct_writes.discard)
+
+
+def _insert_direct(supabase, table: str, record: Dict[str, Any]):
+    try:
+        supabase.table(table).insert(record).execute()
+    except Exception as e:
+        # Recipe execution must continue even if audit fails
+        logger.error(f"❌ Failed to write {table} audit record: {e}", exc_info=True)
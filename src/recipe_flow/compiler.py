@@ -0,0 +1,165 @@
+"""
+Compiles a recipe into an immutable in-memory execution plan.
+
+Each valve, purge and loop step used to load its configuration with its own
+SELECT on valve_step_config, purge_step_config or loop_step_config. Step
+handlers also re-read recipe_id and current_overall_step from the database.
+Inside a 500-cycle loop that meant thousands of identical SELECTs and hundreds
+of ms between ALD pulses.
+
+compile_recipe() runs once before execution:
+
+- fetches the configs of all steps with one batched query per config table
+  (legacy inline parameters are used for steps without a config row, exactly
+  like the handlers' fallback)
+- resolves valve numbers to Modbus addresses through the PLC valve cache and
+  fails before the first step if a valve does not exist
+- precomputes loop counts, total steps/cycles and each step's overall
+  position
+
+The plan (src/recipe_flow/plan.py) is published with execution_plan(); step
+handlers read it through current_plan() and execute without configuration
+reads. Without a plan (e.g. a step run outside execute_recipe) they load
+their config as before.
+"""
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from src.log_setup import get_recipe_flow_logger
+from src.recipe_flow.plan import CompiledStep, ExecutionPlan
+from src.step_flow.loop_step import legacy_loop_count
+from src.step_flow.purge_step import legacy_purge_config
+from src.step_flow.valve_step import legacy_valve_config
+
+logger = get_recipe_flow_logger()
+
+# Step ids per IN (...) query - keeps the PostgREST URL short
+CONFIG_QUERY_CHUNK = 100
+
+
+def _fetch_configs(supabase, table: str, step_ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    configs: Dict[str, Dict[str, Any]] = {}
+    queries = 0
+    for i in range(0, len(step_ids), CONFIG_QUERY_CHUNK):
+        chunk = step_ids[i:i + CONFIG_QUERY_CHUNK]
+        result = supabase.table(table).select('*').in_('step_id', chunk).execute()
+        queries += 1
+        for row in result.data or []:
+            configs.setdefault(row['step_id'], row)
+    return configs, queries
+
+
+def _ids_of(steps: Iterable[dict], kind: str) -> List[str]:
+    return [s['id'] for s in steps if s.get('id') and s['type'].lower() == kind]
+
+
+def compile_recipe(process: Dict[str, Any], supabase,
+                   valve_cache: Optional[Mapping[int, Dict[str, Any]]] = None) -> ExecutionPlan:
+    """
+    Compile a process execution's recipe into an execution plan.
+
+    Args:
+        process: process_executions row (with recipe_version.steps)
+        supabase: Sync Supabase client
+        valve_cache: PLC valve cache (valve number -> {'address': ...}); when
+            non-empty, unknown valve numbers are rejected
+
+    Returns:
+        ExecutionPlan: The immutable plan
+
+    Raises:
+        ValueError: If a valve step refers to a valve the PLC does not know
+    """
+    all_steps = process['recipe_version']['steps']
+
+    valve_configs, valve_queries = _fetch_configs(supabase, 'valve_step_config', _ids_of(all_steps, 'valve'))
+    purge_configs, purge_queries = _fetch_configs(supabase, 'purge_step_config', _ids_of(all_steps, 'purge'))
+    loop_configs, loop_queries = _fetch_configs(supabase, 'loop_step_config', _ids_of(all_steps, 'loop'))
+
+    def compile_step(step: dict, overall_step: int, children: Tuple[CompiledStep, ...] = ()) -> CompiledStep:
+        step_id = step.get('id')
+        kind = step['type'].lower()
+        fields: Dict[str, Any] = {}
+        if kind == 'valve':
+            config = valve_configs.get(step_id)
+            if config:
+                valve_number, duration_ms = config['valve_number'], config['duration_ms']
+            else:
+                valve_number, duration_ms = legacy_valve_config(step)
+            address = None
+            if valve_cache:
+                valve_meta = valve_cache.get(valve_number)
+                if valve_meta is None:
+                    raise ValueError(
+                        f"Valve step '{step.get('name', 'Unknown')}' uses valve {valve_number}, "
+                        f"which is not in the PLC valve map (available: {sorted(valve_cache)})"
+                    )
+                address = valve_meta.get('address')
+            fields.update(valve_number=valve_number, duration_ms=duration_ms, modbus_address=address)
+        elif kind == 'purge':
+            config = purge_configs.get(step_id)
+            if config:
+                duration_ms, gas_type, flow_rate = config['duration_ms'], config['gas_type'], config['flow_rate']
+            else:
+                duration_ms, gas_type, flow_rate = legacy_purge_config(step)
+            fields.update(duration_ms=duration_ms, gas_type=gas_type, flow_rate=flow_rate)
+        elif kind == 'loop':
+            config = loop_configs.get(step_id)
+            loop_count = config['iteration_count'] if config else legacy_loop_count(step)
+            if loop_count < 1:
+                logger.warning(
+                    f"⚠️ Loop step '{step.get('name', 'Unknown')}' has invalid iteration_count {loop_count}. "
+                    f"Defaulting to 1."
+                )
+                loop_count = 1
+            fields.update(loop_count=loop_count)
+        return CompiledStep(
+            step_id=step_id,
+            name=step.get('name', ''),
+            type=step['type'],
+            sequence_number=step.get('sequence_number', 0),
+            parent_step_id=step.get('parent_step_id'),
+            parameters=MappingProxyType(dict(step.get('parameters') or {})),
+            overall_step=overall_step,
+            children=children,
+            **fields,
+        )
+
+    children_of: Dict[str, List[dict]] = {}
+    for step in all_steps:
+        if step.get('parent_step_id'):
+            children_of.setdefault(step['parent_step_id'], []).append(step)
+
+    top_level = sorted((s for s in all_steps if not s.get('parent_step_id')), key=lambda s: s['sequence_number'])
+    compiled_steps: List[CompiledStep] = []
+    by_id: Dict[str, CompiledStep] = {}
+    overall_step = 0
+    total_cycles = 0
+    for step in top_level:
+        child_rows = sorted(children_of.get(step.get('id'), []), key=lambda s: s['sequence_number'])
+        # Children report their loop's position, like current_overall_step does
+        children = tuple(compile_step(child, overall_step) for child in child_rows)
+        compiled = compile_step(step, overall_step, children)
+        compiled_steps.append(compiled)
+        for item in (compiled,) + children:
+            if item.step_id:
+                by_id[item.step_id] = item
+        overall_step += compiled.total_steps
+        if compiled.kind == 'loop':
+            total_cycles += compiled.loop_count
+
+    plan = ExecutionPlan(
+        process_id=process['id'],
+        recipe_id=process.get('recipe_id'),
+        steps=tuple(compiled_steps),
+        by_id=MappingProxyType(by_id),
+        total_steps=overall_step,
+        total_cycles=total_cycles,
+        config_queries=valve_queries + purge_queries + loop_queries,
+    )
+    logger.info(
+        f"🧩 Compiled recipe plan: {len(by_id)} steps, {plan.total_steps} step executions, "
+        f"{plan.total_cycles} cycles, {plan.config_queries} config queries"
+    )
+    return plan
+
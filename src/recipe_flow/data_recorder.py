@@ -12,8 +12,18 @@ async def record_process_data(process_id: str):
     Args:
         process_id: The ID of the current process execution
     """
+    record_process_data_sync(process_id, get_supabase())
+
+
+def record_process_data_sync(process_id: str, supabase):
+    """
+    Blocking body of record_process_data(); run it off the event loop.
+    
+    Args:
+        process_id: The ID of the current process execution
+        supabase: Sync Supabase client
+    """
     logger.info(f"Recording process data points for process {process_id}")
-    supabase = get_supabase()
     
     # 1. Get all active components for this machine
     components_result = supabase.table('machine_components').select('id').eq('machine_id', MACHINE_ID).eq('is_activated', True).execute()
@@ -0,0 +1,463 @@
+"""
+Virtual-clock recipe dry run and duration predictor.
+
+Before an operator commits a multi-hour, thousands-of-cycles recipe we want
+to know how long it takes, how hard each valve is driven and how many
+database and PLC operations it generates.
+
+dry_run_recipe() runs the real step engine (run_recipe_steps() and the
+loop/valve/purge/parameter handlers) with:
+
+- a VirtualClock: the step timeline and the progress publisher run on
+  simulated time, so pulses and purges take no real time
+- DryRunPLC: a no-op PLC that records valve edges and parameter writes
+- InMemorySupabase: serves a snapshot of the recipe, step configs and
+  parameters, and counts every query by table and operation
+
+Only get_supabase() / get_plc() of the dry run's own context are
+redirected, so a recipe running on the real machine is not affected. The
+completion path (machine state, continuous recorder) is not run.
+
+The report gives the predicted duration, valve duty cycles, operation counts,
+the step timeline and the wall time per step (step-engine overhead).
+
+    python -m src.recipe_flow.dry_run --recipe-id <id> [--timeline timeline.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict, field
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import MACHINE_ID
+from src.db import supabase_override
+from src.log_setup import get_recipe_flow_logger, get_step_flow_logger, logger as machine_logger
+from src.plc.context import plc_override
+from src.recipe_flow.audit_sink import AuditSink
+from src.recipe_flow.compiler import _fetch_configs, _ids_of, compile_recipe
+from src.recipe_flow.executor import run_recipe_steps
+from src.recipe_flow.progress_publisher import ProgressPublisher
+from src.recipe_flow.timeline import StepTimeline
+
+logger = get_recipe_flow_logger()
+
+
+class VirtualClock:
+    """Simulated monotonic clock; sleeping advances it instantly."""
+
+    def __init__(self, start: float = 0.0):
+        self.t = start
+
+    def __call__(self) -> float:
+        return self.t
+
+    async def sleep(self, seconds: float):
+        self.t += max(0.0, seconds)
+        await asyncio.sleep(0)
+
+
+class _InMemoryQuery:
+    """Minimal PostgREST-style query builder over InMemorySupabase tables."""
+
+    def __init__(self, db: 'InMemorySupabase', table: str):
+        self._db = db
+        self._table = table
+        self._op = 'select'
+        self._payload: Any = None
+        self._filters: List[Tuple[str, Any]] = []
+        self._order: Optional[Tuple[str, bool]] = None
+        self._limit: Optional[int] = None
+        self._single = False
+
+    def select(self, *args, **kwargs):
+        self._op = 'select'
+        return self
+
+    def insert(self, rows, **kwargs):
+        self._op, self._payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, **kwargs):
+        self._op, self._payload = 'upsert', rows
+        return self
+
+    def update(self, values):
+        self._op, self._payload = 'update', values
+        return self
+
+    def delete(self):
+        self._op = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self._filters.append((column, lambda v, value=value: v == value))
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self._filters.append((column, lambda v: v in values))
+        return self
+
+    def order(self, column, desc: bool = False, **kwargs):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(test(row.get(column)) for column, test in self._filters)
+
+    def execute(self):
+        self._db.operations[f'{self._table}.{self._op}'] += 1
+        rows = self._db.tables.setdefault(self._table, [])
+        if self._op == 'select':
+            data = [dict(row) for row in rows if self._matches(row)]
+            if self._order:
+                column, desc = self._order
+                data.sort(key=lambda row: row.get(column) or 0, reverse=desc)
+            if self._limit is not None:
+                data = data[:self._limit]
+        elif self._op == 'update':
+            data = []
+            for row in rows:
+                if self._matches(row):
+                    row.update(self._payload)
+                    data.append(dict(row))
+        elif self._op in ('insert', 'upsert'):
+            # Counted, not kept: a long run would otherwise hold every data point
+            data = list(self._payload) if isinstance(self._payload, list) else [self._payload]
+        else:
+            data = []
+        if self._single:
+            data = data[0] if data else None
+        return SimpleNamespace(data=data)
+
+
+class InMemorySupabase:
+    """
+    In-memory stand-in for the sync Supabase client.
+
+    Selects and updates work on the seeded tables; inserts are counted only.
+    """
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {
+            name: [dict(row) for row in rows] for name, rows in (tables or {}).items()
+        }
+        self.operations: Counter = Counter()
+
+    def table(self, name: str) -> _InMemoryQuery:
+        return _InMemoryQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _InMemoryQuery:
+        return _InMemoryQuery(self, f'rpc:{name}')
+
+
+@dataclass
+class ValveUsage:
+    """Pulses and total open time of one valve."""
+    pulses: int = 0
+    open_ms: float = 0.0
+
+
+class DryRunPLC:
+    """No-op PLC recording valve edges and parameter writes on the virtual clock."""
+
+    burst_capture = None
+
+    def __init__(self, clock: VirtualClock, valve_cache: Optional[Dict[int, Dict[str, Any]]] = None):
+        self._clock = clock
+        self._valve_cache = dict(valve_cache or {})
+        self._opened_at: Dict[int, float] = {}
+        self.connected = True
+        self.valves: Dict[int, ValveUsage] = {}
+        self.operations: Counter = Counter()
+
+    def _close(self, valve_number: int):
+        opened_at = self._opened_at.pop(valve_number, None)
+        if opened_at is not None:
+            self.valves[valve_number].open_ms += (self._clock() - opened_at) * 1000
+
+    async def control_valve(self, valve_number: int, state: bool, duration_ms: Optional[int] = None,
+                            auto_close: bool = True) -> bool:
+        self.operations['control_valve'] += 1
+        usage = self.valves.setdefault(valve_number, ValveUsage())
+        if not state:
+            self._close(valve_number)
+            return True
+        if valve_number not in self._opened_at:
+            self._opened_at[valve_number] = self._clock()
+            usage.pulses += 1
+        if auto_close and duration_ms:
+            await self._clock.sleep(duration_ms / 1000)
+            self._close(valve_number)
+        return True
+
+    async def write_parameter(self, parameter_id: str, value: float) -> bool:
+        self.operations['write_parameter'] += 1
+        return True
+
+    async def execute_purge(self, duration_ms: int) -> bool:
+        self.operations['execute_purge'] += 1
+        await self._clock.sleep(duration_ms / 1000)
+        return True
+
+
+@dataclass
+class DryRunReport:
+    """Result of a recipe dry run."""
+    recipe_id: Optional[str]
+    recipe_name: str
+    steps: int = 0
+    cycles: int = 0
+    planned_ms: float = 0.0
+    predicted_ms: float = 0.0
+    wall_ms: float = 0.0
+    engine_us_per_step: float = 0.0
+    valves: Dict[int, Dict[str, float]] = field(default_factory=dict)
+    db_operations: Dict[str, int] = field(default_factory=dict)
+    plc_operations: Dict[str, int] = field(default_factory=dict)
+    progress_writes: Dict[str, Any] = field(default_factory=dict)
+    timeline: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def db_reads(self) -> int:
+        return sum(n for op, n in self.db_operations.items() if op.endswith('.select'))
+
+    @property
+    def db_writes(self) -> int:
+        return sum(self.db_operations.values()) - self.db_reads
+
+
+# Minimum level of step-engine log records inside a dry run (None outside one)
+_dry_run_log_level: ContextVar[Optional[int]] = ContextVar('dry_run_log_level', default=None)
+
+
+class _DryRunLogFilter(logging.Filter):
+    """Drops low-level records logged from a dry run's context only."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        level = _dry_run_log_level.get()
+        return level is None or record.levelno >= level
+
+
+_dry_run_log_filter = _DryRunLogFilter()
+
+
+@contextmanager
+def _quiet_step_logs(level: int = logging.ERROR):
+    # Thousands of cycles would otherwise log tens of thousands of lines. The
+    # loggers are shared, so a recipe running for real in the same process
+    # (another context) keeps logging at its normal level.
+    for log in (machine_logger, get_recipe_flow_logger(), get_step_flow_logger()):
+        if _dry_run_log_filter not in log.filters:
+            log.addFilter(_dry_run_log_filter)
+    token = _dry_run_log_level.set(level)
+    try:
+        yield
+    finally:
+        _dry_run_log_level.reset(token)
+
+
+async def dry_run_recipe(recipe: Dict[str, Any], steps: List[Dict[str, Any]],
+                         tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                         valve_cache: Optional[Dict[int, Dict[str, Any]]] = None,
+                         keep_timeline: bool = False) -> DryRunReport:
+    """
+    Run a recipe on a virtual clock against a no-op PLC and an in-memory database.
+
+    Args:
+        recipe: recipes row (id, name)
+        steps: recipe_steps rows
+        tables: Snapshot rows by table (step configs, component_parameters,
+            machine_components)
+        valve_cache: Optional PLC valve map used to validate valve numbers
+        keep_timeline: Include every step timing in the report
+
+    Returns:
+        DryRunReport: Predicted duration, valve duty cycles and operation counts
+    """
+    process_id = f'dry-run-{uuid.uuid4()}'
+    process = {
+        'id': process_id,
+        'recipe_id': recipe.get('id'),
+        'recipe_version': {'id': recipe.get('id'), 'name': recipe.get('name', ''), 'steps': steps},
+    }
+    db = InMemorySupabase({
+        **(tables or {}),
+        'process_executions': [process],
+        'process_execution_state': [{'execution_id': process_id, 'progress': {}}],
+    })
+    clock = VirtualClock()
+    plc = DryRunPLC(clock, valve_cache)
+    report = DryRunReport(recipe_id=recipe.get('id'), recipe_name=recipe.get('name', ''))
+    timeline = StepTimeline(clock=clock, sleep=clock.sleep, spin_ms=0,
+                            max_records=None if keep_timeline else 0)
+    publisher = None
+    audit = AuditSink(db, clock=clock, inline=True, spill_dir=None)
+
+    started = time.perf_counter()
+    with supabase_override(db), plc_override(plc), _quiet_step_logs():
+        try:
+            plan = compile_recipe(process, db, valve_cache)
+            report.planned_ms = plan.planned_ms
+            publisher = ProgressPublisher(process_id, db, clock=clock, inline=True, progress={
+                'total_steps': plan.total_steps,
+                'completed_steps': 0,
+                'total_cycles': plan.total_cycles,
+                'completed_cycles': 0,
+            })
+            timeline.start(plan.planned_ms)
+            await run_recipe_steps(process_id, steps, plan, publisher, timeline, audit)
+        except Exception as e:
+            report.error = f"{type(e).__name__}: {e}"
+        finally:
+            if publisher is not None:
+                report.progress_writes = await publisher.close('dry-run')
+            await audit.close('dry-run')
+    report.wall_ms = (time.perf_counter() - started) * 1000
+
+    if publisher is not None:
+        report.steps = publisher.progress.get('completed_steps', 0)
+        report.cycles = publisher.progress.get('completed_cycles', 0)
+    report.predicted_ms = clock() * 1000
+    report.engine_us_per_step = report.wall_ms * 1000 / max(1, report.steps)
+    report.valves = {
+        number: {
+            'pulses': usage.pulses,
+            'open_ms': usage.open_ms,
+            'duty_cycle': usage.open_ms / report.predicted_ms if report.predicted_ms else 0.0,
+        }
+        for number, usage in sorted(plc.valves.items())
+    }
+    report.db_operations = dict(sorted(db.operations.items()))
+    report.plc_operations = dict(plc.operations)
+    report.timeline = [
+        {
+            'step_id': t.step_id, 'name': t.name, 'kind': t.kind, 'cycle': t.cycle,
+            'start_ms': t.actual_start * 1000, 'end_ms': t.actual_end * 1000,
+        }
+        for t in timeline.timings
+    ]
+    return report
+
+
+def load_recipe_snapshot(supabase, recipe_id: str, machine_id: Optional[str] = MACHINE_ID
+                         ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """
+    Read (only) what a dry run of a recipe needs from the database.
+
+    Returns:
+        Tuple of (recipe row, recipe_steps rows, snapshot tables)
+    """
+    recipe_result = supabase.table('recipes').select('*').eq('id', recipe_id).execute()
+    if not recipe_result.data:
+        raise ValueError(f"Recipe with ID {recipe_id} not found")
+    steps = supabase.table('recipe_steps').select('*').eq('recipe_id', recipe_id).order('sequence_number').execute().data
+    if not steps:
+        raise ValueError(f"Recipe {recipe_id} has no steps")
+
+    tables: Dict[str, List[Dict[str, Any]]] = {}
+    for table, kind in (('valve_step_config', 'valve'), ('purge_step_config', 'purge'), ('loop_step_config', 'loop')):
+        configs, _ = _fetch_configs(supabase, table, _ids_of(steps, kind))
+        tables[table] = list(configs.values())
+
+    parameters: Dict[str, Dict[str, Any]] = {}
+    parameter_ids = [
+        s['parameters']['parameter_id'] for s in steps
+        if s['type'].lower() == 'set parameter' and 'parameter_id' in (s.get('parameters') or {})
+    ]
+    if parameter_ids:
+        result = supabase.table('component_parameters').select('*').in_('id', parameter_ids).execute()
+        parameters.update({row['id']: row for row in result.data or []})
+    if machine_id:
+        # The progress publisher's process data samples read these
+        components = supabase.table('machine_components').select('*').eq('machine_id', machine_id).eq('is_activated', True).execute().data or []
+        tables['machine_components'] = components
+        if components:
+            result = supabase.table('component_parameters').select('*').in_('component_id', [c['id'] for c in components]).execute()
+            parameters.update({row['id']: row for row in result.data or []})
+    tables['component_parameters'] = list(parameters.values())
+    return recipe_result.data[0], steps, tables
+
+
+def _format_ms(ms: float) -> str:
+    seconds = ms / 1000
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{int(hours)}h {int(minutes):02d}m {seconds:06.3f}s"
+
+
+def format_report(report: DryRunReport) -> str:
+    """Human-readable dry-run summary."""
+    lines = [
+        f"Recipe: {report.recipe_name} ({report.recipe_id})",
+        f"Predicted duration: {_format_ms(report.predicted_ms)} "
+        f"({report.steps} steps, {report.cycles} cycles; planned pulses/purges {_format_ms(report.planned_ms)})",
+        f"Dry run wall time: {report.wall_ms:.1f}ms ({report.engine_us_per_step:.1f}us step-engine overhead per step)",
+        "Valves:",
+    ]
+    for number, usage in report.valves.items():
+        lines.append(
+            f"  valve {number}: {usage['pulses']} pulses, open {_format_ms(usage['open_ms'])}, "
+            f"duty cycle {usage['duty_cycle'] * 100:.2f}%"
+        )
+    lines.append(f"PLC operations: {sum(report.plc_operations.values())} {report.plc_operations}")
+    lines.append(f"DB operations: {report.db_reads} reads, {report.db_writes} writes")
+    for op, count in report.db_operations.items():
+        lines.append(f"  {op}: {count}")
+    if report.progress_writes:
+        lines.append(
+            f"Progress writes: {report.progress_writes['writes_performed']} "
+            f"(coalesced from {report.progress_writes['writes_requested']})"
+        )
+    if report.error:
+        lines.append(f"Dry run stopped with error: {report.error}")
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Predict a recipe's duration and operations without running it")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--recipe-id', help="Recipe to load (read-only) from the database")
+    source.add_argument('--recipe-file', help="JSON file with 'recipe', 'steps' and optional 'tables'")
+    parser.add_argument('--timeline', help="Write every step timing to this JSON file")
+    parser.add_argument('--json', action='store_true', help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.recipe_id:
+        from src.db import get_supabase
+        recipe, steps, tables = load_recipe_snapshot(get_supabase(), args.recipe_id)
+    else:
+        with open(args.recipe_file) as f:
+            data = json.load(f)
+        recipe, steps, tables = data.get('recipe', {}), data['steps'], data.get('tables', {})
+
+    report = asyncio.run(dry_run_recipe(recipe, steps, tables, keep_timeline=bool(args.timeline)))
+    if args.timeline:
+        with open(args.timeline, 'w') as f:
+            json.dump(report.timeline, f)
+    if args.json:
+        sys.stdout.write(json.dumps({**asdict(report), 'timeline': len(report.timeline)}, indent=2, default=str) + '\n')
+    else:
+        sys.stdout.write(format_report(report))
+    return 1 if report.error else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
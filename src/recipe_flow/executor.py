@@ -2,12 +2,20 @@
 Executes a recipe by processing its steps in sequence.
 """
 import asyncio
+from contextlib import nullcontext
+from typing import Optional
 from src.log_setup import get_recipe_flow_logger
 
 logger = get_recipe_flow_logger()
 from src.config import MACHINE_ID
 from src.db import get_supabase, get_current_timestamp
-from src.recipe_flow.data_recorder import record_process_data
+from src.recipe_flow.audit_sink import AuditSink, audit_sink
+from src.recipe_flow.compiler import compile_recipe
+from src.recipe_flow.plan import ExecutionPlan, execution_plan
+from src.recipe_flow.progress_publisher import ProgressPublisher, progress_publisher
+from src.recipe_flow.timeline import StepTimeline, step_timeline
+from src.config import RECIPE_STEP_TIMELINE
+from src.plc.context import get_plc
 from src.step_flow.executor import execute_step
 from src.recipe_flow.continuous_data_recorder import continuous_recorder
 from src.recipe_flow.cancellation import is_cancelled, clear as clear_cancel
@@ -81,6 +89,9 @@ async def execute_recipe(process_id: str):
     """
     logger.info(f"Starting execution of recipe process: {process_id}")
     supabase = get_supabase()
+    publisher = None
+    audit = None
+    timeline = None
     
     try:
         # 1. Get process execution record
@@ -92,115 +103,138 @@ async def execute_recipe(process_id: str):
         recipe_version = process['recipe_version']
         all_steps = recipe_version['steps']
         
-        # Calculate total steps including loop iterations
-        total_steps = 0
-        total_cycles = 0
-        for step in all_steps:
-            if step['type'].lower() == 'loop':
-                loop_count = get_loop_count_safe(step)  # Defensive: handles missing/invalid count
-                child_steps = [s for s in all_steps if s.get('parent_step_id') == step['id']]
-                total_steps += len(child_steps) * loop_count
-                total_cycles += loop_count
-            elif not step.get('parent_step_id'):  # Only count non-child steps
-                total_steps += 1
+        # Compile the recipe: batch-load step configs, resolve valves and
+        # precompute totals so step handlers do no configuration reads
+        plc = get_plc()
+        plan = compile_recipe(process, supabase, plc.get_valve_mapping() if plc is not None else None)
+        total_steps = plan.total_steps
+        total_cycles = plan.total_cycles
                 
-        # Initialize progress in process_execution_state
-        state_progress_update = {
-            'progress': {
-                'total_steps': total_steps,
-                'completed_steps': 0,
-                'total_cycles': total_cycles,
-                'completed_cycles': 0
-            },
-            'last_updated': 'now()'
-        }
-        supabase.table('process_execution_state').update(state_progress_update).eq('execution_id', process_id).execute()
-        
-        # 2. Build parent-child step map
-        parent_to_child_steps = await build_parent_child_step_map(all_steps)
+        # Initialize progress: kept in memory and published coalesced from here on
+        publisher = ProgressPublisher(process_id, supabase, progress={
+            'total_steps': total_steps,
+            'completed_steps': 0,
+            'total_cycles': total_cycles,
+            'completed_cycles': 0
+        })
+        publisher.start()
         
-        # 3. Get top-level steps (those without parent_step_id)
-        top_level_steps = [step for step in all_steps if not step.get('parent_step_id')]
-        top_level_steps.sort(key=lambda x: x['sequence_number'])
+        # Audit records are queued and bulk-inserted in the background
+        audit = AuditSink(supabase)
+        audit.start()
         
-        # 4. Execute top-level steps sequentially
-        overall_step_count = 0
-        for step_index, step in enumerate(top_level_steps):
-            # Cooperative cancellation
-            if is_cancelled(process_id):
-                logger.info(f"Process {process_id} cancelled before step {step_index}; exiting")
-                break
-            logger.info(f"Executing top-level step: {step['name']} (Type: {step['type']})")
-            
-            # Touch process record updated_at for activity
-            supabase.table('process_executions').update({
-                'updated_at': get_current_timestamp()
-            }).eq('id', process_id).execute()
-            
-            # Get current progress from process_execution_state
-            progress_result = supabase.table('process_execution_state').select('progress').eq('execution_id', process_id).execute()
-            current_progress = progress_result.data[0]['progress'] if progress_result.data else {'total_steps': total_steps, 'completed_steps': 0}
-            
-            # Update process execution state for current step
-            state_update = {
-                'current_step_index': step_index,
-                'current_step_type': step['type'],
-                'current_step_name': step.get('name', ''),
-                'current_overall_step': overall_step_count,
-                'progress': current_progress,
-                'last_updated': 'now()'
-            }
-            
-            # Add step-specific fields based on type
-            if step['type'].lower() == 'valve':
-                valve_params = step.get('parameters', {})
-                state_update['current_valve_number'] = valve_params.get('valve_number')
-                state_update['current_valve_duration_ms'] = valve_params.get('duration_ms')
-            elif step['type'].lower() == 'purge':
-                purge_params = step.get('parameters', {})
-                state_update['current_purge_duration_ms'] = purge_params.get('duration_ms')
-            elif step['type'].lower() == 'loop':
-                loop_params = step.get('parameters', {})
-                state_update['current_loop_count'] = loop_params.get('count')
-                state_update['current_loop_iteration'] = 0  # Will be updated by loop_step
-            
-            # Update the process execution state
-            state_result = supabase.table('process_execution_state').update(state_update).eq('execution_id', process_id).execute()
-            if not state_result.data:
-                logger.warning(f"Failed to update process_execution_state for step {step_index}")
-            
-            # Execute the step
-            if is_cancelled(process_id):
-                logger.info(f"Process {process_id} cancelled before executing step; exiting")
-                break
-            await execute_step(process_id, step, all_steps, parent_to_child_steps, overall_step_count)
-            
-            # Update step count based on step type
-            if step['type'].lower() == 'loop':
-                # Loop steps handle their own counting
-                loop_count = get_loop_count_safe(step)  # Defensive: handles missing/invalid count
-                child_steps = [s for s in all_steps if s.get('parent_step_id') == step['id']]
-                overall_step_count += len(child_steps) * loop_count
-            else:
-                overall_step_count += 1
-            
-            # Record data points after each step
-            await record_process_data(process_id)
+        # 2-4. Execute the steps, valve pulses and purges on absolute deadlines
+        if RECIPE_STEP_TIMELINE:
+            timeline = StepTimeline()
+            timeline.start(plan.planned_ms)
+        await run_recipe_steps(process_id, all_steps, plan, publisher, timeline, audit)
         
         # 5. Finalize
         if is_cancelled(process_id):
             # Stop recorder; leave DB status updates to stopper (already set to idle/aborted)
+            await publisher.close('aborted')
+            await audit.close('aborted')
             await continuous_recorder.stop()
             logger.info(f"Process {process_id} cancelled; finalizing without completion")
         else:
+            await publisher.close('completed')
+            await audit.close('completed')
             await complete_recipe(process_id)
 
     except Exception as e:
         logger.error(f"Error executing recipe: {str(e)}", exc_info=True)
+        if publisher is not None:
+            await publisher.close('error')
+        if audit is not None:
+            await audit.close('error')
         await handle_recipe_error(process_id, str(e))
     finally:
+        if timeline is not None:
+            timeline.log_summary(process_id)
         clear_cancel(process_id)
 
+async def run_recipe_steps(process_id: str, all_steps: list, plan: ExecutionPlan,
+                           publisher: ProgressPublisher, timeline: Optional[StepTimeline] = None,
+                           audit: Optional[AuditSink] = None):
+    """
+    Execute the steps of a compiled recipe in order.
+    
+    Shared by execute_recipe() and the dry run; completion and error handling
+    are left to the caller.
+    
+    Args:
+        process_id: The ID of the process execution record
+        all_steps: All recipe steps (process recipe_version steps)
+        plan: The compiled execution plan
+        publisher: Progress publisher of the run
+        timeline: Optional step timeline for deadline-driven pulses and purges
+        audit: Optional audit sink for batched audit records
+    """
+    # 2. Build parent-child step map
+    parent_to_child_steps = await build_parent_child_step_map(all_steps)
+    
+    # 3. Get top-level steps (those without parent_step_id)
+    top_level_steps = [step for step in all_steps if not step.get('parent_step_id')]
+    top_level_steps.sort(key=lambda x: x['sequence_number'])
+    
+    # 4. Execute top-level steps sequentially
+    overall_step_count = 0
+    for step_index, step in enumerate(top_level_steps):
+        # Cooperative cancellation
+        if is_cancelled(process_id):
+            logger.info(f"Process {process_id} cancelled before step {step_index}; exiting")
+            break
+        logger.info(f"Executing top-level step: {step['name']} (Type: {step['type']})")
+        
+        # Update process execution state for current step
+        state_update = {
+            'current_step_index': step_index,
+            'current_step_type': step['type'],
+            'current_step_name': step.get('name', ''),
+            'current_overall_step': overall_step_count,
+        }
+        
+        # Add step-specific fields based on type
+        compiled = plan.step(step.get('id'))
+        if step['type'].lower() == 'valve':
+            valve_params = step.get('parameters', {})
+            state_update['current_valve_number'] = compiled.valve_number if compiled else valve_params.get('valve_number')
+            state_update['current_valve_duration_ms'] = compiled.duration_ms if compiled else valve_params.get('duration_ms')
+        elif step['type'].lower() == 'purge':
+            purge_params = step.get('parameters', {})
+            state_update['current_purge_duration_ms'] = compiled.duration_ms if compiled else purge_params.get('duration_ms')
+        elif step['type'].lower() == 'loop':
+            loop_params = step.get('parameters', {})
+            state_update['current_loop_count'] = compiled.loop_count if compiled else loop_params.get('count')
+            state_update['current_loop_iteration'] = 0  # Will be updated by loop_step
+        
+        # Update the process execution state (and touch process record updated_at)
+        publisher.update(state_update)
+        
+        # Execute the step
+        if is_cancelled(process_id):
+            logger.info(f"Process {process_id} cancelled before executing step; exiting")
+            break
+        with execution_plan(plan), progress_publisher(publisher), \
+                (step_timeline(timeline) if timeline is not None else nullcontext()), \
+                (audit_sink(audit) if audit is not None else nullcontext()):
+            await execute_step(process_id, step, all_steps, parent_to_child_steps, overall_step_count)
+        
+        # Update step count based on step type
+        if compiled is not None:
+            # Loop steps count children x iterations (precomputed by the compiler)
+            overall_step_count += compiled.total_steps
+        elif step['type'].lower() == 'loop':
+            # Loop steps handle their own counting
+            loop_count = get_loop_count_safe(step)  # Defensive: handles missing/invalid count
+            child_steps = [s for s in all_steps if s.get('parent_step_id') == step['id']]
+            overall_step_count += len(child_steps) * loop_count
+        else:
+            overall_step_count += 1
+        
+        # Sample data points after each step (recorded by the publisher's next flush)
+        publisher.request_sample()
+
 async def build_parent_child_step_map(steps):
     """
     Build a map of parent steps to their child steps.
@@ -0,0 +1,93 @@
+"""
+Immutable execution plan of a recipe run and the context that exposes it.
+
+Built by src.recipe_flow.compiler.compile_recipe() and published to the step
+handlers with execution_plan() for the duration of execute_recipe().
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Tuple
+
+_current_plan: ContextVar[Optional['ExecutionPlan']] = ContextVar('recipe_execution_plan', default=None)
+
+
+@dataclass(frozen=True)
+class CompiledStep:
+    """A recipe step with its configuration resolved."""
+    step_id: Optional[str]
+    name: str
+    type: str
+    sequence_number: int
+    parent_step_id: Optional[str]
+    parameters: Mapping[str, Any]
+    # Overall step position (current_overall_step); loop children share their loop's
+    overall_step: int = 0
+    # Valve steps
+    valve_number: Optional[int] = None
+    duration_ms: Optional[int] = None
+    modbus_address: Optional[int] = None
+    # Purge steps (duration_ms above)
+    gas_type: Optional[str] = None
+    flow_rate: Optional[float] = None
+    # Loop steps
+    loop_count: Optional[int] = None
+    children: Tuple['CompiledStep', ...] = ()
+
+    @property
+    def kind(self) -> str:
+        return self.type.lower()
+
+    @property
+    def total_steps(self) -> int:
+        """Steps this step contributes to progress (children x iterations for loops)."""
+        if self.kind == 'loop':
+            return len(self.children) * (self.loop_count or 1)
+        return 1
+
+    @property
+    def planned_ms(self) -> int:
+        """Planned duration: valve pulse / purge width, children x iterations for loops."""
+        if self.kind == 'loop':
+            return sum(child.planned_ms for child in self.children) * (self.loop_count or 1)
+        if self.kind in ('valve', 'purge'):
+            return self.duration_ms or 0
+        return 0
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """Immutable execution plan of one process execution."""
+    process_id: str
+    recipe_id: Optional[str]
+    steps: Tuple[CompiledStep, ...]
+    by_id: Mapping[str, CompiledStep]
+    total_steps: int
+    total_cycles: int
+    config_queries: int
+
+    @property
+    def planned_ms(self) -> int:
+        """Planned duration of the whole run (valve pulses and purges)."""
+        return sum(step.planned_ms for step in self.steps)
+
+    def step(self, step_id: Optional[str]) -> Optional[CompiledStep]:
+        """Compiled step by id (None for steps without an id)."""
+        if step_id is None:
+            return None
+        return self.by_id.get(step_id)
+
+
+@contextmanager
+def execution_plan(plan: ExecutionPlan):
+    """Make a plan available to step handlers executed inside the block."""
+    token = _current_plan.set(plan)
+    try:
+        yield plan
+    finally:
+        _current_plan.reset(token)
+
+
+def current_plan() -> Optional[ExecutionPlan]:
+    """The plan of the recipe being executed, if any."""
+    return _current_plan.get()
@@ -0,0 +1,400 @@
+"""
+Coalesced publisher of recipe execution progress.
+
+Every loop child used to cost eight or more synchronous round-trips around a
+100 ms valve pulse: a SELECT of progress, updated_at touches of
+process_executions and four or five UPDATEs of process_execution_state, spread
+over the executor, the loop step and the step handlers.
+
+During execute_recipe() the in-memory ProgressPublisher is the source of truth
+for step state and progress counters. Handlers merge field changes into it and
+a background task publishes them as one process_execution_state UPDATE (plus
+one updated_at touch of process_executions) at most every
+PROGRESS_FLUSH_INTERVAL_MS. close() force-flushes on completion, error or
+abort and reports how many writes were saved.
+
+Process data points (record_process_data(), one machine_components SELECT,
+one component_parameters SELECT per component and the inserts) are sampled
+the same way: handlers call sample_process_data() after each step and the
+publisher records at most one sample per flush, off the event loop.
+
+With inline=True (virtual-clock dry runs) there is no background task: the
+same debounce is applied on the caller's clock whenever a change arrives.
+
+Handlers call publish_state() / advance_progress(); outside a running recipe
+(no publisher in context) these write directly as before.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional
+
+from src.config import PROGRESS_FLUSH_INTERVAL_MS
+from src.db import get_supabase, get_current_timestamp
+from src.log_setup import get_recipe_flow_logger
+from src.recipe_flow.data_recorder import record_process_data, record_process_data_sync
+
+logger = get_recipe_flow_logger()
+
+_current_publisher: ContextVar[Optional['ProgressPublisher']] = ContextVar('recipe_progress_publisher', default=None)
+
+
+@dataclass
+class ProgressPublisherMetrics:
+    """Metrics for coalesced progress publishing."""
+    writes_requested: int = 0
+    writes_performed: int = 0
+    writes_saved: int = 0
+    flushes: int = 0
+    forced_flushes: int = 0
+    write_errors: int = 0
+    samples_requested: int = 0
+    samples_recorded: int = 0
+    sample_errors: int = 0
+
+
+class ProgressPublisher:
+    """
+    In-memory execution state of one process, published debounced.
+
+    Usage:
+        publisher = ProgressPublisher(process_id, supabase, progress=initial)
+        publisher.start()
+        with progress_publisher(publisher):
+            ...  # handlers call publish_state() / advance_progress()
+        await publisher.close('completed')
+    """
+
+    def __init__(self, process_id: str, supabase, progress: Optional[Dict[str, int]] = None,
+                 flush_interval_ms: float = PROGRESS_FLUSH_INTERVAL_MS,
+                 clock: Callable[[], float] = time.monotonic, inline: bool = False):
+        """
+        Initialize the publisher.
+
+        Args:
+            process_id: process_executions / process_execution_state id
+            supabase: Sync Supabase client
+            progress: Initial progress counters (total/completed steps and cycles)
+            flush_interval_ms: Minimum interval between flushes
+            clock: Monotonic time source (seconds)
+            inline: Flush synchronously from update()/advance() on the clock
+                instead of from a background task (virtual-clock dry runs)
+        """
+        self.process_id = process_id
+        self.supabase = supabase
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._clock = clock
+        self.progress: Dict[str, int] = dict(progress or {})
+        self.state: Dict[str, Any] = {}
+        self._pending: Dict[str, Any] = {}
+        self._touch_pending = False
+        self._sample_pending = False
+        self._last_flush: Optional[float] = None
+        self.inline = inline
+        self._due_at: Optional[float] = None
+        self._dirty = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._inflight: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.metrics = ProgressPublisherMetrics()
+        if progress is not None:
+            self._pending['progress'] = dict(self.progress)
+            self.metrics.writes_requested += 1
+            self._changed()
+
+    def start(self):
+        """Start the background flush task."""
+        if self._task is None and not self.inline:
+            self._task = asyncio.create_task(self._run())
+
+    def update(self, fields: Dict[str, Any], touch: bool = True):
+        """
+        Merge process_execution_state field changes.
+
+        Args:
+            fields: Column -> value; later values for a column replace earlier ones
+            touch: Also refresh process_executions.updated_at
+        """
+        self._flush_due()
+        if fields:
+            self.state.update(fields)
+            self._pending.update(fields)
+            self.metrics.writes_requested += 1
+        if touch:
+            self._touch_pending = True
+            self.metrics.writes_requested += 1
+        self._changed()
+
+    def advance(self, deltas: Dict[str, int]):
+        """Add to progress counters (e.g. {'completed_steps': 1})."""
+        self._flush_due()
+        for key, delta in deltas.items():
+            self.progress[key] = self.progress.get(key, 0) + delta
+        self._pending['progress'] = dict(self.progress)
+        self.metrics.writes_requested += 1
+        self._changed()
+
+    def request_sample(self):
+        """Ask for a process data sample with the next flush."""
+        self._flush_due()
+        self._sample_pending = True
+        self.metrics.samples_requested += 1
+        self._changed()
+
+    def _changed(self):
+        if not self.inline:
+            self._dirty.set()
+            return
+        # Same timing as _run(): first change after a flush waits out the interval
+        now = self._clock()
+        if self._due_at is None:
+            self._due_at = now if self._last_flush is None else max(now, self._last_flush + self.flush_interval)
+        if self._due_at <= now:
+            self._flush_inline(now)
+
+    def _flush_due(self):
+        # Inline mode: publish changes whose flush time passed before this change
+        if self.inline and self._due_at is not None and self._due_at <= self._clock():
+            self._flush_inline(self._due_at)
+
+    def _flush_inline(self, at: float):
+        fields, touch = self._pending, self._touch_pending
+        self._pending, self._touch_pending = {}, False
+        self._due_at = None
+        writes = 0
+        try:
+            if fields:
+                self._write_state(fields)
+                writes += 1
+                fields = {}
+            if touch:
+                self._write_touch()
+                writes += 1
+                touch = False
+        except Exception as e:
+            self._requeue(fields, touch)
+            self.metrics.write_errors += 1
+            logger.warning(f"⚠️ Progress publish failed for process {self.process_id}: {e}")
+        if self._sample_pending:
+            self._sample_pending = False
+            self._record_sample(record_process_data_sync)
+        self._last_flush = at
+        self.metrics.flushes += 1
+        self.metrics.writes_performed += writes
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            if self._last_flush is not None:
+                delay = self._last_flush + self.flush_interval - self._clock()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self._dirty.clear()
+            await self.flush()
+            if self._pending or self._touch_pending:
+                # A failed write was requeued: retry after the interval, not on the next change
+                self._dirty.set()
+
+    def _write_state(self, fields: Dict[str, Any]):
+        self.supabase.table('process_execution_state').update(
+            {**fields, 'last_updated': 'now()'}
+        ).eq('execution_id', self.process_id).execute()
+
+    def _write_touch(self):
+        self.supabase.table('process_executions').update({
+            'updated_at': get_current_timestamp()
+        }).eq('id', self.process_id).execute()
+
+    def _record_sample(self, record: Callable):
+        # A failed sample is dropped: the next step requests a fresh one
+        try:
+            record(self.process_id, self.supabase)
+            self.metrics.samples_recorded += 1
+        except Exception as e:
+            self.metrics.sample_errors += 1
+            logger.warning(f"⚠️ Process data sample failed for process {self.process_id}: {e}")
+
+    async def _write(self, fn: Callable, *args):
+        if self.inline:
+            fn(*args)
+        else:
+            await asyncio.to_thread(fn, *args)
+
+    def _requeue(self, fields: Dict[str, Any], touch: bool):
+        # Keep what was not written; newer changes win on retry
+        self._pending = {**fields, **self._pending}
+        self._touch_pending = self._touch_pending or touch
+
+    async def flush(self, force: bool = False) -> int:
+        """
+        Publish pending changes now.
+
+        Args:
+            force: Count as a forced flush (completion, error, abort)
+
+        Returns:
+            int: Number of writes performed
+        """
+        async with self._flush_lock:
+            # Cancelling a flush (close()) releases the lock but not its worker
+            # thread: a stale UPDATE must land before the next one, never after
+            if self._inflight is not None and not self._inflight.done():
+                await asyncio.wait({self._inflight})
+            fields, touch, sample = self._pending, self._touch_pending, self._sample_pending
+            self._pending, self._touch_pending, self._sample_pending = {}, False, False
+            if not fields and not touch and not sample:
+                return 0
+            self._due_at = None
+            if self.inline:
+                return await self._publish(fields, touch, sample, force)
+            self._inflight = asyncio.create_task(self._publish(fields, touch, sample, force))
+            return await asyncio.shield(self._inflight)
+
+    async def _publish(self, fields: Dict[str, Any], touch: bool, sample: bool, force: bool) -> int:
+        """Write one flush; requeues what failed."""
+        writes = 0
+        try:
+            if fields:
+                await self._write(self._write_state, fields)
+                writes += 1
+                fields = {}
+            if touch:
+                await self._write(self._write_touch)
+                writes += 1
+                touch = False
+        except Exception as e:
+            self._requeue(fields, touch)
+            self.metrics.write_errors += 1
+            logger.warning(f"⚠️ Progress publish failed for process {self.process_id}: {e}")
+        if sample:
+            await self._write(self._record_sample, record_process_data_sync)
+        self._last_flush = self._clock()
+        self.metrics.flushes += 1
+        if force:
+            self.metrics.forced_flushes += 1
+        self.metrics.writes_performed += writes
+        return writes
+
+    async def close(self, reason: str) -> Dict[str, Any]:
+        """
+        Stop the flush task and force-flush the final state.
+
+        Args:
+            reason: Why the run ended ('completed', 'error', 'aborted')
+
+        Returns:
+            Dict: Publisher metrics
+        """
+        if self._closed:
+            return self.get_metrics()
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush(force=True)
+        metrics = self.get_metrics()
+        logger.info(
+            f"📉 Progress publisher ({reason}) for process {self.process_id}: "
+            f"{metrics['writes_performed']} writes instead of {metrics['writes_requested']} "
+            f"({metrics['writes_saved']} saved)"
+        )
+        return metrics
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return requested vs performed write counts."""
+        self.metrics.writes_saved = max(0, self.metrics.writes_requested - self.metrics.writes_performed)
+        return asdict(self.metrics)
+
+
+@contextmanager
+def progress_publisher(publisher: ProgressPublisher):
+    """Route publish_state() / advance_progress() inside the block to a publisher."""
+    token = _current_publisher.set(publisher)
+    try:
+        yield publisher
+    finally:
+        _current_publisher.reset(token)
+
+
+def current_progress_publisher() -> Optional[ProgressPublisher]:
+    """The publisher of the recipe being executed, if any."""
+    return _current_publisher.get()
+
+
+def _publisher_for(process_id: str) -> Optional[ProgressPublisher]:
+    publisher = _current_publisher.get()
+    if publisher is not None and publisher.process_id == process_id:
+        return publisher
+    return None
+
+
+def publish_state(process_id: str, fields: Optional[Dict[str, Any]] = None, touch: bool = True, supabase=None):
+    """
+    Record step state for a process execution.
+
+    Args:
+        process_id: The ID of the process execution
+        fields: process_execution_state columns to set
+        touch: Also refresh process_executions.updated_at
+        supabase: Client for the direct write when no publisher is active
+    """
+    publisher = _publisher_for(process_id)
+    if publisher is not None:
+        publisher.update(fields or {}, touch)
+        return
+    supabase = supabase or get_supabase()
+    if touch:
+        supabase.table('process_executions').update({
+            'updated_at': get_current_timestamp()
+        }).eq('id', process_id).execute()
+    if fields:
+        supabase.table('process_execution_state').update(
+            {**fields, 'last_updated': 'now()'}
+        ).eq('execution_id', process_id).execute()
+
+
+async def sample_process_data(process_id: str):
+    """
+    Record process data points after a step.
+
+    With a publisher active the sample is taken by the publisher's next
+    flush, off the step path; otherwise it is recorded now.
+
+    Args:
+        process_id: The ID of the process execution
+    """
+    publisher = _publisher_for(process_id)
+    if publisher is not None:
+        publisher.request_sample()
+        return
+    await record_process_data(process_id)
+
+
+def advance_progress(process_id: str, deltas: Dict[str, int], supabase=None):
+    """
+    Add to the progress counters of a process execution.
+
+    Args:
+        process_id: The ID of the process execution
+        deltas: Counter -> increment (e.g. {'completed_steps': 1})
+        supabase: Client for the direct read-modify-write when no publisher is active
+    """
+    publisher = _publisher_for(process_id)
+    if publisher is not None:
+        publisher.advance(deltas)
+        return
+    supabase = supabase or get_supabase()
+    state_result = supabase.table('process_execution_state').select('progress').eq('execution_id', process_id).single().execute()
+    progress = dict(state_result.data['progress'] or {}) if state_result.data else {}
+    for key, delta in deltas.items():
+        progress[key] = progress.get(key, 0) + delta
+    supabase.table('process_execution_state').update({
+        'progress': progress,
+        'last_updated': 'now()'
+    }).eq('execution_id', process_id).execute()
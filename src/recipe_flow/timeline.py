@@ -0,0 +1,269 @@
+"""
+Deadline-driven step timeline for ALD cycles.
+
+execute_valve_step used to return as soon as control_valve had scheduled the
+auto-close, and purges waited for their duration from whenever the previous
+step's database calls happened to finish. Step boundaries, and with them the
+real pulse and purge widths, drifted from cycle to cycle.
+
+StepTimeline gives every valve pulse and purge an absolute monotonic start
+and end deadline, taken in plan order from the start of the run:
+
+- A pulse opens the valve at its start deadline and closes it at its end
+  deadline, but never less than the requested width after the open write
+  completed; the step returns once the valve is closed. A purge waits until
+  its end deadline.
+- The next step starts at the previous step's end deadline, so handler
+  overhead and sleep overshoot are absorbed instead of accumulated.
+- A step that starts more than slip_threshold_ms late (e.g. a stalled
+  database call) is not shortened: the rest of the timeline is shifted and
+  the slip is recorded.
+
+Achieved-vs-planned timing is recorded per step and cycle; summary() reports
+p50/p99 start, width and cycle errors at the end of the run.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from src.config import RECIPE_TIMELINE_SLIP_MS
+from src.log_setup import get_recipe_flow_logger
+
+logger = get_recipe_flow_logger()
+
+_current_timeline: ContextVar[Optional['StepTimeline']] = ContextVar('recipe_step_timeline', default=None)
+
+
+@dataclass
+class StepTiming:
+    """Planned and achieved timing of one step (monotonic seconds)."""
+    step_id: Optional[str]
+    name: str
+    kind: str
+    cycle: Optional[int]
+    planned_start: float
+    planned_end: float
+    actual_start: float
+    actual_end: float
+
+    @property
+    def start_error_ms(self) -> float:
+        return (self.actual_start - self.planned_start) * 1000
+
+    @property
+    def width_error_ms(self) -> float:
+        return ((self.actual_end - self.actual_start) - (self.planned_end - self.planned_start)) * 1000
+
+
+@dataclass
+class TimelineMetrics:
+    """Metrics for the deadline-driven step timeline."""
+    steps: int = 0
+    cycles: int = 0
+    slips: int = 0
+    slipped_ms: float = 0.0
+    planned_ms: float = 0.0
+    elapsed_ms: float = 0.0
+
+
+def _percentiles(values: Iterable[float]) -> Dict[str, float]:
+    ordered = sorted(abs(v) for v in values)
+    if not ordered:
+        return {'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+
+    def rank(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+    return {'p50_ms': rank(0.5), 'p99_ms': rank(0.99), 'max_ms': ordered[-1]}
+
+
+class StepTimeline:
+    """
+    Absolute step deadlines for one recipe run.
+
+    Usage:
+        timeline = StepTimeline()
+        timeline.start(plan.planned_ms)
+        with step_timeline(timeline):
+            ...  # valve/purge handlers call run_pulse() / run_wait()
+        logger.info(timeline.summary())
+    """
+
+    def __init__(self, slip_threshold_ms: float = RECIPE_TIMELINE_SLIP_MS,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+                 spin_ms: float = 1.0, max_records: Optional[int] = 10000):
+        """
+        Initialize the timeline.
+
+        Args:
+            slip_threshold_ms: Lateness at step start beyond which the timeline shifts
+            clock: Monotonic time source (seconds)
+            sleep: Async sleep used to wait for deadlines
+            spin_ms: Final stretch before a deadline waited by yielding instead of sleeping
+            max_records: Step and cycle timings kept for the summary (None keeps all)
+        """
+        self.slip_threshold = slip_threshold_ms / 1000.0
+        self._clock = clock
+        self._sleep = sleep
+        self.spin = spin_ms / 1000.0
+        self._started_at: Optional[float] = None
+        self._cursor = 0.0
+        self._cycle: Optional[int] = None
+        self.timings: Deque[StepTiming] = deque(maxlen=max_records)
+        self.cycle_errors_ms: Deque[float] = deque(maxlen=max_records)
+        self.metrics = TimelineMetrics()
+
+    def now(self) -> float:
+        return self._clock()
+
+    def start(self, planned_ms: float = 0.0):
+        """Anchor the timeline at the current instant."""
+        self._started_at = self._cursor = self._clock()
+        self.metrics.planned_ms = planned_ms
+
+    def _reserve(self, duration_ms: float) -> Tuple[float, float]:
+        if self._started_at is None:
+            self.start()
+        lateness = self._clock() - self._cursor
+        if lateness > self.slip_threshold:
+            self._cursor += lateness
+            self.metrics.slips += 1
+            self.metrics.slipped_ms += lateness * 1000
+        start = self._cursor
+        self._cursor = start + max(0.0, duration_ms) / 1000.0
+        return start, self._cursor
+
+    async def wait_until(self, deadline: float, cancelled: Optional[Callable[[], bool]] = None,
+                         poll_interval: float = 0.2) -> bool:
+        """
+        Wait for a monotonic deadline.
+
+        Args:
+            deadline: Monotonic time (seconds)
+            cancelled: Optional check polled every poll_interval
+            poll_interval: Maximum sleep between cancellation checks
+
+        Returns:
+            bool: True when the deadline was reached, False if cancelled
+        """
+        while True:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return True
+            if cancelled is not None and cancelled():
+                return False
+            if remaining > self.spin:
+                step = remaining - self.spin
+                await self._sleep(step if cancelled is None else min(poll_interval, step))
+            else:
+                await self._sleep(0)
+
+    def _record(self, step_id, name, kind, planned: Tuple[float, float], actual: Tuple[float, float]):
+        self.timings.append(StepTiming(step_id, name, kind, self._cycle, planned[0], planned[1], actual[0], actual[1]))
+        self.metrics.steps += 1
+
+    async def run_pulse(self, open_fn: Callable[[], Awaitable[bool]], close_fn: Callable[[], Awaitable[bool]],
+                        duration_ms: float, step_id: Optional[str] = None, name: str = '',
+                        kind: str = 'valve') -> bool:
+        """
+        Open at the next start deadline, close at its end deadline.
+
+        Args:
+            open_fn: Opens the valve (without auto-close)
+            close_fn: Closes the valve
+            duration_ms: Planned pulse width
+            step_id / name / kind: Recorded with the timing
+
+        Returns:
+            bool: True if both edges were written
+        """
+        planned = self._reserve(duration_ms)
+        await self.wait_until(planned[0])
+        if not await open_fn():
+            return False
+        opened = self._clock()
+        # Never shorter than requested: a start late by less than the slip
+        # threshold, or a slow open write, moves the close deadline instead of
+        # coming out of the pulse (the following step absorbs the difference)
+        close_at = max(planned[1], opened + max(0.0, duration_ms) / 1000.0)
+        try:
+            await self.wait_until(close_at)
+        finally:
+            # Never leave the valve open, even if the run is torn down mid-pulse
+            closed_ok = await close_fn()
+        self._record(step_id, name, kind, planned, (opened, self._clock()))
+        return closed_ok
+
+    async def run_wait(self, duration_ms: float, cancelled: Optional[Callable[[], bool]] = None,
+                       step_id: Optional[str] = None, name: str = '', kind: str = 'purge') -> bool:
+        """
+        Wait out a timed step (e.g. purge) until its end deadline.
+
+        Returns:
+            bool: True when the step ran to its deadline, False if cancelled
+        """
+        planned = self._reserve(duration_ms)
+        if not await self.wait_until(planned[0], cancelled):
+            return False
+        begun = self._clock()
+        if not await self.wait_until(planned[1], cancelled):
+            return False
+        self._record(step_id, name, kind, planned, (begun, self._clock()))
+        return True
+
+    def begin_cycle(self, cycle: int):
+        """Tag following steps with a loop iteration (1-based)."""
+        self._cycle = cycle
+
+    def end_cycle(self):
+        """Record how far the end of the cycle is from its planned end."""
+        if self._cycle is None:
+            return
+        self.cycle_errors_ms.append((self._clock() - self._cursor) * 1000)
+        self.metrics.cycles += 1
+        self._cycle = None
+
+    def summary(self) -> Dict[str, Any]:
+        """Return timing metrics and p50/p99 jitter of step starts, widths and cycle ends."""
+        if self._started_at is not None:
+            self.metrics.elapsed_ms = (self._clock() - self._started_at) * 1000
+        return {
+            **asdict(self.metrics),
+            'start_error': _percentiles(t.start_error_ms for t in self.timings),
+            'width_error': _percentiles(t.width_error_ms for t in self.timings),
+            'cycle_error': _percentiles(self.cycle_errors_ms),
+        }
+
+    def log_summary(self, process_id: str) -> Dict[str, Any]:
+        """Log the end-of-run timing report."""
+        summary = self.summary()
+        if summary['steps']:
+            logger.info(
+                f"⏱️ Step timeline for process {process_id}: {summary['steps']} timed steps, "
+                f"{summary['cycles']} cycles, {summary['elapsed_ms']:.0f}ms elapsed "
+                f"(planned {summary['planned_ms']:.0f}ms, {summary['slips']} slips / {summary['slipped_ms']:.0f}ms); "
+                f"start error p50={summary['start_error']['p50_ms']:.2f}ms p99={summary['start_error']['p99_ms']:.2f}ms, "
+                f"width error p50={summary['width_error']['p50_ms']:.2f}ms p99={summary['width_error']['p99_ms']:.2f}ms, "
+                f"cycle error p50={summary['cycle_error']['p50_ms']:.2f}ms p99={summary['cycle_error']['p99_ms']:.2f}ms"
+            )
+        return summary
+
+
+@contextmanager
+def step_timeline(timeline: StepTimeline):
+    """Make a timeline available to step handlers executed inside the block."""
+    token = _current_timeline.set(timeline)
+    try:
+        yield timeline
+    finally:
+        _current_timeline.reset(token)
+
+
+def current_timeline() -> Optional[StepTimeline]:
+    """The timeline of the recipe being executed, if any."""
+    return _current_timeline.get()
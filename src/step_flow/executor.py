@@ -4,7 +4,7 @@ Executes recipe steps based on their type.
 from src.log_setup import get_step_flow_logger
 
 logger = get_step_flow_logger()
-from src.db import get_supabase
+from src.recipe_flow.progress_publisher import advance_progress
 from src.step_flow.loop_step import execute_loop_step
 from src.step_flow.purge_step import execute_purge_step
 from src.step_flow.valve_step import execute_valve_step
@@ -27,12 +27,6 @@ async def execute_step(process_id: str, step: dict, all_steps: list, parent_to_c
     logger.info(f"Executing step '{step_name}' of type '{step_type}'")
     
     try:
-        # Get current progress for non-loop steps from process_execution_state
-        if step_type != 'loop':
-            supabase = get_supabase()
-            state_result = supabase.table('process_execution_state').select('progress').eq('execution_id', process_id).single().execute()
-            current_progress = state_result.data['progress'] if state_result.data else {'total_steps': 0, 'completed_steps': 0}
-        
         # Route to appropriate step handler based on step type
         if step_type == 'loop':
             await execute_loop_step(process_id, step, all_steps, parent_to_child_steps)
@@ -70,15 +64,7 @@ async def execute_step(process_id: str, step: dict, all_steps: list, parent_to_c
         
         # Update completed steps for non-loop steps (loop steps handle their own counts)
         if step_type != 'loop':
-            current_progress['completed_steps'] += 1
-            supabase = get_supabase()
-            
-            # Update process_execution_state progress only
-            state_update = {
-                'progress': current_progress,
-                'last_updated': 'now()'
-            }
-            supabase.table('process_execution_state').update(state_update).eq('execution_id', process_id).execute()
+            advance_progress(process_id, {'completed_steps': 1})
         
     except Exception as e:
         logger.error(f"Error executing step '{step_name}': {str(e)}", exc_info=True)
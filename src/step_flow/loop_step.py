@@ -2,8 +2,47 @@
 Executes loop steps in a recipe.
 """
 from src.log_setup import logger
-from src.db import get_supabase, get_current_timestamp
-from src.recipe_flow.data_recorder import record_process_data
+from src.db import get_supabase
+from src.recipe_flow.plan import current_plan
+from src.recipe_flow.progress_publisher import advance_progress, publish_state, sample_process_data
+from src.recipe_flow.timeline import current_timeline
+
+def legacy_loop_count(step: dict) -> int:
+    """
+    Iteration count from the step parameters (pre loop_step_config schema).
+
+    Args:
+        step: The step data including parameters
+
+    Returns:
+        int: Loop count (defaults to 1 if missing/invalid)
+    """
+    parameters = step.get('parameters', {})
+    
+    # Defensive: Handle missing or invalid count parameter
+    if 'count' not in parameters:
+        logger.warning(
+            f"⚠️ Loop step '{step.get('name', 'Unknown')}' missing 'count' parameter. "
+            f"Defaulting to 1 iteration."
+        )
+        loop_count = 1
+    else:
+        try:
+            loop_count = int(parameters['count'])
+            if loop_count < 1:
+                logger.warning(
+                    f"⚠️ Loop step '{step.get('name', 'Unknown')}' has invalid count "
+                    f"{loop_count}. Defaulting to 1."
+                )
+                loop_count = 1
+        except (ValueError, TypeError):
+            logger.warning(
+                f"⚠️ Loop step '{step.get('name', 'Unknown')}' has non-numeric count "
+                f"'{parameters.get('count')}'. Defaulting to 1."
+            )
+            loop_count = 1
+
+    return loop_count
 
 async def execute_loop_step(process_id: str, step: dict, all_steps: list, parent_to_child_steps: dict):
     """
@@ -17,40 +56,23 @@ async def execute_loop_step(process_id: str, step: dict, all_steps: list, parent
     """
     supabase = get_supabase()
     step_id = step['id']
+    plan = current_plan()
+    compiled = plan.step(step_id) if plan else None
     
-    # Load loop configuration from loop_step_config table
-    result = supabase.table('loop_step_config').select('*').eq('step_id', step_id).execute()
-    loop_config = result.data[0] if result.data else None
-    
-    if not loop_config:
-        # Fallback to old method for backwards compatibility
-        parameters = step.get('parameters', {})
+    if compiled is not None:
+        # Resolved by the recipe compiler - no config read
+        loop_count = compiled.loop_count
+    else:
+        # Load loop configuration from loop_step_config table
+        result = supabase.table('loop_step_config').select('*').eq('step_id', step_id).execute()
+        loop_config = result.data[0] if result.data else None
         
-        # Defensive: Handle missing or invalid count parameter
-        if 'count' not in parameters:
-            logger.warning(
-                f"⚠️ Loop step '{step.get('name', 'Unknown')}' missing 'count' parameter. "
-                f"Defaulting to 1 iteration."
-            )
-            loop_count = 1
+        if not loop_config:
+            # Fallback to old method for backwards compatibility
+            loop_count = legacy_loop_count(step)
         else:
-            try:
-                loop_count = int(parameters['count'])
-                if loop_count < 1:
-                    logger.warning(
-                        f"⚠️ Loop step '{step.get('name', 'Unknown')}' has invalid count "
-                        f"{loop_count}. Defaulting to 1."
-                    )
-                    loop_count = 1
-            except (ValueError, TypeError):
-                logger.warning(
-                    f"⚠️ Loop step '{step.get('name', 'Unknown')}' has non-numeric count "
-                    f"'{parameters.get('count')}'. Defaulting to 1."
-                )
-                loop_count = 1
-    else:
-        # Use new loop_step_config table
-        loop_count = loop_config['iteration_count']
+            # Use new loop_step_config table
+            loop_count = loop_config['iteration_count']
     
     # Get child steps for this loop
     child_steps = parent_to_child_steps.get(step_id, [])
@@ -62,57 +84,33 @@ async def execute_loop_step(process_id: str, step: dict, all_steps: list, parent
     steps_per_iteration = len(child_steps)
     total_loop_steps = steps_per_iteration * loop_count
     
-    # Get current progress from process_execution_state
-    state_result = supabase.table('process_execution_state').select('progress').eq('execution_id', process_id).single().execute()
-    current_progress = state_result.data['progress'] if state_result.data else {'total_steps': 0, 'completed_steps': 0, 'total_cycles': 0, 'completed_cycles': 0}
-    
-    # Update total steps to include all iterations
-    updated_progress = {
-        'total_steps': current_progress['total_steps'] + total_loop_steps,
-        'completed_steps': current_progress['completed_steps'],
-        'total_cycles': current_progress['total_cycles'] + loop_count,
-        'completed_cycles': current_progress['completed_cycles']
-    }
-    
-    # Update process_execution_state with new totals
-    supabase.table('process_execution_state').update({
-        'progress': updated_progress,
-        'last_updated': 'now()'
-    }).eq('execution_id', process_id).execute()
+    # Update total steps to include all iterations (compiled plans already count them)
+    if compiled is None:
+        advance_progress(process_id, {'total_steps': total_loop_steps, 'total_cycles': loop_count}, supabase)
     
     # Execute child steps for the specified number of iterations
+    timeline = current_timeline()
     for iteration in range(loop_count):
         logger.info(f"Executing loop iteration {iteration + 1}/{loop_count}")
-        
-        # Update only basic fields in process_executions
-        supabase.table('process_executions').update({
-            'updated_at': get_current_timestamp()
-        }).eq('id', process_id).execute()
+        if timeline is not None:
+            timeline.begin_cycle(iteration + 1)
         
         # Update process_execution_state for loop iteration
-        state_update = {
+        publish_state(process_id, {
             'current_step_type': 'loop',
             'current_step_name': step['name'],
             'current_loop_iteration': iteration + 1,
             'current_loop_count': loop_count,
-            'last_updated': 'now()'
-        }
-        supabase.table('process_execution_state').update(state_update).eq('execution_id', process_id).execute()
+        }, supabase=supabase)
         
         # Execute each child step in sequence
         for child_step in child_steps:
             logger.info(f"Executing child step {child_step['name']} (Type: {child_step['type']})")
             
-            # Touch process record updated_at for activity
-            supabase.table('process_executions').update({
-                'updated_at': get_current_timestamp()
-            }).eq('id', process_id).execute()
-            
             # Update process_execution_state for child step
             child_state_update = {
                 'current_step_type': child_step['type'],
                 'current_step_name': child_step['name'],
-                'last_updated': 'now()'
             }
             
             # Add specific fields based on child step type
@@ -124,7 +122,7 @@ async def execute_loop_step(process_id: str, step: dict, all_steps: list, parent
                 purge_params = child_step.get('parameters', {})
                 child_state_update['current_purge_duration_ms'] = purge_params.get('duration_ms')
             
-            supabase.table('process_execution_state').update(child_state_update).eq('execution_id', process_id).execute()
+            publish_state(process_id, child_state_update, supabase=supabase)
             
             # Execute the step based on its type
             step_type = child_step['type'].lower()
@@ -132,6 +130,7 @@ async def execute_loop_step(process_id: str, step: dict, all_steps: list, parent
             if step_type == 'purge':
                 from src.step_flow.purge_step import execute_purge_step
                 purge_step = {
+                    'id': child_step.get('id'),
                     'type': 'purging',
                     'name': child_step['name'],
                     'parameters': child_step['parameters']
@@ -154,31 +153,15 @@ async def execute_loop_step(process_id: str, step: dict, all_steps: list, parent
                 from src.step_flow.parameter_step import execute_parameter_step
                 await execute_parameter_step(process_id, child_step)
             
-            # Record data points after each step execution
-            await record_process_data(process_id)
+            # Sample data points after each step (off the step path with a publisher)
+            await sample_process_data(process_id)
             
             # Update completed steps count in process_execution_state
-            current_progress['completed_steps'] += 1
-            supabase.table('process_execution_state').update({
-                'progress': current_progress,
-                'last_updated': 'now()'
-            }).eq('execution_id', process_id).execute()
-            
-            # Also update process_execution_state progress
-            state_progress_update = {
-                'progress': {
-                    'total_steps': current_progress.get('total_steps', 0),
-                    'completed_steps': current_progress['completed_steps']
-                },
-                'last_updated': 'now()'
-            }
-            supabase.table('process_execution_state').update(state_progress_update).eq('execution_id', process_id).execute()
+            advance_progress(process_id, {'completed_steps': 1}, supabase)
             
         # Update completed cycles count in process_execution_state
-        current_progress['completed_cycles'] += 1
-        supabase.table('process_execution_state').update({
-            'progress': current_progress,
-            'last_updated': 'now()'
-        }).eq('execution_id', process_id).execute()
+        advance_progress(process_id, {'completed_cycles': 1}, supabase)
+        if timeline is not None:
+            timeline.end_cycle()
             
     logger.info(f"Loop step completed after {loop_count} iterations")
@@ -1,12 +1,13 @@
 """
 Executes parameter setting steps in a recipe and handles parameter set commands.
 """
-import asyncio
 import os
 import uuid
 from src.log_setup import logger
 from src.db import get_supabase, get_current_timestamp
 from src.plc.context import get_plc
+from src.recipe_flow.audit_sink import submit_audit
+from src.recipe_flow.progress_publisher import publish_state
 
 
 async def execute_parameter_step(process_id: str, step: dict):
@@ -33,27 +34,13 @@ async def execute_parameter_step(process_id: str, step: dict):
     parameter_id = parameters['parameter_id']
     parameter_value = parameters['value']
     
-    supabase = get_supabase()
-    
-    # Get current progress from process_execution_state
-    state_result = supabase.table('process_execution_state').select('progress').eq('execution_id', process_id).single().execute()
-    current_progress = state_result.data['progress'] if state_result.data else {}
-    
-    # Update only basic fields in process_executions
-    supabase.table('process_executions').update({
-        'updated_at': get_current_timestamp()
-    }).eq('id', process_id).execute()
-    
-    # Update process_execution_state
-    state_update = {
+    # Touch process_executions and update process_execution_state (coalesced while a recipe runs)
+    publish_state(process_id, {
         'current_step_type': 'set_parameter',
         'current_step_name': step['name'],
         'current_parameter_id': parameter_id,
         'current_parameter_value': parameter_value,
-        'progress': current_progress,
-        'last_updated': 'now()'
-    }
-    supabase.table('process_execution_state').update(state_update).eq('execution_id', process_id).execute()
+    })
     
     # Set the parameter to the specified value
     await set_parameter_value(parameter_id, parameter_value)
@@ -130,39 +117,34 @@ async def set_parameter_value(parameter_id, parameter_value):
     
     logger.info(f"Parameter {parameter_id} set successfully to {parameter_value}")
 
-    # 5. Audit log the parameter write (non-blocking background task)
-    asyncio.create_task(_audit_log_parameter_write(parameter_id, parameter_value))
+    # 5. Audit log the parameter write (queued on the recipe's audit sink)
+    _audit_log_parameter_write(parameter_id, parameter_value, supabase)
 
     return result.data[0]
 
 
-async def _audit_log_parameter_write(parameter_id: str, parameter_value: float):
+def _audit_log_parameter_write(parameter_id: str, parameter_value: float, supabase=None):
     """
-    Background task to log parameter write to audit trail.
-    Runs asynchronously to avoid blocking recipe execution.
-    Failures are logged but do not propagate.
+    Log a parameter write to the audit trail.
+    Queued for the batched insert while a recipe runs, otherwise inserted in a
+    background thread; failures are logged but do not propagate.
 
     Args:
         parameter_id: UUID of the parameter that was written
         parameter_value: Value that was written to the parameter
+        supabase: Client for the direct insert when no audit sink is active
     """
-    try:
-        supabase = get_supabase()
-        machine_id = os.environ.get('MACHINE_ID', 'unknown')
+    machine_id = os.environ.get('MACHINE_ID', 'unknown')
 
-        # Create audit record in parameter_control_commands
-        audit_record = {
-            'id': str(uuid.uuid4()),
-            'component_parameter_id': parameter_id,
-            'target_value': parameter_value,
-            'machine_id': machine_id,
-            'executed_at': get_current_timestamp(),
-            'completed_at': get_current_timestamp(),
-        }
-
-        supabase.table('parameter_control_commands').insert(audit_record).execute()
-        logger.debug(f"Audit log created for parameter {parameter_id} = {parameter_value}")
+    # Create audit record in parameter_control_commands
+    audit_record = {
+        'id': str(uuid.uuid4()),
+        'component_parameter_id': parameter_id,
+        'target_value': parameter_value,
+        'machine_id': machine_id,
+        'executed_at': get_current_timestamp(),
+        'completed_at': get_current_timestamp(),
+    }
 
-    except Exception as e:
-        # Log error but do not propagate - recipe execution must continue
-        logger.error(f"Failed to create audit log for parameter {parameter_id}: {e}", exc_info=True)
\ No newline at end of file
+    submit_audit('parameter_control_commands', audit_record, supabase)
+    logger.debug(f"Audit log created for parameter {parameter_id} = {parameter_value}")
@@ -7,9 +7,69 @@ or simulation modes; recording/logging continues as usual.
 """
 import asyncio
 import time
+from typing import Tuple
 from src.log_setup import logger
-from src.db import get_supabase, get_current_timestamp
+from src.db import get_supabase
 from src.recipe_flow.cancellation import is_cancelled
+from src.plc.burst_capture import burst_step
+from src.plc.context import get_plc
+from src.recipe_flow.plan import current_plan
+from src.recipe_flow.progress_publisher import publish_state
+from src.recipe_flow.timeline import current_timeline
+
+
+def legacy_purge_config(step: dict) -> Tuple[int, str, float]:
+    """
+    Purge settings from the step parameters (pre purge_step_config schema).
+
+    Args:
+        step: The step data including parameters
+
+    Returns:
+        Tuple of (duration_ms, gas_type, flow_rate), with defensive defaults
+    """
+    parameters = step.get('parameters', {})
+
+    # Defensive: Check for both possible parameter names
+    duration_ms = None
+    if 'duration_ms' in parameters:
+        try:
+            duration_ms = int(parameters['duration_ms'])
+        except (ValueError, TypeError):
+            logger.warning(
+                f"⚠️ Purge step '{step.get('name', 'Unknown')}' has non-numeric "
+                f"duration_ms '{parameters.get('duration_ms')}'. Defaulting to 1000ms."
+            )
+            duration_ms = None
+    elif 'duration' in parameters:
+        try:
+            duration_ms = int(parameters['duration'])
+        except (ValueError, TypeError):
+            logger.warning(
+                f"⚠️ Purge step '{step.get('name', 'Unknown')}' has non-numeric "
+                f"duration '{parameters.get('duration')}'. Defaulting to 1000ms."
+            )
+            duration_ms = None
+
+    # Defensive: Use sensible default if missing or invalid
+    if duration_ms is None:
+        logger.warning(
+            f"⚠️ Purge step '{step.get('name', 'Unknown')}' missing duration parameter. "
+            f"Defaulting to 1000ms (1 second)."
+        )
+        duration_ms = 1000  # Default to 1 second
+    elif duration_ms < 0:
+        logger.warning(
+            f"⚠️ Purge step '{step.get('name', 'Unknown')}' has negative duration "
+            f"{duration_ms}ms. Defaulting to 1000ms."
+        )
+        duration_ms = 1000
+
+    # Set default values for new fields
+    gas_type = parameters.get('gas_type', 'N2')
+    flow_rate = parameters.get('flow_rate', 0.0)
+
+    return duration_ms, gas_type, flow_rate
 
 
 async def execute_purge_step(process_id: str, step: dict) -> None:
@@ -22,10 +82,13 @@ async def execute_purge_step(process_id: str, step: dict) -> None:
     """
     supabase = get_supabase()
     step_id = step.get('id')
+    plan = current_plan()
+    compiled = plan.step(step_id) if plan else None
 
     # Load purge configuration from purge_step_config table when we have a valid step_id
+    # (unless the recipe compiler already resolved it)
     purge_config = None
-    if step_id is not None:
+    if compiled is None and step_id is not None:
         result = (
             supabase.table('purge_step_config')
             .select('*')
@@ -34,48 +97,13 @@ async def execute_purge_step(process_id: str, step: dict) -> None:
         )
         purge_config = result.data[0] if result.data else None
 
-    if not purge_config:
+    if compiled is not None:
+        duration_ms = compiled.duration_ms
+        gas_type = compiled.gas_type
+        flow_rate = compiled.flow_rate
+    elif not purge_config:
         # Fallback to old method for backwards compatibility
-        parameters = step.get('parameters', {})
-
-        # Defensive: Check for both possible parameter names
-        duration_ms = None
-        if 'duration_ms' in parameters:
-            try:
-                duration_ms = int(parameters['duration_ms'])
-            except (ValueError, TypeError):
-                logger.warning(
-                    f"⚠️ Purge step '{step.get('name', 'Unknown')}' has non-numeric "
-                    f"duration_ms '{parameters.get('duration_ms')}'. Defaulting to 1000ms."
-                )
-                duration_ms = None
-        elif 'duration' in parameters:
-            try:
-                duration_ms = int(parameters['duration'])
-            except (ValueError, TypeError):
-                logger.warning(
-                    f"⚠️ Purge step '{step.get('name', 'Unknown')}' has non-numeric "
-                    f"duration '{parameters.get('duration')}'. Defaulting to 1000ms."
-                )
-                duration_ms = None
-
-        # Defensive: Use sensible default if missing or invalid
-        if duration_ms is None:
-            logger.warning(
-                f"⚠️ Purge step '{step.get('name', 'Unknown')}' missing duration parameter. "
-                f"Defaulting to 1000ms (1 second)."
-            )
-            duration_ms = 1000  # Default to 1 second
-        elif duration_ms < 0:
-            logger.warning(
-                f"⚠️ Purge step '{step.get('name', 'Unknown')}' has negative duration "
-                f"{duration_ms}ms. Defaulting to 1000ms."
-            )
-            duration_ms = 1000
-
-        # Set default values for new fields
-        gas_type = parameters.get('gas_type', 'N2')
-        flow_rate = parameters.get('flow_rate', 0.0)
+        duration_ms, gas_type, flow_rate = legacy_purge_config(step)
     else:
         # Use new purge_step_config table
         duration_ms = purge_config['duration_ms']
@@ -94,39 +122,30 @@ async def execute_purge_step(process_id: str, step: dict) -> None:
         logger.info("Purge step cancelled before execution")
         return
 
-    # Get current progress from process_execution_state
-    state_result = (
-        supabase
-        .table('process_execution_state')
-        .select('progress')
-        .eq('execution_id', process_id)
-        .single()
-        .execute()
-    )
-    current_progress = state_result.data['progress'] if state_result.data else {}
-
-    # Update only basic fields in process_executions
-    supabase.table('process_executions').update(
-        {'updated_at': get_current_timestamp()}
-    ).eq('id', process_id).execute()
-
-    # Update process_execution_state
-    state_update = {
+    # Touch process_executions and update process_execution_state (coalesced while a recipe runs)
+    publish_state(process_id, {
         'current_step_type': 'purge',
         'current_step_name': step['name'],
         'current_purge_duration_ms': duration_ms,
-        'progress': current_progress,
-        'last_updated': 'now()'
-    }
-    (
-        supabase
-        .table('process_execution_state')
-        .update(state_update)
-        .eq('execution_id', process_id)
-        .execute()
-    )
+    }, supabase=supabase)
+
+    # No PLC actuation, but capture the pressure transient of the purge window
+    burst_capture = getattr(get_plc(), 'burst_capture', None)
+    if burst_capture is not None:
+        with burst_step(process_id, step_id):
+            burst_capture.trigger('purge', duration_ms, label=step.get('name'))
 
     # Purge is a time-based wait only; periodically check for cancellation.
+    timeline = current_timeline()
+    if timeline is not None:
+        # Ends at the step's deadline, absorbing overhead of the steps before it
+        if not await timeline.run_wait(duration_ms, lambda: is_cancelled(process_id),
+                                       step_id=step_id, name=step['name']):
+            logger.info("Purge step cancelled during wait; exiting early")
+            return
+        logger.info("Purge step completed (wait-only; no PLC actuation)")
+        return
+
     start = time.monotonic()
     end_time = start + (duration_ms / 1000.0)
     interval = 0.2  # seconds
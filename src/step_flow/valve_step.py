@@ -4,13 +4,19 @@ Executes valve steps in a recipe.
 import asyncio
 import os
 from datetime import datetime, timezone
+from typing import Tuple
 from src.log_setup import logger
 from src.db import get_supabase, get_current_timestamp
 from src.plc.manager import plc_manager
+from src.recipe_flow.audit_sink import submit_audit
 from src.recipe_flow.cancellation import is_cancelled
+from src.plc.burst_capture import burst_step
+from src.recipe_flow.plan import current_plan
+from src.recipe_flow.progress_publisher import publish_state
+from src.recipe_flow.timeline import current_timeline
 
 
-async def _audit_log_recipe_operation(
+def _audit_log_recipe_operation(
     process_id: str,
     recipe_id: str,
     step_id: str,
@@ -23,12 +29,16 @@ async def _audit_log_recipe_operation(
     plc_write_end: datetime = None,
     modbus_address: int = None,
     error_message: str = None,
-    final_status: str = 'success'
+    final_status: str = 'success',
+    supabase=None
 ):
     """
     Comprehensive audit logging to recipe_execution_audit table.
 
     Logs ALL recipe operations with full context for traceability, debugging, and compliance.
+    The record is queued on the recipe's audit sink and bulk-inserted later, so the
+    step never waits for the database; recipe_id and step_sequence may be left None
+    while a compiled plan is active (filled in from the plan).
 
     Args:
         process_id: Process execution ID
@@ -44,41 +54,100 @@ async def _audit_log_recipe_operation(
         modbus_address: Modbus address written to
         error_message: Error details if failed
         final_status: Operation status ('success', 'failed', 'cancelled')
+        supabase: Client for the direct insert when no audit sink is active
     """
-    try:
-        supabase = get_supabase()
-        machine_id = os.environ.get('MACHINE_ID')
+    machine_id = os.environ.get('MACHINE_ID')
 
-        # Build comprehensive audit record
-        audit_record = {
-            'process_id': process_id,
-            'recipe_id': recipe_id,
-            'step_id': step_id,
-            'machine_id': machine_id,
-            'operation_type': operation_type,
-            'parameter_name': parameter_name,
-            'target_value': target_value,
-            'duration_ms': duration_ms,
-            'step_sequence': step_sequence if step_sequence is not None else 0,
-            'loop_iteration': 0,  # TODO: Extract from execution context when loops implemented
-            'operation_initiated_at': get_current_timestamp(),
-            'plc_write_start_time': plc_write_start.isoformat() if plc_write_start else None,
-            'plc_write_end_time': plc_write_end.isoformat() if plc_write_end else None,
-            'operation_completed_at': get_current_timestamp(),
-            'verification_attempted': False,  # TODO: Enable when verification implemented
-            'final_status': final_status,
-            'modbus_address': modbus_address,
-            'error_message': error_message,
-        }
+    # Build comprehensive audit record
+    audit_record = {
+        'process_id': process_id,
+        'recipe_id': recipe_id,
+        'step_id': step_id,
+        'machine_id': machine_id,
+        'operation_type': operation_type,
+        'parameter_name': parameter_name,
+        'target_value': target_value,
+        'duration_ms': duration_ms,
+        'step_sequence': step_sequence,
+        'loop_iteration': 0,  # Filled in from the loop state by the audit sink
+        'operation_initiated_at': get_current_timestamp(),
+        'plc_write_start_time': plc_write_start.isoformat() if plc_write_start else None,
+        'plc_write_end_time': plc_write_end.isoformat() if plc_write_end else None,
+        'operation_completed_at': get_current_timestamp(),
+        'verification_attempted': False,  # TODO: Enable when verification implemented
+        'final_status': final_status,
+        'modbus_address': modbus_address,
+        'error_message': error_message,
+    }
+
+    # Queue for the batched recipe_execution_audit insert (never raises)
+    submit_audit('recipe_execution_audit', audit_record, supabase)
 
-        # Insert audit record to recipe_execution_audit table
-        result = supabase.table('recipe_execution_audit').insert(audit_record).execute()
+    logger.debug(f"Audited {operation_type} operation: {parameter_name} = {target_value} (process: {process_id})")
 
-        logger.info(f"✅ Audited {operation_type} operation: {parameter_name} = {target_value} (process: {process_id})")
 
-    except Exception as e:
-        # Log error but DO NOT propagate - recipe execution must continue even if audit fails
-        logger.error(f"❌ Failed to audit {operation_type} operation {parameter_name}: {e}", exc_info=True)
+def legacy_valve_config(step: dict) -> Tuple[int, int]:
+    """
+    Valve number and duration from the step type/parameters (pre valve_step_config schema).
+
+    Args:
+        step: The step data including parameters
+
+    Returns:
+        Tuple of (valve_number, duration_ms), with defensive defaults
+    """
+    parameters = step.get('parameters', {})
+    step_type = step['type']
+    
+    # Defensive: Try to extract valve number from type
+    valve_number = None
+    if 'open valve' in step_type.lower():
+        # Extract valve number from step type (e.g., "open valve 1" -> 1)
+        try:
+            valve_number = int(step_type.split('valve')[1].strip())
+        except (IndexError, ValueError):
+            pass
+    
+    # If not found in type, check parameters
+    if valve_number is None and 'valve_number' in parameters:
+        try:
+            valve_number = int(parameters['valve_number'])
+        except (ValueError, TypeError):
+            pass
+    
+    # Defensive: Default to valve 1 if unable to determine
+    if valve_number is None:
+        logger.warning(
+            f"⚠️ Valve step '{step.get('name', 'Unknown')}' unable to determine valve number. "
+            f"Defaulting to valve 1."
+        )
+        valve_number = 1
+    
+    # Defensive: Handle missing or invalid duration_ms
+    duration_ms = None
+    if 'duration_ms' in parameters:
+        try:
+            duration_ms = int(parameters['duration_ms'])
+        except (ValueError, TypeError):
+            logger.warning(
+                f"⚠️ Valve step '{step.get('name', 'Unknown')}' has non-numeric "
+                f"duration_ms '{parameters.get('duration_ms')}'. Defaulting to 1000ms."
+            )
+    
+    if duration_ms is None:
+        logger.warning(
+            f"⚠️ Valve step '{step.get('name', 'Unknown')}' missing duration_ms parameter. "
+            f"Defaulting to 1000ms (1 second)."
+        )
+        duration_ms = 1000  # Default to 1 second
+    elif duration_ms < 0:
+        logger.warning(
+            f"⚠️ Valve step '{step.get('name', 'Unknown')}' has negative duration "
+            f"{duration_ms}ms. Defaulting to 1000ms."
+        )
+        duration_ms = 1000
+
+    return valve_number, duration_ms
 
 
 async def execute_valve_step(process_id: str, step: dict):
@@ -91,67 +160,25 @@ async def execute_valve_step(process_id: str, step: dict):
     """
     supabase = get_supabase()
     step_id = step.get('id')
+    plan = current_plan()
+    compiled = plan.step(step_id) if plan else None
     
-    # Load valve configuration from valve_step_config table
-    result = supabase.table('valve_step_config').select('*').eq('step_id', step_id).execute()
-    valve_config = result.data[0] if result.data else None
-    
-    if not valve_config:
-        # Fallback to old method for backwards compatibility
-        parameters = step.get('parameters', {})
-        step_type = step['type']
-        
-        # Defensive: Try to extract valve number from type
-        valve_number = None
-        if 'open valve' in step_type.lower():
-            # Extract valve number from step type (e.g., "open valve 1" -> 1)
-            try:
-                valve_number = int(step_type.split('valve')[1].strip())
-            except (IndexError, ValueError):
-                pass
-        
-        # If not found in type, check parameters
-        if valve_number is None and 'valve_number' in parameters:
-            try:
-                valve_number = int(parameters['valve_number'])
-            except (ValueError, TypeError):
-                pass
-        
-        # Defensive: Default to valve 1 if unable to determine
-        if valve_number is None:
-            logger.warning(
-                f"⚠️ Valve step '{step.get('name', 'Unknown')}' unable to determine valve number. "
-                f"Defaulting to valve 1."
-            )
-            valve_number = 1
-        
-        # Defensive: Handle missing or invalid duration_ms
-        duration_ms = None
-        if 'duration_ms' in parameters:
-            try:
-                duration_ms = int(parameters['duration_ms'])
-            except (ValueError, TypeError):
-                logger.warning(
-                    f"⚠️ Valve step '{step.get('name', 'Unknown')}' has non-numeric "
-                    f"duration_ms '{parameters.get('duration_ms')}'. Defaulting to 1000ms."
-                )
-        
-        if duration_ms is None:
-            logger.warning(
-                f"⚠️ Valve step '{step.get('name', 'Unknown')}' missing duration_ms parameter. "
-                f"Defaulting to 1000ms (1 second)."
-            )
-            duration_ms = 1000  # Default to 1 second
-        elif duration_ms < 0:
-            logger.warning(
-                f"⚠️ Valve step '{step.get('name', 'Unknown')}' has negative duration "
-                f"{duration_ms}ms. Defaulting to 1000ms."
-            )
-            duration_ms = 1000
+    if compiled is not None:
+        # Resolved by the recipe compiler - no config read
+        valve_number = compiled.valve_number
+        duration_ms = compiled.duration_ms
     else:
-        # Use new valve_step_config table
-        valve_number = valve_config['valve_number']
-        duration_ms = valve_config['duration_ms']
+        # Load valve configuration from valve_step_config table
+        result = supabase.table('valve_step_config').select('*').eq('step_id', step_id).execute()
+        valve_config = result.data[0] if result.data else None
+        
+        if not valve_config:
+            # Fallback to old method for backwards compatibility
+            valve_number, duration_ms = legacy_valve_config(step)
+        else:
+            # Use new valve_step_config table
+            valve_number = valve_config['valve_number']
+            duration_ms = valve_config['duration_ms']
     
     logger.info(f"Opening valve {valve_number} for {duration_ms}ms")
     
@@ -160,37 +187,35 @@ async def execute_valve_step(process_id: str, step: dict):
         logger.info("Valve step cancelled before execution")
         return
 
-    # Get current progress from process_execution_state
-    state_result = supabase.table('process_execution_state').select('progress').eq('execution_id', process_id).single().execute()
-    current_progress = state_result.data['progress'] if state_result.data else {}
-    
-    # Update only basic fields in process_executions
-    supabase.table('process_executions').update({
-        'updated_at': get_current_timestamp()
-    }).eq('id', process_id).execute()
-    
-    # Update process_execution_state
-    state_update = {
+    # Start burst sampling now so the pulse gets its pre-roll
+    from src.plc.context import get_plc
+    burst_capture = getattr(get_plc(), 'burst_capture', None)
+    if burst_capture is not None:
+        burst_capture.arm()
+
+    # Touch process_executions and update process_execution_state (coalesced while a recipe runs)
+    publish_state(process_id, {
         'current_step_type': 'valve',
         'current_step_name': step['name'],
         'current_valve_number': valve_number,
         'current_valve_duration_ms': duration_ms,
-        'progress': current_progress,
-        'last_updated': 'now()'
-    }
-    supabase.table('process_execution_state').update(state_update).eq('execution_id', process_id).execute()
+    }, supabase=supabase)
     
-    # Get recipe_id and step_sequence for audit trail
-    process_result = supabase.table('process_executions').select('recipe_id').eq('id', process_id).single().execute()
-    recipe_id = process_result.data['recipe_id'] if process_result.data else None
+    # Get recipe_id and step_sequence for audit trail (filled in from the plan when compiled)
+    recipe_id = step_sequence = modbus_address = None
+    if compiled is not None:
+        modbus_address = compiled.modbus_address
+    else:
+        process_result = supabase.table('process_executions').select('recipe_id').eq('id', process_id).single().execute()
+        recipe_id = process_result.data['recipe_id'] if process_result.data else None
 
-    # Get step sequence from execution state
-    state_result = supabase.table('process_execution_state').select('current_overall_step').eq('execution_id', process_id).single().execute()
-    step_sequence = state_result.data['current_overall_step'] if state_result.data else 0
+        # Get step sequence from execution state
+        state_result = supabase.table('process_execution_state').select('current_overall_step').eq('execution_id', process_id).single().execute()
+        step_sequence = state_result.data['current_overall_step'] if state_result.data else 0
 
     # Control the valve via PLC
-    from src.plc.context import get_plc
     plc = get_plc()
+    timeline = current_timeline()
     plc_write_start = None
     plc_write_end = None
     error_msg = None
@@ -198,7 +223,17 @@ async def execute_valve_step(process_id: str, step: dict):
 
     if plc:
         plc_write_start = datetime.now(timezone.utc)
-        success = await plc.control_valve(valve_number, True, duration_ms)
+        # Bursts triggered by the valve pulse are linked to this process step
+        with burst_step(process_id, step_id):
+            if timeline is not None:
+                # Open and close at the step's deadlines; returns once the valve is closed
+                success = await timeline.run_pulse(
+                    lambda: plc.control_valve(valve_number, True, duration_ms, auto_close=False),
+                    lambda: plc.control_valve(valve_number, False),
+                    duration_ms, step_id=step_id, name=step['name'],
+                )
+            else:
+                success = await plc.control_valve(valve_number, True, duration_ms)
         plc_write_end = datetime.now(timezone.utc)
 
         if not success:
@@ -206,7 +241,7 @@ async def execute_valve_step(process_id: str, step: dict):
             status = 'failed'
 
             # Audit the failed operation
-            await _audit_log_recipe_operation(
+            _audit_log_recipe_operation(
                 process_id=process_id,
                 recipe_id=recipe_id,
                 step_id=step_id,
@@ -217,14 +252,16 @@ async def execute_valve_step(process_id: str, step: dict):
                 step_sequence=step_sequence,
                 plc_write_start=plc_write_start,
                 plc_write_end=plc_write_end,
+                modbus_address=modbus_address,
                 error_message=error_msg,
-                final_status=status
+                final_status=status,
+                supabase=supabase
             )
 
             raise RuntimeError(error_msg)
 
         # Audit the successful valve operation with full context
-        await _audit_log_recipe_operation(
+        _audit_log_recipe_operation(
             process_id=process_id,
             recipe_id=recipe_id,
             step_id=step_id,
@@ -235,14 +272,19 @@ async def execute_valve_step(process_id: str, step: dict):
             step_sequence=step_sequence,
             plc_write_start=plc_write_start,
             plc_write_end=plc_write_end,
-            final_status=status
+            modbus_address=modbus_address,
+            final_status=status,
+            supabase=supabase
         )
     else:
         # Fallback to simulation behavior if no PLC
-        await asyncio.sleep(duration_ms / 1000)
+        if timeline is not None:
+            await timeline.run_wait(duration_ms, step_id=step_id, name=step['name'], kind='valve')
+        else:
+            await asyncio.sleep(duration_ms / 1000)
 
         # Still audit the simulated operation
-        await _audit_log_recipe_operation(
+        _audit_log_recipe_operation(
             process_id=process_id,
             recipe_id=recipe_id,
             step_id=step_id,
@@ -251,7 +293,8 @@ async def execute_valve_step(process_id: str, step: dict):
             target_value=1,
             duration_ms=duration_ms,
             step_sequence=step_sequence,
-            final_status='success'
+            final_status='success',
+            supabase=supabase
         )
 
     logger.info(f"Valve {valve_number} operation completed successfully")
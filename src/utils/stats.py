@@ -0,0 +1,21 @@
+"""
+Small statistics helpers shared by the metrics of the PLC and data collection paths.
+"""
+
+from typing import Iterable
+
+
+def p95(samples: Iterable[float]) -> float:
+    """
+    95th percentile (nearest rank) of a set of samples.
+
+    Args:
+        samples: Latency/jitter samples, in any order
+
+    Returns:
+        float: The 95th percentile, or 0.0 when there are no samples
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
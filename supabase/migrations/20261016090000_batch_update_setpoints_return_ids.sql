@@ -0,0 +1,55 @@
+-- Migration: batch_update_setpoints returns the ids it updated
+-- Purpose: Terminal 1 confirms its setpoint shadow only for rows that were
+--          actually written, so rows the RPC skipped are retried on the next sync
+-- Date: 2026-10-16
+-- Replaces: src/migrations/rpc_batch_update_setpoints.sql (returned a count)
+
+DROP FUNCTION IF EXISTS batch_update_setpoints(JSONB);
+
+CREATE OR REPLACE FUNCTION batch_update_setpoints(p_updates JSONB)
+RETURNS UUID[]
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  updated_ids UUID[] := ARRAY[]::UUID[];
+  update_record JSONB;
+  param_id UUID;
+  new_set_value NUMERIC;
+BEGIN
+  -- Input format: [{"id": "uuid", "set_value": 123.45}, ...]
+  FOR update_record IN
+    SELECT * FROM jsonb_array_elements(p_updates)
+  LOOP
+    param_id := (update_record->>'id')::uuid;
+    new_set_value := (update_record->>'set_value')::numeric;
+
+    UPDATE component_parameters
+    SET
+      set_value = new_set_value,
+      updated_at = now()
+    WHERE id = param_id;
+
+    IF FOUND THEN
+      updated_ids := array_append(updated_ids, param_id);
+    END IF;
+  END LOOP;
+
+  RETURN updated_ids;
+
+EXCEPTION
+  WHEN OTHERS THEN
+    RAISE WARNING 'batch_update_setpoints failed: %', SQLERRM;
+    RAISE;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION batch_update_setpoints(JSONB) TO authenticated;
+GRANT EXECUTE ON FUNCTION batch_update_setpoints(JSONB) TO anon;
+
+COMMENT ON FUNCTION batch_update_setpoints(JSONB) IS
+'Batch update for component_parameters.set_value.
+Accepts JSONB array of records with keys: id (UUID), set_value (numeric).
+Returns the ids of the updated records.
+Used by Terminal 1 PLC Data Service for setpoint synchronization.';
@@ -440,6 +440,12 @@ def pytest_addoption(parser):
         default=False,
         help="Run hardware-dependent tests"
     )
+    parser.addoption(
+        "--run-performance",
+        action="store_true",
+        default=False,
+        help="Run performance and benchmark tests"
+    )
     parser.addoption(
         "--performance-baseline",
         action="store",
@@ -471,6 +477,7 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "slow: mark test as slow running")
     config.addinivalue_line("markers", "hardware: mark test as requiring hardware")
     config.addinivalue_line("markers", "benchmark: mark test as performance benchmark")
+    config.addinivalue_line("markers", "performance: mark test as timing-sensitive (requires --run-performance)")
     config.addinivalue_line("markers", "flaky: mark test as potentially flaky")
 
     # Multi-terminal testing markers
@@ -488,6 +495,7 @@ def pytest_collection_modifyitems(config, items):
     skip_hardware = pytest.mark.skip(reason="need --run-hardware option to run")
     skip_integration = pytest.mark.skip(reason="need --run-integration option to run")
     skip_stress = pytest.mark.skip(reason="need --run-stress option to run")
+    skip_performance = pytest.mark.skip(reason="need --run-performance option to run")
 
     for item in items:
         if "slow" in item.keywords and not config.getoption("--run-slow"):
@@ -498,6 +506,8 @@ def pytest_collection_modifyitems(config, items):
             item.add_marker(skip_integration)
         if "stress" in item.keywords and not config.getoption("--run-stress"):
             item.add_marker(skip_stress)
+        if "performance" in item.keywords and not config.getoption("--run-performance"):
+            item.add_marker(skip_performance)
 
         # Serial tests should not run in parallel (xdist)
         if "serial" in item.keywords:
@@ -7,6 +7,7 @@ Provides fixtures for:
 - Database state verification helpers
 - Table cleanup utilities
 - Supabase connection health checks
+- RecordingSupabase, an in-memory client double for unit tests
 """
 
 import pytest
@@ -14,6 +15,77 @@ import pytest_asyncio
 import os
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
+from unittest.mock import Mock
+
+
+class RecordingSupabase:
+    """
+    Sync Supabase client double that serves canned rows and records every query.
+
+    Each executed query is recorded as (table, operation, payload), where the
+    operation is select/update/insert and the payload its first argument.
+    Selects return the table's rows, filtered by in_(column, values).
+
+    Usage:
+        supabase = RecordingSupabase({'valve_step_config': [...]}, fail_inserts=True)
+        ...
+        assert supabase.inserts('recipe_execution_audit') == [...]
+    """
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 fail_inserts: bool = False, fail_updates: int = 0):
+        """
+        Args:
+            tables: Rows returned by selects, per table
+            fail_inserts: Make every insert raise
+            fail_updates: Number of updates that raise before updates succeed
+        """
+        self.tables = tables or {}
+        self.fail_inserts = fail_inserts
+        self.fail_updates = fail_updates
+        self.queries = []
+
+    def table(self, name: str):
+        query = Mock()
+        state = {'op': None, 'payload': None, 'filters': []}
+
+        def chain(op):
+            def call(*args, **kwargs):
+                if op in ('select', 'update', 'insert'):
+                    state['op'] = op
+                    state['payload'] = args[0] if args else None
+                elif op == 'in_':
+                    state['filters'].append((args[0], set(args[1])))
+                return query
+            return call
+
+        def execute():
+            if state['op'] == 'insert' and self.fail_inserts:
+                raise Exception("database unavailable")
+            if state['op'] == 'update' and self.fail_updates:
+                self.fail_updates -= 1
+                raise Exception("database unavailable")
+            self.queries.append((name, state['op'], state['payload']))
+            if state['op'] != 'select':
+                return Mock(data=[])
+            rows = [
+                row for row in self.tables.get(name, [])
+                if all(row.get(column) in values for column, values in state['filters'])
+            ]
+            return Mock(data=rows)
+
+        for op in ('select', 'update', 'insert', 'eq', 'in_', 'single'):
+            setattr(query, op, chain(op))
+        query.execute = execute
+        return query
+
+    def inserts(self, table: str) -> List[Any]:
+        """Payloads inserted into a table, in order."""
+        return [q[2] for q in self.queries if q[0] == table and q[1] == 'insert']
+
+    def updates(self, table: str) -> List[Any]:
+        """Payloads of updates to a table, in order."""
+        return [q[2] for q in self.queries if q[0] == table and q[1] == 'update']
 
 
 @pytest_asyncio.fixture(scope="function")
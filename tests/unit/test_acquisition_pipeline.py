@@ -0,0 +1,143 @@
+"""
+Acquisition Pipeline Tests
+
+Tests for the double-buffered Terminal 1 acquisition pipeline:
+1. Acquisition of cycle N+1 overlaps processing of cycle N; nothing is dropped
+2. Monotonic instants map to wall-clock time and never go backwards
+3. Histograms bucket per-stage latency and inter-sample jitter
+4. The service stamps rows with the read-completion instant, not the log time
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from plc_data_service import PLCDataService
+from src.data_collection.acquisition_pipeline import (
+    AcquiredCycle, AcquisitionPipeline, LatencyHistogram, MonotonicWallClock
+)
+
+
+def _cycle(n, read_completed_at=None):
+    now = time.monotonic() if read_completed_at is None else read_completed_at
+    return AcquiredCycle(
+        parameter_values={'p': float(n)}, setpoint_values={},
+        read_completed_at=now, timestamp=datetime.utcnow(), started_at=now - 0.003,
+    )
+
+
+@pytest.mark.asyncio
+async def test_acquisition_overlaps_processing_without_drops():
+    processed = []
+    release = asyncio.Event()
+
+    async def process(cycle):
+        await release.wait()
+        processed.append(cycle.parameter_values['p'])
+
+    pipeline = AcquisitionPipeline(process, expected_interval=0.01)
+    pipeline.start()
+
+    # Cycle 0 is being processed, cycle 1 waits in the second buffer: both hand-offs return at once
+    await asyncio.wait_for(pipeline.submit(_cycle(0)), timeout=0.1)
+    await asyncio.sleep(0)
+    await asyncio.wait_for(pipeline.submit(_cycle(1)), timeout=0.1)
+
+    # A third cycle has to wait for processing to catch up (a stall, not a drop)
+    third = asyncio.create_task(pipeline.submit(_cycle(2)))
+    await asyncio.sleep(0.02)
+    assert not third.done()
+    release.set()
+    await third
+    await pipeline.close()
+
+    assert processed == [0.0, 1.0, 2.0]
+    metrics = pipeline.get_metrics()
+    assert metrics['cycles_processed'] == 3
+    assert metrics['stalls'] == 1
+    assert metrics['histograms']['process_ms']['count'] == 3
+    assert not pipeline.running
+
+
+def test_monotonic_instants_map_to_non_decreasing_wall_time():
+    clock_state = {'mono': 100.0, 'wall': 1_700_000_000.0}
+    clock = MonotonicWallClock(
+        resync_interval=10.0, monotonic=lambda: clock_state['mono'], wall=lambda: clock_state['wall']
+    )
+
+    assert clock.to_wall(99.75) == pytest.approx(1_700_000_000.0 - 0.25)
+    assert clock.to_datetime(100.0).timestamp() == pytest.approx(1_700_000_000.0)
+
+    # NTP steps the wall clock back by 2 s; the next re-sync must not produce an earlier timestamp
+    clock_state['mono'] = 111.0
+    clock_state['wall'] = 1_700_000_009.0
+    first_after_step = clock.to_wall(110.5)
+    assert clock.last_step_ms == pytest.approx(-2000.0)
+    assert first_after_step >= 1_700_000_000.0
+    assert clock.to_wall(111.0) == pytest.approx(1_700_000_009.0)
+
+
+@pytest.mark.asyncio
+async def test_histogram_buckets_and_interval_jitter():
+    histogram = LatencyHistogram([1, 10, 100])
+    for value in (0.5, 4, 6, 50, 500):
+        histogram.observe(value)
+    snapshot = histogram.to_dict()
+    assert snapshot['buckets'] == {'le_1': 1, 'le_10': 3, 'le_100': 4, 'le_inf': 5}
+    assert snapshot['max_ms'] == 500
+    assert snapshot['p50_ms'] == 10
+
+    pipeline = AcquisitionPipeline(AsyncMock(), expected_interval=1.0)
+    # Spacing of 1.02 s and 1.98 s (one skipped tick): jitter 20 ms both times
+    for at in (10.0, 11.02, 13.0):
+        await pipeline.submit(_cycle(0, read_completed_at=at))
+        pipeline._buffer.get_nowait()
+    jitter = pipeline.get_metrics()['histograms']['inter_sample_jitter_ms']
+    assert jitter['count'] == 2
+    assert jitter['max_ms'] == pytest.approx(20.0)
+
+
+@pytest.mark.asyncio
+async def test_service_stamps_rows_at_read_completion():
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    service.plc_manager = Mock()
+    service.plc_manager.is_connected.return_value = True
+    service.setpoint_refresh_interval = 3600
+    service._last_setpoint_read_time = asyncio.get_event_loop().time()
+
+    read_done = {}
+
+    async def read_all_parameters():
+        await asyncio.sleep(0.01)
+        read_done['at'] = time.time()
+        return {'p': 1.0}
+
+    logged = []
+
+    async def log(parameter_values, setpoint_values, timestamp=None):
+        await asyncio.sleep(0.2)  # slow processing must not shift the timestamp
+        logged.append(timestamp)
+        return 1
+
+    service.plc_manager.read_all_parameters = read_all_parameters
+    service._log_parameters_with_metadata = log
+    service.acquisition_pipeline.start()
+
+    submitted_at = time.monotonic()
+    await service._collect_and_log_data()
+    assert time.monotonic() - submitted_at < 0.15  # returned before processing finished
+    await service.acquisition_pipeline.close()
+
+    assert len(logged) == 1
+    stamped = datetime.fromisoformat(logged[0]).timestamp()
+    assert stamped == pytest.approx(read_done['at'], abs=0.05)
+    assert service.get_status()['acquisition_pipeline']['cycles_processed'] == 1
+    service._db_executor.shutdown(wait=False)
@@ -0,0 +1,97 @@
+"""
+Adaptive Concurrency Limiter Tests
+
+Tests for the AIMD controller gating parallel PLC range reads:
+1. Concurrency rises while p95 latency stays flat, up to the ceiling
+2. A rising p95 steps concurrency back down
+3. Timeouts / refused connections cut the limit once per burst
+4. In-flight requests never exceed the current limit
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.plc.concurrency import AdaptiveConcurrencyLimiter
+
+
+async def _run(limiter, count=1, delay=0.0, error=None):
+    for _ in range(count):
+        try:
+            async with limiter.slot():
+                await asyncio.sleep(delay)
+                if error is not None:
+                    raise error
+        except Exception:
+            if error is None:
+                raise
+
+
+@pytest.mark.asyncio
+async def test_limit_increases_while_latency_flat():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=4, initial_limit=1, window_size=5)
+
+    await _run(limiter, count=30)
+
+    metrics = limiter.get_metrics()
+    assert metrics['current_limit'] == 4
+    assert metrics['increases'] == 3
+    assert [entry['limit'] for entry in metrics['history']] == [1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_limit_steps_back_when_p95_rises():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8, initial_limit=3, window_size=5)
+
+    await _run(limiter, count=5, delay=0.001)   # fast window sets the baseline -> 4
+    await _run(limiter, count=5, delay=0.03)    # p95 far above baseline -> 3
+
+    assert limiter.limit == 3
+    assert limiter.history[-1]['reason'] == 'p95 rising'
+
+
+@pytest.mark.asyncio
+async def test_timeouts_cut_limit_once_per_burst():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8, initial_limit=8)
+
+    # Eight parallel reads all time out: only one multiplicative decrease
+    await asyncio.gather(*[
+        _run(limiter, delay=0.01, error=asyncio.TimeoutError()) for _ in range(8)
+    ])
+    assert limiter.limit == 4
+    assert limiter.get_metrics()['overload_errors'] == 8
+
+    # A refused connection in a later request cuts again
+    await _run(limiter, error=ConnectionRefusedError())
+    assert limiter.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_non_overload_errors_do_not_change_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=3)
+
+    await _run(limiter, error=ValueError("bad response"))
+
+    assert limiter.limit == 3
+    assert limiter.get_metrics()['overload_errors'] == 0
+
+
+@pytest.mark.asyncio
+async def test_in_flight_never_exceeds_limit():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8, initial_limit=2, window_size=1000)
+    peak = 0
+
+    async def worker():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.005)
+
+    await asyncio.gather(*[worker() for _ in range(10)])
+
+    assert peak == 2
+    assert limiter.in_flight == 0
@@ -0,0 +1,145 @@
+"""
+Async PLC Communicator Tests
+
+Tests for the asyncio Modbus transport used by RealPLC:
+1. Float/int32 encode/decode round-trips for every byte order
+2. Retry with asyncio.sleep backoff does not block the event loop
+3. Broken-pipe errors force a reconnect before the next attempt
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.plc.async_communicator import AsyncPLCCommunicator
+from src.plc.byte_order import decode_float, decode_int32, encode_float, encode_int32
+
+
+class FakeResponse(SimpleNamespace):
+    def isError(self):
+        return getattr(self, 'error', False)
+
+
+class FakeAsyncClient:
+    """Stand-in for AsyncModbusTcpClient with scriptable failures."""
+
+    def __init__(self, failures=0, failure_exc=None, delay=0.0):
+        self.connected = True
+        self.failures = failures
+        self.failure_exc = failure_exc or OSError("connection reset by peer")
+        self.delay = delay
+        self.registers = {}
+        self.calls = 0
+
+    def close(self):
+        self.connected = False
+
+    async def read_coils(self, address, count=1, slave=0):
+        return FakeResponse(bits=[False] * count)
+
+    async def read_holding_registers(self, address, count=1, slave=0):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failures > 0:
+            self.failures -= 1
+            raise self.failure_exc
+        return FakeResponse(registers=[self.registers.get(address + i, 0) for i in range(count)])
+
+    async def write_registers(self, address, values, slave=0):
+        for i, v in enumerate(values):
+            self.registers[address + i] = v
+        return FakeResponse()
+
+
+def _make_communicator(client, byte_order='badc'):
+    comm = AsyncPLCCommunicator(plc_ip='127.0.0.1', byte_order=byte_order)
+    comm.client = client
+    comm._current_ip = '127.0.0.1'
+    comm._operation_retry_delay = 0.01
+    return comm
+
+
+@pytest.mark.parametrize('byte_order', ['abcd', 'badc', 'cdab', 'dcba'])
+def test_byte_order_round_trip(byte_order):
+    """Encoded registers decode back to the original value."""
+    assert decode_float(encode_float(12.5, byte_order), byte_order) == 12.5
+    assert decode_int32(encode_int32(-123456, byte_order), byte_order) == -123456
+
+
+@pytest.mark.asyncio
+async def test_write_then_read_float():
+    client = FakeAsyncClient()
+    comm = _make_communicator(client)
+
+    assert await comm.write_float(100, 3.25)
+    assert await comm.read_float(100) == 3.25
+
+
+@pytest.mark.asyncio
+async def test_retry_does_not_block_event_loop():
+    """Backoff sleeps are awaited, so other tasks keep running during retries."""
+    client = FakeAsyncClient(failures=2, failure_exc=RuntimeError("timeout"))
+    comm = _make_communicator(client)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    tick_task = asyncio.create_task(ticker())
+    try:
+        registers = await comm.read_holding_registers(0, count=2)
+    finally:
+        tick_task.cancel()
+
+    assert registers == [0, 0]
+    assert client.calls == 3
+    assert ticks > 1
+
+
+@pytest.mark.asyncio
+async def test_broken_pipe_triggers_reconnect():
+    """A connection reset closes the client and reconnects before retrying."""
+    broken = FakeAsyncClient(failures=1)
+    fresh = FakeAsyncClient()
+    comm = _make_communicator(broken)
+    reconnects = []
+
+    async def fake_connect():
+        reconnects.append(True)
+        comm.client = fresh
+        return True
+
+    comm.connect = fake_connect
+
+    registers = await comm.read_holding_registers(10, count=1)
+
+    assert registers == [0]
+    assert not broken.connected
+    assert reconnects == [True]
+    assert fresh.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_log_their_own_parameter():
+    """Overlapping reads label their log lines with the parameter passed in."""
+    client = FakeAsyncClient(delay=0.01)
+    comm = _make_communicator(client)
+    messages = []
+    comm.log = lambda level, message: messages.append(message)
+
+    await asyncio.gather(
+        comm.read_float(100, param_info={'name': 'temp', 'component_name': 'Heater'}),
+        comm.read_float(200, param_info={'name': 'flow', 'component_name': 'MFC'}),
+    )
+
+    values = [m for m in messages if m.startswith('Float value')]
+    assert sorted(values) == ['Float value: 0.0 [Heater - temp]', 'Float value: 0.0 [MFC - flow]']
@@ -0,0 +1,178 @@
+"""
+Audit Sink Tests
+
+Tests for the batched, non-blocking recipe audit trail:
+1. Valve steps in a loop queue audit rows with plan context and no database access
+2. Queued rows are bulk-inserted by the background task on its timer
+3. Rows that cannot be written spill to a JSONL file and are replayed by a later sink
+4. Without a sink the direct insert runs off the event loop
+5. close() waits for an in-flight background flush instead of racing it
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from tests.fixtures.database_fixtures import RecordingSupabase
+from src.recipe_flow.audit_sink import AuditSink, audit_sink, submit_audit
+from src.recipe_flow.compiler import compile_recipe
+from src.recipe_flow.plan import execution_plan
+from src.recipe_flow.progress_publisher import ProgressPublisher, progress_publisher
+from src.step_flow.loop_step import execute_loop_step
+
+
+@pytest.mark.asyncio
+async def test_loop_queues_audit_rows_with_plan_context(tmp_path):
+    steps = [
+        {'id': 'loop', 'name': 'Cycle', 'type': 'loop', 'sequence_number': 1, 'parameters': {'count': 5}},
+        {'id': 'v1', 'name': 'Pulse', 'type': 'valve', 'sequence_number': 1,
+         'parent_step_id': 'loop', 'parameters': {'valve_number': 1, 'duration_ms': 0}},
+    ]
+    process = {'id': 'exec-1', 'recipe_id': 'recipe-1', 'recipe_version': {'steps': steps}}
+    plan = compile_recipe(process, RecordingSupabase())
+    supabase = RecordingSupabase()
+    publisher = ProgressPublisher('exec-1', supabase, flush_interval_ms=10_000)
+    sink = AuditSink(supabase, flush_interval_ms=10_000, spill_dir=tmp_path)
+    plc = Mock(burst_capture=None)
+    plc.control_valve = AsyncMock(return_value=True)
+
+    with patch('src.step_flow.loop_step.get_supabase', return_value=supabase), \
+            patch('src.step_flow.valve_step.get_supabase', return_value=supabase), \
+            patch('src.plc.context.get_plc', return_value=plc):
+        with execution_plan(plan), progress_publisher(publisher), audit_sink(sink):
+            await execute_loop_step('exec-1', steps[0], steps, {'loop': [steps[1]]})
+
+    assert not supabase.inserts('recipe_execution_audit')
+    assert not [q for q in supabase.queries if q[1] == 'select']
+
+    metrics = await sink.close('completed')
+    await publisher.close('completed')
+    [rows] = supabase.inserts('recipe_execution_audit')
+    assert [row['loop_iteration'] for row in rows] == [1, 2, 3, 4, 5]
+    assert {(row['recipe_id'], row['step_sequence'], row['step_id']) for row in rows} == {('recipe-1', 0, 'v1')}
+    assert metrics['records_written'] == 5 and metrics['batches_written'] == 1
+
+
+@pytest.mark.asyncio
+async def test_background_task_bulk_inserts_in_batches(tmp_path):
+    supabase = RecordingSupabase()
+    sink = AuditSink(supabase, flush_interval_ms=20, batch_size=3, spill_dir=tmp_path)
+    sink.start()
+
+    with audit_sink(sink):
+        for i in range(4):
+            submit_audit('parameter_control_commands', {'id': str(i), 'target_value': i})
+        submit_audit('recipe_execution_audit', {'process_id': 'exec-1', 'step_id': 'v1'})
+    assert not supabase.queries
+
+    await asyncio.sleep(0.05)
+    assert [len(rows) for rows in supabase.inserts('parameter_control_commands')] == [3, 1]
+    assert supabase.inserts('recipe_execution_audit') == [[{'process_id': 'exec-1', 'step_id': 'v1', 'step_sequence': 0}]]
+    await sink.close('completed')
+
+
+@pytest.mark.asyncio
+async def test_unreachable_database_spills_and_replays(tmp_path):
+    down = RecordingSupabase(fail_inserts=True)
+    sink = AuditSink(down, spill_dir=tmp_path)
+    with audit_sink(sink):
+        submit_audit('parameter_control_commands', {'id': 'a', 'target_value': 1.5})
+        submit_audit('recipe_execution_audit', {'process_id': 'exec-1', 'step_id': 'v1'})
+    metrics = await sink.close('error')
+
+    assert metrics['records_spilled'] == 2
+    [spill_file] = tmp_path.glob('audit_*.jsonl')
+    entries = [json.loads(line) for line in spill_file.read_text().splitlines()]
+    assert {e['table'] for e in entries} == {'parameter_control_commands', 'recipe_execution_audit'}
+
+    # The next run's sink replays the spill once inserts succeed
+    up = RecordingSupabase()
+    sink = AuditSink(up, spill_dir=tmp_path)
+    metrics = await sink.close('completed')
+
+    assert metrics['records_replayed'] == 2
+    assert up.inserts('parameter_control_commands') == [[{'id': 'a', 'target_value': 1.5}]]
+    assert not list(tmp_path.glob('audit_*.jsonl'))
+
+
+@pytest.mark.asyncio
+async def test_direct_insert_without_sink_does_not_block_loop():
+    supabase = RecordingSupabase()
+    release = threading.Event()
+    execute = supabase.table
+
+    def slow_table(name):
+        query = execute(name)
+        original = query.execute
+
+        def blocking_execute():
+            release.wait(1.0)
+            return original()
+        query.execute = blocking_execute
+        return query
+    supabase.table = slow_table
+
+    started = time.perf_counter()
+    submit_audit('parameter_control_commands', {'id': 'a', 'target_value': 1.0}, supabase)
+    assert time.perf_counter() - started < 0.1
+    assert not supabase.queries
+
+    release.set()
+    for _ in range(100):
+        if supabase.queries:
+            break
+        await asyncio.sleep(0.01)
+    assert supabase.inserts('parameter_control_commands') == [{'id': 'a', 'target_value': 1.0}]
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_in_flight_flush(tmp_path):
+    supabase = RecordingSupabase()
+    entered = threading.Event()
+    release = threading.Event()
+    active = []
+    overlaps = []
+    execute = supabase.table
+
+    def slow_table(name):
+        query = execute(name)
+        original = query.execute
+
+        def blocking_execute():
+            overlaps.append(len(active))
+            active.append(name)
+            entered.set()
+            release.wait(1.0)
+            active.pop()
+            return original()
+        query.execute = blocking_execute
+        return query
+    supabase.table = slow_table
+
+    sink = AuditSink(supabase, flush_interval_ms=10, spill_dir=tmp_path)
+    sink.start()
+    with audit_sink(sink):
+        submit_audit('parameter_control_commands', {'id': 'a', 'target_value': 1.0})
+    await asyncio.to_thread(entered.wait, 1.0)
+    with audit_sink(sink):
+        submit_audit('parameter_control_commands', {'id': 'b', 'target_value': 2.0})
+
+    closing = asyncio.create_task(sink.close('completed'))
+    await asyncio.sleep(0.05)
+    assert not closing.done()  # still waiting for the cancelled task's worker thread
+    release.set()
+    metrics = await closing
+
+    assert overlaps == [0, 0]
+    assert supabase.inserts('parameter_control_commands') == [
+        [{'id': 'a', 'target_value': 1.0}], [{'id': 'b', 'target_value': 2.0}]
+    ]
+    assert metrics['records_written'] == 2 and metrics['records_spilled'] == 0
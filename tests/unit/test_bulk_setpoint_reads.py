@@ -0,0 +1,99 @@
+"""
+Bulk Setpoint Read Tests
+
+Tests that RealPLC plans setpoint reads over write addresses:
+1. Setpoints are grouped into a few bulk register/coil ranges
+2. write_modbus_type decides coil vs register (binary-in-register supported)
+3. read_all_setpoints uses the bulk plan and reports round-trips saved
+"""
+
+import os
+import sys
+from unittest.mock import AsyncMock
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.plc.real_plc import RealPLC
+
+
+def _param(write_addr, data_type, write_type=None, writable=True):
+    return {
+        'name': f'p{write_addr}',
+        'read_modbus_address': write_addr + 1000,
+        'write_modbus_address': write_addr,
+        'read_modbus_type': None,
+        'write_modbus_type': write_type,
+        'data_type': data_type,
+        'min_value': 0,
+        'max_value': 100,
+        'is_writable': writable,
+        'component_name': 'test',
+        'short_component_name': 'test',
+    }
+
+
+@pytest.fixture
+def plc():
+    plc = RealPLC(ip_address='127.0.0.1', port=502)
+    plc.connected = True
+    plc._parameter_cache = {
+        'flow_1': _param(100, 'float', 'holding'),
+        'flow_2': _param(102, 'float', 'holding'),
+        'count': _param(104, 'int32', 'holding'),
+        'mode': _param(106, 'int16', 'holding'),
+        'enable': _param(107, 'binary', 'holding'),  # binary stored in a register
+        'valve_1': _param(10, 'binary', 'coil'),
+        'valve_2': _param(11, 'binary'),  # no write type -> coil
+        'readonly': _param(200, 'float', 'holding', writable=False),
+    }
+    return plc
+
+
+def test_setpoint_plan_groups_write_addresses(plc):
+    plc._initialize_bulk_setpoint_optimization()
+
+    ranges = plc._bulk_setpoint_ranges
+    assert len(ranges['coils']) == 1
+
+    holding_ids = {p[0] for r in ranges['holding_registers'] for p in r['parameters']}
+    assert holding_ids == {'flow_1', 'flow_2', 'count', 'mode', 'enable'}
+    coil_ids = {p[0] for p in ranges['coils'][0]['parameters']}
+    assert coil_ids == {'valve_1', 'valve_2'}
+
+    bulk_reads = len(ranges['holding_registers']) + len(ranges['coils'])
+    stats = plc.get_performance_metrics()['setpoint_plan']
+    assert stats['setpoints'] == 7
+    assert stats['bulk_reads_per_refresh'] == bulk_reads
+    assert stats['round_trips_saved_per_refresh'] == 7 - bulk_reads
+    assert bulk_reads < 7
+
+
+@pytest.mark.asyncio
+async def test_read_all_setpoints_uses_bulk_plan(plc):
+    plc._initialize_bulk_setpoint_optimization()
+    plc._bulk_read_holding_registers = AsyncMock(return_value={'flow_1': 5.0, 'enable': 1.0})
+    plc._bulk_read_coils = AsyncMock(return_value={'valve_1': 0.0})
+    plc.read_setpoint = AsyncMock()
+
+    result = await plc.read_all_setpoints()
+
+    assert result == {'flow_1': 5.0, 'enable': 1.0, 'valve_1': 0.0}
+    plc._bulk_read_holding_registers.assert_awaited_once()
+    plc._bulk_read_coils.assert_awaited_once()
+    plc.read_setpoint.assert_not_called()
+    # set_value sync is queued on the write-behind buffer, not sent per row
+    assert plc.value_buffer.pending_count == 3
+
+
+@pytest.mark.asyncio
+async def test_read_all_setpoints_falls_back_on_bulk_failure(plc):
+    plc._initialize_bulk_setpoint_optimization()
+    plc._read_all_setpoints_bulk = AsyncMock(side_effect=RuntimeError("bulk failed"))
+    plc.read_setpoint = AsyncMock(return_value=1.0)
+
+    result = await plc.read_all_setpoints()
+
+    assert len(result) == 7
+    assert plc.read_setpoint.await_count == 7
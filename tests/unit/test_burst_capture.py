@@ -0,0 +1,128 @@
+"""
+Burst Capture Tests
+
+Tests for high-rate sampling around valve pulses and purges:
+1. A trigger captures pre-roll, pulse and post-roll into one compact row
+2. The row is linked to the process and step set by burst_step()
+3. Failed uploads are spilled to disk
+4. RealPLC.control_valve triggers a burst only when capture is configured
+"""
+
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.plc.burst_capture import BurstCapture, burst_step
+from src.plc.real_plc import RealPLC
+
+
+class FakeSupabase:
+    """Records inserted rows; optionally fails every insert."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.rows = []
+
+    def table(self, name):
+        assert name == 'parameter_bursts'
+        query = Mock()
+
+        def insert(row):
+            def execute():
+                if self.fail:
+                    raise Exception("database unavailable")
+                self.rows.append(row)
+            query.execute = execute
+            return query
+
+        query.insert = insert
+        return query
+
+
+def _capture(supabase, tmp_path, reads=None):
+    counter = {'n': 0}
+
+    async def read(parameter_ids):
+        counter['n'] += 1
+        if reads is not None:
+            reads.append(list(parameter_ids))
+        return {pid: float(counter['n']) for pid in parameter_ids}
+
+    return BurstCapture(
+        read, ['pressure', 'flow'], rate_hz=100, pre_roll_ms=50, post_roll_ms=50,
+        idle_timeout=0.05, spill_dir=tmp_path, supabase_provider=lambda: supabase,
+    )
+
+
+@pytest.mark.asyncio
+async def test_trigger_uploads_one_compact_row_linked_to_step(tmp_path):
+    supabase = FakeSupabase()
+    reads = []
+    capture = _capture(supabase, tmp_path, reads)
+
+    capture.arm()
+    await asyncio.sleep(0.08)  # pre-roll builds up
+    with burst_step('process-1', 'step-7'):
+        assert capture.trigger('valve', duration_ms=100, label='valve_2')
+
+    for _ in range(100):
+        if supabase.rows:
+            break
+        await asyncio.sleep(0.02)
+    await capture.stop()
+
+    assert len(supabase.rows) == 1
+    row = supabase.rows[0]
+    assert (row['process_id'], row['step_id'], row['trigger'], row['label']) == (
+        'process-1', 'step-7', 'valve', 'valve_2'
+    )
+    assert row['sample_count'] == len(row['offsets_ms']) >= 10
+    assert row['offsets_ms'][0] < 0 <= row['offsets_ms'][-1] <= 200
+    assert all(len(values) == row['sample_count'] for values in row['samples'].values())
+    assert set(row['samples']) == {'pressure', 'flow'}
+    assert all(ids == ['pressure', 'flow'] for ids in reads)
+    assert capture.get_metrics()['last_pre_roll_ms'] > 0
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_spills_to_disk(tmp_path):
+    capture = _capture(FakeSupabase(fail=True), tmp_path)
+    capture.trigger('purge', duration_ms=20)
+    await asyncio.sleep(0.2)
+    await capture.stop()
+
+    spilled = list(tmp_path.glob('failed_burst_*.json'))
+    assert len(spilled) == 1
+    assert json.loads(spilled[0].read_text())['trigger'] == 'purge'
+    assert capture.get_metrics()['bursts_spilled'] == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_capture_never_samples(tmp_path):
+    read = AsyncMock()
+    capture = BurstCapture(read, [], spill_dir=tmp_path)
+    assert not capture.trigger('valve', duration_ms=100)
+    capture.arm()
+    await asyncio.sleep(0.02)
+    read.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_control_valve_triggers_burst():
+    plc = RealPLC(ip_address='127.0.0.1', port=502)
+    plc.connected = True
+    plc._valve_cache = {1: {'address': 10, 'parameter_id': 'valve_1'}}
+    plc.communicator.write_coil = AsyncMock(return_value=True)
+    plc._auto_close_valve = AsyncMock()
+    plc.burst_capture = Mock()
+
+    with burst_step('process-1', 'step-1'):
+        assert await plc.control_valve(1, True, 150)
+
+    plc.burst_capture.trigger.assert_called_once_with('valve', 150, label='valve_1')
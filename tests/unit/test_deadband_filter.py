@@ -0,0 +1,166 @@
+"""
+Deadband / Report-by-Exception Tests
+
+Tests for Terminal 1 report-by-exception publishing:
+1. The first row and every keyframe carry all columns
+2. Analog columns are published only beyond their absolute / percentage deadband
+3. Binary columns are published on any change; unchanged rows are suppressed
+4. Metrics report the payload reduction
+5. A heartbeat reports the read-but-unchanged columns, never unread ones
+6. The service writes sparse wide rows and counts suppressed rows as logged
+7. The service refreshes latest readings of unchanged parameters on heartbeats
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from plc_data_service import PLCDataService
+from src.data_collection.deadband_filter import DeadbandFilter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_keyframe_then_only_changes_beyond_deadband():
+    clock = FakeClock()
+    deadband = DeadbandFilter(absolute=0.5, keyframe_interval=60, clock=clock)
+
+    assert deadband.filter({'param_a': 10.0, 'param_b': 100.0}) == {'param_a': 10.0, 'param_b': 100.0}
+
+    clock.now = 1
+    assert deadband.filter({'param_a': 10.4, 'param_b': 101.0}) == {'param_b': 101.0}
+    clock.now = 2
+    # Drift is measured against the last reported value, not the last reading
+    assert deadband.filter({'param_a': 10.6, 'param_b': 101.0}) == {'param_a': 10.6}
+
+    clock.now = 60
+    assert deadband.filter({'param_a': 10.6, 'param_b': 101.0}) == {'param_a': 10.6, 'param_b': 101.0}
+    assert deadband.get_metrics()['keyframes'] == 2
+
+
+def test_percentage_and_per_column_thresholds():
+    clock = FakeClock()
+    deadband = DeadbandFilter(percent=1.0, keyframe_interval=60, clock=clock)
+    deadband.set_threshold('param_fixed', absolute=5.0, percent=0.0)
+    deadband.filter({'param_pct': 200.0, 'param_fixed': 50.0})
+
+    clock.now = 1
+    assert deadband.filter({'param_pct': 201.5, 'param_fixed': 54.0}) == {}  # 0.75% and 4.0
+    clock.now = 2
+    assert deadband.filter({'param_pct': 202.5, 'param_fixed': 56.0}) == {'param_pct': 202.5, 'param_fixed': 56.0}
+
+
+def test_binary_columns_published_on_change_and_unchanged_rows_suppressed():
+    clock = FakeClock()
+    deadband = DeadbandFilter(absolute=10.0, keyframe_interval=60, clock=clock)
+    deadband.set_binary_columns(['param_valve'])
+    deadband.filter({'param_valve': 0.0, 'param_temp': 25.0})
+
+    clock.now = 1
+    assert deadband.filter({'param_valve': 0.0, 'param_temp': 25.0}) == {}
+    clock.now = 2
+    assert deadband.filter({'param_valve': 1.0, 'param_temp': 25.0}) == {'param_valve': 1.0}
+
+    metrics = deadband.get_metrics()
+    assert metrics['rows_in'] == 3
+    assert metrics['rows_published'] == 2
+    assert metrics['rows_suppressed'] == 1
+
+
+def test_metrics_report_payload_reduction():
+    clock = FakeClock()
+    deadband = DeadbandFilter(keyframe_interval=60, clock=clock)
+    row = {f'param_{i:08x}': 0.0 for i in range(51)}
+    for second in range(60):
+        clock.now = second
+        deadband.filter(dict(row, param_00000000=float(second)))
+
+    metrics = deadband.get_metrics()
+    assert metrics['values_in'] == 60 * 51
+    assert metrics['values_published'] == 51 + 59
+    assert metrics['value_reduction_pct'] > 90
+    assert metrics['payload_reduction_pct'] > 90
+
+
+def test_heartbeat_reports_unchanged_columns_that_were_read():
+    clock = FakeClock()
+    deadband = DeadbandFilter(absolute=10.0, keyframe_interval=60, heartbeat_interval=1.0, clock=clock)
+    deadband.filter({'param_a': 1.0, 'param_b': 2.0, 'param_c': 3.0})
+    assert deadband.take_unchanged() == {}  # the keyframe refreshed everything
+
+    clock.now = 0.5
+    assert deadband.filter({'param_a': 1.0, 'param_b': 2.0, 'param_c': 3.0}) == {}
+    assert deadband.take_unchanged() == {}
+    clock.now = 1.0
+    # param_c failed to read: it is neither published nor refreshed
+    assert deadband.filter({'param_a': 20.0, 'param_b': 2.5}) == {'param_a': 20.0}
+    assert deadband.take_unchanged() == {'param_b': 2.0}
+    assert deadband.take_unchanged() == {}
+
+    metrics = deadband.get_metrics()
+    assert metrics['heartbeats'] == 1
+    assert metrics['rows_suppressed'] == 1
+
+
+@pytest.mark.asyncio
+async def test_service_writes_sparse_rows_in_deadband_mode():
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    service.deadband_enabled = True
+    service.deadband = DeadbandFilter(keyframe_interval=60, clock=FakeClock())
+    service._enqueue_wide_record = AsyncMock()
+
+    values = {
+        '0d444e71-9767-4956-af7b-787bfa79d080': 1.0,
+        '2b2e7952-c68e-40eb-ab67-d182fc460821': 2.0,
+    }
+    assert await service._log_parameters_with_metadata(values, {}) == 2
+    assert await service._log_parameters_with_metadata(values, {}) == 2  # suppressed, still logged
+    values['2b2e7952-c68e-40eb-ab67-d182fc460821'] = 3.0
+    assert await service._log_parameters_with_metadata(values, {}) == 2
+
+    written = [call.args[1] for call in service._enqueue_wide_record.await_args_list]
+    assert written == [{'param_0d444e71': 1.0, 'param_2b2e7952': 2.0}, {'param_2b2e7952': 3.0}]
+    assert service.get_status()['deadband']['rows_suppressed'] == 1
+    service._db_executor.shutdown(wait=False)
+
+
+@pytest.mark.asyncio
+async def test_service_refreshes_unchanged_latest_readings():
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    clock = FakeClock()
+    service.deadband_enabled = True
+    service.deadband = DeadbandFilter(absolute=10.0, keyframe_interval=60, heartbeat_interval=1.0, clock=clock)
+    service._enqueue_wide_record = AsyncMock()
+    refreshed = []
+    service._supabase_upsert_latest_readings_sync = refreshed.append
+
+    values = {
+        '0d444e71-9767-4956-af7b-787bfa79d080': 1.0,
+        '2b2e7952-c68e-40eb-ab67-d182fc460821': 2.0,
+    }
+    await service._log_parameters_with_metadata(values, {}, timestamp='t0')
+    clock.now = 1.0
+    await service._log_parameters_with_metadata(values, {}, timestamp='t1')
+    assert len(service._heartbeat_refresh_tasks) == 1  # held until it completes
+    await asyncio.sleep(0.05)
+    assert not service._heartbeat_refresh_tasks
+
+    assert refreshed == [[
+        {'parameter_id': pid, 'value': value, 'timestamp': 't1', 'updated_at': 'now()'}
+        for pid, value in values.items()
+    ]]
+    assert service.metrics['deadband_heartbeat_refreshes'] == 2
+    service._db_executor.shutdown(wait=False)
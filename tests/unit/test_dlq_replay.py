@@ -0,0 +1,157 @@
+"""
+Dead Letter Queue Bulk Replay Tests
+
+Tests for the indexed DLQ replay engine used by Terminal 1:
+1. Pending files are indexed once; DLQ writes update the depth without globbing
+2. Many files are packed into one bulk RPC per kind and deleted after the ack
+3. Rejected replays keep files; empty files are deleted, corrupted ones kept
+4. Replay is paced to the configured rows-per-second rate
+5. The recovery loop drains the queue and keeps the depth metric current
+"""
+
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from plc_data_service import PLCDataService
+from src.data_collection.dlq_replay import DeadLetterIndex, DeadLetterReplayer
+
+
+def _write_wide(directory, i):
+    path = directory / f"failed_wide_20260101_0000{i:02d}_000000.json"
+    path.write_text(json.dumps({'timestamp': f"2026-01-01T00:00:{i:02d}", 'params': {'param_a': float(i)}}))
+    return path
+
+
+def _write_narrow(directory, i, records=3):
+    path = directory / f"failed_batch_20260101_0000{i:02d}_000000.jsonl"
+    path.write_text(''.join(json.dumps({'parameter_id': f'p{j}', 'value': j}) + '\n' for j in range(records)))
+    return path
+
+
+async def _run_io(func, *args):
+    return func(*args)
+
+
+class FakeBulkInserts:
+    """Records bulk insert calls; optionally rejects them."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.wide_calls = []
+        self.narrow_calls = []
+
+    async def wide(self, rows):
+        self.wide_calls.append(rows)
+        return 0 if self.fail else len(rows)
+
+    async def narrow(self, records):
+        self.narrow_calls.append(records)
+        if self.fail:
+            raise Exception("database unavailable")
+        return len(records)
+
+
+@pytest.mark.asyncio
+async def test_files_packed_into_one_bulk_rpc_per_kind(tmp_path):
+    for i in range(40):
+        _write_wide(tmp_path, i)
+    _write_narrow(tmp_path, 0)
+    _write_narrow(tmp_path, 1)
+
+    inserts = FakeBulkInserts()
+    replayer = DeadLetterReplayer(DeadLetterIndex(), inserts.wide, inserts.narrow, _run_io, max_batch_rows=200)
+    assert await replayer.rescan(tmp_path) == 42
+
+    rows, acknowledged = await replayer.replay_batch()
+
+    assert acknowledged and rows == 46
+    assert len(inserts.wide_calls) == 1 and len(inserts.wide_calls[0]) == 40
+    assert len(inserts.narrow_calls) == 1 and len(inserts.narrow_calls[0]) == 6
+    assert list(tmp_path.iterdir()) == []
+    assert replayer.get_metrics()['pending_files'] == 0
+    assert replayer.get_metrics()['bulk_requests'] == 2
+
+
+@pytest.mark.asyncio
+async def test_batches_respect_row_budget(tmp_path):
+    for i in range(25):
+        _write_wide(tmp_path, i)
+    inserts = FakeBulkInserts()
+    replayer = DeadLetterReplayer(DeadLetterIndex(), inserts.wide, inserts.narrow, _run_io, max_batch_rows=10)
+    await replayer.rescan(tmp_path)
+
+    while len(replayer.index):
+        await replayer.replay_batch()
+
+    assert [len(call) for call in inserts.wide_calls] == [10, 10, 5]
+
+
+@pytest.mark.asyncio
+async def test_rejected_replay_keeps_files_and_handles_bad_files(tmp_path):
+    wide = _write_wide(tmp_path, 0)
+    narrow = _write_narrow(tmp_path, 1)
+    empty = tmp_path / "failed_batch_empty.jsonl"
+    empty.touch()
+    corrupted = tmp_path / "failed_batch_corrupted.jsonl"
+    corrupted.write_text('{"parameter_id": "p1"}\nTHIS IS NOT JSON\n')
+
+    inserts = FakeBulkInserts(fail=True)
+    replayer = DeadLetterReplayer(DeadLetterIndex(), inserts.wide, inserts.narrow, _run_io)
+    await replayer.rescan(tmp_path)
+    rows, acknowledged = await replayer.replay_batch()
+
+    assert rows == 0 and not acknowledged
+    assert wide.exists() and narrow.exists()
+    assert not empty.exists()
+    assert corrupted.exists()  # kept for manual recovery
+    assert len(replayer.index) == 2  # corrupted file no longer retried
+    metrics = replayer.get_metrics()
+    assert metrics['failed_requests'] == 2
+    assert metrics['skipped_corrupted_files'] == 1
+
+
+def test_replay_rate_pacing():
+    replayer = DeadLetterReplayer(DeadLetterIndex(), None, None, _run_io, rows_per_second=50)
+    assert replayer.pause_after(100, elapsed=0.5) == pytest.approx(1.5)
+    assert replayer.pause_after(0, elapsed=0.1) == 0.0
+    replayer.rows_per_second = 0  # unlimited
+    assert replayer.pause_after(100, elapsed=0.1) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_recovery_loop_drains_queue_with_bulk_rpcs(tmp_path):
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    service.dead_letter_queue_dir = tmp_path
+    service.dlq_replayer.rows_per_second = 0
+    service.dlq_replayer.max_batch_rows = 50
+
+    response = Mock()
+    response.data = 50
+    service.supabase.rpc.return_value.execute.return_value = response
+
+    for i in range(3):
+        await service._write_wide_record_to_dlq(f"2026-01-01T00:00:0{i}", {'param_a': float(i)})
+    assert service.metrics['dead_letter_queue_depth'] == 3
+    for i in range(10, 60):
+        _write_wide(tmp_path, i)  # left over from a previous run
+
+    recovery = asyncio.create_task(service._dead_letter_queue_recovery_loop())
+    for _ in range(200):
+        if service.metrics['dead_letter_queue_depth'] == 0 and not list(tmp_path.iterdir()):
+            break
+        await asyncio.sleep(0.01)
+    service.shutdown_event.set()
+    await recovery
+
+    assert list(tmp_path.iterdir()) == []
+    assert service.metrics['dead_letter_queue_replays'] == 53
+    assert service.supabase.rpc.call_count == 2  # 53 files in two bulk requests
+    service._db_executor.shutdown(wait=False)
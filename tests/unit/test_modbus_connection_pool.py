@@ -0,0 +1,159 @@
+"""
+Modbus Connection Pool Tests
+
+Tests for the persistent connection pool used by RealPLC bulk reads:
+1. Connections are reused across checkouts instead of reconnecting
+2. Broken connections are discarded and transparently re-opened
+3. Concurrency never exceeds the configured connection limit
+4. Host changes (DHCP re-discovery) invalidate pooled connections
+5. RealPLC leaves one of the PLC's connections to the communicator socket
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.plc.connection_pool import ModbusConnectionPool
+from src.plc.real_plc import RealPLC
+
+
+class FakeModbusClient:
+    """Minimal stand-in for pymodbus AsyncModbusTcpClient."""
+
+    instances = []
+
+    def __init__(self, host, port=502, timeout=2.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.open = False
+        self.connect_calls = 0
+        FakeModbusClient.instances.append(self)
+
+    async def connect(self):
+        self.connect_calls += 1
+        self.open = True
+        return True
+
+    def close(self):
+        self.open = False
+
+    @property
+    def connected(self):
+        return self.open
+
+
+@pytest.fixture
+def fake_clients():
+    FakeModbusClient.instances = []
+    yield FakeModbusClient.instances
+    FakeModbusClient.instances = []
+
+
+def _make_pool(host='10.0.0.5', **kwargs):
+    state = {'host': host}
+    pool = ModbusConnectionPool(
+        host_provider=lambda: state['host'],
+        port=502,
+        client_factory=FakeModbusClient,
+        **kwargs
+    )
+    return pool, state
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_connection(fake_clients):
+    """Sequential checkouts reuse one TCP connection."""
+    pool, _ = _make_pool(max_connections=4)
+
+    for _ in range(5):
+        async with pool.connection() as client:
+            assert client.open
+
+    metrics = pool.get_metrics()
+    assert len(fake_clients) == 1
+    assert metrics['total_connects'] == 1
+    assert metrics['reuse_count'] == 4
+    assert metrics['open_connections'] == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_discards_broken_connection(fake_clients):
+    """An exception inside the block closes the connection; next checkout reconnects."""
+    pool, _ = _make_pool()
+
+    with pytest.raises(ConnectionError):
+        async with pool.connection():
+            raise ConnectionError("socket reset")
+
+    assert not fake_clients[0].open
+
+    async with pool.connection() as client:
+        assert client is fake_clients[1]
+
+    metrics = pool.get_metrics()
+    assert metrics['discarded_connections'] == 1
+    assert metrics['total_connects'] == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_respects_connection_limit(fake_clients):
+    """Concurrent checkouts never exceed max_connections."""
+    pool, _ = _make_pool(max_connections=2)
+    active = 0
+    peak = 0
+
+    async def borrow():
+        nonlocal active, peak
+        async with pool.connection():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*[borrow() for _ in range(8)])
+
+    assert peak == 2
+    assert len(fake_clients) == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_reconnects_on_host_change(fake_clients):
+    """A changed PLC IP invalidates idle connections."""
+    pool, state = _make_pool()
+
+    async with pool.connection():
+        pass
+
+    state['host'] = '10.0.0.6'
+    async with pool.connection() as client:
+        assert client.host == '10.0.0.6'
+
+    assert not fake_clients[0].open
+
+
+@pytest.mark.asyncio
+async def test_pool_close_refuses_checkout(fake_clients):
+    """Closing the pool closes idle connections and blocks new checkouts."""
+    pool, _ = _make_pool()
+
+    async with pool.connection():
+        pass
+    await pool.close()
+
+    assert not fake_clients[0].open
+    with pytest.raises(RuntimeError):
+        async with pool.connection():
+            pass
+
+
+def test_real_plc_pool_leaves_room_for_communicator_socket():
+    plc = RealPLC(ip_address='127.0.0.1', port=502, max_connections=4)
+
+    # 3 pooled + the communicator's own socket = the PLC's limit of 4
+    assert plc.connection_pool.max_connections == 3
+    assert plc.concurrency_limiter.max_limit == 3
@@ -0,0 +1,153 @@
+"""
+Parameter Write-Behind Buffer Tests
+
+Tests for the coalescing buffer that replaces per-read/per-write
+component_parameters UPDATEs in RealPLC:
+1. Only the latest value per parameter/field is flushed
+2. All changed rows go out in one batched RPC
+3. Failed flushes are re-queued without clobbering newer values
+4. Values equal to the last flushed value are not sent again until resync
+5. stop() during an in-flight RPC retries the batch if that RPC fails
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.plc.write_behind import ParameterWriteBehindBuffer
+
+
+@pytest.fixture
+def supabase():
+    client = Mock()
+    client.rpc.return_value.execute.return_value = Mock(data=2)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_flush_coalesces_latest_values(supabase):
+    buffer = ParameterWriteBehindBuffer(supabase_provider=lambda: supabase)
+
+    buffer.update('p1', current_value=1.0)
+    buffer.update('p1', current_value=2.0)
+    buffer.update('p1', set_value=5.0)
+    buffer.update('p2', current_value=7.0)
+
+    sent = await buffer.flush()
+
+    assert sent == 2
+    supabase.rpc.assert_called_once()
+    rpc_name, params = supabase.rpc.call_args[0]
+    assert rpc_name == 'batch_update_parameter_values'
+    assert sorted(params['p_updates'], key=lambda r: r['id']) == [
+        {'id': 'p1', 'current_value': 2.0, 'set_value': 5.0},
+        {'id': 'p2', 'current_value': 7.0},
+    ]
+
+    metrics = buffer.get_metrics()
+    assert metrics['updates_received'] == 4
+    assert metrics['fields_coalesced'] == 1
+    assert metrics['rows_flushed'] == 2
+    assert metrics['pending_rows'] == 0
+
+
+@pytest.mark.asyncio
+async def test_empty_flush_sends_nothing(supabase):
+    buffer = ParameterWriteBehindBuffer(supabase_provider=lambda: supabase)
+
+    assert await buffer.flush() == 0
+    supabase.rpc.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_requeues_without_overwriting_newer(supabase):
+    supabase.rpc.return_value.execute.side_effect = Exception("network down")
+    buffer = ParameterWriteBehindBuffer(supabase_provider=lambda: supabase)
+
+    buffer.update('p1', current_value=1.0, set_value=3.0)
+    assert await buffer.flush() == 0
+
+    # Newer value arrives before the retry
+    buffer.update('p1', current_value=9.0)
+    supabase.rpc.return_value.execute.side_effect = None
+
+    assert await buffer.flush() == 1
+    _, params = supabase.rpc.call_args[0]
+    assert params['p_updates'] == [{'id': 'p1', 'current_value': 9.0, 'set_value': 3.0}]
+    assert buffer.get_metrics()['flush_failures'] == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_remaining_rows(supabase):
+    buffer = ParameterWriteBehindBuffer(flush_interval=60, supabase_provider=lambda: supabase)
+    buffer.start()
+    buffer.update('p1', set_value=4.0)
+
+    await buffer.stop()
+
+    supabase.rpc.assert_called_once()
+    assert buffer.pending_count == 0
+
+
+@pytest.mark.asyncio
+async def test_unchanged_values_are_not_resent(supabase):
+    buffer = ParameterWriteBehindBuffer(supabase_provider=lambda: supabase)
+
+    buffer.update('p1', set_value=4.0)
+    buffer.update('p2', set_value=2.0)
+    assert await buffer.flush() == 2
+
+    # Next setpoint poll: p1 unchanged, p2 changed
+    buffer.update('p1', set_value=4.0)
+    buffer.update('p2', set_value=2.5)
+    assert await buffer.flush() == 1
+    _, params = supabase.rpc.call_args[0]
+    assert params['p_updates'] == [{'id': 'p2', 'set_value': 2.5}]
+
+    # Nothing changed: no RPC at all
+    buffer.update('p1', set_value=4.0)
+    buffer.update('p2', set_value=2.5)
+    assert await buffer.flush() == 0
+    assert supabase.rpc.call_count == 2
+    assert buffer.get_metrics()['values_unchanged'] == 3
+
+    # Past the resync interval the value is written again
+    buffer.resync_interval = 0
+    buffer.update('p1', set_value=4.0)
+    assert await buffer.flush() == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_during_in_flight_rpc_keeps_failed_rows(supabase):
+    entered = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def execute():
+        calls.append(supabase.rpc.call_args[0][1]['p_updates'])
+        if len(calls) == 1:
+            entered.set()
+            release.wait(1.0)
+            raise Exception("database unavailable")
+        return Mock(data=1)
+    supabase.rpc.return_value.execute.side_effect = execute
+
+    buffer = ParameterWriteBehindBuffer(flush_interval=0.01, supabase_provider=lambda: supabase)
+    buffer.start()
+    buffer.update('p1', current_value=1.0)
+    await asyncio.to_thread(entered.wait, 1.0)
+
+    stopping = asyncio.create_task(buffer.stop())
+    await asyncio.sleep(0.05)
+    assert not stopping.done()  # waits for the RPC the cancelled loop left running
+    release.set()
+    await stopping
+
+    assert calls == [[{'id': 'p1', 'current_value': 1.0}], [{'id': 'p1', 'current_value': 1.0}]]
+    assert buffer.pending_count == 0
@@ -0,0 +1,218 @@
+"""
+Pipelined Modbus Transport Tests
+
+Runs PipelinedModbusClient against a small in-process Modbus TCP server:
+1. Several requests are in flight on one socket; responses are matched by
+   transaction ID even when the device answers out of order
+2. Exception responses surface as isError() like pymodbus responses
+3. Timeouts fail only the affected request; late answers to timed-out or
+   cancelled requests are ignored
+4. Out-of-spec answers switch the client to serial mode (sticky across reconnects)
+"""
+
+import asyncio
+import os
+import struct
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from pymodbus.exceptions import ModbusIOException
+
+from src.plc.async_communicator import AsyncPLCCommunicator
+from src.plc.pipelined_transport import PipelinedModbusClient
+
+MBAP = struct.Struct('>HHHB')
+
+
+class FakeModbusServer:
+    """Modbus TCP server holding registers/coils in memory."""
+
+    def __init__(self, mode='normal', batch=1):
+        self.mode = mode
+        self.batch = batch  # answer after collecting this many requests
+        self.registers = {address: address * 10 for address in range(200)}
+        self.coils = {address: address % 3 == 0 for address in range(64)}
+        self.max_outstanding = 0
+        self.server = None
+        self.port = None
+        self._dropped = False
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def _respond(self, tid, unit, pdu):
+        fc = pdu[0]
+        if fc == 0x03:
+            address, count = struct.unpack('>HH', pdu[1:5])
+            if address >= 1000:
+                body = bytes([0x83, 0x02])
+            else:
+                values = [self.registers.get(address + i, 0) for i in range(count)]
+                body = struct.pack(f'>BB{count}H', 0x03, count * 2, *values)
+        elif fc == 0x01:
+            address, count = struct.unpack('>HH', pdu[1:5])
+            bits = [self.coils.get(address + i, False) for i in range(count)]
+            packed = bytes(sum(1 << j for j, bit in enumerate(bits[i:i + 8]) if bit) for i in range(0, count, 8))
+            body = struct.pack('>BB', 0x01, len(packed)) + packed
+        elif fc == 0x05:
+            address, value = struct.unpack('>HH', pdu[1:5])
+            self.coils[address] = value == 0xFF00
+            body = pdu
+        else:
+            body = pdu[:5]
+        if self.mode == 'bad_tid':
+            tid = (tid + 1000) % 0xFFFF
+        return MBAP.pack(tid, 0, len(body) + 1, unit) + body
+
+    async def _handle(self, reader, writer):
+        queued = []
+        try:
+            while True:
+                tid, _, length, unit = MBAP.unpack(await reader.readexactly(MBAP.size))
+                pdu = await reader.readexactly(length - 1)
+                if self.mode == 'drop_first' and not self._dropped:
+                    self._dropped = True
+                    continue
+                queued.append((tid, unit, pdu))
+                self.max_outstanding = max(self.max_outstanding, len(queued))
+                if len(queued) >= self.batch:
+                    for item in reversed(queued):  # answer out of order
+                        writer.write(self._respond(*item))
+                    queued = []
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            writer.close()
+
+
+async def _client_for(server, **kwargs):
+    client = PipelinedModbusClient('127.0.0.1', port=server.port, **kwargs)
+    assert await client.connect()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_responses_matched_by_transaction_id():
+    server = FakeModbusServer(batch=4)
+    await server.start()
+    client = await _client_for(server, depth=4)
+    try:
+        results = await asyncio.gather(*[
+            client.read_holding_registers(start, count=3, slave=1) for start in (0, 10, 20, 30)
+        ])
+        assert [r.registers for r in results] == [
+            [0, 10, 20], [100, 110, 120], [200, 210, 220], [300, 310, 320]
+        ]
+        assert server.max_outstanding == 4
+        assert client.get_metrics()['max_in_flight'] == 4
+        assert client.pipelining
+    finally:
+        client.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_coils_writes_and_exception_responses():
+    server = FakeModbusServer()
+    await server.start()
+    client = await _client_for(server, depth=2)
+    try:
+        coils = await client.read_coils(0, count=10, slave=1)
+        assert coils.bits[:10] == [i % 3 == 0 for i in range(10)]
+
+        assert not (await client.write_coil(1, True, slave=1)).isError()
+        assert server.coils[1] is True
+
+        error = await client.read_holding_registers(1000, count=1, slave=1)
+        assert error.isError()
+        assert error.exception_code == 2
+    finally:
+        client.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_dropped_request_times_out_and_falls_back_to_serial():
+    server = FakeModbusServer(mode='drop_first')
+    await server.start()
+    fallbacks = []
+    client = await _client_for(server, depth=4, timeout=0.2, on_fallback=fallbacks.append)
+    try:
+        results = await asyncio.gather(
+            client.read_holding_registers(0, count=1, slave=1),
+            client.read_holding_registers(5, count=1, slave=1),
+            return_exceptions=True,
+        )
+        assert isinstance(results[0], ModbusIOException)
+        assert results[1].registers == [50]
+        assert not client.pipelining
+        assert len(fallbacks) == 1
+        assert client.get_metrics()['mode'] == 'serial'
+    finally:
+        client.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_late_answer_to_cancelled_request_keeps_pipelining():
+    server = FakeModbusServer(batch=2)  # first answer arrives with the second request
+    await server.start()
+    client = await _client_for(server, depth=4, timeout=1.0)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.read_holding_registers(0, count=1, slave=1), timeout=0.05)
+        response = await client.read_holding_registers(5, count=1, slave=1)
+        assert response.registers == [50]
+        await asyncio.sleep(0.05)
+        assert client.pipelining
+        assert client.get_metrics()['protocol_violations'] == 0
+    finally:
+        client.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_unknown_transaction_id_falls_back_to_serial():
+    server = FakeModbusServer(mode='bad_tid')
+    await server.start()
+    client = await _client_for(server, depth=4, timeout=0.2)
+    try:
+        with pytest.raises(ModbusIOException):
+            await client.read_holding_registers(0, count=1, slave=1)
+        metrics = client.get_metrics()
+        assert metrics['protocol_violations'] >= 1
+        assert metrics['mode'] == 'serial'
+    finally:
+        client.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_communicator_uses_pipelined_client_and_keeps_serial_after_fallback():
+    server = FakeModbusServer()
+    await server.start()
+    communicator = AsyncPLCCommunicator(
+        plc_ip='127.0.0.1', port=server.port, retries=1, pipeline_depth=4
+    )
+    try:
+        assert await communicator.connect()
+        assert communicator.pipelined_client() is communicator.client
+        assert await communicator.read_holding_registers(2, count=2) == [20, 30]
+
+        communicator.client._fall_back("test")
+        assert communicator.pipelined_client() is None
+
+        # Reconnect builds a new client that starts in serial mode
+        assert await communicator.connect()
+        assert not communicator.client.pipelining
+        assert communicator.get_pipeline_metrics()['fallback_reason'] == "test"
+    finally:
+        await communicator.disconnect()
+        await server.stop()
@@ -0,0 +1,103 @@
+"""
+PLC Snapshot Cache Tests
+
+Tests for PLCManager.read_parameter(max_age_ms=...):
+1. Values from the latest bulk read are served while fresh enough
+2. Stale or missing values fall through to a wire read
+3. Concurrent misses for one parameter share a single wire read
+4. Writes invalidate the cached value (including reads already in flight)
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.plc.manager import PLCManager
+from src.plc.snapshot_cache import ParameterSnapshotCache
+
+
+class FakePLC:
+    """PLC stand-in counting wire reads."""
+
+    def __init__(self):
+        self.connected = True
+        self.values = {'flow': 10.0, 'pressure': 2.5}
+        self.wire_reads = 0
+        self.read_delay = 0.0
+
+    async def read_parameter(self, parameter_id, skip_noise=False):
+        self.wire_reads += 1
+        await asyncio.sleep(self.read_delay)
+        return self.values[parameter_id]
+
+    async def read_all_parameters(self):
+        return dict(self.values)
+
+    async def write_parameter(self, parameter_id, value):
+        self.values[parameter_id] = value
+        return True
+
+
+@pytest.fixture
+def manager():
+    manager = PLCManager()
+    saved_plc, saved_snapshot = manager._plc, manager._snapshot
+    manager._plc = FakePLC()
+    manager._snapshot = ParameterSnapshotCache()
+    yield manager
+    manager._plc, manager._snapshot = saved_plc, saved_snapshot
+
+
+@pytest.mark.asyncio
+async def test_fresh_bulk_value_served_from_snapshot(manager):
+    await manager.read_all_parameters()
+
+    assert await manager.read_parameter('flow', max_age_ms=1000) == 10.0
+    assert manager.plc.wire_reads == 0
+
+    metrics = manager.get_performance_metrics()['snapshot_cache']
+    assert metrics['hits'] == 1
+    assert metrics['hit_rate'] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_stale_or_uncached_value_reads_the_wire(manager):
+    await manager.read_all_parameters()
+    await asyncio.sleep(0.02)
+
+    assert await manager.read_parameter('flow', max_age_ms=5) == 10.0
+    assert await manager.read_parameter('pressure') == 2.5  # no max_age -> always wire
+    assert manager.plc.wire_reads == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_wire_read(manager):
+    manager.plc.read_delay = 0.01
+
+    values = await asyncio.gather(*[manager.read_parameter('flow', max_age_ms=100) for _ in range(5)])
+
+    assert values == [10.0] * 5
+    assert manager.plc.wire_reads == 1
+    assert manager.get_performance_metrics()['snapshot_cache']['coalesced'] == 4
+
+
+@pytest.mark.asyncio
+async def test_write_invalidates_snapshot_and_in_flight_reads(manager):
+    await manager.read_all_parameters()
+    await manager.write_parameter('flow', 42.0)
+
+    assert await manager.read_parameter('flow', max_age_ms=1000) == 42.0
+    assert manager.plc.wire_reads == 1
+
+    # A read that started before a write must not repopulate the snapshot
+    manager.plc.read_delay = 0.02
+    before_write = asyncio.create_task(manager.read_parameter('flow'))
+    await asyncio.sleep(0)
+    await manager.write_parameter('flow', 7.0)
+    await before_write
+
+    assert manager._snapshot.get('flow', max_age_ms=1000) is None
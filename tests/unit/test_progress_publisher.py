@@ -0,0 +1,183 @@
+"""
+Progress Publisher Tests
+
+Tests for coalesced process_execution_state publishing during recipe runs:
+1. Field changes within the flush interval merge into one UPDATE (latest wins)
+2. close() force-flushes pending progress and reports the writes saved
+3. A failed write is kept and retried on the next flush, or after the interval
+4. A loop of valve steps publishes through the publisher with no progress SELECTs
+5. Process data samples requested by steps are coalesced into one per flush
+6. close() waits for an in-flight UPDATE so the final state is written last
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from tests.fixtures.database_fixtures import RecordingSupabase
+from src.recipe_flow.plan import execution_plan
+from src.recipe_flow.compiler import compile_recipe
+from src.recipe_flow.progress_publisher import ProgressPublisher, progress_publisher, sample_process_data
+from src.step_flow.loop_step import execute_loop_step
+
+
+@pytest.mark.asyncio
+async def test_changes_within_interval_coalesce():
+    supabase = RecordingSupabase()
+    publisher = ProgressPublisher('exec-1', supabase, flush_interval_ms=50)
+    publisher.start()
+
+    publisher.update({'current_step_name': 'first'})
+    await asyncio.sleep(0.01)  # first change is published immediately
+    for name in ('a', 'b', 'c'):
+        publisher.update({'current_step_name': name, 'current_valve_number': 1})
+    await asyncio.sleep(0.02)
+    assert len(supabase.updates('process_execution_state')) == 1
+
+    await asyncio.sleep(0.06)
+    updates = supabase.updates('process_execution_state')
+    assert len(updates) == 2
+    assert updates[1]['current_step_name'] == 'c' and updates[1]['last_updated'] == 'now()'
+    touches = [q for q in supabase.queries if q[0] == 'process_executions']
+    assert len(touches) == 2
+    await publisher.close('completed')
+
+
+@pytest.mark.asyncio
+async def test_close_force_flushes_and_reports_savings():
+    supabase = RecordingSupabase()
+    publisher = ProgressPublisher('exec-1', supabase, flush_interval_ms=10_000,
+                                  progress={'total_steps': 3, 'completed_steps': 0})
+    publisher.start()
+    await asyncio.sleep(0.01)
+
+    for _ in range(3):
+        publisher.update({'current_step_type': 'valve'})
+        publisher.advance({'completed_steps': 1})
+    metrics = await publisher.close('completed')
+
+    assert supabase.updates('process_execution_state')[-1]['progress'] == {'total_steps': 3, 'completed_steps': 3}
+    assert metrics['forced_flushes'] == 1
+    assert metrics['writes_requested'] == 1 + 3 * 3
+    assert metrics['writes_performed'] == 3  # initial progress, final state, one touch
+    assert metrics['writes_saved'] == 7
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_retried():
+    supabase = RecordingSupabase(fail_updates=1)
+    publisher = ProgressPublisher('exec-1', supabase, flush_interval_ms=10_000)
+
+    publisher.update({'current_step_name': 'pulse'}, touch=False)
+    assert await publisher.flush() == 0
+    publisher.update({'current_valve_number': 2}, touch=False)
+    assert await publisher.flush() == 1
+
+    assert supabase.updates('process_execution_state') == [
+        {'current_step_name': 'pulse', 'current_valve_number': 2, 'last_updated': 'now()'}
+    ]
+    assert publisher.get_metrics()['write_errors'] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_retries_without_new_changes():
+    supabase = RecordingSupabase(fail_updates=1)
+    publisher = ProgressPublisher('exec-1', supabase, flush_interval_ms=20)
+    publisher.start()
+
+    publisher.update({'current_step_name': 'long purge'}, touch=False)
+    await asyncio.sleep(0.01)
+    assert not supabase.updates('process_execution_state')
+
+    await asyncio.sleep(0.04)
+    assert supabase.updates('process_execution_state') == [
+        {'current_step_name': 'long purge', 'last_updated': 'now()'}
+    ]
+    await publisher.close('completed')
+
+@pytest.mark.asyncio
+async def test_loop_publishes_through_publisher():
+    steps = [
+        {'id': 'loop', 'name': 'Cycle', 'type': 'loop', 'sequence_number': 1, 'parameters': {'count': 20}},
+        {'id': 'v1', 'name': 'Pulse', 'type': 'valve', 'sequence_number': 1,
+         'parent_step_id': 'loop', 'parameters': {'valve_number': 1, 'duration_ms': 0}},
+    ]
+    process = {'id': 'exec-1', 'recipe_id': 'recipe-1', 'recipe_version': {'steps': steps}}
+    plan = compile_recipe(process, RecordingSupabase())
+    supabase = RecordingSupabase()
+    publisher = ProgressPublisher('exec-1', supabase, flush_interval_ms=10_000,
+                                  progress={'total_steps': plan.total_steps, 'completed_steps': 0,
+                                            'total_cycles': plan.total_cycles, 'completed_cycles': 0})
+    plc = Mock(burst_capture=None)
+    plc.control_valve = AsyncMock(return_value=True)
+
+    with patch('src.step_flow.loop_step.get_supabase', return_value=supabase), \
+            patch('src.step_flow.valve_step.get_supabase', return_value=supabase), \
+            patch('src.plc.context.get_plc', return_value=plc):
+        with execution_plan(plan), progress_publisher(publisher):
+            await execute_loop_step('exec-1', steps[0], steps, {'loop': [steps[1]]})
+    metrics = await publisher.close('completed')
+
+    assert not [q for q in supabase.queries if q[0] == 'process_execution_state' and q[1] == 'select']
+    assert supabase.updates('process_execution_state')[-1]['progress'] == {
+        'total_steps': 20, 'completed_steps': 20, 'total_cycles': 20, 'completed_cycles': 20
+    }
+    assert metrics['writes_performed'] == 2
+    assert metrics['writes_saved'] > 100
+
+
+@pytest.mark.asyncio
+async def test_process_data_samples_coalesce_per_flush():
+    supabase = RecordingSupabase({
+        'machine_components': [{'id': 'c1'}],
+        'component_parameters': [{'id': 'p1', 'current_value': 1.0, 'set_value': 2.0}],
+    })
+    publisher = ProgressPublisher('exec-1', supabase, flush_interval_ms=10_000)
+
+    with progress_publisher(publisher):
+        for _ in range(50):
+            await sample_process_data('exec-1')
+    assert not supabase.queries
+
+    metrics = await publisher.close('completed')
+    assert len([q for q in supabase.queries if q[0] == 'machine_components']) == 1
+    [points] = supabase.inserts('process_data_points')
+    assert points[0]['parameter_id'] == 'p1' and points[0]['set_point'] == 2.0
+    assert metrics['samples_requested'] == 50 and metrics['samples_recorded'] == 1
+
+
+@pytest.mark.asyncio
+async def test_close_writes_final_state_after_in_flight_update():
+    supabase = RecordingSupabase()
+    entered = threading.Event()
+    release = threading.Event()
+    write_state = ProgressPublisher._write_state
+
+    class SlowPublisher(ProgressPublisher):
+        def _write_state(self, fields):
+            if not entered.is_set():
+                entered.set()
+                release.wait(1.0)
+            write_state(self, fields)
+
+    publisher = SlowPublisher('exec-1', supabase, flush_interval_ms=10_000,
+                              progress={'completed_steps': 0})
+    publisher.start()
+    await asyncio.to_thread(entered.wait, 1.0)
+    publisher.advance({'completed_steps': 5})
+
+    closing = asyncio.create_task(publisher.close('completed'))
+    await asyncio.sleep(0.05)
+    assert not closing.done()
+    release.set()
+    await closing
+
+    assert [u['progress'] for u in supabase.updates('process_execution_state')] == [
+        {'completed_steps': 0}, {'completed_steps': 5}
+    ]
@@ -0,0 +1,195 @@
+"""
+Bulk Read Range Planner Tests
+
+Tests for the latency-aware planner that replaced the greedy optimizer:
+1. The DP partition has minimal predicted cost (checked against brute force)
+2. Modbus per-request limits (125 registers / 2000 coils) are respected
+3. Gaps are bridged only when that is cheaper than an extra round-trip
+4. The cost model can be fitted from measured read latencies
+5. No range bridges more than max_gap unused addresses
+6. A range rejected with Illegal Data Address is re-read in pieces split at its gaps
+"""
+
+import itertools
+import os
+import random
+import sys
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.plc.communicator import PLCCommunicator
+from src.plc.decode_plan import compile_decode_plans
+from src.plc.range_planner import (
+    MODBUS_ILLEGAL_DATA_ADDRESS,
+    MODBUS_MAX_COILS,
+    MODBUS_MAX_REGISTERS,
+    RangeCostModel,
+    plan_coil_ranges,
+    plan_register_ranges,
+    register_width,
+    split_range,
+)
+from src.plc.real_plc import RealPLC
+
+
+def _brute_force_cost(params, model, max_registers):
+    fields = sorted((address, address + register_width(dt)) for _, address, dt in params)
+    best = float('inf')
+    for cuts in itertools.product([False, True], repeat=len(fields) - 1):
+        groups, current = [], [fields[0]]
+        for field, cut in zip(fields[1:], cuts):
+            if cut:
+                groups.append(current)
+                current = []
+            current.append(field)
+        groups.append(current)
+        spans = [max(e for _, e in g) - g[0][0] for g in groups]
+        if all(span <= max_registers for span in spans):
+            best = min(best, sum(model.range_cost(span) for span in spans))
+    return best
+
+
+def test_register_plan_is_optimal_against_brute_force():
+    rng = random.Random(7)
+    model = RangeCostModel(request_cost_ms=3.0, register_cost_ms=0.25)
+    for _ in range(100):
+        params = [
+            (f'p{i}', rng.randrange(0, 120), rng.choice(['float', 'int16', 'int32', 'binary']))
+            for i in range(rng.randrange(1, 9))
+        ]
+        ranges, cost = plan_register_ranges(params, model, max_registers=30)
+
+        assert cost == pytest.approx(_brute_force_cost(params, model, 30))
+        assert sum(model.range_cost(r['count']) for r in ranges) == pytest.approx(cost)
+        assert sorted(p for r in ranges for p in r['parameters']) == sorted(params)
+
+
+def test_register_plan_covers_every_field_within_limit():
+    params = [(f'p{i}', i * 3, 'float') for i in range(200)]
+    ranges, _ = plan_register_ranges(params, RangeCostModel())
+
+    for range_info in ranges:
+        assert range_info['count'] <= MODBUS_MAX_REGISTERS
+        for _, address, data_type in range_info['parameters']:
+            assert range_info['start_address'] <= address
+            assert address + register_width(data_type) <= range_info['start_address'] + range_info['count']
+
+
+def test_gap_bridged_only_when_cheaper_than_extra_request():
+    params = [('a', 0, 'int16'), ('b', 41, 'int16')]
+
+    # Bridging 40 registers costs 0.4ms < 1ms extra request -> one range
+    ranges, cost = plan_register_ranges(params, RangeCostModel(request_cost_ms=1.0, register_cost_ms=0.01))
+    assert len(ranges) == 1
+    assert cost == pytest.approx(1.0 + 0.42)
+
+    # Bridging costs 4ms > 1ms extra request -> two ranges
+    ranges, _ = plan_register_ranges(params, RangeCostModel(request_cost_ms=1.0, register_cost_ms=0.1))
+    assert [r['start_address'] for r in ranges] == [0, 41]
+
+
+def test_mixed_data_types_share_a_range():
+    params = [('f', 0, 'float'), ('i', 2, 'int16'), ('d', 3, 'int32')]
+    ranges, _ = plan_register_ranges(params, RangeCostModel())
+
+    assert len(ranges) == 1
+    assert ranges[0]['count'] == 5
+    assert ranges[0]['value_count'] == 3
+
+
+def test_coil_plan_respects_coil_limit():
+    params = [(f'c{i}', i * 10, 'binary') for i in range(500)]
+    ranges, _ = plan_coil_ranges(params, RangeCostModel())
+
+    assert len(ranges) == 3
+    assert all(r['count'] <= MODBUS_MAX_COILS for r in ranges)
+
+
+def test_optimize_address_ranges_reports_predicted_cost():
+    communicator = PLCCommunicator(plc_ip='127.0.0.1')
+    plan = communicator.optimize_address_ranges(
+        [('f', 100, 'float', 'holding'), ('v', 5, 'binary', None)],
+        cost_model=RangeCostModel(request_cost_ms=2.0, register_cost_ms=0.5, coil_cost_ms=0.1),
+    )
+
+    assert len(plan['holding_registers']) == 1
+    assert len(plan['coils']) == 1
+    assert plan['predicted_cost_ms'] == pytest.approx((2.0 + 1.0) + (2.0 + 0.1))
+
+
+def test_cost_model_fit_from_measurements():
+    fallback = RangeCostModel(request_cost_ms=5.0, register_cost_ms=0.02, coil_cost_ms=0.002)
+    samples = [(count, 4.0 + 0.1 * count) for count in range(10, 110, 4)]
+
+    fitted = RangeCostModel.fit(samples, fallback)
+
+    assert fitted.request_cost_ms == pytest.approx(4.0)
+    assert fitted.register_cost_ms == pytest.approx(0.1)
+    assert fitted.coil_cost_ms == pytest.approx(0.01)
+
+    # Too few samples, or no spread in read sizes -> fallback
+    assert RangeCostModel.fit(samples[:5], fallback) is fallback
+    assert RangeCostModel.fit([(50, 3.0)] * 30, fallback) is fallback
+
+
+def test_max_gap_limits_bridging():
+    params = [('a', 0, 'int16'), ('b', 41, 'int16'), ('c', 50, 'int16')]
+    cheap = RangeCostModel(request_cost_ms=10.0, register_cost_ms=0.01)
+
+    assert len(plan_register_ranges(params, cheap)[0]) == 1
+    ranges, _ = plan_register_ranges(params, cheap, max_gap=16)
+    assert [(r['start_address'], r['count']) for r in ranges] == [(0, 1), (41, 10)]
+
+    coils, _ = plan_coil_ranges([('v1', 0, 'binary'), ('v2', 100, 'binary')], cheap, max_gap=16)
+    assert len(coils) == 2
+
+
+def test_split_range_cuts_at_gaps_then_per_parameter():
+    ranges, _ = plan_register_ranges(
+        [('f', 0, 'float'), ('i', 2, 'int16'), ('d', 10, 'int32')],
+        RangeCostModel(request_cost_ms=10.0, register_cost_ms=0.01),
+    )
+    [whole] = ranges
+
+    pieces = split_range(whole)
+    assert [(r['start_address'], r['count'], r['value_count']) for r in pieces] == [(0, 3, 2), (10, 2, 1)]
+    assert [(r['start_address'], r['count']) for r in split_range(pieces[0])] == [(0, 2), (2, 1)]
+    assert split_range(pieces[1]) == []
+
+
+@pytest.mark.asyncio
+async def test_rejected_range_is_reread_in_pieces():
+    plc = RealPLC(ip_address='127.0.0.1', port=502)
+    unmapped = set(range(3, 10))
+    requests = []
+
+    class Client:
+        async def read_holding_registers(self, address, count, slave=None):
+            requests.append((address, count))
+            if unmapped & set(range(address, address + count)):
+                return SimpleNamespace(isError=lambda: True, exception_code=MODBUS_ILLEGAL_DATA_ADDRESS)
+            return SimpleNamespace(isError=lambda: False, registers=[7] * count)
+
+    @asynccontextmanager
+    async def range_client():
+        yield Client()
+    plc._range_client = range_client
+
+    ranges = {'holding_registers': [{
+        'start_address': 0, 'count': 12, 'data_type': 'int16', 'value_count': 2,
+        'parameters': [('a', 0, 'int16'), ('b', 10, 'int32')],
+    }]}
+    compile_decode_plans(ranges, plc.communicator.byte_order)
+
+    values = await plc._bulk_read_holding_registers(ranges['holding_registers'])
+    assert values['a'] == 7 and 'b' in values
+    assert requests == [(0, 12), (0, 1), (10, 2)]
+
+    # The split is remembered: the next read skips the rejected range
+    requests.clear()
+    await plc._bulk_read_holding_registers(ranges['holding_registers'])
+    assert sorted(requests) == [(0, 1), (10, 2)]
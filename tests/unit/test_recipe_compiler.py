@@ -0,0 +1,119 @@
+"""
+Recipe Compiler Tests
+
+Tests for compiling a recipe into an in-memory execution plan:
+1. Step configs are fetched with one batched query per config table
+2. Steps without a config row fall back to their inline parameters
+3. A valve missing from the PLC valve map (get_valve_mapping()) fails compilation
+4. Overall step positions and totals match the executor's progress counting
+5. A valve step executed under a plan does no configuration reads
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from tests.fixtures.database_fixtures import RecordingSupabase
+from src.plc.simulation import SimulationPLC
+from src.recipe_flow.compiler import compile_recipe
+from src.recipe_flow.plan import current_plan, execution_plan
+from src.step_flow.valve_step import execute_valve_step
+
+
+def make_process():
+    steps = [
+        {'id': 'v1', 'name': 'Pulse A', 'type': 'valve', 'sequence_number': 1, 'parameters': {}},
+        {'id': 'loop', 'name': 'Cycle', 'type': 'loop', 'sequence_number': 2, 'parameters': {'count': 3}},
+        {'id': 'v2', 'name': 'Pulse B', 'type': 'valve', 'sequence_number': 1,
+         'parent_step_id': 'loop', 'parameters': {'valve_number': 2, 'duration_ms': 150}},
+        {'id': 'p1', 'name': 'Purge', 'type': 'purge', 'sequence_number': 2,
+         'parent_step_id': 'loop', 'parameters': {}},
+        {'id': 'p2', 'name': 'Final purge', 'type': 'purge', 'sequence_number': 3,
+         'parameters': {'duration_ms': 2000, 'gas_type': 'Ar'}},
+    ]
+    return {'id': 'exec-1', 'recipe_id': 'recipe-1', 'recipe_version': {'steps': steps}}
+
+
+CONFIGS = {
+    'valve_step_config': [{'step_id': 'v1', 'valve_number': 1, 'duration_ms': 50}],
+    'purge_step_config': [{'step_id': 'p1', 'duration_ms': 300, 'gas_type': 'N2', 'flow_rate': 10.0}],
+    'loop_step_config': [{'step_id': 'loop', 'iteration_count': 500}],
+}
+VALVES = {1: {'address': 100}, 2: {'address': 101}}
+
+
+def test_configs_fetched_with_one_query_per_table():
+    supabase = RecordingSupabase(CONFIGS)
+    plan = compile_recipe(make_process(), supabase, VALVES)
+
+    assert sorted(q[:2] for q in supabase.queries) == [
+        ('loop_step_config', 'select'), ('purge_step_config', 'select'), ('valve_step_config', 'select')
+    ]
+    assert plan.config_queries == 3
+    assert plan.step('v1').duration_ms == 50 and plan.step('v1').modbus_address == 100
+    assert plan.step('p1').gas_type == 'N2'
+    assert plan.step('loop').loop_count == 500
+
+
+def test_steps_without_config_use_inline_parameters():
+    plan = compile_recipe(make_process(), RecordingSupabase(CONFIGS), VALVES)
+
+    v2 = plan.step('v2')
+    assert (v2.valve_number, v2.duration_ms, v2.modbus_address) == (2, 150, 101)
+    p2 = plan.step('p2')
+    assert (p2.duration_ms, p2.gas_type, p2.flow_rate) == (2000, 'Ar', 0.0)
+
+
+def test_unknown_valve_fails_compilation():
+    with pytest.raises(ValueError, match='valve 2'):
+        compile_recipe(make_process(), RecordingSupabase(CONFIGS), {1: {'address': 100}})
+    # Without a valve map (e.g. simulation not yet connected) valves are not validated
+    assert compile_recipe(make_process(), RecordingSupabase(CONFIGS)).step('v2').modbus_address is None
+
+
+def test_plc_exposes_valve_mapping():
+    plc = SimulationPLC()
+    assert plc.get_valve_mapping() == {}
+    plc._valve_cache[1] = {'address': 100}
+    with pytest.raises(ValueError, match='valve 2'):
+        compile_recipe(make_process(), RecordingSupabase(CONFIGS), plc.get_valve_mapping())
+
+
+def test_overall_steps_and_totals():
+    plan = compile_recipe(make_process(), RecordingSupabase(CONFIGS), VALVES)
+
+    assert [s.step_id for s in plan.steps] == ['v1', 'loop', 'p2']
+    assert [s.overall_step for s in plan.steps] == [0, 1, 1001]
+    assert plan.step('v2').overall_step == plan.step('loop').overall_step
+    assert plan.total_steps == 1 + 2 * 500 + 1
+    assert plan.total_cycles == 500
+
+
+@pytest.mark.asyncio
+async def test_valve_step_under_plan_does_no_config_reads():
+    plan = compile_recipe(make_process(), RecordingSupabase(CONFIGS), VALVES)
+    supabase = RecordingSupabase({})
+    plc = Mock(burst_capture=None)
+    plc.control_valve = AsyncMock(return_value=True)
+
+    with patch('src.step_flow.valve_step.get_supabase', return_value=supabase), \
+            patch('src.plc.context.get_plc', return_value=plc):
+        with execution_plan(plan):
+            assert current_plan() is plan
+            await execute_valve_step('exec-1', {'id': 'v2', 'name': 'Pulse B', 'type': 'valve'})
+    assert current_plan() is None
+
+    plc.control_valve.assert_awaited_once_with(2, True, 150)
+    assert not [q for q in supabase.queries if q[1] == 'select']
+    # Without an audit sink the row is inserted from a background thread
+    for _ in range(100):
+        audit = [q[:2] for q in supabase.queries if q[0] == 'recipe_execution_audit']
+        if audit:
+            break
+        await asyncio.sleep(0.01)
+    assert audit == [('recipe_execution_audit', 'insert')]
@@ -0,0 +1,116 @@
+"""
+Recipe Dry Run Tests
+
+Tests for the virtual-clock recipe dry run and duration predictor:
+1. A 2000-cycle recipe dry-runs in well under a second with exact duration and valve duty
+2. Parameter writes are counted and an out-of-range parameter is reported as the failing step
+3. The database, PLC and log-level overrides are scoped to the dry run
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+import src.db
+import src.plc.context
+from src.log_setup import get_step_flow_logger
+from src.recipe_flow.dry_run import dry_run_recipe, format_report
+
+
+def ald_recipe(cycles):
+    steps = [
+        {'id': 'loop', 'name': 'ALD cycle', 'type': 'loop', 'sequence_number': 1, 'parameters': {'count': cycles}},
+        {'id': 'v1', 'name': 'Precursor', 'type': 'valve', 'sequence_number': 1, 'parent_step_id': 'loop',
+         'parameters': {'valve_number': 1, 'duration_ms': 100}},
+        {'id': 'p1', 'name': 'Purge', 'type': 'purge', 'sequence_number': 2, 'parent_step_id': 'loop',
+         'parameters': {'duration_ms': 300, 'gas_type': 'N2'}},
+        {'id': 'v2', 'name': 'Oxidizer', 'type': 'valve', 'sequence_number': 3, 'parent_step_id': 'loop',
+         'parameters': {'valve_number': 2, 'duration_ms': 50}},
+        {'id': 'p2', 'name': 'Purge', 'type': 'purge', 'sequence_number': 4, 'parent_step_id': 'loop',
+         'parameters': {'duration_ms': 550, 'gas_type': 'N2'}},
+    ]
+    return {'id': 'recipe-1', 'name': 'Al2O3'}, steps
+
+
+@pytest.mark.asyncio
+async def test_long_recipe_predicts_duration_quickly():
+    recipe, steps = ald_recipe(2000)
+
+    started = time.perf_counter()
+    report = await dry_run_recipe(recipe, steps)
+    elapsed = time.perf_counter() - started
+
+    assert report.error is None
+    assert elapsed < 5.0  # 2000 cycles of 1 s each, in virtual time
+    assert report.predicted_ms == pytest.approx(2000 * 1000)
+    assert report.planned_ms == 2000 * 1000
+    assert report.steps == 8000 and report.cycles == 2000
+    assert report.valves[1] == {'pulses': 2000, 'open_ms': pytest.approx(200_000), 'duty_cycle': pytest.approx(0.1)}
+    assert report.valves[2]['duty_cycle'] == pytest.approx(0.05)
+    assert report.plc_operations == {'control_valve': 8000}
+    # 4000 valve audit rows, bulk-inserted at most once per second of recipe time
+    assert report.db_operations['recipe_execution_audit.insert'] <= 2000
+    # Progress is coalesced on the virtual clock: at most one state write per 500 ms of recipe time
+    assert report.db_operations['process_execution_state.update'] <= 2 * 2000 + 2
+    # Process data is sampled with those flushes, not after every one of the 8001 steps
+    assert report.db_operations.get('machine_components.select', 0) <= 2 * 2000 + 2
+    assert report.progress_writes['writes_saved'] > 30_000
+    assert 'Predicted duration: 0h 33m 20.000s' in format_report(report)
+
+
+@pytest.mark.asyncio
+async def test_parameter_steps_and_failing_step():
+    recipe = {'id': 'recipe-2', 'name': 'Heat up'}
+    steps = [
+        {'id': 's1', 'name': 'Set temp', 'type': 'set parameter', 'sequence_number': 1,
+         'parameters': {'parameter_id': 'temp', 'value': 150}},
+        {'id': 's2', 'name': 'Overheat', 'type': 'set parameter', 'sequence_number': 2,
+         'parameters': {'parameter_id': 'temp', 'value': 900}},
+    ]
+    tables = {'component_parameters': [{'id': 'temp', 'min_value': 0, 'max_value': 300, 'set_value': 0}]}
+
+    report = await dry_run_recipe(recipe, steps, tables)
+
+    assert report.plc_operations == {'write_parameter': 1}
+    assert report.steps == 1
+    assert 'outside allowed range' in report.error
+    assert 'Dry run stopped with error' in format_report(report)
+
+
+@pytest.mark.asyncio
+async def test_overrides_are_scoped_to_dry_run():
+    recipe, steps = ald_recipe(2)
+    report = await dry_run_recipe(recipe, steps, keep_timeline=True)
+
+    assert len(report.timeline) == 8
+    assert report.timeline[-1]['end_ms'] == pytest.approx(2000)
+    assert src.db._supabase_override.get() is None
+    assert src.plc.context._plc_override.get() is None
+
+
+@pytest.mark.asyncio
+async def test_dry_run_does_not_quiet_a_concurrent_real_run():
+    step_logger = get_step_flow_logger()
+    seen = []
+    handler = logging.Handler(logging.INFO)
+    handler.emit = lambda record: seen.append(record.getMessage())
+
+    async def real_run():
+        for i in range(20):
+            step_logger.info(f"real step {i}")
+            await asyncio.sleep(0)
+
+    step_logger.addHandler(handler)
+    try:
+        await asyncio.gather(dry_run_recipe(*ald_recipe(20)), real_run())
+    finally:
+        step_logger.removeHandler(handler)
+
+    assert [m for m in seen if m.startswith('real step')] == [f"real step {i}" for i in range(20)]
+    assert len(seen) == 20  # the dry run's own step logs stay quiet
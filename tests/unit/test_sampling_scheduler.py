@@ -0,0 +1,151 @@
+"""
+Multi-Rate Sampling Tests
+
+Tests for Terminal 1 multi-rate polling:
+1. Parameters get their sampling class from metadata or overrides
+2. Each tick reads only the due classes; coinciding classes share one tick
+3. A class that falls behind skips missed ticks; jitter/latency are per class
+4. RealPLC plans bulk ranges over the polled subset only
+5. The service loop reads the due subsets and reports per-class timing
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from plc_data_service import PLCDataService
+from src.data_collection.sampling_scheduler import (
+    MultiRateScheduler, parse_sampling_classes, sampling_class_for
+)
+from src.plc.real_plc import RealPLC
+
+CLASSES = {'fast': 0.1, 'normal': 1.0, 'slow': 0.5, 'static': 60.0}
+
+
+def test_class_assignment_from_metadata_and_overrides():
+    assert parse_sampling_classes("fast:0.1, slow:5") == {'fast': 0.1, 'slow': 5.0}
+
+    overrides = {'p_cfg': 'static', 'heater-1': 'fast', 'Chamber Gauge': 'normal'}
+    assert sampling_class_for('p1', {'data_type': 'pressure'}, {}, CLASSES) == 'fast'
+    assert sampling_class_for('p2', {'data_type': 'float', 'component_type': 'heater'}, {}, CLASSES) == 'slow'
+    assert sampling_class_for('p3', {'data_type': 'binary'}, {}, CLASSES) == 'normal'
+    assert sampling_class_for('p_cfg', {'data_type': 'float'}, overrides, CLASSES) == 'static'
+    assert sampling_class_for('p4', {'component_id': 'heater-1'}, overrides, CLASSES) == 'fast'
+    assert sampling_class_for(
+        'p5', {'data_type': 'pressure', 'component_name': 'Chamber Gauge'}, overrides, CLASSES
+    ) == 'normal'
+
+
+def test_ticks_read_only_due_classes_and_merge_coinciding_ones():
+    scheduler = MultiRateScheduler(CLASSES)
+    scheduler.assign('pressure', 'fast')
+    scheduler.assign('temp_1', 'slow')
+    scheduler.assign('temp_2', 'slow')
+    scheduler.start(0.0)
+
+    reads = []
+    while True:
+        deadline, due = scheduler.next_tick()
+        if deadline > 0.999:
+            break
+        reads.append((round(deadline, 3), sorted(scheduler.parameters_for(due))))
+        scheduler.complete(due, started=deadline, latency_s=0.01, now=deadline + 0.01)
+
+    assert len(reads) == 10  # fast class at 10 Hz
+    assert reads[0] == (0.0, ['pressure', 'temp_1', 'temp_2'])
+    assert reads[5] == (0.5, ['pressure', 'temp_1', 'temp_2'])
+    assert all(ids == ['pressure'] for at, ids in reads if at not in (0.0, 0.5))
+
+    metrics = scheduler.get_metrics()
+    assert metrics['fast']['ticks'] == 10
+    assert metrics['slow']['ticks'] == 2
+    assert metrics['static']['ticks'] == 0  # no parameters, never scheduled
+
+
+def test_late_class_skips_missed_ticks_and_records_jitter():
+    scheduler = MultiRateScheduler({'fast': 0.1, 'slow': 1.0})
+    scheduler.assign('pressure', 'fast')
+    scheduler.assign('temp', 'slow')
+    scheduler.start(0.0)
+
+    deadline, due = scheduler.next_tick()
+    # The read starts 20 ms late and takes 330 ms: the fast class misses three ticks
+    scheduler.complete(due, started=0.02, latency_s=0.33, now=0.35)
+
+    deadline, due = scheduler.next_tick()
+    assert due == ['fast'] and deadline == pytest.approx(0.4)
+    metrics = scheduler.get_metrics()
+    assert metrics['fast']['skipped_ticks'] == 3
+    assert metrics['slow']['skipped_ticks'] == 0
+    assert metrics['fast']['last_jitter_ms'] == pytest.approx(20.0)
+    assert metrics['slow']['max_read_latency_ms'] == pytest.approx(330.0)
+
+
+def _param(addr, data_type='float'):
+    return {
+        'name': f'p{addr}',
+        'read_modbus_address': addr,
+        'read_modbus_type': 'coil' if data_type == 'binary' else 'holding',
+        'data_type': data_type,
+        'is_writable': False,
+    }
+
+
+@pytest.mark.asyncio
+async def test_real_plc_plans_ranges_over_polled_subset():
+    plc = RealPLC(ip_address='127.0.0.1', port=502)
+    plc.connected = True
+    plc._parameter_cache = {
+        'pressure': _param(100),
+        'temp_1': _param(500),
+        'temp_2': _param(502),
+        'valve': _param(10, 'binary'),
+    }
+    await plc._initialize_bulk_read_optimization()
+    plc._bulk_read_holding_registers = AsyncMock(return_value={'pressure': 1.5})
+    plc._bulk_read_coils = AsyncMock(return_value={})
+
+    assert await plc.read_parameters(['pressure']) == {'pressure': 1.5}
+
+    ranges = plc._bulk_read_holding_registers.await_args.args[0]
+    assert [p[0] for r in ranges for p in r['parameters']] == ['pressure']
+    plc._bulk_read_coils.assert_not_called()
+    # The subset plan is cached for the next tick
+    assert plc._read_ranges_for(['pressure']) is plc._read_ranges_for(['pressure'])
+
+
+@pytest.mark.asyncio
+async def test_service_multi_rate_loop_reads_due_subsets():
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    service.sampling_classes = {'fast': 0.02, 'slow': 0.1}
+    service.parameter_metadata = {
+        'pressure': {'data_type': 'pressure'},
+        'temp': {'data_type': 'temperature'},
+    }
+    service._configure_sampling_classes()
+    assert service.wide_batcher.arrival_interval == 0.02
+    assert service.cycle_log_level == logging.DEBUG  # no INFO line per 20 ms tick
+
+    reads = []
+
+    async def collect(parameter_ids=None):
+        reads.append(sorted(parameter_ids))
+
+    service._collect_and_log_data = collect
+    loop_task = asyncio.create_task(service._data_collection_loop())
+    await asyncio.sleep(0.15)
+    service.shutdown_event.set()
+    await loop_task
+
+    assert reads[0] == ['pressure', 'temp']
+    assert reads.count(['pressure']) >= 3
+    classes = service.get_status()['sampling_classes']
+    assert classes['fast']['ticks'] > classes['slow']['ticks'] >= 1
+    service._db_executor.shutdown(wait=False)
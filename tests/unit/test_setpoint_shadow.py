@@ -0,0 +1,165 @@
+"""
+Setpoint Shadow Tests
+
+Tests for shadow-state setpoint synchronization in Terminal 1:
+1. The shadow reports only real deltas and external changes
+2. Realtime notifications update tracked parameters only
+3. Without Realtime the shadow asks for a periodic re-seed
+4. The service syncs setpoints without a SELECT per read and writes only deltas
+5. A closed or errored Realtime channel clears the flag and triggers a re-seed
+6. Rows the batch RPC did not update stay pending and are retried
+"""
+
+import os
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from plc_data_service import PLCDataService
+from src.data_collection.setpoint_shadow import SetpointShadow
+
+
+def test_diff_reports_only_real_deltas():
+    shadow = SetpointShadow(tolerance=0.01)
+    shadow.seed({'temp': 200.0, 'flow': 50.0}, ['temp', 'flow', 'pressure'])
+
+    updates, external = shadow.diff({'temp': 200.005, 'flow': 55.0, 'pressure': 1.0})
+    assert updates == ['flow', 'pressure']  # pressure has no DB value yet
+    assert external == [('flow', 50.0)]
+
+    shadow.confirm({'flow': 55.0, 'pressure': 1.0})
+    assert shadow.diff({'temp': 200.0, 'flow': 55.0, 'pressure': 1.0}) == ([], [])
+    assert shadow.get_metrics()['deltas_confirmed'] == 2
+
+
+def test_realtime_updates_tracked_parameters_only():
+    shadow = SetpointShadow()
+    shadow.seed({'temp': 200.0}, ['temp'])
+
+    assert shadow.apply_remote({'id': 'temp', 'set_value': 210.0})
+    assert not shadow.apply_remote({'id': 'other', 'set_value': 1.0})
+    assert not shadow.apply_remote({'id': 'temp', 'name': 'no set_value column'})
+    assert shadow.get('temp') == 210.0
+    assert 'other' not in shadow
+    # The PLC still holds the old value: it is reported as an external change
+    assert shadow.diff({'temp': 200.0}) == (['temp'], [('temp', 210.0)])
+
+
+def test_periodic_reseed_only_without_realtime():
+    now = {'t': 0.0}
+    shadow = SetpointShadow(reseed_interval=60.0, clock=lambda: now['t'])
+    assert shadow.needs_reseed()
+
+    shadow.seed({}, ['temp'])
+    now['t'] = 59.0
+    assert not shadow.needs_reseed()
+    now['t'] = 61.0
+    assert shadow.needs_reseed()
+
+    shadow.set_realtime_connected(True)
+    assert not shadow.needs_reseed()
+    shadow.set_realtime_connected(False)  # channel dropped: re-seed right away
+    assert shadow.needs_reseed()
+
+
+@pytest.mark.asyncio
+async def test_service_sync_writes_deltas_without_select_per_read():
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    service.parameter_metadata = {
+        'temp': {'is_writable': True, 'name': 'temp'},
+        'flow': {'is_writable': True, 'name': 'flow'},
+    }
+    selects = []
+    updates = []
+
+    def select(param_ids):
+        selects.append(sorted(param_ids))
+        return {'temp': 200.0, 'flow': 50.0, 'valve': 0.0}
+
+    def batch_update(batch):
+        updates.append(batch)
+        return len(batch), {update['id'] for update in batch}
+
+    service._supabase_select_setvalues_sync = select
+    service._supabase_batch_update_setvalues_sync = batch_update
+    service.setpoint_shadow.set_realtime_connected(True)
+
+    await service._seed_setpoint_shadow()
+    assert selects == [['flow', 'temp']]
+
+    # Steady state: nothing changed, no DB round-trip at all
+    for _ in range(5):
+        await service._sync_setpoints_to_database({'temp': 200.0, 'flow': 50.0})
+    assert selects == [['flow', 'temp']] and updates == []
+
+    # Only the changed setpoint is written; a parameter seen for the first time is seeded once
+    await service._sync_setpoints_to_database({'temp': 205.0, 'flow': 50.0, 'valve': 0.0})
+    await service._sync_setpoints_to_database({'temp': 205.0, 'flow': 50.0, 'valve': 0.0})
+    assert selects == [['flow', 'temp'], ['valve']]
+    assert updates == [[{'id': 'temp', 'set_value': 205.0}]]
+    assert service.metrics['external_setpoint_changes_detected'] == 1
+
+    # A Realtime notification (e.g. Terminal 3 wrote the same value) avoids a redundant write
+    service._on_setpoint_change({'data': {'record': {'id': 'flow', 'set_value': 60.0}}})
+    await service._sync_setpoints_to_database({'temp': 205.0, 'flow': 60.0, 'valve': 0.0})
+    assert len(updates) == 1
+    assert service.get_status()['setpoint_shadow']['realtime_updates'] == 1
+
+    # A dropped channel clears the flag and re-seeds, since UPDATEs may have been missed
+    service._on_setpoint_channel_status('CHANNEL_ERROR', Exception('socket closed'))
+    assert not service.get_status()['setpoint_shadow']['realtime_connected']
+    await service._sync_setpoints_to_database({'temp': 205.0, 'flow': 60.0, 'valve': 0.0})
+    assert len(selects) == 3
+    service._on_setpoint_channel_status('SUBSCRIBED')
+    assert not service.setpoint_shadow.needs_reseed()
+
+    # A channel that drops after subscribing is noticed on the next sync
+    service.setpoint_channel = Mock(is_joined=False, is_closed=True)
+    await service._sync_setpoints_to_database({'temp': 205.0, 'flow': 60.0, 'valve': 0.0})
+    assert not service.get_status()['setpoint_shadow']['realtime_connected']
+    assert len(selects) == 4
+    service._db_executor.shutdown(wait=False)
+
+
+@pytest.mark.asyncio
+async def test_rows_the_rpc_did_not_update_are_retried():
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    service.parameter_metadata = {
+        'temp': {'is_writable': True, 'name': 'temp'},
+        'flow': {'is_writable': True, 'name': 'flow'},
+    }
+    updates = []
+
+    def batch_update(batch):
+        updates.append(sorted(update['id'] for update in batch))
+        return 1, {'temp'}  # 'flow' was not updated
+
+    service._supabase_select_setvalues_sync = lambda param_ids: {'temp': 200.0, 'flow': 50.0}
+    service._supabase_batch_update_setvalues_sync = batch_update
+    service.setpoint_shadow.set_realtime_connected(True)
+    await service._seed_setpoint_shadow()
+
+    await service._sync_setpoints_to_database({'temp': 205.0, 'flow': 55.0})
+    await service._sync_setpoints_to_database({'temp': 205.0, 'flow': 55.0})
+    assert updates == [['flow', 'temp'], ['flow']]
+    service._db_executor.shutdown(wait=False)
+
+
+def test_batch_update_rpc_result_parsing():
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    batch = [{'id': 'temp', 'set_value': 205.0}, {'id': 'flow', 'set_value': 55.0}]
+
+    service.supabase.rpc.return_value.execute.return_value = Mock(data=['temp'])
+    assert service._supabase_batch_update_setvalues_sync(batch) == (1, {'temp'})
+    # Count-only RPC: a short count confirms nothing
+    service.supabase.rpc.return_value.execute.return_value = Mock(data=1)
+    assert service._supabase_batch_update_setvalues_sync(batch) == (1, set())
+    service.supabase.rpc.return_value.execute.return_value = Mock(data=2)
+    assert service._supabase_batch_update_setvalues_sync(batch) == (2, {'temp', 'flow'})
+    service._db_executor.shutdown(wait=False)
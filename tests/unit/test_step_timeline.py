@@ -0,0 +1,167 @@
+"""
+Step Timeline Tests
+
+Tests for the deadline-driven ALD step timeline:
+1. Step overhead and write latency are absorbed, not accumulated, across cycles
+2. A stall beyond the slip threshold shifts the timeline instead of shortening a pulse
+3. A pulse always closes its valve, even when the run is cancelled mid-pulse
+4. The valve step opens without auto-close and closes the valve itself under a timeline
+5. A late start plus open-write latency never shortens a pulse below its requested width
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, Mock, call, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.recipe_flow.timeline import StepTimeline, step_timeline
+from src.step_flow.valve_step import execute_valve_step
+
+
+class VirtualClock:
+    """Monotonic clock advanced by sleeps (with overshoot) and simulated work."""
+
+    def __init__(self, overshoot=0.0015):
+        self.t = 1000.0
+        self.overshoot = overshoot
+
+    def __call__(self):
+        return self.t
+
+    async def sleep(self, seconds):
+        self.t += seconds + self.overshoot if seconds > 0 else 0.0002
+
+    def work(self, ms):
+        self.t += ms / 1000.0
+
+
+def make_timeline(clock, slip_threshold_ms=20):
+    return StepTimeline(slip_threshold_ms=slip_threshold_ms, clock=clock, sleep=clock.sleep)
+
+
+def make_edge(clock, latency_ms=3.0):
+    edges = []
+
+    async def edge():
+        clock.work(latency_ms)
+        edges.append(clock())
+        return True
+    return edge, edges
+
+
+@pytest.mark.asyncio
+async def test_overhead_absorbed_across_cycles():
+    clock = VirtualClock()
+    timeline = make_timeline(clock)
+    timeline.start(planned_ms=50 * 300)
+    edge, _ = make_edge(clock)
+
+    for cycle in range(1, 51):
+        timeline.begin_cycle(cycle)
+        clock.work(2)  # handler / progress bookkeeping before the pulse
+        assert await timeline.run_pulse(edge, edge, 100)
+        clock.work(2)
+        assert await timeline.run_wait(200)
+        timeline.end_cycle()
+
+    summary = timeline.summary()
+    assert summary['steps'] == 100 and summary['cycles'] == 50
+    assert summary['slips'] == 0
+    # Without deadlines each cycle would run ~10 ms long: 500 ms over 50 cycles
+    assert summary['elapsed_ms'] < 50 * 300 + 10
+    pulse_errors = [t.width_error_ms for t in timeline.timings if t.kind == 'valve']
+    assert all(0 <= e < 5 for e in pulse_errors)
+    # The late start and open latency the pulse made up for come out of the purge after it
+    purge_errors = [t.width_error_ms for t in timeline.timings if t.kind == 'purge']
+    assert all(-12 < e <= 0 for e in purge_errors)
+    assert summary['cycle_error']['p99_ms'] < 5
+    assert timeline.timings[0].cycle == 1 and timeline.timings[-1].kind == 'purge'
+
+
+@pytest.mark.asyncio
+async def test_stall_slips_timeline_instead_of_shortening_pulse():
+    clock = VirtualClock()
+    timeline = make_timeline(clock)
+    timeline.start()
+    edge, _ = make_edge(clock, latency_ms=0)
+
+    await timeline.run_pulse(edge, edge, 100)
+    clock.work(80)  # stalled database call
+    await timeline.run_pulse(edge, edge, 100)
+
+    summary = timeline.summary()
+    assert summary['slips'] == 1
+    assert summary['slipped_ms'] == pytest.approx(80, abs=3)
+    assert abs(timeline.timings[1].width_error_ms) < 3
+
+
+@pytest.mark.asyncio
+async def test_pulse_closes_valve_when_cancelled():
+    timeline = StepTimeline()
+    timeline.start()
+    closes = []
+
+    async def open_valve():
+        return True
+
+    async def close_valve():
+        closes.append(True)
+        return True
+
+    task = asyncio.create_task(timeline.run_pulse(open_valve, close_valve, 10_000))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert closes == [True]
+    assert not await timeline.run_wait(10_000, cancelled=lambda: True)
+
+
+@pytest.mark.asyncio
+async def test_valve_step_closes_valve_under_timeline():
+    plc = Mock(burst_capture=None)
+    plc.control_valve = AsyncMock(return_value=True)
+    timeline = StepTimeline()
+    timeline.start()
+    step = {'id': 'v1', 'name': 'Pulse', 'type': 'valve', 'parameters': {'valve_number': 2, 'duration_ms': 20}}
+
+    query = Mock()
+    query.execute.return_value = Mock(data=[])
+    for method in ('select', 'update', 'insert', 'eq', 'single'):
+        getattr(query, method).return_value = query
+
+    with patch('src.step_flow.valve_step.get_supabase', return_value=Mock(table=Mock(return_value=query))), \
+            patch('src.plc.context.get_plc', return_value=plc):
+        with step_timeline(timeline):
+            await execute_valve_step('exec-1', step)
+
+    assert plc.control_valve.await_args_list == [call(2, True, 20, auto_close=False), call(2, False)]
+    assert timeline.timings[0].actual_end >= timeline.timings[0].planned_end
+
+
+@pytest.mark.asyncio
+async def test_late_start_and_open_latency_never_shorten_pulse():
+    clock = VirtualClock(overshoot=0.0)
+    timeline = make_timeline(clock)
+    timeline.start()
+    opened, closed = [], []
+
+    async def open_valve():
+        clock.work(4)  # slow open write
+        opened.append(clock())
+        return True
+
+    async def close_valve():
+        closed.append(clock())
+        return True
+
+    clock.work(15)  # late by less than the slip threshold
+    assert await timeline.run_pulse(open_valve, close_valve, 20)
+
+    assert timeline.metrics.slips == 0
+    assert (closed[0] - opened[0]) * 1000 >= 20
+    assert timeline.timings[0].width_error_ms >= 0
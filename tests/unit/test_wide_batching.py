@@ -0,0 +1,101 @@
+"""
+Wide-Row Micro-Batching Tests
+
+Tests for the Terminal 1 DB writer batching wide rows:
+1. Batch size follows the queued backlog and the measured RPC latency
+2. Slow or failed batches halve the batch cap; healthy full batches grow it
+3. The writer sends logged rows in one batched RPC, in timestamp order
+4. A failed batch dead-letters every row
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from plc_data_service import PLCDataService
+from src.data_collection.wide_batcher import AdaptiveWideBatcher
+from src.data_collection.write_ahead_log import SegmentedWriteAheadLog
+
+
+def _rpc_response(data):
+    response = Mock()
+    response.data = data
+    return response
+
+
+@pytest.fixture
+def service(tmp_path):
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    service.dead_letter_queue_dir = tmp_path / "dead_letter_queue"
+    service.dead_letter_queue_dir.mkdir(parents=True, exist_ok=True)
+    service.wal = SegmentedWriteAheadLog(tmp_path / "wal", group_commit_ms=5)
+    service.wal.open()
+    return service
+
+
+def test_target_follows_backlog_and_latency():
+    batcher = AdaptiveWideBatcher(max_rows=10, arrival_interval=1.0)
+    assert batcher.target_size(backlog=1) == 1
+    assert batcher.target_size(backlog=25) == 10  # capped at max_rows
+
+    # A 3.2s RPC means ~4 rows arrive per request: batch at least that many
+    batcher.record_success(rows=1, rpc_seconds=3.2)
+    assert batcher.target_size(backlog=1) == 4
+
+
+def test_cap_shrinks_on_failure_or_slow_rpc_and_regrows():
+    batcher = AdaptiveWideBatcher(max_rows=16, latency_budget_ms=500)
+
+    batcher.record_failure()
+    assert batcher.cap == 8
+    batcher.record_success(rows=8, rpc_seconds=0.9)  # over budget
+    assert batcher.cap == 4
+    batcher.record_success(rows=4, rpc_seconds=0.1)  # full and fast
+    assert batcher.cap == 8
+
+    metrics = batcher.get_metrics()
+    assert metrics['failed_requests'] == 1
+    assert metrics['rows_per_request'] == 6.0
+    assert metrics['throughput_ceiling_rows_per_s'] == pytest.approx(12 / 1.0)
+
+
+@pytest.mark.asyncio
+async def test_writer_sends_queued_rows_in_one_batched_rpc(service):
+    service.supabase.rpc.return_value.execute.return_value = _rpc_response(5)
+    for second in range(5):
+        await service._enqueue_wide_record(f"2026-01-01T00:00:0{second}", {'param_a': float(second)})
+    await service.wal.sync()
+
+    writer = asyncio.create_task(service._db_writer_loop())
+    await asyncio.sleep(0.05)
+    service.shutdown_event.set()
+    await writer
+    await service.wal.close()
+
+    service.supabase.rpc.assert_called_once()
+    name, = service.supabase.rpc.call_args.args
+    rows = service.supabase.rpc.call_args.kwargs['params']['p_rows']
+    assert name == 'insert_parameter_readings_wide_batch'
+    assert [row['timestamp'][-2:] for row in rows] == ['00', '01', '02', '03', '04']
+    assert service.metrics['successful_readings'] == 5
+
+    metrics = service.get_status()['wide_batching']
+    assert metrics['requests'] == 1
+    assert metrics['rows_per_request'] == 5.0
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_dead_letters_every_row(service):
+    service.supabase.rpc.return_value.execute.side_effect = Exception("connection reset")
+    rows = [(f"2026-01-01T00:00:0{i}", {'param_a': float(i)}) for i in range(3)]
+
+    assert await service._insert_wide_batch_with_retry(rows) is False
+
+    assert len(list(service.dead_letter_queue_dir.glob('failed_wide_*.json'))) == 3
+    assert service.metrics['batch_insert_failures'] == 1
@@ -0,0 +1,167 @@
+"""
+Wide Column Mapping Tests
+
+Tests for the wide-table column mapping generated from parameter metadata:
+1. Known parameters keep their columns; new ones get collision-free names
+2. New columns stay pending until the wide table has them (probed at load)
+3. The database mapping is cached and reused when the database is unreachable
+4. Rows are built from a compiled layout; unmapped parameters warn once
+5. The generated SQL adds every column and syncs latest_parameter_readings
+6. The service re-probes pending columns on a timer and starts writing them once they exist
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from plc_data_service import PLCDataService
+from src.data_collection.wide_column_mapping import (
+    WideColumnMapping, column_name_for, generate_wide_table_sql
+)
+
+KNOWN_ID = '0d444e71-9767-4956-af7b-787bfa79d080'
+NEW_ID = 'abcdef01-2222-4333-8444-555566667777'
+CLASHING_ID = 'abcdef01-9999-4333-8444-555566667777'
+
+
+class FakeSupabase:
+    """Serves component_parameters_full and fails selects of missing wide columns."""
+
+    def __init__(self, rows, existing_columns=(), fail=False):
+        self.rows = rows
+        self.existing_columns = set(existing_columns)
+        self.fail = fail
+
+    def table(self, name):
+        query = Mock()
+        state = {}
+
+        def select(columns):
+            state['columns'] = columns
+            return query
+
+        def execute():
+            if self.fail:
+                raise Exception("database unavailable")
+            if name == 'component_parameters_full':
+                return Mock(data=self.rows)
+            if state['columns'] not in self.existing_columns:
+                raise Exception(f"column {name}.{state['columns']} does not exist")
+            return Mock(data=[])
+
+        query.select = select
+        query.limit = lambda n: query
+        query.execute = execute
+        return query
+
+
+def test_known_columns_kept_and_new_names_collision_free():
+    assert column_name_for(NEW_ID, set()) == 'param_abcdef01'
+    assert column_name_for(CLASHING_ID, {'param_abcdef01'}) == 'param_abcdef019999'
+
+    mapping = WideColumnMapping.from_rows([
+        {'id': KNOWN_ID, 'data_type': 'float'},
+        {'id': NEW_ID, 'data_type': 'float'},
+        {'id': CLASHING_ID, 'data_type': 'binary'},
+    ])
+    assert mapping.parameter_to_column == {KNOWN_ID: 'param_0d444e71'}
+    assert sorted(c.column for c in mapping.pending()) == ['param_abcdef01', 'param_abcdef019999']
+
+
+def test_load_probes_new_columns_and_caches(tmp_path):
+    cache = tmp_path / 'mapping.json'
+    rows = [{'id': KNOWN_ID}, {'id': NEW_ID}, {'id': CLASHING_ID}]
+
+    mapping = WideColumnMapping.load(FakeSupabase(rows, existing_columns={'param_abcdef01'}), cache)
+    assert mapping.metrics.source == 'database'
+    assert mapping.parameter_to_column[NEW_ID] == 'param_abcdef01'
+    assert [c.parameter_id for c in mapping.pending()] == [CLASHING_ID]
+    assert cache.exists()
+
+    offline = WideColumnMapping.load(FakeSupabase(rows, fail=True), cache)
+    assert offline.metrics.source == 'cache'
+    assert offline.parameter_to_column == mapping.parameter_to_column
+
+    assert WideColumnMapping.load(FakeSupabase(rows, fail=True), tmp_path / 'none.json').metrics.source == 'static'
+
+
+def test_build_row_uses_compiled_layout_and_warns_once():
+    mapping = WideColumnMapping.from_rows([{'id': KNOWN_ID}, {'id': NEW_ID}])
+    values = {NEW_ID: 5.0, KNOWN_ID: 1}
+
+    with patch('src.data_collection.wide_column_mapping.data_logger') as log:
+        for _ in range(3):
+            assert mapping.build_row(values) == {'param_0d444e71': 1.0}
+    assert log.warning.call_count == 1
+    assert 'param_abcdef01' in log.warning.call_args.args[0]
+
+    metrics = mapping.get_metrics()
+    assert metrics['layouts_compiled'] == 1
+    assert metrics['rows_built'] == 3
+    assert metrics['unmapped_values'] == 3
+
+
+def test_generated_sql_covers_every_column():
+    mapping = WideColumnMapping.from_rows([
+        {'id': KNOWN_ID, 'component_name': 'Chamber', 'parameter_name': 'pressure', 'data_type': 'float'},
+        {'id': NEW_ID},
+    ])
+    sql = generate_wide_table_sql(mapping)
+
+    assert 'ALTER TABLE parameter_readings ADD COLUMN IF NOT EXISTS param_0d444e71 float8;' in sql
+    assert 'ALTER TABLE parameter_readings ADD COLUMN IF NOT EXISTS param_abcdef01 float8;' in sql
+    assert f"('{NEW_ID}'::uuid, NEW.param_abcdef01)" in sql
+    assert 'ON CONFLICT (parameter_id)' in sql
+    assert 'CREATE TRIGGER sync_latest_readings_trigger' in sql
+    assert 'Chamber, pressure, float' in sql
+
+
+@pytest.mark.asyncio
+async def test_service_logs_rows_with_generated_mapping(tmp_path):
+    rows = [{'id': KNOWN_ID}, {'id': NEW_ID}]
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    service.supabase = FakeSupabase(rows, existing_columns={'param_abcdef01'})
+    service.column_mapping_cache = tmp_path / 'mapping.json'
+    service.async_writer_enabled = True
+    written = []
+
+    async def enqueue(timestamp, wide_record):
+        written.append(wide_record)
+
+    service._enqueue_wide_record = enqueue
+    await service._load_column_mapping()
+    assert await service._log_parameters_with_metadata({KNOWN_ID: 1.0, NEW_ID: 2.0}, {}) == 2
+    assert written == [{'param_0d444e71': 1.0, 'param_abcdef01': 2.0}]
+    assert service.get_status()['column_mapping']['columns'] == 2
+    service._db_executor.shutdown(wait=False)
+
+
+@pytest.mark.asyncio
+async def test_service_reprobes_pending_columns(tmp_path):
+    rows = [{'id': KNOWN_ID}, {'id': NEW_ID}]
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    service.supabase = FakeSupabase(rows)
+    service.column_mapping_cache = tmp_path / 'mapping.json'
+    service.column_probe_interval = 0.01
+    await service._load_column_mapping()
+    assert [c.column for c in service.column_mapping.pending()] == ['param_abcdef01']
+
+    probe = asyncio.create_task(service._column_probe_loop())
+    await asyncio.sleep(0.05)
+    assert not probe.done()  # still pending
+
+    service.supabase.existing_columns.add('param_abcdef01')  # DDL applied
+    await asyncio.wait_for(probe, timeout=1.0)
+
+    assert service.column_mapping.build_row({KNOWN_ID: 1.0, NEW_ID: 2.0}) == {
+        'param_0d444e71': 1.0, 'param_abcdef01': 2.0,
+    }
+    assert WideColumnMapping.from_cache(tmp_path / 'mapping.json').pending() == []
+    service._db_executor.shutdown(wait=False)
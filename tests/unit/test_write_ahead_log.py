@@ -0,0 +1,149 @@
+"""
+Write-Ahead Log Tests
+
+Tests for the Terminal 1 segmented write-ahead log:
+1. Appends within one group-commit window share a single fsync
+2. Segments rotate and older records stream back from disk in order
+3. The committed-offset checkpoint survives a restart and fully committed
+   segments are deleted
+4. A torn final line is truncated on recovery
+5. A DB outage keeps readings in the log (no drops, no DLQ files) and they
+   are replayed once the DB is back
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from plc_data_service import PLCDataService
+from src.data_collection.write_ahead_log import SegmentedWriteAheadLog
+
+
+def _wide(i):
+    return {'kind': 'wide', 't': f"2026-01-01T00:00:{i:02d}", 'p': {'param_a': float(i)}}
+
+
+@pytest.mark.asyncio
+async def test_group_commit_shares_one_fsync(tmp_path):
+    wal = SegmentedWriteAheadLog(tmp_path, group_commit_ms=20)
+    wal.open()
+    wal.start()
+    offsets = [wal.append(_wide(i)) for i in range(10)]
+    assert offsets == list(range(1, 11))
+    assert await wal.read(1, 10) == []  # not durable yet
+
+    assert await wal.wait_for_records(0, timeout=1.0)
+    entries = await wal.read(1, 10)
+    assert [offset for offset, _ in entries] == offsets
+    assert wal.get_metrics()['fsyncs'] == 1
+    await wal.close()
+
+
+@pytest.mark.asyncio
+async def test_rotated_segments_replay_from_disk_in_order(tmp_path):
+    wal = SegmentedWriteAheadLog(tmp_path, segment_max_bytes=200, tail_cache_records=2)
+    wal.open()
+    for i in range(20):
+        wal.append(_wide(i))
+    await wal.sync()
+    assert wal.get_metrics()['segments'] > 3
+
+    replayed = []
+    while len(replayed) < 20:
+        replayed += await wal.read(len(replayed) + 1, 6)
+    assert [record['t'][-2:] for _, record in replayed] == [f"{i:02d}" for i in range(20)]
+    assert wal.get_metrics()['replayed_from_disk'] == 18  # last two served from memory
+    await wal.close()
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_survives_restart_and_deletes_committed_segments(tmp_path):
+    wal = SegmentedWriteAheadLog(tmp_path, segment_max_bytes=200)
+    wal.open()
+    for i in range(20):
+        wal.append(_wide(i))
+    await wal.sync()
+    segments_before = wal.get_metrics()['segments']
+
+    wal.commit(12)
+    await wal.close()
+    assert wal.get_metrics()['segments_deleted'] > 0
+    assert wal.get_metrics()['segments'] < segments_before
+
+    reopened = SegmentedWriteAheadLog(tmp_path, segment_max_bytes=200)
+    reopened.open()
+    assert reopened.committed_offset == 12
+    assert reopened.last_offset == 20
+    assert reopened.get_metrics()['recovered_records'] == 8
+    entries = await reopened.read(13, 100)
+    assert [offset for offset, _ in entries] == list(range(13, 21))
+    assert reopened.append(_wide(20)) == 21
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_torn_tail_is_truncated_on_recovery(tmp_path):
+    wal = SegmentedWriteAheadLog(tmp_path)
+    wal.open()
+    for i in range(3):
+        wal.append(_wide(i))
+    await wal.close()
+
+    segment = sorted(tmp_path.glob('wal-*.log'))[-1]
+    with open(segment, 'ab') as f:
+        f.write(b'{"o":4,"r":{"kind":"wi')  # crash mid-write
+
+    reopened = SegmentedWriteAheadLog(tmp_path)
+    reopened.open()
+    assert reopened.last_offset == 3
+    assert reopened.get_metrics()['truncated_bytes'] > 0
+    assert reopened.append(_wide(3)) == 4
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_outage_keeps_readings_in_log_and_replays_them(tmp_path):
+    with patch('plc_data_service.get_supabase', return_value=Mock()):
+        service = PLCDataService()
+    service.dead_letter_queue_dir = tmp_path / "dead_letter_queue"
+    service.dead_letter_queue_dir.mkdir()
+    service.wal = SegmentedWriteAheadLog(tmp_path / "wal", group_commit_ms=5)
+    service.wal.open()
+    service._wal_retry_delay = 0.01
+
+    calls = []
+
+    def execute():
+        calls.append(1)
+        if len(calls) <= 3:  # first batch fails all three attempts
+            raise Exception("database unavailable")
+        response = Mock()
+        response.data = 5
+        return response
+
+    service.supabase.rpc.return_value.execute.side_effect = execute
+
+    for i in range(5):
+        await service._enqueue_wide_record(f"2026-01-01T00:00:0{i}", {'param_a': float(i)})
+    await service.wal.sync()
+
+    writer = asyncio.create_task(service._db_writer_loop())
+    for _ in range(300):
+        if service.wal.committed_offset == 5:
+            break
+        await asyncio.sleep(0.01)
+    service.shutdown_event.set()
+    await writer
+    await service.wal.close()
+
+    assert service.wal.committed_offset == 5
+    assert list(service.dead_letter_queue_dir.iterdir()) == []
+    assert service.metrics['batches_dropped'] == 0
+    assert service.metrics['successful_readings'] == 5
+    assert service.get_status()['write_ahead_log']['pending_records'] == 0
+    service._db_executor.shutdown(wait=False)